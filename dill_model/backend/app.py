@@ -1,17 +1,51 @@
-from flask import Flask, send_from_directory
+import time
+
+# 记录模块导入耗时（冷启动时间的主要部分）
+_import_started = time.perf_counter()
+
+from flask import Flask, Request, send_from_directory, abort, request, jsonify
+from flask.helpers import get_debug_flag
 from flask_cors import CORS
 import os
 import json
-from .routes import api_bp
-from .utils import NumpyEncoder
+import threading
+from .routes import api_bp, warm_up_ml_models
+from .utils import NumpyEncoder, StaticAssetManager, ResponseCompressor, format_response
+from .utils.intensity_file_parser import MAX_FILE_BYTES as INTENSITY_FILE_MAX_BYTES
+from .utils.lazy_imports import loaded_heavy_modules
+
+_import_seconds = time.perf_counter() - _import_started
+
+# 默认请求体上限
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+# 允许上传大文件的端点 -> 请求体上限（文件上限之外预留 multipart 表单开销）
+LARGE_UPLOAD_ENDPOINTS = {
+    'api.parse_intensity_file': INTENSITY_FILE_MAX_BYTES + 1024 * 1024
+}
+
 
-def create_app():
+class DillRequest(Request):
+    """按端点放宽请求体上限：服务端解析的光强文件可达 INTENSITY_FILE_MAX_BYTES，其余请求仍为16MB"""
+
+    @property
+    def max_content_length(self):
+        limit = LARGE_UPLOAD_ENDPOINTS.get(self.endpoint)
+        if limit is not None:
+            return limit
+        return super().max_content_length
+
+def create_app(debug=None):
     """
     创建并配置Flask应用
     
+    参数:
+        debug: 是否为调试（开发）模式；None 时取环境变量 FLASK_DEBUG。
+               需在创建时确定，之后 app.run(debug=...) 才设置的值不影响静态资源缓存策略
+    
     返回:
         配置好的Flask应用实例
     """
+    started = time.perf_counter()
     # 获取当前文件的绝对路径
     current_dir = os.path.dirname(os.path.abspath(__file__))
     # 项目根目录
@@ -28,13 +62,18 @@ def create_app():
         static_url_path=''
     )
     
+    if debug is None:
+        debug = get_debug_flag()
+    app.debug = bool(debug)
+    app.request_class = DillRequest
+    
     # 配置CORS，允许跨域请求
     CORS(app)
     
     # 配置应用
     app.config['JSON_SORT_KEYS'] = False
     # 文件上传配置
-    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB最大文件大小
+    app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH  # 16MB最大文件大小（光强文件解析端点见 LARGE_UPLOAD_ENDPOINTS）
     app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(root_dir), 'test_data')
     # 自定义JSON编码器以处理NumPy数据类型
     app.json_encoder = NumpyEncoder
@@ -42,20 +81,60 @@ def create_app():
     # 注册API蓝图
     app.register_blueprint(api_bp)
     
+    # 响应压缩（大体积JSON结果、HTML页面、SSE日志流）
+    ResponseCompressor(app)
+    
+    # 后台预热机器学习模型，首个预测请求无需等待模型加载（DILL_ML_WARMUP=0 可关闭）
+    # 预热会导入 scikit-learn/pandas 等并打开验证记录库，不放在启动路径上：
+    # 首个请求完成后再延迟 DILL_ML_WARMUP_DELAY 秒（默认10秒）在后台执行，避免与冷启动争用CPU
+    if os.environ.get('DILL_ML_WARMUP', '1') != '0':
+        warmup_delay = float(os.environ.get('DILL_ML_WARMUP_DELAY', 10))
+        warmup_lock = threading.Lock()
+        warmup_scheduled = []
+        
+        @app.after_request
+        def schedule_ml_warmup(response):
+            if not warmup_scheduled:
+                with warmup_lock:
+                    if not warmup_scheduled:
+                        timer = threading.Timer(warmup_delay, warm_up_ml_models)
+                        timer.name = 'ml-warmup'
+                        timer.daemon = True
+                        timer.start()
+                        warmup_scheduled.append(timer)
+            return response
+    
+    # 前端静态资源：预压缩 + 指纹路径长期缓存（DILL_STATIC_CACHE=0 时按开发模式发送原文件）
+    static_assets = StaticAssetManager(
+        frontend_static_dir,
+        fingerprint=os.environ.get('DILL_STATIC_CACHE', '1') != '0' and not debug
+    )
+    app.extensions['static_assets'] = static_assets
+    
+    def serve_static(filename):
+        response = static_assets.serve(filename)
+        if response is None:
+            abort(404)
+        return response
+    
+    app.view_functions['static'] = serve_static
+    if static_assets.fingerprint:
+        threading.Thread(target=static_assets.warm, name='static-warmup', daemon=True).start()
+    
     # 首页路由
     @app.route('/')
     def index():
-        return send_from_directory(frontend_static_dir, 'index.html')
+        return static_assets.serve('index.html')
     
     # 单一计算页面路由
     @app.route('/index.html')
     def single_calculation():
-        return send_from_directory(frontend_static_dir, 'index.html')
+        return static_assets.serve('index.html')
     
     # 参数比较页面路由
     @app.route('/compare.html')
     def parameter_comparison():
-        return send_from_directory(frontend_static_dir, 'compare.html')
+        return static_assets.serve('compare.html')
     
     # 模型矩阵可视化页面路由
     @app.route('/matrix_visualization/<path:filename>')
@@ -67,15 +146,32 @@ def create_app():
     def matrix_visualization_index():
         return send_from_directory(matrix_visualization_static_dir, 'index.html')
     
+    # 413错误处理 - API请求返回JSON，便于前端给出明确提示
+    @app.errorhandler(413)
+    def request_too_large(e):
+        limit = request.max_content_length
+        if not request.path.startswith('/api/'):
+            return e
+        return jsonify(format_response(False, data={'max_bytes': limit},
+                                       message=f"上传内容过大，上限为 {limit // (1024 * 1024)}MB")), 413
+    
     # 404错误处理 - 返回index.html
     @app.errorhandler(404)
     def not_found(e):
-        return send_from_directory(frontend_static_dir, 'index.html')
+        return static_assets.serve('index.html')
+    
+    # 启动耗时（/api/health 返回，check_startup_time.py 用于发现回归）
+    app.config['STARTUP_TIMING'] = {
+        'import_seconds': round(_import_seconds, 4),
+        'create_app_seconds': round(time.perf_counter() - started, 4),
+        'heavy_modules_at_startup': loaded_heavy_modules()
+    }
+    print(f"⏱️  启动耗时: 导入 {_import_seconds:.3f}s, 创建应用 {app.config['STARTUP_TIMING']['create_app_seconds']:.3f}s")
     
     return app
 
 # 主入口点
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app(debug=True)
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=True, host='0.0.0.0', port=port) 
\ No newline at end of file
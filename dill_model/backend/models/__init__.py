@@ -1,6 +1,7 @@
-from .dill_model import DillModel, get_model_by_name
+from .dill_model import DillModel
 from .enhanced_dill_model import EnhancedDillModel
 from .car_model import CARModel
 from .pid_model import PIDModel
+from .model_registry import get_model_by_name, registry_stats
 
-__all__ = ['DillModel', 'EnhancedDillModel', 'CARModel', 'PIDModel', 'get_model_by_name'] 
\ No newline at end of file
+__all__ = ['DillModel', 'EnhancedDillModel', 'CARModel', 'PIDModel', 'get_model_by_name', 'registry_stats'] 
\ No newline at end of file
@@ -5,28 +5,21 @@ CAR模型 (化学放大光刻胶)
 """
 
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D  # 添加3D绘图支持
-from io import BytesIO
-import base64
-from scipy.ndimage import gaussian_filter
 import math
 import ast
 import re
 import warnings
 import logging  # 添加logging模块
 from typing import Union  # 添加类型注解支持
+from ..utils.intensity_profiles import profile_from_request_data
+from .acid_diffusion import AcidDiffusionEngine
+from .peb_solver import PEBSolver, resolve_peb_parameters, initial_acid_from_dose, MAX_PEB_STEPS, MAX_PEB_WORK
+from ..utils.figure_renderer import get_figure_renderer, line_plot, image_plot, surface_plot
 
 # 设置日志配置
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# 新增：全局字体设置，优先使用常见的无衬线字体
-plt.rcParams['font.sans-serif'] = ['Arial', 'DejaVu Sans', 'Liberation Sans', 'SimHei', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示为方块的问题
-
 def parse_phi_expr(phi_expr, t):
     """
     安全解析phi_expr表达式，t为时间，只允许sin/cos/pi/t等
@@ -74,7 +67,10 @@ class CARModel:
     """
     
     def __init__(self):
-        pass
+        # 光酸扩散引擎：余弦分布用解析衰减，任意分布用频域滤波，必要时回退到 gaussian_filter
+        self.diffusion = AcidDiffusionEngine()
+        # 后烘反应-扩散求解器（物理单位，PEB模式使用）
+        self.peb = PEBSolver()
     
     def calculate_acid_generation(self, x, I_avg, V, K=None, t_exp=1, acid_gen_efficiency=1, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y: Union[float, int, np.ndarray] = 0, z: Union[float, int, np.ndarray] = 0):
         """
@@ -175,15 +171,17 @@ class CARModel:
         logger.info("【CAR模型 - 光酸扩散模拟】")
         logger.info("=" * 60)
         logger.info("🔸 扩散模型:")
-        logger.info("   使用高斯滤波器模拟后烘阶段的热扩散过程")
+        logger.info("   使用高斯核卷积模拟后烘阶段的热扩散过程")
         logger.info("   [Acid]_diffused = GaussianFilter([Acid]_initial, σ=EPDL)")
+        logger.info("   余弦分布: 调制幅度按 H(k)≈exp(-k²σ²/2) 衰减；任意分布: 频域(DCT)滤波")
         logger.info(f"🔸 扩散参数:")
         logger.info(f"   - EPDL (光酸扩散长度) = {diffusion_length} 像素")
         logger.info(f"   - 初始光酸分布范围: [{np.min(initial_acid):.4f}, {np.max(initial_acid):.4f}]")
         
-        # 使用高斯滤波器模拟扩散
-        diffused_acid = gaussian_filter(initial_acid, sigma=diffusion_length)
+        # 按分布形态选择解析/频域/直接卷积
+        diffused_acid, method = self.diffusion.diffuse(initial_acid, diffusion_length)
         
+        logger.info(f"   - 计算方法: {method}")
         logger.info(f"   - 扩散后光酸分布范围: [{np.min(diffused_acid):.4f}, {np.max(diffused_acid):.4f}]")
         logger.info(f"   - 扩散效果: 峰值平滑度提升 {diffusion_length:.1f}x")
         
@@ -346,8 +344,202 @@ class CARModel:
             'thickness': thickness,
             'additionalInfo': additionalInfo
         }
-    
-    def generate_data(self, I_avg, V, K, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate, amplification, contrast, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y_range=None, z_range=None, enable_4d_animation=False, t_start=0, t_end=5, time_steps=20, custom_intensity_data=None):
+
+    def calculate_surface_stack(self, X, Y, I_avg, V, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate, amplification, contrast, Kx, Ky, phases):
+        """
+        3D表面模式（及其4D动画）的各阶段分布，按时间批量计算
+
+        modulation = cos(2Kx·X + 2Ky·Y + φ_t)，每个相位对应一帧，结果为 (时间, y, x) 的堆叠数组：
+        - cos(a + φ) = cos(a)cos(φ) - sin(a)sin(φ)，空间部分的三角函数只计算一次
+        - 光酸扩散只在空间轴上进行（整叠一次调用扩散引擎）；扩散是线性的，
+          先对未归一化的光酸扩散再按帧归一化，各帧共享常数项，余弦分布可走解析路径
+        - 脱保护与显影对整叠数组逐元素计算
+
+        参数:
+            X, Y: 空间网格
+            phases: 各帧的相位 φ_t
+
+        返回:
+            包含 exposure_dose/initial_acid/diffused_acid/deprotection/thickness 堆叠数组的字典
+        """
+        # 增大频率系数使波纹更加明显，并确保振幅足够
+        spatial_phase = (Kx * 2.0) * X + (Ky * 2.0) * Y
+        amplitude = 0.8 if V < 0.2 else V
+        phases = np.asarray(phases, dtype=float).reshape(-1, 1, 1)
+        modulation = np.cos(phases) * np.cos(spatial_phase) - np.sin(phases) * np.sin(spatial_phase)
+
+        # 曝光剂量与光强成正比，初始光酸与曝光剂量成正比
+        base_exposure = I_avg * t_exp
+        variation = amplitude * base_exposure * 0.5
+        exposure_dose = base_exposure + variation * modulation
+        acid = acid_gen_efficiency * base_exposure + (acid_gen_efficiency * variation) * modulation
+
+        # 按帧归一化
+        frame_max = acid.max(axis=(1, 2), keepdims=True)
+        diffused, _ = self.diffusion.diffuse(acid, diffusion_length, axes=(1, 2))
+        initial_acid = acid / frame_max
+        diffused_acid = diffused / frame_max
+
+        deprotection = 1 - np.exp(-reaction_rate * amplification * diffused_acid)
+        thickness = 1 - np.power(deprotection, contrast)
+        return {
+            'exposure_dose': exposure_dose,
+            'initial_acid': initial_acid,
+            'diffused_acid': diffused_acid,
+            'deprotection': deprotection,
+            'thickness': thickness
+        }
+
+    def generate_peb_data(self, I_avg, V, K, t_exp, contrast, sine_type='1d', Kx=None, Ky=None, phi_expr=None, y_range=None, custom_intensity_data=None, peb_params=None, peb_frames=20):
+        """
+        PEB模式：用后烘反应-扩散求解器代替高斯模糊 + 一次性脱保护
+
+        光酸、淬灭剂与保护基三个场按物理单位（nm、s、°C）做时间积分，见 peb_solver 模块。
+        该模式下 acid_gen_efficiency/diffusion_length/reaction_rate/amplification 不参与计算，
+        由 peb_params 中的 PAG曝光速率常数、扩散系数、催化速率、后烘温度/时间等物理参数代替；
+        显影仍使用 厚度 = 1 - (脱保护程度)^γ。
+
+        参数:
+            sine_type: '1d' 或 'multi'（需要 y_range 才按2D计算，否则回退到1D）
+            peb_params: 后烘参数（缺省项取 DEFAULT_PEB_PARAMS）
+            peb_frames: 1D模式下记录的后烘中间帧数
+
+        返回:
+            与1D/2D模式相同键名的数据字典，外加 quencher 与后烘时间演化数据
+        """
+        params = resolve_peb_parameters(peb_params)
+        x_np = np.linspace(0, 10, 1000)  # 0到10微米，1000个点
+        phi = parse_phi_expr(phi_expr, 0) if phi_expr is not None else 0.0
+        is_2d = sine_type == 'multi' and Kx is not None and Ky is not None and y_range is not None and len(y_range) > 1
+
+        # 曝光剂量 D = I·t_exp（mJ/cm²）
+        intensity_x = None
+        if custom_intensity_data is not None and 'x' in custom_intensity_data and 'intensity' in custom_intensity_data:
+            profile = profile_from_request_data(custom_intensity_data)
+            intensity_x = profile.resample(x_np, 'μm', custom_intensity_data.get('outside_range_mode', 'zero'),
+                                           custom_intensity_data.get('custom_intensity_value', 0))
+            logger.info(f"🔸 CAR-PEB模式使用自定义光强分布数据: {profile.x.size}个点")
+        if is_2d:
+            y_np = np.asarray(y_range, dtype=float)
+            X_grid, Y_grid = np.meshgrid(x_np, y_np)
+            if intensity_x is not None:
+                intensity = I_avg * intensity_x[np.newaxis, :] * (1 + V * np.cos(Ky * y_np + phi))[:, np.newaxis]
+            else:
+                intensity = I_avg * (1 + V * np.cos(Kx * X_grid + Ky * Y_grid + phi))
+            # 坐标单位为微米，求解器使用纳米
+            spacings = ((y_np[1] - y_np[0]) * 1000.0, (x_np[1] - x_np[0]) * 1000.0)
+        else:
+            if K is None:
+                K = 2.0
+            intensity = I_avg * intensity_x if intensity_x is not None else I_avg * (1 + V * np.cos(K * x_np))
+            spacings = ((x_np[1] - x_np[0]) * 1000.0,)
+        exposure_dose = intensity * t_exp
+        initial_acid = initial_acid_from_dose(exposure_dose, params['pag_rate_constant'])
+
+        logger.info("=" * 60)
+        logger.info("【CAR模型 - 后烘(PEB)反应-扩散求解】")
+        logger.info("=" * 60)
+        logger.info("🔸 PEB方程:")
+        logger.info("   ∂A/∂t = D_A∇²A - k_q·A·Q - k_loss·A")
+        logger.info("   ∂Q/∂t = D_Q∇²Q - k_q·A·Q")
+        logger.info("   ∂M/∂t = -k_amp·A·M,   A0 = 1 - exp(-C·D)")
+        logger.info(f"🔸 后烘条件: T = {params['bake_temperature']} °C, t = {params['bake_time']} s")
+
+        result = self.peb.solve(initial_acid, spacings, params, frames=0 if is_2d else peb_frames)
+        rates = result['rates']
+        final_acid = result['acid']
+        deprotection = 1 - result['protection']
+        thickness = self.calculate_dissolution(deprotection, contrast)
+        acid_diffusion_length = math.sqrt(2 * rates['acid_diffusivity'] * params['bake_time'])
+
+        logger.info(f"   - D_A(T) = {rates['acid_diffusivity']:.4g} nm²/s, 扩散长度 √(2Dt) = {acid_diffusion_length:.2f} nm")
+        logger.info(f"   - k_amp(T) = {rates['amplification_rate']:.4g} 1/s")
+        logger.info(f"   - 时间步: {result['time_steps']} × {result['time_step']:.4g} s")
+        time_step_note = None
+        if result['time_step_limited_by'] is not None:
+            reason = f"最多{MAX_PEB_STEPS}步" if result['time_step_limited_by'] == 'max_steps' else \
+                f"计算量上限（步数×网格点数 ≤ {MAX_PEB_WORK}）"
+            time_step_note = (f"受{reason}限制，后烘步长由 max_time_step={result['requested_time_step']:.4g} s "
+                              f"放大为 {result['time_step']:.4g} s")
+            logger.warning(f"⚠️ {time_step_note}")
+        logger.info(f"   - 脱保护程度范围: [{np.min(deprotection):.4f}, {np.max(deprotection):.4f}]")
+
+        if not np.isfinite(thickness).all():
+            raise ValueError('CAR模型PEB计算结果无效，可能参数设置不合理或数值溢出。')
+
+        additionalInfo = {
+            'simulation_mode': 'peb',
+            'max_acid_concentration': float(np.max(initial_acid)),
+            'min_acid_concentration': float(np.min(initial_acid)),
+            'max_diffused_acid': float(np.max(final_acid)),
+            'min_diffused_acid': float(np.min(final_acid)),
+            'max_deprotection': float(np.max(deprotection)),
+            'min_deprotection': float(np.min(deprotection)),
+            'deprotection_range': float(np.max(deprotection) - np.min(deprotection)),
+            'max_thickness': float(np.max(thickness)),
+            'min_thickness': float(np.min(thickness)),
+            'thickness_range': float(np.max(thickness) - np.min(thickness)),
+            'average_acid_concentration': float(np.mean(initial_acid)),
+            'average_diffused_acid': float(np.mean(final_acid)),
+            'average_quencher': float(np.mean(result['quencher'])),
+            'average_deprotection': float(np.mean(deprotection)),
+            'average_thickness': float(np.mean(thickness)),
+            'acid_remaining_fraction': float(np.sum(final_acid) / np.sum(initial_acid)) if np.sum(initial_acid) > 0 else 0.0,
+            'effective_dose_range': float(np.max(exposure_dose)),
+            'contrast_parameter': contrast,
+            'peb_parameters': params,
+            'acid_diffusivity_at_bake': rates['acid_diffusivity'],
+            'quencher_diffusivity_at_bake': rates['quencher_diffusivity'],
+            'amplification_rate_at_bake': rates['amplification_rate'],
+            'acid_diffusion_length_nm': acid_diffusion_length,
+            'peb_time_steps': result['time_steps'],
+            'peb_time_step': result['time_step'],
+            'peb_requested_time_step': result['requested_time_step'],
+            'peb_time_step_limited_by': result['time_step_limited_by'],
+            'peb_time_step_note': time_step_note,
+            'grid_spacing_nm': list(spacings)
+        }
+
+        if is_2d:
+            additionalInfo['spatial_dimensions'] = '2D'
+            additionalInfo['grid_size'] = f"{len(x_np)} x {len(y_np)}"
+            return {
+                'x_coords': x_np.tolist(),
+                'y_coords': y_np.tolist(),
+                'z_exposure_dose': exposure_dose.tolist(),
+                'z_thickness': thickness.tolist(),
+                'z_initial_acid': initial_acid.tolist(),
+                'z_diffused_acid': final_acid.tolist(),
+                'z_deprotection': deprotection.tolist(),
+                'z_quencher': result['quencher'].tolist(),
+                'initial_acid': initial_acid.flatten().tolist(),
+                'diffused_acid': final_acid.flatten().tolist(),
+                'deprotection': deprotection.flatten().tolist(),
+                'thickness': thickness.flatten().tolist(),
+                'is_2d': True,
+                'is_peb': True,
+                'additionalInfo': additionalInfo
+            }
+
+        return {
+            'x': x_np.tolist(),
+            'initial_acid': initial_acid.tolist(),
+            'exposure_dose': exposure_dose.tolist(),
+            'diffused_acid': final_acid.tolist(),
+            'quencher': result['quencher'].tolist(),
+            'deprotection': deprotection.tolist(),
+            'thickness': thickness.tolist(),
+            'peb_frames': {
+                'time': [frame[0] for frame in result['frames']],
+                'acid': [frame[1].tolist() for frame in result['frames']],
+                'deprotection': [(1 - frame[2]).tolist() for frame in result['frames']]
+            },
+            'is_2d': False,
+            'is_peb': True,
+            'additionalInfo': additionalInfo
+        }
+
+    def generate_data(self, I_avg, V, K, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate, amplification, contrast, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y_range=None, z_range=None, enable_4d_animation=False, t_start=0, t_end=5, time_steps=20, custom_intensity_data=None, enable_peb=False, peb_params=None):
         """
         生成模型数据用于交互式图表
         
@@ -368,10 +560,17 @@ class CARModel:
             phi_expr: 相位表达式
             y_range: y坐标范围
             z_range: z坐标范围
+            enable_peb: 使用物理单位的后烘反应-扩散求解器（1D/2D，见 generate_peb_data）
+            peb_params: 后烘参数
             
         返回:
             包含x坐标和各阶段y值的数据字典
         """
+        if enable_peb and sine_type != '3d':
+            return self.generate_peb_data(I_avg, V, K, t_exp, contrast, sine_type=sine_type, Kx=Kx, Ky=Ky,
+                                          phi_expr=phi_expr, y_range=y_range,
+                                          custom_intensity_data=custom_intensity_data, peb_params=peb_params)
+        
         logger.info("=" * 60)
         logger.info("【CAR模型 - 完整流程数据生成】")
         logger.info("=" * 60)
@@ -435,77 +634,34 @@ class CARModel:
                 # 生成时间序列数据
                 time_array = np.linspace(t_start, t_end, time_steps)
                 
-                # 存储每个时间步的数据
+                # 所有帧一次性计算为 (时间, y, x) 堆叠数组
+                phases = [parse_phi_expr(phi_expr, t) if phi_expr is not None else 0.0 for t in time_array]
+                stack = self.calculate_surface_stack(X, Y, I_avg, V, t_exp, acid_gen_efficiency, diffusion_length,
+                                                     reaction_rate, amplification, contrast, Kx, Ky, phases)
+                
+                # 确保每帧维度正确
+                if stack['exposure_dose'].shape[1:] != (y_points, x_points):
+                    stack = {name: frames.transpose(0, 2, 1) for name, frames in stack.items()}
+                
                 animation_data = {
                     'x_coords': x_coords.tolist(),
                     'y_coords': y_coords.tolist(),
                     'time_array': time_array.tolist(),
                     'time_steps': time_steps,
-                    'initial_acid_frames': [],
-                    'diffused_acid_frames': [],
-                    'deprotection_frames': [],
-                    'thickness_frames': [],
+                    'initial_acid_frames': stack['initial_acid'].tolist(),
+                    'diffused_acid_frames': stack['diffused_acid'].tolist(),
+                    'deprotection_frames': stack['deprotection'].tolist(),
+                    'thickness_frames': stack['thickness'].tolist(),
                     'enable_4d_animation': True,
                     'sine_type': '3d',
                     'is_3d': True
                 }
                 
-                for t_idx, t in enumerate(time_array):
-                    # 计算当前时间的相位
-                    phi_t = parse_phi_expr(phi_expr, t) if phi_expr is not None else 0.0
-                    
-                    # 1. 增大频率系数使波纹更加明显
-                    Kx_scaled = Kx * 2.0
-                    Ky_scaled = Ky * 2.0
-                    
-                    # 2. 增加振幅，确保波动很明显
-                    amplitude = 0.8 if V < 0.2 else V
-                    
-                    # 3. 生成当前时间的正弦波形状
-                    modulation_t = np.cos(Kx_scaled * X + Ky_scaled * Y + phi_t)
-                    
-                    # 4. 计算各阶段数据
-                    # 曝光剂量与光强成正比
-                    base_exposure = I_avg * t_exp
-                    variation = amplitude * base_exposure * 0.5
-                    exposure_dose_t = base_exposure + variation * modulation_t
-                    
-                    # 初始光酸生成与曝光剂量成正比
-                    acid_base = acid_gen_efficiency * base_exposure
-                    acid_variation = acid_gen_efficiency * variation
-                    initial_acid_t = acid_base + acid_variation * modulation_t
-                    initial_acid_t = initial_acid_t / np.max(initial_acid_t)  # 归一化
-                    
-                    # 模拟光酸扩散 - 使用高斯滤波
-                    diffused_acid_t = gaussian_filter(initial_acid_t, sigma=diffusion_length)
-                    
-                    # 计算脱保护反应
-                    deprotection_t = 1 - np.exp(-reaction_rate * amplification * diffused_acid_t)
-                    
-                    # 计算光刻胶厚度分布
-                    thickness_t = 1 - np.power(deprotection_t, contrast)
-                    
-                    # 确保数组维度正确
-                    if exposure_dose_t.shape != (y_points, x_points):
-                        exposure_dose_t = exposure_dose_t.T
-                        initial_acid_t = initial_acid_t.T
-                        diffused_acid_t = diffused_acid_t.T
-                        deprotection_t = deprotection_t.T
-                        thickness_t = thickness_t.T
-                    
-                    # 存储当前帧数据
-                    animation_data['initial_acid_frames'].append(initial_acid_t.tolist())
-                    animation_data['diffused_acid_frames'].append(diffused_acid_t.tolist())
-                    animation_data['deprotection_frames'].append(deprotection_t.tolist())
-                    animation_data['thickness_frames'].append(thickness_t.tolist())
-                    
-                    logger.info(f"   - 时间步 {t_idx+1}/{time_steps} (t={t:.2f}s) 计算完成")
-                
                 # 计算4D动画的额外信息（基于最后一帧）
-                last_frame_initial_acid = np.array(animation_data['initial_acid_frames'][-1])
-                last_frame_diffused_acid = np.array(animation_data['diffused_acid_frames'][-1])
-                last_frame_deprotection = np.array(animation_data['deprotection_frames'][-1])
-                last_frame_thickness = np.array(animation_data['thickness_frames'][-1])
+                last_frame_initial_acid = stack['initial_acid'][-1]
+                last_frame_diffused_acid = stack['diffused_acid'][-1]
+                last_frame_deprotection = stack['deprotection'][-1]
+                last_frame_thickness = stack['thickness'][-1]
                 
                 additionalInfo = {
                     'chemical_amplification_factor': reaction_rate * amplification,
@@ -552,40 +708,15 @@ class CARModel:
                 return animation_data
             
             else:
-                # 原有的静态3D数据生成
-                # 计算相位
+                # 原有的静态3D数据生成（单帧）
                 phi = parse_phi_expr(phi_expr, 0) if phi_expr is not None else 0.0
-                
-                # 1. 增大频率系数使波纹更加明显
-                Kx_scaled = Kx * 2.0
-                Ky_scaled = Ky * 2.0
-                
-                # 2. 增加振幅，确保波动很明显
-                amplitude = 0.8 if V < 0.2 else V
-                
-                # 3. 生成真正的正弦波形状
-                modulation = np.cos(Kx_scaled * X + Ky_scaled * Y + phi)  # 纯正弦波
-                
-                # 4. 计算各阶段数据
-                # 曝光剂量与光强成正比
-                base_exposure = I_avg * t_exp
-                variation = amplitude * base_exposure * 0.5
-                exposure_dose = base_exposure + variation * modulation
-                
-                # 初始光酸生成与曝光剂量成正比
-                acid_base = acid_gen_efficiency * base_exposure
-                acid_variation = acid_gen_efficiency * variation
-                initial_acid = acid_base + acid_variation * modulation
-                initial_acid = initial_acid / np.max(initial_acid)  # 归一化
-                
-                # 模拟光酸扩散 - 使用高斯滤波
-                diffused_acid = gaussian_filter(initial_acid, sigma=diffusion_length)
-                
-                # 计算脱保护反应
-                deprotection = 1 - np.exp(-reaction_rate * amplification * diffused_acid)
-                
-                # 计算光刻胶厚度分布
-                thickness = 1 - np.power(deprotection, contrast)
+                stack = self.calculate_surface_stack(X, Y, I_avg, V, t_exp, acid_gen_efficiency, diffusion_length,
+                                                     reaction_rate, amplification, contrast, Kx, Ky, [phi])
+                exposure_dose = stack['exposure_dose'][0]
+                initial_acid = stack['initial_acid'][0]
+                diffused_acid = stack['diffused_acid'][0]
+                deprotection = stack['deprotection'][0]
+                thickness = stack['thickness'][0]
                 
                 # 确保数组维度正确
                 if exposure_dose.shape != (y_points, x_points):
@@ -657,51 +788,15 @@ class CARModel:
                     logger.warning(f"⚠️  注意：CAR模型2D模式的自定义光强数据仅应用于X方向，Y方向使用标准余弦分布")
                     
                     # 对于CAR模型2D模式，使用自定义数据处理X方向光强分布
-                    custom_x = np.array(custom_intensity_data['x'])
-                    custom_intensity = np.array(custom_intensity_data['intensity'])
-                    
-                    # 🔧 执行单位转换（复用Dill模型的逻辑）
-                    original_unit = custom_intensity_data.get('original_unit', 'mm')
-                    unit_scale = custom_intensity_data.get('unit_scale', 1.0)
-                    
-                    # 智能单位转换判断（假设CAR模型通常工作在微米级）
-                    target_range = 20  # 默认20μm范围，CAR模型通常在亚微米级工作
-                    target_is_um = True  # CAR模型通常使用微米单位
-                    data_range = custom_x.max() - custom_x.min()
-                    
-                    logger.info(f"🔸 CAR模型2D模式智能单位转换:")
-                    logger.info(f"   - 声明单位: {original_unit}")
-                    logger.info(f"   - 数据范围: [{custom_x.min():.6f}, {custom_x.max():.6f}] ({data_range:.6f})")
-                    logger.info(f"   - 目标单位: μm (CAR模型默认)")
-                    
-                    # 执行单位转换到微米
-                    if original_unit == 'mm':
-                        custom_x = custom_x * 1000.0
-                        logger.info(f"🔸 单位转换: mm → μm，坐标×1000")
-                    elif original_unit == 'nm':
-                        custom_x = custom_x / 1000.0  # nm → μm 需要除1000
-                        logger.info(f"🔸 单位转换: nm → μm，坐标÷1000")
-                    elif original_unit in ['μm', 'um', 'micron']:
-                        logger.info(f"🔸 单位匹配: μm → μm，无需转换")
-                    
-                    # 计算X方向的自定义光强分布（插值到x_np）
+                    # 共享的光强分布对象（CAR模型工作在微米网格），按网格缓存重采样结果
+                    profile = profile_from_request_data(custom_intensity_data)
                     outside_range_mode = custom_intensity_data.get('outside_range_mode', 'zero')
                     custom_intensity_value = custom_intensity_data.get('custom_intensity_value', 0)
                     
+                    logger.info(f"🔸 CAR模型2D模式自定义光强: {profile.x.size}个点, 原始单位 {profile.original_unit} → μm")
                     logger.info(f"🔸 CAR模型X方向自定义光强插值模式: {outside_range_mode}")
                     
-                    # 执行插值处理
-                    if outside_range_mode == 'edge':
-                        intensity_x = np.interp(x_np, custom_x, custom_intensity)
-                    elif outside_range_mode == 'custom':
-                        intensity_x = np.full_like(x_np, custom_intensity_value, dtype=float)
-                        mask = (x_np >= custom_x.min()) & (x_np <= custom_x.max())
-                        intensity_x[mask] = np.interp(x_np[mask], custom_x, custom_intensity)
-                    else:  # 'zero' mode (default)
-                        intensity_x = np.zeros_like(x_np, dtype=float)
-                        mask = (x_np >= custom_x.min()) & (x_np <= custom_x.max())
-                        if np.any(mask):
-                            intensity_x[mask] = np.interp(x_np[mask], custom_x, custom_intensity)
+                    intensity_x = profile.resample(x_np, 'μm', outside_range_mode, custom_intensity_value)
                     
                     logger.info(f"   - CAR模型X方向光强范围: [{intensity_x.min():.6f}, {intensity_x.max():.6f}]")
                     
@@ -939,7 +1034,6 @@ class CARModel:
         返回:
             包含多个Base64编码图像的字典
         """
-        plt.close('all')
         x = np.linspace(0, 10, 1000)  # 0到10微米，1000个点
         
         # 优先处理各维度情况，确保逻辑清晰
@@ -962,74 +1056,32 @@ class CARModel:
                 np.isnan(initial_acid).all() or np.isnan(diffused_acid).all() or np.isnan(deprotection).all() or np.isnan(thickness).all()):
                 raise ValueError('CAR模型(1D)计算结果无效，可能参数设置不合理或数值溢出。')
             
-            # 绘制1D线图
-            plots = {}
-            
-            # 1. 初始光酸分布图
-            fig1 = plt.figure(figsize=(10, 6))
-            plt.plot(x, initial_acid, 'g-', linewidth=2)
-            plt.title('Initial Acid Distribution (1D)', fontsize=16)
-            plt.xlabel('Position (μm)', fontsize=14)
-            plt.ylabel('Normalized Acid Concentration', fontsize=14)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer1 = BytesIO()
-            fig1.savefig(buffer1, format='png', dpi=100)
-            buffer1.seek(0)
-            plots['initial_acid_plot'] = base64.b64encode(buffer1.getvalue()).decode()
-            plt.close(fig1)
-            
-            # 2. 扩散后光酸分布图
-            fig2 = plt.figure(figsize=(10, 6))
-            plt.plot(x, initial_acid, 'g--', linewidth=1.5, label='Initial')
-            plt.plot(x, diffused_acid, 'b-', linewidth=2, label='After Diffusion')
-            plt.title('Acid Diffusion Comparison (1D)', fontsize=16)
-            plt.xlabel('Position (μm)', fontsize=14)
-            plt.ylabel('Normalized Acid Concentration', fontsize=14)
-            plt.legend()
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer2 = BytesIO()
-            fig2.savefig(buffer2, format='png', dpi=100)
-            buffer2.seek(0)
-            plots['acid_diffusion_plot'] = base64.b64encode(buffer2.getvalue()).decode()
-            plt.close(fig2)
-            
-            # 3. 脱保护程度分布图
-            fig3 = plt.figure(figsize=(10, 6))
-            plt.plot(x, deprotection, 'r-', linewidth=2)
-            plt.title('Deprotection Degree Distribution (1D)', fontsize=16)
-            plt.xlabel('Position (μm)', fontsize=14)
-            plt.ylabel('Deprotection Degree', fontsize=14)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer3 = BytesIO()
-            fig3.savefig(buffer3, format='png', dpi=100)
-            buffer3.seek(0)
-            plots['deprotection_plot'] = base64.b64encode(buffer3.getvalue()).decode()
-            plt.close(fig3)
-            
-            # 4. 光刻胶厚度分布图
-            fig4 = plt.figure(figsize=(10, 6))
-            plt.plot(x, thickness, 'm-', linewidth=2)
-            plt.title('Photoresist Thickness After Development (1D)', fontsize=16)
-            plt.xlabel('Position (μm)', fontsize=14)
-            plt.ylabel('Normalized Thickness', fontsize=14)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer4 = BytesIO()
-            fig4.savefig(buffer4, format='png', dpi=100)
-            buffer4.seek(0)
-            plots['thickness_plot'] = base64.b64encode(buffer4.getvalue()).decode()
-            plt.close(fig4)
-            
+            # 绘制1D线图（模板复用，只替换曲线数据）
+            position_label = 'Position (μm)'
+            acid_label = 'Normalized Acid Concentration'
+            plots = get_figure_renderer().render_many({
+                # 1. 初始光酸分布图
+                'initial_acid_plot': line_plot(
+                    [{'x': x, 'y': initial_acid, 'fmt': 'g-', 'linewidth': 2}],
+                    'Initial Acid Distribution (1D)', position_label, acid_label),
+                # 2. 扩散后光酸分布图
+                'acid_diffusion_plot': line_plot(
+                    [{'x': x, 'y': initial_acid, 'fmt': 'g--', 'linewidth': 1.5, 'label': 'Initial'},
+                     {'x': x, 'y': diffused_acid, 'fmt': 'b-', 'linewidth': 2, 'label': 'After Diffusion'}],
+                    'Acid Diffusion Comparison (1D)', position_label, acid_label, legend={}),
+                # 3. 脱保护程度分布图
+                'deprotection_plot': line_plot(
+                    [{'x': x, 'y': deprotection, 'fmt': 'r-', 'linewidth': 2}],
+                    'Deprotection Degree Distribution (1D)', position_label, 'Deprotection Degree'),
+                # 4. 光刻胶厚度分布图
+                'thickness_plot': line_plot(
+                    [{'x': x, 'y': thickness, 'fmt': 'm-', 'linewidth': 2}],
+                    'Photoresist Thickness After Development (1D)', position_label, 'Normalized Thickness')
+            })
+
             # 确保与前端期望的键名一致
             plots['exposure_plot'] = plots['acid_diffusion_plot']
-            
+
             return plots
             
         # 情况2: 严格的2D计算和绘图
@@ -1061,35 +1113,16 @@ class CARModel:
             # 计算光刻胶厚度分布
             thickness_2d = self.calculate_dissolution(deprotection_2d, contrast)
             
-            # 绘制曝光剂量热图
-            fig1 = plt.figure(figsize=(8, 6))
-            plt.imshow(initial_acid_2d, aspect='auto', origin='lower', 
-                      extent=(min(x), max(x), min(y_axis_points), max(y_axis_points)), cmap='viridis')
-            plt.colorbar(label='曝光剂量 (mJ/cm²)')
-            plt.xlabel('X 位置 (μm)')
-            plt.ylabel('Y 位置 (μm)')
-            plt.title('曝光剂量分布 (2D)')
-            plt.tight_layout()
-            buffer1 = BytesIO()
-            fig1.savefig(buffer1, format='png', dpi=100)
-            buffer1.seek(0)
-            exposure_plot = base64.b64encode(buffer1.getvalue()).decode()
-            plt.close(fig1)
-            
-            # 绘制光刻胶厚度热图
-            fig2 = plt.figure(figsize=(8, 6))
-            plt.imshow(thickness_2d, aspect='auto', origin='lower', 
-                      extent=(min(x), max(x), min(y_axis_points), max(y_axis_points)), cmap='plasma')
-            plt.colorbar(label='相对厚度')
-            plt.xlabel('X 位置 (μm)')
-            plt.ylabel('Y 位置 (μm)')
-            plt.title('光刻胶厚度分布 (2D)')
-            plt.tight_layout()
-            buffer2 = BytesIO()
-            fig2.savefig(buffer2, format='png', dpi=100)
-            buffer2.seek(0)
-            thickness_plot = base64.b64encode(buffer2.getvalue()).decode()
-            plt.close(fig2)
+            # 绘制曝光剂量与光刻胶厚度热图
+            extent = (min(x), max(x), min(y_axis_points), max(y_axis_points))
+            plots = get_figure_renderer().render_many({
+                'exposure_plot': image_plot(initial_acid_2d, extent, '曝光剂量分布 (2D)', 'X 位置 (μm)', 'Y 位置 (μm)',
+                                            cmap='viridis', colorbar_label='曝光剂量 (mJ/cm²)'),
+                'thickness_plot': image_plot(thickness_2d, extent, '光刻胶厚度分布 (2D)', 'X 位置 (μm)', 'Y 位置 (μm)',
+                                             cmap='plasma', colorbar_label='相对厚度')
+            })
+            exposure_plot = plots['exposure_plot']
+            thickness_plot = plots['thickness_plot']
             
             # 同时提供其他CAR模型需要的图表键
             return {
@@ -1121,36 +1154,15 @@ class CARModel:
             # 计算相位
             phi = parse_phi_expr(phi_expr, 0) if phi_expr is not None else 0.0
             
-            # 1. 增大频率系数使波纹更加明显
-            Kx_scaled = Kx * 2.0
-            Ky_scaled = Ky * 2.0
-            
-            # 2. 增加振幅，确保波动很明显
-            amplitude = 0.8 if V < 0.2 else V
-            
-            # 3. 生成真正的正弦波形状
-            modulation = np.cos(Kx_scaled * X + Ky_scaled * Y + phi)  # 纯正弦波
-            
-            # 4. 计算各阶段数据
-            # 曝光剂量与光强成正比
-            base_exposure = I_avg * t_exp
-            variation = amplitude * base_exposure * 0.5
-            exposure_dose = base_exposure + variation * modulation
-            
-            # 初始光酸生成与曝光剂量成正比
-            acid_base = acid_gen_efficiency * base_exposure
-            acid_variation = acid_gen_efficiency * variation
-            initial_acid = acid_base + acid_variation * modulation
-            initial_acid = initial_acid / np.max(initial_acid)  # 归一化
-            
-            # 模拟光酸扩散 - 使用高斯滤波
-            diffused_acid = gaussian_filter(initial_acid, sigma=diffusion_length)
-            
-            # 计算脱保护反应
-            deprotection = 1 - np.exp(-reaction_rate * amplification * diffused_acid)
-            
-            # 计算光刻胶厚度分布
-            thickness = 1 - np.power(deprotection, contrast)
+            # 各阶段分布（单帧）
+            stages = self.calculate_surface_stack(
+                X, Y, I_avg, V, t_exp, acid_gen_efficiency, diffusion_length,
+                reaction_rate, amplification, contrast, Kx, Ky, [phi])
+            exposure_dose = stages['exposure_dose'][0]
+            initial_acid = stages['initial_acid'][0]
+            diffused_acid = stages['diffused_acid'][0]
+            deprotection = stages['deprotection'][0]
+            thickness = stages['thickness'][0]
             
             # 确保数组维度正确
             if exposure_dose.shape != (y_points, x_points):
@@ -1160,76 +1172,22 @@ class CARModel:
                 deprotection = deprotection.T
                 thickness = thickness.T
             
-            # 存储所有图表的Base64编码
-            plots = {}
-
-            # 1. 创建3D表面图 - 初始光酸分布
-            fig1 = plt.figure(figsize=(10, 8))
-            ax1 = fig1.add_subplot(111, projection='3d')
-            surf1 = ax1.plot_surface(X, Y, initial_acid, cmap='viridis', edgecolor='none')  # type: ignore
-            ax1.set_title('3D Initial Acid Distribution', fontsize=16)
-            ax1.set_xlabel('X Position (μm)', fontsize=14)
-            ax1.set_ylabel('Y Position (μm)', fontsize=14)
-            ax1.set_zlabel('Initial Acid Concentration', fontsize=14)  # type: ignore
-            fig1.colorbar(surf1, ax=ax1, shrink=0.5, aspect=5)
-            plt.tight_layout()
-            
-            buffer1 = BytesIO()
-            fig1.savefig(buffer1, format='png', dpi=100)
-            buffer1.seek(0)
-            plots['initial_acid_plot'] = base64.b64encode(buffer1.getvalue()).decode()
-            plt.close(fig1)
-            
-            # 2. 创建3D表面图 - 扩散后光酸分布
-            fig2 = plt.figure(figsize=(10, 8))
-            ax2 = fig2.add_subplot(111, projection='3d')
-            surf2 = ax2.plot_surface(X, Y, diffused_acid, cmap='viridis', edgecolor='none')  # type: ignore
-            ax2.set_title('3D Diffused Acid Distribution', fontsize=16)
-            ax2.set_xlabel('X Position (μm)', fontsize=14)
-            ax2.set_ylabel('Y Position (μm)', fontsize=14)
-            ax2.set_zlabel('Acid Concentration After Diffusion', fontsize=14)  # type: ignore
-            fig2.colorbar(surf2, ax=ax2, shrink=0.5, aspect=5)
-            plt.tight_layout()
-            
-            buffer2 = BytesIO()
-            fig2.savefig(buffer2, format='png', dpi=100)
-            buffer2.seek(0)
-            plots['acid_diffusion_plot'] = base64.b64encode(buffer2.getvalue()).decode()
-            plt.close(fig2)
-            
-            # 3. 创建3D表面图 - 脱保护程度分布
-            fig3 = plt.figure(figsize=(10, 8))
-            ax3 = fig3.add_subplot(111, projection='3d')
-            surf3 = ax3.plot_surface(X, Y, deprotection, cmap='YlOrRd', edgecolor='none')  # type: ignore
-            ax3.set_title('3D Deprotection Distribution', fontsize=16)
-            ax3.set_xlabel('X Position (μm)', fontsize=14)
-            ax3.set_ylabel('Y Position (μm)', fontsize=14)
-            ax3.set_zlabel('Deprotection Degree', fontsize=14)  # type: ignore
-            fig3.colorbar(surf3, ax=ax3, shrink=0.5, aspect=5)
-            plt.tight_layout()
-            
-            buffer3 = BytesIO()
-            fig3.savefig(buffer3, format='png', dpi=100)
-            buffer3.seek(0)
-            plots['deprotection_plot'] = base64.b64encode(buffer3.getvalue()).decode()
-            plt.close(fig3)
-            
-            # 4. 创建3D表面图 - 光刻胶厚度分布
-            fig4 = plt.figure(figsize=(10, 8))
-            ax4 = fig4.add_subplot(111, projection='3d')
-            surf4 = ax4.plot_surface(X, Y, thickness, cmap='plasma', edgecolor='none')  # type: ignore
-            ax4.set_title('3D Photoresist Thickness Distribution', fontsize=16)
-            ax4.set_xlabel('X Position (μm)', fontsize=14)
-            ax4.set_ylabel('Y Position (μm)', fontsize=14)
-            ax4.set_zlabel('Relative Thickness', fontsize=14)  # type: ignore
-            fig4.colorbar(surf4, ax=ax4, shrink=0.5, aspect=5)
-            plt.tight_layout()
-            
-            buffer4 = BytesIO()
-            fig4.savefig(buffer4, format='png', dpi=100)
-            buffer4.seek(0)
-            plots['thickness_plot'] = base64.b64encode(buffer4.getvalue()).decode()
-            plt.close(fig4)
+            # 4张3D表面图（模板复用，只替换曲面数据）
+            surface_style = {'colorbar': {'shrink': 0.5, 'aspect': 5}}
+            plots = get_figure_renderer().render_many({
+                'initial_acid_plot': surface_plot(
+                    [(X, Y, initial_acid)], '3D Initial Acid Distribution', 'X Position (μm)', 'Y Position (μm)',
+                    'Initial Acid Concentration', cmap='viridis', **surface_style),
+                'acid_diffusion_plot': surface_plot(
+                    [(X, Y, diffused_acid)], '3D Diffused Acid Distribution', 'X Position (μm)', 'Y Position (μm)',
+                    'Acid Concentration After Diffusion', cmap='viridis', **surface_style),
+                'deprotection_plot': surface_plot(
+                    [(X, Y, deprotection)], '3D Deprotection Distribution', 'X Position (μm)', 'Y Position (μm)',
+                    'Deprotection Degree', cmap='YlOrRd', **surface_style),
+                'thickness_plot': surface_plot(
+                    [(X, Y, thickness)], '3D Photoresist Thickness Distribution', 'X Position (μm)', 'Y Position (μm)',
+                    'Relative Thickness', cmap='plasma', **surface_style)
+            })
             
             # 曝光剂量与初始光酸相同
             plots['exposure_plot'] = plots['initial_acid_plot']
@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
 import numpy as np
-import matplotlib
-# 设置Matplotlib后端为非交互式后端
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from io import BytesIO
 import base64
 from .enhanced_dill_model import EnhancedDillModel
+from .model_registry import get_cache, ARC_CACHE_SIZE, ARC_MAP_CACHE_MAX_POINTS, MATERIAL_CACHE_SIZE
+from ..utils.intensity_profiles import profile_from_request_data, grid_unit_for
+from ..utils.lazy_imports import pyplot as plt
+from ..utils.thin_film import (multilayer_reflectance, arc_reflectance_map, transmission_factor,
+                               DEFAULT_WAVELENGTHS, DEFAULT_THICKNESSES, DEFAULT_ANGLES)
 import math
 import ast
 import logging
@@ -72,6 +73,10 @@ class DillModel:
     
     def __init__(self):
         self.setup_optical_database()
+        # 材料/ARC参数是纯查表计算，结果在所有实例间共享（取出时深拷贝，调用方可以放心修改）
+        self._material_cache = get_cache('dill_material_properties', MATERIAL_CACHE_SIZE, copy_values=True)
+        self._arc_cache = get_cache('dill_arc_parameters', ARC_CACHE_SIZE, copy_values=True)
+        self._arc_map_cache = get_cache('dill_arc_reflectance_maps', ARC_CACHE_SIZE)
         
     def setup_optical_database(self):
         """设置基底材料和ARC材料的光学参数数据库"""
@@ -120,26 +125,46 @@ class DillModel:
         logger.info("🔧 光学参数数据库初始化完成")
         
     def get_material_properties(self, substrate_material='silicon', arc_material='sion', wavelength=405):
-        """获取材料光学性质"""
-        wl_key = str(int(wavelength))
-        
+        """获取材料光学性质（带缓存）"""
+        return self._material_cache.get_or_compute(
+            (substrate_material, arc_material, wavelength),
+            lambda: self._lookup_material_properties(substrate_material, arc_material, wavelength)
+        )
+
+    @staticmethod
+    def _optical_constants(entry, wavelengths):
+        """按数据库中的波长节点线性插值 n、k（超出范围时取端点值）"""
+        keys = sorted(entry['n'], key=float)
+        nodes = np.array([float(key) for key in keys])
+        n = np.interp(wavelengths, nodes, [entry['n'][key] for key in keys])
+        k = np.interp(wavelengths, nodes, [entry['k'][key] for key in keys])
+        return n, k
+
+    def complex_index(self, material, wavelengths, kind='substrate'):
+        """材料复折射率 N = n + ik（wavelengths 可以是数组）；'none' 基底按玻璃(1.5)处理，'none' ARC 返回None"""
+        database = self.substrate_materials if kind == 'substrate' else self.arc_materials
+        if material == 'none':
+            return np.full(np.shape(wavelengths), 1.5 + 0j) if kind == 'substrate' else None
+        entry = database.get(material, database['silicon' if kind == 'substrate' else 'sion'])
+        n, k = self._optical_constants(entry, np.asarray(wavelengths, dtype=float))
+        return n + 1j * k
+
+    def _lookup_material_properties(self, substrate_material, arc_material, wavelength):
         # 获取基底材料参数
         if substrate_material == 'none':
             substrate_info = {'name': '无基底', 'n': 1.0, 'k': 0.0}
         else:
             substrate = self.substrate_materials.get(substrate_material, self.substrate_materials['silicon'])
-            substrate_n = substrate['n'].get(wl_key, substrate['n']['405'])
-            substrate_k = substrate['k'].get(wl_key, substrate['k']['405'])
-            substrate_info = {'name': substrate['name'], 'n': substrate_n, 'k': substrate_k}
+            substrate_n, substrate_k = self._optical_constants(substrate, float(wavelength))
+            substrate_info = {'name': substrate['name'], 'n': float(substrate_n), 'k': float(substrate_k)}
         
         # 获取ARC材料参数  
         if arc_material == 'none':
             arc_info = {'name': '无ARC薄膜', 'type': '无', 'n': 1.0, 'k': 0.0}
         else:
             arc = self.arc_materials.get(arc_material, self.arc_materials['sion'])
-            arc_n = arc['n'].get(wl_key, arc['n']['405'])
-            arc_k = arc['k'].get(wl_key, arc['k']['405'])
-            arc_info = {'name': arc['name'], 'type': arc['type'], 'n': arc_n, 'k': arc_k}
+            arc_n, arc_k = self._optical_constants(arc, float(wavelength))
+            arc_info = {'name': arc['name'], 'type': arc['type'], 'n': float(arc_n), 'k': float(arc_k)}
         
         return {
             'substrate': substrate_info,
@@ -147,33 +172,76 @@ class DillModel:
             'wavelength': wavelength
         }
         
+    def calculate_arc_reflectance_map(self, substrate_material='silicon', arc_material='sion', wavelengths=None,
+                                      thicknesses=None, angles=None, n_resist=1.7):
+        """
+        传输矩阵法计算 光刻胶/ARC/基底 叠层的反射率图（波长 × ARC厚度 × 入射角）
+
+        结果按 (基底, ARC, 光刻胶折射率, 扫描网格) 缓存，数组为只读；
+        网格点数超过 ARC_MAP_CACHE_MAX_POINTS 的大扫描不缓存，避免少数大图占满内存。
+
+        返回:
+            dict: 见 utils.thin_film.arc_reflectance_map
+        """
+        wavelengths = DEFAULT_WAVELENGTHS if wavelengths is None else np.atleast_1d(np.asarray(wavelengths, dtype=float))
+        thicknesses = DEFAULT_THICKNESSES if thicknesses is None else np.atleast_1d(np.asarray(thicknesses, dtype=float))
+        angles = DEFAULT_ANGLES if angles is None else np.atleast_1d(np.asarray(angles, dtype=float))
+        if arc_material == 'none':
+            raise ValueError("未选择ARC材料，无法计算ARC厚度扫描")
+        if not (np.all(np.isfinite(wavelengths)) and np.all(wavelengths > 0)):
+            raise ValueError("波长必须为正数")
+
+        def compute():
+            result = arc_reflectance_map(
+                n_resist,
+                self.complex_index(arc_material, wavelengths, kind='arc'),
+                self.complex_index(substrate_material, wavelengths, kind='substrate'),
+                wavelengths, thicknesses, angles
+            )
+            for value in result.values():
+                value.setflags(write=False)
+            return result
+
+        if wavelengths.size * thicknesses.size * angles.size > ARC_MAP_CACHE_MAX_POINTS:
+            return compute()
+        key = (substrate_material, arc_material, float(n_resist),
+               tuple(wavelengths.tolist()), tuple(thicknesses.tolist()), tuple(angles.tolist()))
+        return self._arc_map_cache.get_or_compute(key, compute)
+
     def calculate_arc_parameters(self, substrate_material='silicon', arc_material='sion', wavelength=405):
-        """计算ARC设计参数"""
+        """计算ARC设计参数（带缓存）"""
+        return self._arc_cache.get_or_compute(
+            (substrate_material, arc_material, wavelength),
+            lambda: self._compute_arc_parameters(substrate_material, arc_material, wavelength)
+        )
+
+    def _compute_arc_parameters(self, substrate_material, arc_material, wavelength):
         materials = self.get_material_properties(substrate_material, arc_material, wavelength)
         
+        # 光刻胶折射率（典型值）
+        n_resist = 1.7
+        
         # 如果没有ARC材料，但基底材料存在，需要计算基底本身的反射率
         if arc_material == 'none':
             # 处理基底材料为'none'的情况
             if substrate_material == 'none':
                 return {
                     'materials': materials,
-                    'n_resist': 1.7,
+                    'n_resist': n_resist,
                     'n_arc_ideal': 1.0,
                     'd_arc_ideal': 0.0,
                     'reflectance_no_arc': 0.0,
                     'reflectance_with_arc': 0.0,
                     'suppression_ratio': 1.0,
                     'arc_efficiency': 1.0,  # 无基底无ARC，透射率修正因子为1.0
+                    'arc_transmission_factor': 1.0,
                     'status': 'disabled',
                     'message': '基底和ARC材料均未选择，抗反射计算已禁用'
                 }
             else:
-                # 基底存在但无ARC，计算基底本身的反射率
-                n_resist = 1.7
-                n_substrate = materials['substrate']['n']
-                
-                # 计算无ARC时的反射率 (光刻胶/基底界面)
-                reflectance_no_arc = ((n_resist - n_substrate) / (n_resist + n_substrate)) ** 2
+                # 基底存在但无ARC，计算基底本身的反射率 (光刻胶/基底界面，含消光系数)
+                n_substrate = self.complex_index(substrate_material, float(wavelength))
+                reflectance_no_arc = float(multilayer_reflectance(n_resist, [], n_substrate, float(wavelength)))
                 
                 # 无ARC情况下，有ARC反射率等于无ARC反射率
                 reflectance_with_arc = reflectance_no_arc
@@ -191,40 +259,26 @@ class DillModel:
                     'reflectance_with_arc': reflectance_with_arc,
                     'suppression_ratio': 1.0,
                     'arc_efficiency': arc_efficiency,
+                    'arc_transmission_factor': 1.0,
                     'status': 'no_arc',
                     'message': f'基底材料{materials["substrate"]["name"]}存在，但无ARC材料，考虑基底反射率损失'
                 }
         
-        # 光刻胶折射率（典型值）
-        n_resist = 1.7
-        
-        # 处理基底材料为'none'的情况，使用默认值(如玻璃基底)
-        if substrate_material == 'none':
-            n_substrate = 1.5  # 假设玻璃基底的折射率
-        else:
-            n_substrate = materials['substrate']['n']
-            
-        n_arc = materials['arc']['n']
-        k_arc = materials['arc']['k']
-        
+        # 处理基底材料为'none'的情况时 complex_index 使用默认值(玻璃基底 n=1.5)
+        n_substrate = self.complex_index(substrate_material, float(wavelength))
         # 理想ARC折射率（振幅匹配）
-        n_arc_ideal = np.sqrt(n_resist * n_substrate)
+        n_arc_ideal = float(np.sqrt(n_resist * n_substrate.real))
         
-        # 理想ARC厚度（四分之一波长）
-        d_arc_ideal = wavelength / (4 * n_arc)
+        # 传输矩阵法扫描ARC厚度（垂直入射，0.5nm步长，常用ARC厚度范围0~200nm），取反射率最小的厚度
+        thicknesses = np.arange(0.0, DEFAULT_THICKNESSES[-1] + 0.25, 0.5)
+        sweep = self.calculate_arc_reflectance_map(substrate_material, arc_material, [float(wavelength)],
+                                                   thicknesses, [0.0], n_resist)
+        d_arc_ideal = float(sweep['optimal_thickness'][0])
+        r_with_arc = float(sweep['min_reflectance'][0])
+        r_no_arc = float(sweep['reflectance_no_arc'][0, 0])
         
-        # 反射率估算
-        r_no_arc = abs((n_resist - n_substrate) / (n_resist + n_substrate))**2
-        
-        # 简化的ARC效果计算
-        if materials['arc']['type'] == '干涉型':
-            arc_efficiency = 0.9  # 90%抑制
-        elif materials['arc']['type'] == '吸收型':
-            arc_efficiency = 0.7  # 70%抑制
-        else:  # 混合型
-            arc_efficiency = 0.95  # 95%抑制
-            
-        r_with_arc = r_no_arc * (1 - arc_efficiency)
+        # 抑制效率由实际反射率得出（原先按ARC类型取固定的90%/70%/95%）
+        arc_efficiency = 1.0 - r_with_arc / r_no_arc if r_no_arc > 0 else 0.0
         
         return {
             'materials': materials,
@@ -235,6 +289,8 @@ class DillModel:
             'reflectance_with_arc': r_with_arc,
             'suppression_ratio': r_no_arc / max(r_with_arc, 1e-6),
             'arc_efficiency': arc_efficiency,
+            'arc_transmission_factor': transmission_factor(r_with_arc, r_no_arc),
+            'method': 'transfer_matrix',
             'status': 'enabled',
             'message': 'ARC计算已启用'
         }
@@ -379,162 +435,19 @@ class DillModel:
             logger.info("🔸 计算模式: 自定义光强分布")
             logger.info("🔸 使用外部提供的光强分布数据")
             
-            custom_x = np.array(custom_intensity_data['x'])
-            custom_intensity = np.array(custom_intensity_data['intensity'])
-            
-            logger.info(f"🔸 自定义数据统计:")
-            logger.info(f"   - 数据点数: {len(custom_x)}")
-            logger.info(f"   - X坐标范围: [{np.min(custom_x):.3f}, {np.max(custom_x):.3f}]")
-            logger.info(f"   - 光强范围: [{np.min(custom_intensity):.6f}, {np.max(custom_intensity):.6f}]")
-            logger.info(f"   - 目标X坐标范围: [{np.min(x):.3f}, {np.max(x):.3f}], 点数: {len(x)}")
-            
-            # 使用插值将自定义数据映射到目标x坐标
-            from scipy.interpolate import interp1d
-            
-            # 确保自定义数据的x坐标是单调递增的
-            if not np.all(np.diff(custom_x) >= 0):
-                logger.warning("🔸 自定义数据X坐标不是单调递增，正在排序...")
-                sorted_indices = np.argsort(custom_x)
-                custom_x = custom_x[sorted_indices]
-                custom_intensity = custom_intensity[sorted_indices]
-            
-            # 创建插值函数，处理边界外的值
             try:
-                # 检查是否有单位信息并进行单位转换
-                unit_scale = custom_intensity_data.get('unit_scale', 1.0)
-                original_unit = custom_intensity_data.get('original_unit', 'mm')
-                
-                logger.info(f"🔸 单位信息检测:")
-                logger.info(f"   - 原始单位: {original_unit}")
-                logger.info(f"   - 单位比例: {unit_scale}")
-                
-                # 🔥 修复：智能单位转换逻辑
-                x_min_target, x_max_target = np.min(x), np.max(x)
-                target_range = x_max_target - x_min_target
-                
-                # 🔥 修复单位判断逻辑：照片数据特殊处理
-                # 照片数据通常来自像素坐标，原始单位为'pixels'，需要合理映射到物理尺寸
-                custom_x_range = np.max(custom_x) - np.min(custom_x)
-                
-                # 检查数据来源：如果原始单位是'pixels'，说明是照片数据
-                if original_unit == 'pixels':
-                    # 照片数据：像素坐标需要映射到合理的物理尺寸
-                    # 典型的照片特征尺寸应该在几十到几百微米范围内
-                    # 目标网格通常是微米单位，所以照片坐标应该直接当作微米使用
-                    target_is_um = True  # 照片数据直接映射到微米
-                    unit_hint = "pixels→μm(照片数据直接映射)"
-                elif custom_x_range < 10:  # 自定义数据范围小，可能是毫米单位
-                    # 🔥 修复：光刻模型通常在微米级工作，阈值应该是10而不是100
-                    # 目标范围 > 10 就认为是微米单位（例如：10-1000 μm的光刻范围）
-                    target_is_um = target_range > 10  # 光刻模型通常使用微米单位
-                    unit_hint = "mm(数据范围小)" if not target_is_um else "μm(目标范围大)"
-                else:  # 自定义数据范围大，可能已经是微米单位
-                    target_is_um = target_range > 10  # 同样修正阈值
-                    unit_hint = "μm(数据范围大)" if target_is_um else "mm(目标范围小)"
-                
-                logger.info(f"🔸 单位判断: 自定义数据范围={custom_x_range:.6f}, 目标范围={target_range:.6f}, 推测={unit_hint}")
-                
-                # 🔥 修复单位转换逻辑：统一处理所有单位
-                if original_unit == 'pixels':
-                    # 照片数据：像素坐标直接当作微米使用，无需转换
-                    logger.info(f"🔸 照片数据处理: 像素坐标 {custom_x_range:.1f} 直接映射为微米单位")
-                    logger.info(f"🔸 坐标范围: [{np.min(custom_x):.1f}, {np.max(custom_x):.1f}] μm")
-                    # custom_x 保持不变，直接当作微米使用
-                else:
-                    # 🔥 新逻辑：前端发送原始数据，后端根据unit_scale转换为mm，再转为目标单位
-                    logger.info(f"🔸 接收原始数据: 单位={original_unit}, unit_scale={unit_scale}")
-                    logger.info(f"🔸 原始数据范围: [{np.min(custom_x):.6f}, {np.max(custom_x):.6f}] {original_unit}")
-                    
-                    # 步骤1：原始单位 → mm
-                    custom_x_mm = custom_x * unit_scale
-                    logger.info(f"🔸 转换为毫米: [{np.min(custom_x_mm):.6f}, {np.max(custom_x_mm):.6f}] mm (×{unit_scale})")
-                    
-                    # 步骤2：mm → 目标单位（μm或mm）
-                    if target_is_um:
-                        # 目标是微米，mm → μm (×1000)
-                        custom_x = custom_x_mm * 1000.0
-                        logger.info(f"🔸 转换为微米: [{np.min(custom_x):.6f}, {np.max(custom_x):.6f}] μm (×1000)")
-                    else:
-                        # 目标是毫米，保持不变
-                        custom_x = custom_x_mm
-                        logger.info(f"🔸 保持毫米单位: [{np.min(custom_x):.6f}, {np.max(custom_x):.6f}] mm")
-                
-                # 扩展自定义数据范围以覆盖目标范围
-                x_min_target, x_max_target = np.min(x), np.max(x)
-                x_min_custom, x_max_custom = np.min(custom_x), np.max(custom_x)
-                
-                logger.info(f"🔸 坐标范围比较:")
-                logger.info(f"   - 自定义数据范围: [{x_min_custom:.6f}, {x_max_custom:.6f}]")
-                logger.info(f"   - 目标范围: [{x_min_target:.6f}, {x_max_target:.6f}]")
-                
-                # 获取数据范围外光强处理模式，默认为'zero'（零）
+                # 共享的光强分布对象：单位换算与排序只做一次，按目标网格缓存重采样结果
+                profile = profile_from_request_data(custom_intensity_data)
+                target_unit = grid_unit_for(x)
                 outside_range_mode = custom_intensity_data.get('outside_range_mode', 'zero')
-                logger.info(f"🔸 数据范围外光强处理模式: {outside_range_mode}")
-                
-                # 准备扩展后的数据
-                extended_x = custom_x.copy()
-                extended_intensity = custom_intensity.copy()
-                
-                # 根据模式处理范围外数据
-                if outside_range_mode == 'zero':
-                    # 'zero'模式：超出范围使用0值
-                    logger.info("   - 使用零值作为范围外光强")
-                    
-                    # 这里不需要扩展数据，因为interp1d的fill_value将设置为(0,0)
-                    # 但我们仍然需要确保插值函数能覆盖整个目标范围
-                    if x_min_target < x_min_custom or x_max_target > x_max_custom:
-                        logger.info("   - 目标范围超出数据范围，使用零值填充")
-                    
-                elif outside_range_mode == 'boundary':  # 'boundary'模式：超出范围使用边界值
-                    logger.info("   - 使用边界值作为范围外光强")
-                    
-                    # 如果目标范围超出自定义数据范围，使用边界值进行扩展
-                    if x_min_target < x_min_custom:
-                        logger.info(f"   - 扩展下限: {x_min_target} < {x_min_custom}")
-                        extended_x = np.concatenate([[x_min_target], extended_x])
-                        extended_intensity = np.concatenate([[custom_intensity[0]], extended_intensity])
-                    
-                    if x_max_target > x_max_custom:
-                        logger.info(f"   - 扩展上限: {x_max_target} > {x_max_custom}")
-                        extended_x = np.concatenate([extended_x, [x_max_target]])
-                        extended_intensity = np.concatenate([extended_intensity, [custom_intensity[-1]]])
-                        
-                elif outside_range_mode == 'custom':  # 'custom'模式：使用用户定义的固定值
-                    # 获取用户定义的光强值
-                    custom_intensity_value = float(custom_intensity_data.get('custom_intensity_value', 0.0))
-                    logger.info(f"   - 使用自定义值作为范围外光强: {custom_intensity_value}")
-                    
-                    # 仍然需要扩展坐标范围，但使用自定义值
-                    if x_min_target < x_min_custom:
-                        logger.info(f"   - 扩展下限: {x_min_target} < {x_min_custom}")
-                        extended_x = np.concatenate([[x_min_target], extended_x])
-                        extended_intensity = np.concatenate([[custom_intensity_value], extended_intensity])
-                    
-                    if x_max_target > x_max_custom:
-                        logger.info(f"   - 扩展上限: {x_max_target} > {x_max_custom}")
-                        extended_x = np.concatenate([extended_x, [x_max_target]])
-                        extended_intensity = np.concatenate([extended_intensity, [custom_intensity_value]])
+                custom_intensity_value = float(custom_intensity_data.get('custom_intensity_value', 0.0))
                 
-                # 设置插值函数的边界外行为 (已在上方处理了outside_range_mode)
-                if outside_range_mode == 'zero':
-                    # 超出范围使用0
-                    fill_value = (0, 0)
-                elif outside_range_mode == 'boundary':
-                    # 超出范围使用两端值
-                    fill_value = (custom_intensity[0], custom_intensity[-1])
-                else:  # custom模式
-                    # 超出范围使用自定义值
-                    custom_intensity_value = float(custom_intensity_data.get('custom_intensity_value', 0.0))
-                    fill_value = (custom_intensity_value, custom_intensity_value)
-                
-                # 创建线性插值函数
-                interp_func = interp1d(extended_x, extended_intensity, 
-                                     kind='linear', 
-                                     bounds_error=False, 
-                                     fill_value=fill_value)
+                logger.info(f"🔸 自定义数据统计:")
+                logger.info(f"   - 数据点数: {profile.x.size}, 原始单位: {profile.original_unit} (→mm ×{profile.mm_scale})")
+                logger.info(f"   - 目标X坐标范围: [{np.min(x):.3f}, {np.max(x):.3f}] {target_unit}, 点数: {len(x)}")
+                logger.info(f"🔸 数据范围外光强处理模式: {outside_range_mode}")
                 
-                # 将自定义数据插值到目标x坐标
-                result = interp_func(x)
+                result = profile.resample(x, target_unit, outside_range_mode, custom_intensity_value)
                 
                 # 确保结果为正值（光强不能为负）
                 result = np.maximum(result, 0)
@@ -969,7 +882,7 @@ class DillModel:
             reflectance_no_arc = arc_params.get('reflectance_no_arc', 0.0)
             
             # ARC透射率修正因子：考虑基底反射对光强分布的影响
-            arc_transmission_factor = (1 - reflectance_with_arc) / (1 - reflectance_no_arc) if reflectance_no_arc > 0 else 1.0
+            arc_transmission_factor = transmission_factor(reflectance_with_arc, reflectance_no_arc)
             
             logger.info(f"🔬 ARC参数应用:")
             logger.info(f"   - 无ARC反射率: {reflectance_no_arc:.4f}")
@@ -1213,62 +1126,16 @@ class DillModel:
                 logger.info(f"🔸 2D多维模式使用自定义光强分布数据")
                 logger.warning(f"⚠️  注意：2D多维模式的自定义光强数据仅应用于X方向，Y方向使用标准余弦分布")
                 
-                # 对于2D多维模式，使用自定义数据处理X方向光强分布
-                custom_x = np.array(custom_intensity_data['x'])
-                custom_intensity = np.array(custom_intensity_data['intensity'])
-                
-                # 🔧 执行单位转换（复用2D曝光图案的逻辑）
-                original_unit = custom_intensity_data.get('original_unit', 'mm')
-                unit_scale = custom_intensity_data.get('unit_scale', 1.0)
-                
-                # 智能单位转换判断
-                target_range = x_max - x_min if 'x_max' in locals() and 'x_min' in locals() else 20  # 默认20μm范围
-                target_is_um = target_range >= 10
-                data_range = custom_x.max() - custom_x.min()
-                
-                logger.info(f"🔸 2D多维模式智能单位转换:")
-                logger.info(f"   - 声明单位: {original_unit}")
-                logger.info(f"   - 数据范围: [{custom_x.min():.6f}, {custom_x.max():.6f}] ({data_range:.6f})")
-                logger.info(f"   - 目标范围: {target_range:.1f} {'μm' if target_is_um else 'mm'}")
-                
-                # 执行单位转换
-                if target_is_um:  # 目标是微米网格
-                    if original_unit == 'mm':
-                        custom_x = custom_x * 1000.0
-                        logger.info(f"🔸 单位转换: mm → μm，坐标×1000")
-                    elif original_unit == 'nm':
-                        custom_x = custom_x / 1000.0  # nm → μm 需要除1000
-                        logger.info(f"🔸 单位转换: nm → μm，坐标÷1000")
-                    elif original_unit in ['μm', 'um', 'micron']:
-                        logger.info(f"🔸 单位匹配: μm → μm，无需转换")
-                else:  # 目标是毫米网格
-                    if original_unit in ['μm', 'um', 'micron']:
-                        custom_x = custom_x / 1000.0
-                        logger.info(f"🔸 单位转换: μm → mm，坐标÷1000")
-                    elif original_unit == 'nm':
-                        custom_x = custom_x / 1000000.0  # nm → mm 需要除1000000
-                        logger.info(f"🔸 单位转换: nm → mm，坐标÷1000000")
-                    elif original_unit == 'mm':
-                        logger.info(f"🔸 单位匹配: mm → mm，无需转换")
-                
-                # 计算X方向的自定义光强分布（插值到x_axis_points）
+                # 对于2D多维模式，使用自定义数据处理X方向光强分布（共享的光强分布对象，按网格缓存重采样）
+                profile = profile_from_request_data(custom_intensity_data)
+                target_unit = grid_unit_for(x_axis_points)
                 outside_range_mode = custom_intensity_data.get('outside_range_mode', 'zero')
                 custom_intensity_value = custom_intensity_data.get('custom_intensity_value', 0)
                 
+                logger.info(f"🔸 2D多维模式自定义光强: {profile.x.size}个点, 原始单位 {profile.original_unit}, 目标网格 {target_unit}")
                 logger.info(f"🔸 X方向自定义光强插值模式: {outside_range_mode}")
                 
-                # 执行插值处理
-                if outside_range_mode == 'edge':
-                    intensity_x = np.interp(x_axis_points, custom_x, custom_intensity)
-                elif outside_range_mode == 'custom':
-                    intensity_x = np.full_like(x_axis_points, custom_intensity_value, dtype=float)
-                    mask = (x_axis_points >= custom_x.min()) & (x_axis_points <= custom_x.max())
-                    intensity_x[mask] = np.interp(x_axis_points[mask], custom_x, custom_intensity)
-                else:  # 'zero' mode (default)
-                    intensity_x = np.zeros_like(x_axis_points, dtype=float)
-                    mask = (x_axis_points >= custom_x.min()) & (x_axis_points <= custom_x.max())
-                    if np.any(mask):
-                        intensity_x[mask] = np.interp(x_axis_points[mask], custom_x, custom_intensity)
+                intensity_x = profile.resample(x_axis_points, target_unit, outside_range_mode, custom_intensity_value)
                 
                 # 应用I_avg和ARC透射率修正因子
                 intensity_x = I_avg * arc_transmission_factor * intensity_x
@@ -1800,14 +1667,13 @@ class DillModel:
         arc_params = None
         
         if substrate_material is not None and arc_material is not None:
-            from ..utils.helpers import calculate_reflectance
             try:
-                # 计算ARC参数
-                arc_params = calculate_reflectance(substrate_material, arc_material, wavelength)
+                # 计算ARC参数（传输矩阵法）
+                arc_params = self.calculate_arc_parameters(substrate_material, arc_material, wavelength)
                 if arc_params is not None:
                     reflectance_with_arc = arc_params.get('reflectance_with_arc', 0.0)
                     reflectance_no_arc = arc_params.get('reflectance_no_arc', 0.0)
-                    arc_transmission_factor = (1 - reflectance_with_arc) / (1 - reflectance_no_arc) if reflectance_no_arc > 0 else 1.0
+                    arc_transmission_factor = transmission_factor(reflectance_with_arc, reflectance_no_arc)
                     
                     logger.info(f"🔬 ARC透射率修正因子计算:")
                     logger.info(f"   - 无ARC反射率: {reflectance_no_arc:.4f}")
@@ -2281,7 +2147,7 @@ class DillModel:
         # 🔸 计算ARC透射率修正因子
         reflectance_with_arc = arc_params.get('reflectance_with_arc', 0.0)
         reflectance_no_arc = arc_params.get('reflectance_no_arc', 0.0)
-        arc_transmission_factor = (1 - reflectance_with_arc) / (1 - reflectance_no_arc) if reflectance_no_arc > 0 else 1.0
+        arc_transmission_factor = transmission_factor(reflectance_with_arc, reflectance_no_arc)
         logger.info(f"🔬 2D曝光图案ARC透射率修正因子: {arc_transmission_factor:.4f}")
         
         # 从周期距离计算空间频率
@@ -2377,91 +2243,17 @@ class DillModel:
         if custom_intensity_data and 'x' in custom_intensity_data and 'intensity' in custom_intensity_data:
             logger.info(f"📊 使用自定义光强分布数据")
             # 使用自定义光强分布数据，需要乘以I_avg系数
-            custom_x = np.array(custom_intensity_data['x'])
-            custom_intensity = np.array(custom_intensity_data['intensity'])
-            
-            # 🔥 关键修复：智能单位转换
-            # 前端数据可能有各种单位，需要智能识别和转换
-            original_unit = custom_intensity_data.get('original_unit', 'mm')
-            unit_scale = custom_intensity_data.get('unit_scale', 1.0)
-            
-            # 🔧 改进的目标坐标系单位判断逻辑
+            # 共享的光强分布对象：单位换算（含误标修正）在登记时确定一次
+            profile = profile_from_request_data(custom_intensity_data)
             target_range = x_max - x_min
-            # 更合理的判断：范围>=10认为是微米单位，<10认为是毫米单位
-            # 因为2D光刻通常在微米级别，只有非常小的范围才可能是毫米级
+            # 范围>=10认为是微米单位，<10认为是毫米单位（2D光刻通常在微米级别）
             target_is_um = target_range >= 10
-            
-            # 智能数据范围检测
-            data_range = custom_x.max() - custom_x.min()
-            
-            logger.info(f"🔸 智能单位转换检查:")
-            logger.info(f"   - 声明单位: {original_unit}")
-            logger.info(f"   - 数据范围: [{custom_x.min():.6f}, {custom_x.max():.6f}] ({data_range:.6f})")
-            logger.info(f"   - 目标网格: [{x_min:.1f}, {x_max:.1f}] {'μm' if target_is_um else 'mm'}")
-            
-            # 异常检测和智能修正
-            unit_mismatch_detected = False
-            corrected_unit = original_unit
-            
-            if original_unit == 'mm':
-                if data_range < 0.01:  # 小于0.01mm，可能是纳米或微米数据误标为mm
-                    if data_range < 0.00001:  # <0.01μm，可能是纳米数据
-                        logger.info(f"⚠️  检测到异常：数据范围{data_range*1000000:.1f}nm，可能是纳米数据误标为mm")
-                        corrected_unit = 'nm'
-                        unit_mismatch_detected = True
-                    else:  # 0.01μm - 10μm，可能是微米数据
-                        logger.info(f"⚠️  检测到异常：数据范围{data_range*1000:.3f}μm，可能是微米数据误标为mm")
-                        corrected_unit = 'μm'
-                        unit_mismatch_detected = True
-                elif data_range > 100:  # 大于100mm，可能是微米数据误标为mm
-                    logger.info(f"⚠️  检测到异常：数据范围{data_range:.1f}mm过大，可能是微米数据误标为mm")
-                    corrected_unit = 'μm'
-                    unit_mismatch_detected = True
-            
-            if unit_mismatch_detected:
-                logger.info(f"🔧 智能修正：{original_unit} → {corrected_unit}")
-            
-            # 🔸 添加单位转换前的验证
-            pre_conversion_range = custom_x.max() - custom_x.min()
-            logger.info(f"🔍 转换前验证:")
-            logger.info(f"   - 数据单位: {corrected_unit}")
-            logger.info(f"   - 数据范围: {pre_conversion_range:.6f} {corrected_unit}")
-            logger.info(f"   - 目标单位: {'μm' if target_is_um else 'mm'}")
-            logger.info(f"   - 目标范围: {target_range:.1f} {'μm' if target_is_um else 'mm'}")
-            
-            # 执行单位转换
-            if target_is_um:  # 目标是微米网格
-                if corrected_unit == 'mm':
-                    custom_x = custom_x * 1000.0
-                    logger.info(f"🔸 单位转换: mm → μm，坐标×1000")
-                elif corrected_unit == 'nm':
-                    custom_x = custom_x / 1000.0  # nm → μm 需要除1000
-                    logger.info(f"🔸 单位转换: nm → μm，坐标÷1000")
-                elif corrected_unit in ['μm', 'um', 'micron']:
-                    logger.info(f"🔸 单位匹配: μm → μm，无需转换")
-                logger.info(f"   - 转换后范围: [{custom_x.min():.1f}, {custom_x.max():.1f}] μm")
-            else:  # 目标是毫米网格
-                if corrected_unit in ['μm', 'um', 'micron']:
-                    custom_x = custom_x / 1000.0
-                    logger.info(f"🔸 单位转换: μm → mm，坐标÷1000")
-                elif corrected_unit == 'nm':
-                    custom_x = custom_x / 1000000.0  # nm → mm 需要除1000000
-                    logger.info(f"🔸 单位转换: nm → mm，坐标÷1000000")
-                elif corrected_unit == 'mm':
-                    logger.info(f"🔸 单位匹配: mm → mm，无需转换")
-                logger.info(f"   - 转换后范围: [{custom_x.min():.3f}, {custom_x.max():.3f}] mm")
-            
-            # 🔸 转换后验证和警告
-            post_conversion_range = custom_x.max() - custom_x.min()
             target_unit = 'μm' if target_is_um else 'mm'
-            logger.info(f"🔍 转换后验证:")
-            logger.info(f"   - 转换后数据范围: {post_conversion_range:.6f} {target_unit}")
+            custom_x = profile.coordinates(target_unit)
+            custom_intensity = profile.intensity
             
-            # 合理性检查
-            if target_is_um and (post_conversion_range > 100000 or post_conversion_range < 0.001):
-                logger.warning(f"⚠️  转换后μm范围异常: {post_conversion_range:.6f}μm，请检查原始数据单位")
-            elif not target_is_um and (post_conversion_range > 1000 or post_conversion_range < 0.000001):
-                logger.warning(f"⚠️  转换后mm范围异常: {post_conversion_range:.6f}mm，请检查原始数据单位")
+            logger.info(f"🔸 单位换算: 声明单位 {profile.original_unit}, 按 {profile.corrected_unit} 处理, 目标网格 {target_unit}")
+            logger.info(f"   - 转换后范围: [{custom_x.min():.3f}, {custom_x.max():.3f}] {target_unit}")
             
             # 验证转换后的数据是否在合理范围内（插值可以处理边界外的情况）
             data_span = custom_x.max() - custom_x.min()
@@ -2530,26 +2322,11 @@ class DillModel:
                 logger.info(f"   - 使用自定义值: {custom_intensity_value}")
             elif outside_range_mode == 'zero':
                 logger.info(f"   - 使用零值作为范围外光强")
-            elif outside_range_mode == 'edge':
+            elif outside_range_mode in ('edge', 'boundary'):
                 logger.info(f"   - 使用边界值作为范围外光强")
             
-            # 执行插值，根据outside_range_mode处理边界外的值
-            if outside_range_mode == 'edge':
-                # 使用边界值外推
-                intensity_1d_raw = np.interp(x_range, custom_x, custom_intensity)
-            elif outside_range_mode == 'custom':
-                # 使用自定义值填充范围外
-                intensity_1d_raw = np.full_like(x_range, custom_intensity_value, dtype=float)
-                # 在数据范围内的点使用插值
-                mask = (x_range >= custom_x.min()) & (x_range <= custom_x.max())
-                intensity_1d_raw[mask] = np.interp(x_range[mask], custom_x, custom_intensity)
-            else:  # 'zero' mode (default)
-                # 使用零值填充范围外  
-                intensity_1d_raw = np.zeros_like(x_range, dtype=float)
-                # 在数据范围内的点使用插值
-                mask = (x_range >= custom_x.min()) & (x_range <= custom_x.max())
-                if np.any(mask):
-                    intensity_1d_raw[mask] = np.interp(x_range[mask], custom_x, custom_intensity)
+            # 执行插值，根据outside_range_mode处理边界外的值（按网格缓存）
+            intensity_1d_raw = profile.resample(x_range, target_unit, outside_range_mode, custom_intensity_value)
             
             # 关键修复：只对X的1D坐标插值，然后广播到2D网格
             # 严格按照MATLAB逻辑：D0(i,j) 只依赖于X(i)，对所有j都相同
@@ -2683,18 +2460,3 @@ class DillModel:
         logger.info(f"✅ 2D曝光图案ARC参数已添加到返回数据中")
         
         return results_data
-
-def get_model_by_name(model_name):
-    """
-    根据模型名称返回对应模型实例
-    支持：'dill', 'enhanced_dill', 'car'
-    """
-    if model_name == 'dill':
-        return DillModel()
-    elif model_name == 'enhanced_dill':
-        return EnhancedDillModel(debug_mode=False)
-    elif model_name == 'car':
-        from .car_model import CARModel
-        return CARModel()
-    else:
-        raise ValueError(f"未知模型类型: {model_name}")
\ No newline at end of file
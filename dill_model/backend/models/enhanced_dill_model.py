@@ -1,14 +1,13 @@
 import numpy as np
-from scipy.integrate import odeint
 import math
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D  # 添加3D绘图支持
-from io import BytesIO
-import base64
 import ast
 import logging  # 添加logging模块
 import time
 
+from .enhanced_dill_surrogate import get_enhanced_dill_surrogate
+from .model_registry import get_cache, ABC_CACHE_SIZE
+from ..utils.figure_renderer import get_figure_renderer, line_plot, surface_plot
+
 # 设置日志配置
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -65,11 +64,12 @@ class EnhancedDillModel:
     - 光强沿深度按Beer-Lambert定律衰减
     - PAC浓度随时间和空间变化
     """
-    def __init__(self, debug_mode=False, use_arc_layer=True):
+    def __init__(self, debug_mode=False, use_arc_layer=True, use_surrogate=True):
         self.debug_mode = debug_mode  # 增加调试模式标志
         self.use_arc_layer = use_arc_layer  # 是否使用抗反射涂层
-        # 添加ABC参数缓存
-        self._abc_cache = {}
+        self.use_surrogate = use_surrogate  # 是否优先使用代理仿真器（超出信任区域时自动回退到PDE求解器）
+        # ABC参数缓存（有界LRU，所有实例共享）
+        self._abc_cache = get_cache('enhanced_dill_abc', ABC_CACHE_SIZE)
         if debug_mode:
             logging.basicConfig(level=logging.DEBUG)
 
@@ -89,8 +89,9 @@ class EnhancedDillModel:
         cache_key = (z_h, T, t_B)
         
         # 检查缓存
-        if cache_key in self._abc_cache:
-            return self._abc_cache[cache_key]
+        cached = self._abc_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         # 仅在第一次计算时输出详细日志
         logger.info("=" * 60)
@@ -105,6 +106,36 @@ class EnhancedDillModel:
         logger.info("   B(z_h,T,t_B) = 0.00066301*D + 0.00024413*T - 0.0096")
         logger.info("   C(z_h,T,t_B) = -0.01233*D + 0.00054385*T + 0.00056988*D² - 0.00001487*D*T - 0.00000115*T² + 0.0629")
         
+        A, B, C = self.fit_abc(z_h, T, t_B)
+        
+        # 缓存结果
+        self._abc_cache.put(cache_key, (A, B, C))
+        
+        logger.info(f"🔸 输入参数:")
+        logger.info(f"   - z_h (胶厚) = {z_h} μm")
+        logger.info(f"   - T (前烘温度) = {T} °C")
+        logger.info(f"   - t_B (前烘时间) = {t_B} min")
+        
+        logger.info(f"🔸 计算得到的ABC参数:")
+        logger.info(f"   - A (PAC吸收率) = {A:.6f}")
+        logger.info(f"   - B (基底吸收率) = {B:.6f}")
+        logger.info(f"   - C (反应速率常数) = {C:.6f}")
+        
+        # 物理意义验证
+        if A < B:
+            logger.warning("⚠️  A < B: PAC吸收率小于基底吸收率，这在物理上较为少见")
+        if C > 0.1:
+            logger.info("✓ 高反应速率：适用于高感光度光刻胶")
+        elif C < 0.01:
+            logger.info("✓ 低反应速率：适用于高对比度光刻胶")
+            
+        return A, B, C
+
+    @staticmethod
+    def fit_abc(z_h, T, t_B):
+        """
+        A/B/C拟合公式本身（无日志、无缓存），供 get_abc 和代理仿真器批量采样使用
+        """
         # 参数范围检查和物理约束
         if not (1 <= z_h <= 100):
             raise ValueError(f"胶厚z_h={z_h}超出合理范围[1, 100]μm")
@@ -137,27 +168,6 @@ class EnhancedDillModel:
         B = max(0.001, min(B, 0.1))  # 基底吸收率：0.001-0.1  
         C = max(0.001, min(C, 1.0))  # 反应速率：0.001-1.0
         
-        # 缓存结果
-        self._abc_cache[cache_key] = (A, B, C)
-        
-        logger.info(f"🔸 输入参数:")
-        logger.info(f"   - z_h (胶厚) = {z_h} μm")
-        logger.info(f"   - T (前烘温度) = {T} °C")
-        logger.info(f"   - t_B (前烘时间) = {t_B} min")
-        
-        logger.info(f"🔸 计算得到的ABC参数:")
-        logger.info(f"   - A (PAC吸收率) = {A:.6f}")
-        logger.info(f"   - B (基底吸收率) = {B:.6f}")
-        logger.info(f"   - C (反应速率常数) = {C:.6f}")
-        
-        # 物理意义验证
-        if A < B:
-            logger.warning("⚠️  A < B: PAC吸收率小于基底吸收率，这在物理上较为少见")
-        if C > 0.1:
-            logger.info("✓ 高反应速率：适用于高感光度光刻胶")
-        elif C < 0.01:
-            logger.info("✓ 低反应速率：适用于高对比度光刻胶")
-            
         return A, B, C
 
     def validate_physical_constraints(self, I, M, z_h, I0, M0):
@@ -500,6 +510,60 @@ class EnhancedDillModel:
         
         return z, I_final, M_final, exposure_dose, compute_time
 
+    def surrogate_depth_profiles(self, z_h, T, t_B, I_surface, M0=1.0, t_exp=5.0, num_z_points=100):
+        """
+        使用代理仿真器批量计算深度分布（I_surface 可以是多个横向位置的表面光强数组）
+
+        返回:
+            (z, I_final, M_final, exposure_dose, error)，I_final 等形状为 (N, num_z_points)；
+            未启用代理、参数超出信任区域或误差估计超过容差时返回None，调用方应回退到PDE求解器
+        """
+        if not self.use_surrogate:
+            return None
+        try:
+            return get_enhanced_dill_surrogate(self.fit_abc).query(
+                z_h, T, t_B, I_surface, M0=M0, t_exp=t_exp, num_z_points=num_z_points
+            )
+        except Exception as e:
+            logger.warning(f"代理仿真器查询失败，回退到PDE求解器: {e}")
+            return None
+
+    def lookup_depth_profile(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, num_z_points=100):
+        """
+        查找表多线性插值：恒定表面光强 I0 下的深度分布
+
+        查找表（离线构建时以内存映射方式共享）只依赖 (z_h, T, t_B, M0, I0·t_exp)，
+        查询耗时与参数无关；插值误差上限见 get_enhanced_dill_surrogate(...).stats()['validation_max_error']。
+
+        返回:
+            (z, I_final, M_final, exposure_dose)；参数不在表格范围内或误差估计超过容差时返回None
+        """
+        result = self.surrogate_depth_profiles(z_h, T, t_B, I0, M0, t_exp, num_z_points)
+        if result is None:
+            return None
+        z, I_final, M_final, exposure_dose, _ = result
+        return z, I_final[0], M_final[0], exposure_dose[0]
+
+    def solve_depth_profile(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, num_z_points=100, x_position=None, K=None, V=0, phi_expr=None):
+        """
+        深度分布求解入口：表面光强不随时间变化时先查表，否则（或不在表格范围内时）调用PDE求解器
+
+        参数和返回值与 solve_enhanced_dill_pde 相同。
+        """
+        if phi_expr is None:
+            if x_position is not None and K is not None and V > 0:
+                surface_I0 = I0 * (1 + V * np.cos(K * x_position))
+            else:
+                surface_I0 = I0
+            result = self.lookup_depth_profile(z_h, T, t_B, surface_I0, M0, t_exp, num_z_points)
+            if result is not None:
+                return result
+        return self.solve_enhanced_dill_pde(
+            z_h, T, t_B, I0, M0, t_exp,
+            num_z_points=num_z_points,
+            x_position=x_position, K=K, V=V, phi_expr=phi_expr
+        )
+
     def simulate(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, num_points=100, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, V=0, y=0, K=None, x_position=None):
         """
         Enhanced Dill模型仿真入口函数，支持不同的计算模式
@@ -841,7 +905,7 @@ class EnhancedDillModel:
                 x_pos = x_position if x_position is not None else 5.0  # 默认横向位置
                 K_val = K if K is not None else 2.0  # 默认空间频率
                 
-                z, I_final, M_final, exposure_dose = self.solve_enhanced_dill_pde(
+                z, I_final, M_final, exposure_dose = self.solve_depth_profile(
                     z_h, T, t_B, I0, M0, t_exp,
                     num_z_points=num_points,
                     x_position=x_pos, K=K_val, V=V, phi_expr=phi_expr
@@ -875,8 +939,16 @@ class EnhancedDillModel:
                 
                 phi_val = parse_phi_expr(phi_expr, 0) if phi_expr is not None else 0.0
 
-                for i, y in enumerate(y_coords_yz):
-                    intensity_y = I0 * (1 + V * np.cos(Kx * x_fixed_for_yz + Ky * y + phi_val))
+                intensity_yz = I0 * (1 + V * np.cos(Kx * x_fixed_for_yz + Ky * y_coords_yz + phi_val))
+                # 所有y位置共用一次代理仿真器批量查询，失败时逐点调用PDE求解器
+                surrogate_yz = self.surrogate_depth_profiles(z_h, T, t_B, intensity_yz, M0, t_exp, len(z_coords_yz))
+                if surrogate_yz is not None:
+                    _, I_depth_yz, M_depth_yz, _, _ = surrogate_yz
+                    yz_exposure = (I_depth_yz * t_exp).tolist()
+                    yz_thickness = M_depth_yz.tolist()
+
+                for i, y in enumerate(y_coords_yz if surrogate_yz is None else []):
+                    intensity_y = intensity_yz[i]
                     try:
                         _, I_depth, M_depth, _ = self.solve_enhanced_dill_pde(
                             z_h, T, t_B, intensity_y, M0, t_exp,
@@ -1142,8 +1214,6 @@ class EnhancedDillModel:
             logger.warning(f"[Plots警告] 干涉条纹可见度V={V}，已设为默认值0.8以显示正弦波")
             V = 0.8  # 使用默认值以显示正弦波效果
 
-        plt.close('all')
-        
         if sine_type == '3d' and Kx is not None and Ky is not None and Kz is not None:
             # 处理3D情况，生成3D表面图
             x_points = 50  # 与数据生成保持一致
@@ -1189,70 +1259,27 @@ class EnhancedDillModel:
             if thickness.shape != (y_points, x_points):
                 thickness = thickness.T
             
-            # 生成每个Z层的插值面，从而创建真正的3D可视化
-            # 生成曝光剂量的3D表面图
-            fig1 = plt.figure(figsize=(10, 8))
-            ax1 = fig1.add_subplot(111, projection='3d')  # type: ignore
-            
-            # 绘制带有Z层差异的表面
-            for i, z_val in enumerate(z_coords):
-                # 为每层创建调整后的z网格
-                Z = np.ones(X.shape) * z_val
-                
-                # 计算该z层的曝光剂量
+            # 生成每个Z层的表面（按曝光剂量/PAC浓度抬升Z坐标），从而创建真正的3D可视化
+            exposure_layers = []
+            thickness_layers = []
+            for z_val in z_coords:
                 curr_modulation = np.cos(Kx * X + Ky * Y + Kz * z_val + phi)
                 curr_exposure = base_exposure * (1 + amplitude * curr_modulation)
-                
-                # 根据曝光剂量调整Z坐标，创建3D表面效果
-                Z_adjusted = Z + curr_exposure * 0.1
-                
-                # 绘制此Z层的表面
-                ax1.plot_surface(X, Y, Z_adjusted, alpha=0.7, cmap='viridis',  # type: ignore
-                                edgecolor='none', rstride=5, cstride=5)
-            
-            ax1.set_title('3D Exposure Dose Distribution', fontsize=16)
-            ax1.set_xlabel('X Position (μm)', fontsize=14)
-            ax1.set_ylabel('Y Position (μm)', fontsize=14)
-            ax1.set_zlabel('Z Position (μm)', fontsize=14)  # type: ignore
-            plt.tight_layout()
-            
-            buffer1 = BytesIO()
-            fig1.savefig(buffer1, format='png', dpi=100)
-            buffer1.seek(0)
-            exposure_plot = base64.b64encode(buffer1.getvalue()).decode()
-            plt.close(fig1)
-            
-            # 生成PAC浓度3D表面图，同样带有Z层差异
-            fig2 = plt.figure(figsize=(10, 8))
-            ax2 = fig2.add_subplot(111, projection='3d')  # type: ignore
-            
-            # 绘制带有Z层差异的表面
-            for i, z_val in enumerate(z_coords):
-                # 为每层创建调整后的z网格
-                Z = np.ones(X.shape) * z_val
-                
-                # 计算该z层的PAC浓度
-                curr_modulation = np.cos(Kx * X + Ky * Y + Kz * z_val + phi)
                 curr_thickness = M0 * (1 - 0.5 * amplitude * curr_modulation)
-                
-                # 根据厚度调整Z坐标，创建3D表面效果
-                Z_adjusted = Z + curr_thickness * 0.2
-                
-                # 绘制此Z层的表面
-                ax2.plot_surface(X, Y, Z_adjusted, alpha=0.7, cmap='plasma',  # type: ignore
-                                edgecolor='none', rstride=5, cstride=5)
-            
-            ax2.set_title('3D PAC Concentration Distribution', fontsize=16)
-            ax2.set_xlabel('X Position (μm)', fontsize=14)
-            ax2.set_ylabel('Y Position (μm)', fontsize=14)
-            ax2.set_zlabel('Z Position (μm)', fontsize=14)  # type: ignore
-            plt.tight_layout()
-            
-            buffer2 = BytesIO()
-            fig2.savefig(buffer2, format='png', dpi=100)
-            buffer2.seek(0)
-            thickness_plot = base64.b64encode(buffer2.getvalue()).decode()
-            plt.close(fig2)
+                exposure_layers.append((X, Y, z_val + curr_exposure * 0.1))
+                thickness_layers.append((X, Y, z_val + curr_thickness * 0.2))
+            
+            layer_options = {'alpha': 0.7, 'edgecolor': 'none', 'rstride': 5, 'cstride': 5}
+            plots = get_figure_renderer().render_many({
+                'exposure_plot': surface_plot(exposure_layers, '3D Exposure Dose Distribution', 'X Position (μm)',
+                                              'Y Position (μm)', 'Z Position (μm)', cmap='viridis',
+                                              surface_options=layer_options),
+                'thickness_plot': surface_plot(thickness_layers, '3D PAC Concentration Distribution', 'X Position (μm)',
+                                               'Y Position (μm)', 'Z Position (μm)', cmap='plasma',
+                                               surface_options=layer_options)
+            })
+            exposure_plot = plots['exposure_plot']
+            thickness_plot = plots['thickness_plot']
             
         else:
             # 使用与simulate相同的参数处理逻辑
@@ -1261,35 +1288,16 @@ class EnhancedDillModel:
             z, I, M = self.simulate(z_h, T, t_B, I0, M0, t_exp, sine_type=sine_type, 
                                     Kx=Kx, Ky=Ky, Kz=Kz, phi_expr=phi_expr, V=int(V), K=current_K)
             
-            # Exposure dose distribution plot (I)
-            fig1 = plt.figure(figsize=(10, 6))
-            plt.plot(z, I, 'b-', linewidth=2)
-            plt.title('Exposure Dose Distribution', fontsize=16)
-            plt.xlabel('Depth (μm)', fontsize=14)
-            plt.ylabel('Post-exposure Intensity', fontsize=14)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer1 = BytesIO()
-            fig1.savefig(buffer1, format='png', dpi=100)
-            buffer1.seek(0)
-            exposure_plot = base64.b64encode(buffer1.getvalue()).decode()
-            plt.close(fig1)
-            
-            # PAC concentration distribution plot (M)
-            fig2 = plt.figure(figsize=(10, 6))
-            plt.plot(z, M, 'r-', linewidth=2)
-            plt.title('PAC Concentration Distribution', fontsize=16)
-            plt.xlabel('Depth (μm)', fontsize=14)
-            plt.ylabel('Post-exposure PAC Concentration', fontsize=14)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer2 = BytesIO()
-            fig2.savefig(buffer2, format='png', dpi=100)
-            buffer2.seek(0)
-            thickness_plot = base64.b64encode(buffer2.getvalue()).decode()
-            plt.close(fig2)
+            # 曝光剂量分布图(I) 与 PAC浓度分布图(M)
+            plots = get_figure_renderer().render_many({
+                'exposure_plot': line_plot([{'x': z, 'y': I, 'fmt': 'b-', 'linewidth': 2}],
+                                           'Exposure Dose Distribution', 'Depth (μm)', 'Post-exposure Intensity'),
+                'thickness_plot': line_plot([{'x': z, 'y': M, 'fmt': 'r-', 'linewidth': 2}],
+                                            'PAC Concentration Distribution', 'Depth (μm)',
+                                            'Post-exposure PAC Concentration')
+            })
+            exposure_plot = plots['exposure_plot']
+            thickness_plot = plots['thickness_plot']
             
         return {
             'exposure_plot': exposure_plot,
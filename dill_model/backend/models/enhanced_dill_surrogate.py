@@ -0,0 +1,456 @@
+"""
+增强Dill模型代理（surrogate）仿真器
+
+增强Dill方程在无量纲化后只依赖三个组合参数：
+    ζ = z / z_h,  s = t / t_exp,  m = M / M0,  i = I / I_surface
+    ∂i/∂ζ = -i (α m + β)      α = A·M0·z_h,  β = B·z_h
+    ∂m/∂s = -δ i m            δ = C·I_surface·t_exp
+因此 (z_h, T, t_B, I0, M0, t_exp) 的整个参数族可以由 (α, β, δ) 上的一张三维表描述。
+
+本模块在 get_abc 参数范围（胶厚/前烘温度/前烘时间）对应的 (α, β, δ) 范围内，
+用向量化批量求解器一次性求出张量积网格上的深度分布，查询时做三线性插值。
+
+插值变量按 β=0 时的解析解（漂白前沿）选取：
+    m = 1 / (1 + (e^δ - 1)·e^{-αζ})    ⇒  u = ln(1/m - 1) = ln(e^δ - 1) - αζ
+    i = m·e^{δ - αζ}                  ⇒  w = ln(i / m) - δ = -αζ
+    g = ∫i ds = -ln(m) / δ             ⇒  r = ln(g·δ / -ln m) = 0
+以 x = ln(e^δ - 1) 和 α 为坐标时 u、w 是线性函数，漂白前沿的移动不会被插值抹平；
+β > 0 与离散格式只带来平滑的小修正。误差估计取全分辨率与半分辨率网格插值之差（Richardson估计），
+参数超出信任区域或误差估计超过容差时返回None，由调用方回退到完整PDE求解器。
+
+查找表可以离线构建（见 build_lookup_tables.py），保存为 .npy 文件包；
+服务进程以只读内存映射方式加载，多个 worker 共享同一份页缓存，启动时无需重新求解。
+"""
+
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# 无量纲深度/时间网格
+SURROGATE_Z_POINTS = 65
+SURROGATE_T_POINTS = 256
+
+# 张量积网格节点数（取奇数，便于抽取半分辨率网格做误差估计）
+ALPHA_NODES = 17
+BETA_NODES = 3
+DELTA_NODES = 33
+
+# 信任区域：M0 的范围以及 δ = C·I·t_exp 的范围（更小的 δ 按下限处理，误差不超过 DELTA_MIN）
+M0_RANGE = (0.5, 1.5)
+DELTA_MIN = 1e-4
+DELTA_MAX = 50.0
+
+# 对数变换时的下限
+LOG_FLOOR = 1e-15
+
+# 误差估计超过该值时回退到PDE求解器（归一化量 m、i 的绝对误差）
+DEFAULT_TOLERANCE = 2e-3
+
+# 离散查找表文件包
+TABLE_FORMAT_VERSION = 1
+TABLE_KEYS = ('u', 'w', 'r')
+TABLE_FILE = 'tables.npy'
+META_FILE = 'meta.json'
+DEFAULT_TABLE_DIR = os.environ.get(
+    'DILL_LOOKUP_TABLE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 'lookup_tables', 'enhanced_dill')
+)
+
+
+def _delta_coordinate(delta):
+    """δ 的插值坐标 x = ln(e^δ - 1)"""
+    delta = np.clip(delta, DELTA_MIN, None)
+    return np.where(delta > 30.0, delta, np.log(np.expm1(np.minimum(delta, 30.0))))
+
+
+def _delta_from_coordinate(x):
+    return np.log1p(np.exp(x))
+
+
+def solve_normalized_batch(alpha, beta, delta, num_z_points=SURROGATE_Z_POINTS, num_t_points=SURROGATE_T_POINTS):
+    """
+    批量求解无量纲增强Dill方程
+
+    离散格式与 EnhancedDillModel.solve_enhanced_dill_pde 一致：
+    PAC浓度使用Crank-Nicolson半隐式更新，光强沿深度按分段指数衰减传播。
+
+    参数:
+        alpha, beta, delta: 形状 (N,) 的无量纲参数
+
+    返回:
+        m, i, g: 形状 (N, num_z_points)，分别为最终PAC浓度、最终光强和时间积分光强（均已归一化）
+    """
+    alpha = np.asarray(alpha, dtype=float)[:, None]
+    beta = np.asarray(beta, dtype=float)[:, None]
+    delta = np.asarray(delta, dtype=float)[:, None]
+    zeta = np.linspace(0.0, 1.0, num_z_points)
+    dzeta = zeta[1] - zeta[0]
+    ds = 1.0 / (num_t_points - 1)
+
+    m = np.ones((alpha.shape[0], num_z_points))
+    i = np.exp(-(alpha + beta) * zeta[None, :])
+    g = 0.5 * i * ds
+    h = 0.5 * ds * delta
+
+    for step in range(1, num_t_points):
+        hi = h * i
+        m = np.clip(m * (1.0 - hi) / (1.0 + hi), 0.0, 1.0)
+        absorption = (alpha * 0.5 * (m[:, 1:] + m[:, :-1]) + beta) * dzeta
+        i = np.empty_like(m)
+        i[:, 0] = 1.0
+        i[:, 1:] = np.exp(-np.cumsum(absorption, axis=1))
+        g += (0.5 if step == num_t_points - 1 else 1.0) * i * ds
+    return m, i, g
+
+
+def abc_parameter_box(fit_abc, z_h_range=(1.0, 100.0), T_range=(60.0, 200.0), t_B_range=(1.0, 30.0), samples=12):
+    """在 get_abc 的有效参数范围内采样，返回 A、B、C 及 A·z_h、B·z_h 的取值范围"""
+    z_h = np.linspace(*z_h_range, samples)
+    T = np.linspace(*T_range, samples)
+    t_B = np.linspace(*t_B_range, samples)
+    values = []
+    for zh in z_h:
+        for temp in T:
+            for tb in t_B:
+                A, B, C = fit_abc(zh, temp, tb)
+                values.append((A * zh, B * zh, C))
+    values = np.array(values)
+    return {
+        'alpha_z': (float(values[:, 0].min()), float(values[:, 0].max())),
+        'beta_z': (float(values[:, 1].min()), float(values[:, 1].max())),
+        'C': (float(values[:, 2].min()), float(values[:, 2].max()))
+    }
+
+
+class EnhancedDillSurrogate:
+    """
+    增强Dill模型的代理仿真器
+
+    参数:
+        fit_abc: fit_abc(z_h, T, t_B) -> (A, B, C)，不带日志/缓存的ABC拟合公式
+        tolerance: 误差估计上限，超过时 query 返回None
+    """
+
+    def __init__(self, fit_abc, tolerance=DEFAULT_TOLERANCE, alpha_nodes=ALPHA_NODES, beta_nodes=BETA_NODES,
+                 delta_nodes=DELTA_NODES, num_z_points=SURROGATE_Z_POINTS, num_t_points=SURROGATE_T_POINTS, build=True):
+        self.fit_abc = fit_abc
+        self.tolerance = tolerance
+        self.build_time = None
+        self.validation_error = None
+        self.source = 'memory'
+        self.queries = 0
+        self.fallbacks = 0
+        if build:
+            self._build(alpha_nodes, beta_nodes, delta_nodes, num_z_points, num_t_points)
+
+    def _build(self, alpha_nodes, beta_nodes, delta_nodes, num_z_points, num_t_points):
+        start = time.time()
+        box = abc_parameter_box(self.fit_abc)
+        alpha_range = (box['alpha_z'][0] * M0_RANGE[0], box['alpha_z'][1] * M0_RANGE[1])
+        beta_range = box['beta_z']
+
+        # α、β 线性均匀分布，δ 在 x = ln(e^δ - 1) 坐标下均匀分布
+        axes = (
+            np.linspace(alpha_range[0], alpha_range[1], alpha_nodes),
+            np.linspace(beta_range[0], max(beta_range[1], beta_range[0] * 1.0001), beta_nodes),
+            np.linspace(_delta_coordinate(DELTA_MIN), _delta_coordinate(DELTA_MAX), delta_nodes)
+        )
+        grid = np.meshgrid(axes[0], axes[1], _delta_from_coordinate(axes[2]), indexing='ij')
+        m, i, g = solve_normalized_batch(grid[0].ravel(), grid[1].ravel(), grid[2].ravel(),
+                                         num_z_points=num_z_points, num_t_points=num_t_points)
+        shape = grid[0].shape + (num_z_points,)
+        tables = {key: value.reshape(shape)
+                  for key, value in self._transform(m, i, g, grid[2].ravel()).items()}
+
+        self.box = box
+        self.num_t_points = num_t_points
+        self._set_tables(axes, tables, {'alpha': alpha_range, 'beta': beta_range, 'delta': (0.0, DELTA_MAX)})
+        self.build_time = time.time() - start
+        self.validation_error = self._validate()
+
+    def _set_tables(self, axes, tables, ranges):
+        self.axes = tuple(np.asarray(axis, dtype=float) for axis in axes)
+        self.tables = tables
+        self.zeta = np.linspace(0.0, 1.0, next(iter(tables.values())).shape[-1])
+        self.ranges = ranges
+
+        # 半分辨率网格：用于逐次查询的误差估计（内存映射时为只读视图，不复制数据）
+        self.half_axes = tuple(axis[::2] for axis in self.axes)
+        self.half_tables = {key: table[::2, ::2, ::2] for key, table in self.tables.items()}
+
+    def save(self, directory):
+        """
+        保存为 .npy 文件包：tables-<构建号>.npy（形状 (3, α, β, δ, ζ) 的插值变量）和 meta.json（坐标轴、构建信息及表文件名）
+
+        表文件名每次构建唯一，meta.json 写入临时文件后 os.replace 替换，
+        读取方看到的 meta.json 总是指向与之匹配的完整表文件；旧的表文件在替换后删除
+        （已映射旧表的进程不受影响）。
+
+        返回:
+            表文件路径
+        """
+        os.makedirs(directory, exist_ok=True)
+        stacked = np.stack([np.asarray(self.tables[key]) for key in TABLE_KEYS])
+        build_id = f"{datetime.datetime.now():%Y%m%d%H%M%S}-{os.getpid()}-{threading.get_ident() & 0xffff:04x}"
+        table_file = f'tables-{build_id}.npy'
+        table_path = os.path.join(directory, table_file)
+        _atomic_write(table_path, lambda f: np.save(f, stacked))
+
+        meta = {
+            'format_version': TABLE_FORMAT_VERSION,
+            'keys': list(TABLE_KEYS),
+            'table_file': table_file,
+            'axes': [axis.tolist() for axis in self.axes],
+            'ranges': {key: list(value) for key, value in self.ranges.items()},
+            'abc_box': {key: list(value) for key, value in self.box.items()},
+            'num_t_points': self.num_t_points,
+            'validation_max_error': self.validation_error,
+            'build_time': self.build_time,
+            'created': datetime.datetime.now().isoformat()
+        }
+        _atomic_write(os.path.join(directory, META_FILE),
+                      lambda f: f.write(json.dumps(meta, indent=2).encode('utf-8')))
+
+        # 清理不再被 meta.json 引用的表文件
+        for name in os.listdir(directory):
+            if name != table_file and (name == TABLE_FILE or (name.startswith('tables-') and name.endswith('.npy'))):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+        self.source = table_path
+        return table_path
+
+    @classmethod
+    def load(cls, directory, fit_abc, tolerance=DEFAULT_TOLERANCE, mmap_mode='r'):
+        """
+        以只读内存映射方式加载离线构建的查找表
+
+        返回:
+            EnhancedDillSurrogate；文件不存在、格式版本不符或 ABC 拟合公式已改变（参数范围不一致）时返回None
+        """
+        meta_path = os.path.join(directory, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        table_path = os.path.join(directory, meta.get('table_file', TABLE_FILE))
+        if meta.get('format_version') != TABLE_FORMAT_VERSION or meta.get('keys') != list(TABLE_KEYS):
+            print(f"⚠️ 查找表格式版本不符，忽略: {directory}")
+            return None
+        box = abc_parameter_box(fit_abc)
+        if any(not np.allclose(box[key], meta['abc_box'].get(key, ()), rtol=1e-9, atol=0) for key in box):
+            print(f"⚠️ 查找表与当前ABC拟合公式不一致，忽略: {directory}")
+            return None
+
+        try:
+            stacked = np.load(table_path, mmap_mode=mmap_mode)
+        except FileNotFoundError:
+            # 表文件缺失，或读取 meta.json 之后恰好被新的构建替换
+            print(f"⚠️ 查找表文件不存在，忽略: {table_path}")
+            return None
+        surrogate = cls(fit_abc, tolerance=tolerance, build=False)
+        surrogate.box = box
+        surrogate.num_t_points = meta['num_t_points']
+        surrogate._set_tables(meta['axes'], {key: stacked[k] for k, key in enumerate(TABLE_KEYS)},
+                              {key: tuple(value) for key, value in meta['ranges'].items()})
+        surrogate.validation_error = meta['validation_max_error']
+        surrogate.build_time = meta['build_time']
+        surrogate.source = table_path
+        return surrogate
+
+    @staticmethod
+    def _transform(m, i, g, delta):
+        """
+        深度分布 -> 插值变量
+
+        u = ln(1/m - 1)，w = ln(i/m) - δ，r = ln(g·δ / L)，其中 L = -ln m = ln(1 + e^u)；
+        β=0 时 u、w 对 (α, x) 是线性的，r ≡ 0。
+        """
+        delta = np.clip(delta, DELTA_MIN, None)[:, None]
+        m = np.clip(m, LOG_FLOOR, 1.0 - LOG_FLOOR)
+        u = np.log1p(-m) - np.log(m)
+        L = np.logaddexp(0.0, u)
+        return {
+            'u': u,
+            'w': np.log(np.maximum(i, LOG_FLOOR)) - np.log(m) - delta,
+            'r': np.log(np.maximum(g, LOG_FLOOR)) + np.log(delta) - np.log(np.maximum(L, LOG_FLOOR))
+        }
+
+    @staticmethod
+    def _inverse_transform(values, delta):
+        """插值变量 -> 深度分布"""
+        delta = np.clip(delta, DELTA_MIN, None)[:, None]
+        u = values['u']
+        m = 1.0 / (1.0 + np.exp(u))
+        result = {'m': m, 'i': m * np.exp(values['w'] + delta)}
+        if 'r' in values:
+            result['g'] = np.exp(values['r']) * np.logaddexp(0.0, u) / delta
+        return result
+
+    def _coordinates(self, alpha, beta, delta):
+        return (alpha, beta, _delta_coordinate(delta))
+
+    @staticmethod
+    def _interpolate(axes, tables, coords, keys):
+        """张量积网格上的三线性插值（coords 为形状 (N,) 的三个坐标数组）"""
+        lower, weight = [], []
+        for axis, coord in zip(axes, coords):
+            idx = np.clip(np.searchsorted(axis, coord, side='right') - 1, 0, len(axis) - 2)
+            lower.append(idx)
+            weight.append(np.clip((coord - axis[idx]) / (axis[idx + 1] - axis[idx]), 0.0, 1.0)[:, None])
+        result = {key: 0.0 for key in keys}
+        for corner in range(8):
+            bits = [(corner >> d) & 1 for d in range(3)]
+            w = np.ones_like(weight[0])
+            for d in range(3):
+                w = w * (weight[d] if bits[d] else 1.0 - weight[d])
+            index = tuple(lower[d] + bits[d] for d in range(3))
+            for key in keys:
+                result[key] = result[key] + w * tables[key][index]
+        return result
+
+    def in_trust_region(self, alpha, beta, delta):
+        (a0, a1), (b0, b1), (d0, d1) = self.ranges['alpha'], self.ranges['beta'], self.ranges['delta']
+        return (a0 <= alpha) & (alpha <= a1) & (b0 <= beta) & (beta <= b1) & (d0 <= delta) & (delta <= d1)
+
+    def query_normalized(self, alpha, beta, delta, with_error=True):
+        """
+        查询无量纲深度分布
+
+        返回:
+            dict: m、i、g（形状 (N, 表格深度点数)）以及 error（形状 (N,)）
+        """
+        alpha, beta, delta = (np.atleast_1d(np.asarray(v, dtype=float)) for v in (alpha, beta, delta))
+        alpha, beta, delta = np.broadcast_arrays(alpha, beta, delta)
+        coords = self._coordinates(alpha, beta, delta)
+        result = self._inverse_transform(self._interpolate(self.axes, self.tables, coords, ('u', 'w', 'r')), delta)
+        if with_error:
+            half = self._inverse_transform(self._interpolate(self.half_axes, self.half_tables, coords, ('u', 'w')), delta)
+            # 线性插值误差 ∝ h²，半分辨率误差约为全分辨率的4倍
+            result['error'] = np.maximum(np.abs(result['m'] - half['m']).max(axis=1),
+                                         np.abs(result['i'] - half['i']).max(axis=1)) / 3.0
+        return result
+
+    def _validate(self, samples=64, seed=0):
+        """在信任区域内随机抽样，与直接求解比较，返回最大绝对误差"""
+        rng = np.random.default_rng(seed)
+        coords = [rng.uniform(axis[0], axis[-1], samples) for axis in self.axes]
+        alpha, beta, delta = coords[0], coords[1], _delta_from_coordinate(coords[2])
+        m, i, _ = solve_normalized_batch(alpha, beta, delta, num_z_points=len(self.zeta), num_t_points=self.num_t_points)
+        predicted = self.query_normalized(alpha, beta, delta, with_error=False)
+        return float(max(np.abs(predicted['m'] - m).max(), np.abs(predicted['i'] - i).max()))
+
+    def query(self, z_h, T, t_B, I_surface, M0=1.0, t_exp=5.0, num_z_points=100):
+        """
+        查询深度分布（I_surface 可以是数组，用于一次计算多个横向位置）
+
+        返回:
+            (z, I_final, M_final, exposure_dose, error)，I_final 等形状为 (N, num_z_points)；
+            任一查询超出信任区域或误差估计超过容差时返回None
+        """
+        self.queries += 1
+        I_surface = np.atleast_1d(np.asarray(I_surface, dtype=float))
+        A, B, C = self.fit_abc(z_h, T, t_B)
+        alpha = A * M0 * z_h
+        beta = B * z_h
+        delta = C * I_surface * t_exp
+        if not (M0_RANGE[0] <= M0 <= M0_RANGE[1]) or np.any(I_surface < 0) \
+                or not np.all(self.in_trust_region(alpha, beta, delta)):
+            self.fallbacks += 1
+            return None
+
+        result = self.query_normalized(alpha, beta, delta)
+        if np.any(result['error'] > self.tolerance):
+            self.fallbacks += 1
+            return None
+
+        z = np.linspace(0.0, z_h, num_z_points)
+        zeta = z / z_h
+
+        idx = np.clip(np.searchsorted(self.zeta, zeta, side='right') - 1, 0, len(self.zeta) - 2)
+        w = (zeta - self.zeta[idx]) / (self.zeta[idx + 1] - self.zeta[idx])
+
+        def resample(table):
+            return table[:, idx] * (1.0 - w) + table[:, idx + 1] * w
+
+        I_final = I_surface[:, None] * resample(result['i'])
+        M_final = M0 * resample(result['m'])
+        exposure_dose = (I_surface * t_exp)[:, None] * resample(result['g'])
+        return z, I_final, M_final, exposure_dose, result['error']
+
+    def stats(self):
+        return {
+            'source': self.source,
+            'table_shape': list(next(iter(self.tables.values())).shape),
+            'build_time': self.build_time,
+            'validation_max_error': self.validation_error,
+            'tolerance': self.tolerance,
+            'ranges': self.ranges,
+            'queries': self.queries,
+            'fallbacks': self.fallbacks
+        }
+
+
+_surrogate = None
+_surrogate_lock = threading.Lock()
+
+
+def get_enhanced_dill_surrogate(fit_abc, table_dir=DEFAULT_TABLE_DIR):
+    """
+    获取进程内共享的代理仿真器
+
+    首次调用时优先以内存映射方式加载离线查找表，没有可用的查找表时在内存中构建。
+    """
+    global _surrogate
+    if _surrogate is None:
+        with _surrogate_lock:
+            if _surrogate is None:
+                surrogate = None
+                try:
+                    surrogate = EnhancedDillSurrogate.load(table_dir, fit_abc)
+                except Exception as e:
+                    print(f"⚠️ 加载增强Dill查找表失败，改为在内存中构建: {e}")
+                if surrogate is None:
+                    surrogate = EnhancedDillSurrogate(fit_abc)
+                else:
+                    print(f"📦 已映射增强Dill查找表: {surrogate.source}")
+                _surrogate = surrogate
+    return _surrogate
+
+
+def _atomic_write(path, write):
+    """先写入同目录的临时文件再 os.replace，读取方只会看到旧文件或完整的新文件"""
+    fd, temp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        # mkstemp 创建的文件仅属主可读，查找表需供其他进程读取
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def build_lookup_tables(fit_abc, directory=DEFAULT_TABLE_DIR, alpha_nodes=33, beta_nodes=5, delta_nodes=65,
+                        num_z_points=129, num_t_points=SURROGATE_T_POINTS):
+    """
+    离线构建查找表文件包（默认网格比进程内构建更密，插值误差更小）
+
+    返回:
+        构建好的 EnhancedDillSurrogate
+    """
+    surrogate = EnhancedDillSurrogate(fit_abc, alpha_nodes=alpha_nodes, beta_nodes=beta_nodes, delta_nodes=delta_nodes,
+                                      num_z_points=num_z_points, num_t_points=num_t_points)
+    surrogate.save(directory)
+    return surrogate
@@ -0,0 +1,161 @@
+"""
+进程内模型注册表与有界缓存
+
+模型类本身不保存请求相关的状态，每个进程只需要一个实例：
+- get_model_by_name 返回按名称缓存的单例，/api/calculate* 与比较接口共用
+- ABC参数、ARC参数、材料光学参数等纯函数结果放入有界LRU缓存，所有实例共享
+- cache_stats() 汇总各缓存的命中率，供 /api/health 等接口查看
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+
+# 各缓存的容量上限
+ABC_CACHE_SIZE = 256
+ARC_CACHE_SIZE = 64
+# 只缓存网格点数（波长 × 厚度 × 角度）不超过该值的ARC反射率图，单条约0.8MB，全部缓存约50MB
+ARC_MAP_CACHE_MAX_POINTS = 100_000
+MATERIAL_CACHE_SIZE = 64
+
+_MISSING = object()
+
+
+class BoundedLRUCache:
+    """
+    线程安全的有界LRU缓存
+
+    参数:
+        name: 缓存名称（用于统计信息）
+        maxsize: 最大条目数，超过时淘汰最久未使用的条目
+        copy_values: 取出时是否深拷贝（缓存可变对象如dict时避免调用方修改缓存内容）
+    """
+
+    def __init__(self, name, maxsize, copy_values=False):
+        self.name = name
+        self.maxsize = max(int(maxsize), 1)
+        self.copy_values = copy_values
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value) if self.copy_values else value
+
+    def put(self, key, value):
+        if self.copy_values:
+            value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """命中时返回缓存值，否则调用 compute() 计算并缓存（计算过程不持有锁）"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else None
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name, maxsize, copy_values=False):
+    """获取（首次调用时创建）进程内共享的命名缓存"""
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                cache = BoundedLRUCache(name, maxsize, copy_values=copy_values)
+                _caches[name] = cache
+    return cache
+
+
+def cache_stats():
+    """所有共享缓存的统计信息"""
+    return {name: cache.stats() for name, cache in list(_caches.items())}
+
+
+def _create_dill():
+    from .dill_model import DillModel
+    return DillModel()
+
+
+def _create_enhanced_dill():
+    from .enhanced_dill_model import EnhancedDillModel
+    return EnhancedDillModel(debug_mode=False)
+
+
+def _create_car():
+    from .car_model import CARModel
+    return CARModel()
+
+
+MODEL_FACTORIES = {
+    'dill': _create_dill,
+    'enhanced_dill': _create_enhanced_dill,
+    'car': _create_car
+}
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model_by_name(model_name):
+    """
+    根据模型名称返回进程内共享的模型实例
+    支持：'dill', 'enhanced_dill', 'car'
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+    factory = MODEL_FACTORIES.get(model_name)
+    if factory is None:
+        raise ValueError(f"未知模型类型: {model_name}")
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = factory()
+            _models[model_name] = model
+    return model
+
+
+def registry_stats():
+    """已创建的模型单例及共享缓存统计"""
+    return {
+        'models': sorted(_models),
+        'caches': cache_stats()
+    }
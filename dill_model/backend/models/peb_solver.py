@@ -0,0 +1,329 @@
+"""
+CAR模型后烘（PEB）反应-扩散求解器
+
+CARModel 的默认流程把后烘简化为一次高斯模糊（σ=扩散长度，像素）加一次指数脱保护，
+无法体现后烘时间/温度、光酸损失与碱性淬灭剂。这里按物理单位（nm、s、°C）对三个场做时间积分：
+
+    ∂A/∂t = D_A ∇²A - k_q A Q - k_loss A        光酸（相对PAG总量的浓度）
+    ∂Q/∂t = D_Q ∇²Q - k_q A Q                   淬灭剂（碱）
+    ∂M/∂t = -k_amp A M                          未脱保护的保护基比例（初值为1）
+
+初始光酸由Dill曝光动力学给出：A0 = 1 - exp(-C·D)，D为曝光剂量（mJ/cm²）。
+扩散系数与催化速率按Arrhenius关系随后烘温度变化：
+    k(T) = k(T_ref) · exp(-Ea/R · (1/T - 1/T_ref))
+
+时间推进采用Strang分裂：半步反应 → 一步扩散 → 半步反应。
+- 扩散在DCT-II频域内精确求解（与 acid_diffusion 的 reflect 边界一致，即零通量边界）：
+  每个余弦分量乘以 exp(-D k² Δt)，k = πn/(N·Δx)，与步长无关地稳定，细网格下每步只需一次正反变换
+- 酸碱中和 A+Q→0 有闭式解（A-Q 守恒），光酸损失与脱保护为指数衰减，均无刚性步长限制
+因此步长只受分裂误差约束（默认不超过 max_time_step 秒）。
+计算量按 时间步数 × 网格点数 限制（MAX_PEB_WORK）：超出时自动增大步长，并在结果中给出实际步长及原因。
+"""
+
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ..utils.lazy_imports import scipy_fft
+
+# 气体常数 J/(mol·K)
+GAS_CONSTANT = 8.314462618
+# 摄氏度到开尔文
+KELVIN_OFFSET = 273.15
+
+# 时间步数范围
+MIN_PEB_STEPS = 10
+MAX_PEB_STEPS = 2000
+# 计算量上限：时间步数 × 网格点数（约对应单核20秒以内，低于gunicorn请求超时）
+MAX_PEB_WORK = 200_000_000
+# 缓存的频域传播子个数
+MAX_PROPAGATOR_CACHE = 64
+
+# 默认后烘参数（物理单位）
+DEFAULT_PEB_PARAMS = {
+    'bake_temperature': 110.0,                  # 后烘温度 °C
+    'bake_time': 60.0,                          # 后烘时间 s
+    'reference_temperature': 110.0,             # 参考温度 °C（下列速率常数在该温度下的值）
+    'acid_diffusivity': 5.0,                    # 光酸扩散系数 nm²/s
+    'quencher_diffusivity': 0.0,                # 淬灭剂扩散系数 nm²/s
+    'diffusion_activation_energy': 80.0,        # 扩散活化能 kJ/mol
+    'amplification_rate': 0.05,                 # 催化脱保护速率 k_amp 1/s
+    'amplification_activation_energy': 100.0,  # 脱保护活化能 kJ/mol
+    'acid_loss_rate': 0.001,                    # 光酸损失速率 1/s
+    'quencher_concentration': 0.1,              # 淬灭剂初始浓度（相对PAG总量）
+    'neutralization_rate': 10.0,                # 酸碱中和速率 1/s
+    'pag_rate_constant': 0.02,                  # PAG曝光速率常数 C cm²/mJ
+    'max_time_step': 1.0                        # 最大时间步长 s
+}
+
+# 参数取值范围 (最小值, 最大值, 是否允许取最小值)
+PEB_PARAM_RANGES = {
+    'bake_temperature': (20.0, 250.0, True),
+    'bake_time': (0.0, 3600.0, False),
+    'reference_temperature': (20.0, 250.0, True),
+    'acid_diffusivity': (0.0, 1e5, True),
+    'quencher_diffusivity': (0.0, 1e5, True),
+    'diffusion_activation_energy': (0.0, 500.0, True),
+    'amplification_rate': (0.0, 100.0, True),
+    'amplification_activation_energy': (0.0, 500.0, True),
+    'acid_loss_rate': (0.0, 100.0, True),
+    'quencher_concentration': (0.0, 10.0, True),
+    'neutralization_rate': (0.0, 1e4, True),
+    'pag_rate_constant': (0.0, 100.0, False),
+    'max_time_step': (0.0, 600.0, False)
+}
+
+
+def resolve_peb_parameters(overrides=None):
+    """
+    合并默认后烘参数并校验取值范围
+
+    参数:
+        overrides: 需要覆盖的参数字典（值为 None 或空字符串的项忽略）
+
+    返回:
+        完整的参数字典；未知参数或超出范围时抛出 ValueError
+    """
+    params = dict(DEFAULT_PEB_PARAMS)
+    for key, value in (overrides or {}).items():
+        if value is None or value == '':
+            continue
+        if key not in DEFAULT_PEB_PARAMS:
+            raise ValueError(f"未知的后烘参数: {key}")
+        try:
+            params[key] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"后烘参数 {key} 必须是数值")
+    for key, (low, high, inclusive) in PEB_PARAM_RANGES.items():
+        value = params[key]
+        if not math.isfinite(value) or value > high or value < low or (value == low and not inclusive):
+            bound = '≤' if inclusive else '<'
+            raise ValueError(f"后烘参数 {key}={value} 超出范围（{low} {bound} {key} ≤ {high}）")
+    return params
+
+
+def arrhenius(value_ref, activation_energy, temperature, reference_temperature):
+    """
+    Arrhenius温度修正
+
+    参数:
+        value_ref: 参考温度下的速率常数/扩散系数
+        activation_energy: 活化能 kJ/mol
+        temperature, reference_temperature: 温度 °C
+    """
+    t_kelvin = temperature + KELVIN_OFFSET
+    t_ref_kelvin = reference_temperature + KELVIN_OFFSET
+    exponent = -activation_energy * 1e3 / GAS_CONSTANT * (1.0 / t_kelvin - 1.0 / t_ref_kelvin)
+    return value_ref * math.exp(exponent)
+
+
+def rates_at_temperature(params):
+    """后烘温度下的扩散系数与反应速率"""
+    temperature = params['bake_temperature']
+    reference = params['reference_temperature']
+    return {
+        'acid_diffusivity': arrhenius(params['acid_diffusivity'], params['diffusion_activation_energy'], temperature, reference),
+        'quencher_diffusivity': arrhenius(params['quencher_diffusivity'], params['diffusion_activation_energy'], temperature, reference),
+        'amplification_rate': arrhenius(params['amplification_rate'], params['amplification_activation_energy'], temperature, reference),
+        'acid_loss_rate': params['acid_loss_rate'],
+        'neutralization_rate': params['neutralization_rate']
+    }
+
+
+def initial_acid_from_dose(exposure_dose, pag_rate_constant):
+    """Dill曝光动力学：A0 = 1 - exp(-C·D)（相对PAG总量）"""
+    return -np.expm1(-pag_rate_constant * np.asarray(exposure_dose, dtype=float))
+
+
+def neutralize(acid, quencher, rate, dt):
+    """
+    酸碱中和 dA/dt = dQ/dt = -k A Q 的闭式解
+
+    A - Q = c 守恒，A(t) = c·A0 / (A0 - Q0·e^{-x})，x = k c t。记 a = |x|，g = (1 - e^{-a})/a（a→0 时 g→1）：
+        c ≥ 0（酸过量）: A = A0 / (e^{-a} + k t A0 g)
+        c < 0（碱过量）: A = A0 e^{-a} / (1 + k t A0 g)
+    两式中只出现 e^{-a} ≤ 1，任何参数下都不会溢出；c→0 时都退化为 A0 / (1 + k A0 t)。
+    光酸需非负（扩散后的舍入负值由调用方截断）。
+    """
+    if rate <= 0:
+        return acid, quencher
+    kdt = rate * dt
+    difference = acid - quencher
+    exponent = np.abs(difference)
+    exponent *= -kdt
+    decay = np.exp(exponent)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.expm1(exponent)
+        growth /= exponent
+    np.copyto(growth, 1.0, where=(exponent == 0))
+    growth *= acid
+    growth *= kdt
+    acid_excess = difference >= 0
+    numerator = np.where(acid_excess, acid, acid * decay)
+    denominator = np.where(acid_excess, decay, 1.0)
+    denominator += growth
+    acid = numerator / denominator
+    quencher = np.subtract(acid, difference, out=difference)
+    np.maximum(quencher, 0.0, out=quencher)
+    return acid, quencher
+
+
+
+def plan_time_steps(params, grid_points=1):
+    """
+    后烘时间步规划
+
+    步数取 ceil(bake_time / max_time_step)，限制在 [MIN_PEB_STEPS, MAX_PEB_STEPS] 内，
+    并保证 步数 × 网格点数 不超过 MAX_PEB_WORK（超出时减少步数，即增大步长）。
+
+    参数:
+        params: resolve_peb_parameters 给出的完整参数
+        grid_points: 网格点数
+
+    返回:
+        dict: steps、time_step（实际步长）、requested_time_step、
+              limited_by（None / 'max_steps' / 'work_budget'，步长被放大的原因）
+
+    异常:
+        ValueError: 网格过大，最少步数也超出计算量上限
+    """
+    grid_points = max(int(grid_points), 1)
+    max_steps_for_grid = MAX_PEB_WORK // grid_points
+    if max_steps_for_grid < MIN_PEB_STEPS:
+        raise ValueError(f"PEB网格过大: {grid_points}个点 × 最少{MIN_PEB_STEPS}步超出计算量上限 {MAX_PEB_WORK}，请减少网格点数")
+    requested = int(math.ceil(params['bake_time'] / params['max_time_step']))
+    steps = max(requested, MIN_PEB_STEPS)
+    limited_by = None
+    if steps > MAX_PEB_STEPS:
+        steps, limited_by = MAX_PEB_STEPS, 'max_steps'
+    if steps > max_steps_for_grid:
+        steps, limited_by = max_steps_for_grid, 'work_budget'
+    return {
+        'steps': steps,
+        'time_step': params['bake_time'] / steps,
+        'requested_time_step': params['max_time_step'],
+        'limited_by': limited_by
+    }
+
+class PEBSolver:
+    """
+    后烘反应-扩散求解器（1D/2D，频域扩散 + 闭式反应的Strang分裂）
+
+    场数组的每个轴都是空间轴，spacings 给出各轴的网格间距（nm）。
+    """
+
+    def __init__(self):
+        self._propagators = OrderedDict()
+        self._lock = threading.Lock()
+        self.solves = 0
+
+    def _propagator(self, size, spacing, diffusivity, dt):
+        """DCT-II 各余弦分量一步扩散的衰减因子 exp(-D k² Δt)（按 尺寸/间距/DΔt 缓存）"""
+        key = (size, float(spacing), float(diffusivity * dt))
+        with self._lock:
+            propagator = self._propagators.get(key)
+            if propagator is not None:
+                self._propagators.move_to_end(key)
+                return propagator
+        wavenumbers = np.pi * np.arange(size) / (size * spacing)
+        propagator = np.exp(-diffusivity * dt * wavenumbers ** 2)
+        with self._lock:
+            self._propagators[key] = propagator
+            while len(self._propagators) > MAX_PROPAGATOR_CACHE:
+                self._propagators.popitem(last=False)
+        return propagator
+
+    def _diffuse(self, field, diffusivity, dt, spacings):
+        if diffusivity <= 0:
+            return field
+        spectrum = scipy_fft.dctn(field, type=2, norm='ortho')
+        for axis, spacing in enumerate(spacings):
+            shape = [1] * field.ndim
+            shape[axis] = field.shape[axis]
+            spectrum *= self._propagator(field.shape[axis], spacing, diffusivity, dt).reshape(shape)
+        return scipy_fft.idctn(spectrum, type=2, norm='ortho')
+
+    @staticmethod
+    def _react(acid, quencher, protection, rates, dt):
+        """反应子步：对称组合 半步光酸损失 → 中和 → 半步光酸损失（二阶精度），催化脱保护取子步首末光酸的平均值"""
+        acid_start = acid
+        loss = math.exp(-0.5 * rates['acid_loss_rate'] * dt)
+        acid, quencher = neutralize(acid * loss, quencher, rates['neutralization_rate'], dt)
+        acid = acid * loss
+        if rates['amplification_rate'] > 0:
+            protection = protection * np.exp(-rates['amplification_rate'] * dt * 0.5 * (acid_start + acid))
+        return acid, quencher, protection
+
+    def time_steps(self, params, grid_points=1):
+        """后烘的时间步数与步长（见 plan_time_steps）"""
+        plan = plan_time_steps(params, grid_points)
+        return plan['steps'], plan['time_step']
+
+    def solve(self, initial_acid, spacings, params, frames=0):
+        """
+        对给定初始光酸分布做后烘时间积分
+
+        参数:
+            initial_acid: 初始光酸分布（相对PAG总量）
+            spacings: 各轴网格间距 nm
+            params: resolve_peb_parameters 给出的完整参数
+            frames: 记录的中间时刻数（0表示只返回终态）
+
+        返回:
+            包含 acid/quencher/protection 终态、温度修正后的速率以及中间帧的字典
+        """
+        acid = np.maximum(np.asarray(initial_acid, dtype=float), 0.0)
+        spacings = tuple(float(s) for s in spacings)
+        if len(spacings) != acid.ndim:
+            raise ValueError(f"网格间距个数({len(spacings)})与场维数({acid.ndim})不一致")
+        rates = rates_at_temperature(params)
+        if params['quencher_concentration'] <= 0:
+            # 没有淬灭剂时不需要中和
+            rates['neutralization_rate'] = 0.0
+        plan = plan_time_steps(params, acid.size)
+        steps, dt = plan['steps'], plan['time_step']
+        quencher = np.full_like(acid, params['quencher_concentration'])
+        protection = np.ones_like(acid)
+        mobile_quencher = rates['quencher_diffusivity'] > 0 and params['quencher_concentration'] > 0
+
+        record = set(np.linspace(0, steps, frames).round().astype(int).tolist()) if frames > 0 else set()
+        history = []
+        if 0 in record:
+            history.append((0.0, acid.copy(), protection.copy()))
+
+        # 相邻两步之间的两个反应半步合并为一个整步，只在需要输出（记录帧/终态）时补齐末尾半步
+        half = 0.5 * dt
+        pending = False
+        for step in range(1, steps + 1):
+            acid, quencher, protection = self._react(acid, quencher, protection, rates, dt if pending else half)
+            acid = self._diffuse(acid, rates['acid_diffusivity'], dt, spacings)
+            # 频域扩散的舍入误差可能产生极小的负浓度
+            np.maximum(acid, 0.0, out=acid)
+            if mobile_quencher:
+                quencher = self._diffuse(quencher, rates['quencher_diffusivity'], dt, spacings)
+                np.maximum(quencher, 0.0, out=quencher)
+            pending = step not in record and step != steps
+            if not pending:
+                acid, quencher, protection = self._react(acid, quencher, protection, rates, half)
+            if step in record:
+                history.append((step * dt, acid.copy(), protection.copy()))
+
+        with self._lock:
+            self.solves += 1
+        return {
+            'acid': acid,
+            'quencher': quencher,
+            'protection': protection,
+            'rates': rates,
+            'time_steps': steps,
+            'time_step': dt,
+            'requested_time_step': plan['requested_time_step'],
+            'time_step_limited_by': plan['limited_by'],
+            'frames': history
+        }
+
+    def stats(self):
+        with self._lock:
+            return {'solves': self.solves, 'propagator_cache': len(self._propagators)}
@@ -8,14 +8,14 @@ import time
 import struct
 import json
 import glob
-import pandas as pd
 import numpy as np
 from datetime import datetime
 from pathlib import Path
 import base64
-from PIL import Image, ImageDraw, ImageFont
 import io
 
+from ..utils.lazy_imports import pandas as pd, pil_image as Image, pil_image_draw as ImageDraw, pil_image_font as ImageFont
+
 
 class PIDModel:
     """PID控制模型，处理与LabVIEW的数据交换"""
@@ -1,3 +1,3 @@
-from .api import api_bp
+from .api import api_bp, warm_up_ml_models
 
-__all__ = ['api_bp'] 
\ No newline at end of file
+__all__ = ['api_bp', 'warm_up_ml_models'] 
\ No newline at end of file
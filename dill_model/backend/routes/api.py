@@ -1,27 +1,40 @@
-from flask import Blueprint, request, jsonify
-from ..models import DillModel, get_model_by_name, PIDModel
-from ..utils import validate_input, validate_enhanced_input, validate_car_input, format_response, NumpyEncoder
+from flask import Blueprint, request, jsonify, Response, stream_with_context, send_file, current_app
+from ..models import DillModel, get_model_by_name, registry_stats, PIDModel
+from ..utils import validate_input, validate_enhanced_input, validate_car_input, format_response, NumpyEncoder, LogStore, create_state_store, ValidationStore, MLModelRegistry, ML_MODEL_TYPES, InverseDesignSearch, OnlineModelUpdater, transmission_factor, PhotoImageStore
+from ..utils.photo_store import decode_image_data
+from ..utils.profile_extraction import extract_profiles, generate_coordinates as symmetric_coordinates
+from ..utils.intensity_profiles import get_intensity_profile_registry, profile_from_request_data
+from ..utils.intensity_file_parser import get_intensity_file_parser, IntensityFileError, DEFAULT_PREVIEW_POINTS
+from ..utils.example_catalog import ExampleFileCatalog
 import json
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from ..utils.lazy_imports import loaded_heavy_modules
+from ..utils.figure_renderer import get_figure_renderer, line_plot
 from io import BytesIO
 import base64
 from ..models import EnhancedDillModel
+from ..models.peb_solver import DEFAULT_PEB_PARAMS, resolve_peb_parameters, plan_time_steps
 import traceback, datetime
 import time
+import threading
 
-# 全局日志存储
-calculation_logs = []
+# 共享状态存储（日志、最近计算结果），后端由 DILL_STATE_BACKEND 环境变量选择
+state_store = create_state_store(log_capacity=1000)
 
-# 全局最近计算结果存储
-latest_calculation_result = {
-    'timestamp': None,
-    'parameters': None,
-    'results': None,
-    'model_type': None
-}
+# 全局日志存储（固定容量环形缓冲区，最多1000条）
+calculation_logs = state_store.logs
+
+# 最近计算结果在状态存储中的键
+LATEST_CALCULATION_KEY = 'latest_calculation'
+
+def get_latest_calculation_result():
+    """读取最近一次计算结果（无结果时各字段为None）"""
+    return state_store.get(LATEST_CALCULATION_KEY) or {
+        'timestamp': None,
+        'parameters': None,
+        'results': None,
+        'model_type': None
+    }
 
 def add_log_entry(log_type, model_type, message, timestamp=None, dimension=None, details=None):
     """添加增强的日志条目"""
@@ -38,10 +51,6 @@ def add_log_entry(log_type, model_type, message, timestamp=None, dimension=None,
     }
     
     calculation_logs.append(log_entry)
-    
-    # 保持日志条目数量在合理范围内（最多1000条）
-    if len(calculation_logs) > 1000:
-        calculation_logs.pop(0)
 
 def add_dimension_log(log_type, model_type, message, dimension, details=None):
     """添加带维度信息的日志条目"""
@@ -67,13 +76,12 @@ def add_error_log(model_type, message, dimension=None, details=None):
 
 def clear_logs():
     """清空日志"""
-    global calculation_logs
-    calculation_logs = []
+    calculation_logs.clear()
 
 def extract_intensity_at_x_coordinate(custom_intensity_data, x_coordinate):
     """
     从自定义向量数据中提取指定X坐标处的光强值
-    使用线性插值方法
+    使用线性插值方法（X坐标与原始数据单位相同）
     """
     try:
         if not custom_intensity_data or 'x' not in custom_intensity_data or 'intensity' not in custom_intensity_data:
@@ -89,37 +97,9 @@ def extract_intensity_at_x_coordinate(custom_intensity_data, x_coordinate):
         
         print(f"🔍 从{len(x_data)}个数据点中提取X={x_coordinate}处的光强值")
         
-        # 转换为numpy数组便于计算
-        x_array = np.array(x_data)
-        intensity_array = np.array(intensity_data)
-        
-        # 如果恰好有匹配的X坐标
-        exact_indices = np.where(np.abs(x_array - x_coordinate) < 1e-6)[0]
-        if len(exact_indices) > 0:
-            result = float(intensity_array[exact_indices[0]])
-            print(f"✅ 找到精确匹配: X={x_array[exact_indices[0]]}, I={result}")
-            return result
-        
-        # 排序数据以便插值
-        sorted_indices = np.argsort(x_array)
-        x_sorted = x_array[sorted_indices]
-        intensity_sorted = intensity_array[sorted_indices]
-        
-        # 边界处理
-        if x_coordinate <= x_sorted[0]:
-            result = float(intensity_sorted[0])
-            print(f"📍 X坐标小于最小值，使用边界值: I={result}")
-            return result
-        
-        if x_coordinate >= x_sorted[-1]:
-            result = float(intensity_sorted[-1])
-            print(f"📍 X坐标大于最大值，使用边界值: I={result}")
-            return result
-        
-        # 使用numpy的线性插值
-        interpolated_intensity = np.interp(x_coordinate, x_sorted, intensity_sorted)
-        result = float(interpolated_intensity)
-        
+        # 共享的光强分布对象（已排序，searchsorted 查询，超出范围取边界值）
+        profile = profile_from_request_data(custom_intensity_data)
+        result = float(profile.values_at(x_coordinate, outside_range_mode='boundary'))
         print(f"🔍 线性插值成功: X={x_coordinate} → I={result:.6f}")
         return result
         
@@ -130,8 +110,146 @@ def extract_intensity_at_x_coordinate(custom_intensity_data, x_coordinate):
 # 创建API蓝图
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-# 实例化Dill模型
-dill_model = DillModel()
+def get_shared_dill_model():
+    """获取进程内共享的DillModel实例"""
+    return get_model_by_name('dill')
+
+def resolve_intensity_profile_reference(data):
+    """
+    将请求中的光强分布ID替换为登记的数组
+
+    支持顶层 intensity_profile_id，或 custom_intensity_data 中只含 profile_id
+    （以及 outside_range_mode、custom_intensity_value 等请求级选项）。
+    解析结果写回 data['custom_intensity_data']，后续各模型分支无需改动。
+
+    返回:
+        None 或 错误响应
+    """
+    custom_intensity_data = data.get('custom_intensity_data')
+    options = custom_intensity_data if isinstance(custom_intensity_data, dict) else {}
+    profile_id = data.get('intensity_profile_id') or options.get('profile_id')
+    if not profile_id or 'x' in options:
+        return None
+
+    profile = get_intensity_profile_registry().get(profile_id)
+    if profile is None:
+        add_error_log('system', f'光强分布ID不存在或已过期: {profile_id}')
+        return jsonify(format_response(False, data={'profile_id': profile_id, 'expired': True},
+                                       message="光强分布ID不存在或已过期，请重新上传光强数据")), 404
+    data['custom_intensity_data'] = profile.as_request_data(options)
+    add_progress_log('system', f'使用已登记的光强分布: {profile_id} ({profile.x.size}个点)')
+    return None
+
+@api_bp.route('/intensity-profiles', methods=['POST'])
+def register_intensity_profile():
+    """
+    登记自定义光强分布并返回ID
+
+    请求体: x, intensity, original_unit（或 x_unit）, unit_scale, name
+    之后的计算请求传 intensity_profile_id（或 custom_intensity_data.profile_id）即可。
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if data.get('file_hash'):
+            # 服务端已解析的文件：直接使用缓存的完整数组
+            parsed = get_intensity_file_parser().get(data['file_hash'])
+            if parsed is None:
+                return jsonify(format_response(False, data={'file_hash': data['file_hash'], 'expired': True},
+                                               message="文件解析结果不存在或已过期，请重新上传文件")), 404
+            profile, cached = register_parsed_intensity_file(parsed, data)
+            add_log_entry('info', 'system', f'{"命中已登记" if cached else "登记"}光强分布: {profile.profile_id} ({profile.x.size}个点, 来自文件 {parsed.filename})')
+            return jsonify(format_response(True, data=dict(profile.describe(), cached=cached)))
+        if 'x' not in data or 'intensity' not in data:
+            return jsonify(format_response(False, message="缺少 x 或 intensity 数据")), 400
+        profile, cached = get_intensity_profile_registry().register(
+            data['x'], data['intensity'],
+            original_unit=data.get('original_unit', data.get('x_unit', 'mm')),
+            unit_scale=data.get('unit_scale'),
+            name=data.get('name')
+        )
+        add_log_entry('info', 'system', f'{"命中已登记" if cached else "登记"}光强分布: {profile.profile_id} ({profile.x.size}个点)')
+        return jsonify(format_response(True, data=dict(profile.describe(), cached=cached)))
+    except (TypeError, ValueError) as e:
+        return jsonify(format_response(False, message=f"光强数据无效: {str(e)}")), 400
+
+def register_parsed_intensity_file(parsed, options):
+    """将解析结果登记为光强分布（单位优先取请求指定，其次取文件头识别结果）"""
+    return get_intensity_profile_registry().register(
+        parsed.x, parsed.intensity,
+        original_unit=options.get('original_unit') or options.get('x_unit') or parsed.x_unit or 'mm',
+        unit_scale=options.get('unit_scale'),
+        name=options.get('name') or parsed.filename
+    )
+
+def parsed_intensity_file_response(parsed, cached, options):
+    """解析结果 + 降采样预览（register 为真时同时登记为光强分布）"""
+    try:
+        preview_points = int(options.get('preview_points') or DEFAULT_PREVIEW_POINTS)
+    except (TypeError, ValueError):
+        preview_points = DEFAULT_PREVIEW_POINTS
+    preview_x, preview_intensity = parsed.preview(preview_points)
+    info = dict(parsed.describe(), cached=cached, preview={
+        'x': preview_x.tolist(),
+        'intensity': preview_intensity.tolist(),
+        'num_points': int(preview_x.size),
+        'decimated': bool(preview_x.size < parsed.x.size)
+    })
+    if str(options.get('register', '')).lower() in ('1', 'true'):
+        profile, profile_cached = register_parsed_intensity_file(parsed, options)
+        info['profile'] = dict(profile.describe(), cached=profile_cached)
+    return jsonify(format_response(True, data=info))
+
+@api_bp.route('/intensity-files/parse', methods=['POST'])
+def parse_intensity_file():
+    """
+    服务端解析光强分布文件
+
+    请求: multipart 上传 file 字段，或 JSON {filename, content}
+    选项（表单字段或JSON）: register、preview_points、original_unit、unit_scale
+    返回文件信息（file_hash、点数、识别的坐标单位）与降采样预览；完整数组留在服务端，
+    可用 file_hash 登记为光强分布（POST /api/intensity-profiles）。
+    """
+    try:
+        upload = request.files.get('file')
+        start_time = time.time()
+        if upload is not None:
+            # 上传内容已由 Werkzeug 暂存，直接从暂存文件解析
+            options = request.form.to_dict()
+            filename = upload.filename
+            parsed, cached = get_intensity_file_parser().parse_stream(upload.stream, filename)
+        else:
+            options = request.get_json(silent=True) or {}
+            if not isinstance(options.get('content'), str):
+                return jsonify(format_response(False, message="缺少文件内容")), 400
+            filename = options.get('filename', '')
+            parsed, cached = get_intensity_file_parser().parse_bytes(options['content'].encode('utf-8'), filename)
+
+        add_log_entry('info', 'system', f'{"命中缓存" if cached else "解析"}光强文件: {filename} '
+                      f'({parsed.x.size}个点, {request.content_length or 0}字节请求, 耗时{time.time() - start_time:.3f}s)')
+        return parsed_intensity_file_response(parsed, cached, options)
+    except IntensityFileError as e:
+        add_error_log('system', f'光强文件解析失败: {str(e)}')
+        return jsonify(format_response(False, message=f"文件解析失败: {str(e)}")), 400
+    except (TypeError, ValueError) as e:
+        return jsonify(format_response(False, message=f"光强数据无效: {str(e)}")), 400
+
+@api_bp.route('/intensity-profiles/<profile_id>', methods=['GET'])
+def get_intensity_profile(profile_id):
+    """已登记光强分布的信息（include_data=1 时附带数组）"""
+    profile = get_intensity_profile_registry().get(profile_id)
+    if profile is None:
+        return jsonify(format_response(False, message="光强分布ID不存在或已过期")), 404
+    info = profile.describe()
+    if request.args.get('include_data') in ('1', 'true'):
+        info.update(x=profile.x.tolist(), intensity=profile.intensity.tolist())
+    return jsonify(format_response(True, data=info))
+
+@api_bp.route('/intensity-profiles/<profile_id>', methods=['DELETE'])
+def delete_intensity_profile(profile_id):
+    """删除已登记的光强分布"""
+    if not get_intensity_profile_registry().remove(profile_id):
+        return jsonify(format_response(False, message="光强分布ID不存在或已过期")), 404
+    return jsonify(format_response(True, message="已删除"))
 
 @api_bp.route('/calculate', methods=['POST'])
 def calculate():
@@ -141,6 +259,9 @@ def calculate():
     """
     try:
         data = request.get_json()
+        error_response = resolve_intensity_profile_reference(data)
+        if error_response is not None:
+            return error_response
         print('收到前端参数:', data)  # 调试用
         
         # === 🔍 调试自定义光强数据 ===
@@ -436,7 +557,7 @@ def calculate():
                     if arc_params is not None:
                         reflectance_with_arc = arc_params.get('reflectance_with_arc', 0.0)
                         reflectance_no_arc = arc_params.get('reflectance_no_arc', 0.0)
-                        arc_transmission_factor = (1 - reflectance_with_arc) / (1 - reflectance_no_arc) if reflectance_no_arc > 0 else 1.0
+                        arc_transmission_factor = transmission_factor(reflectance_with_arc, reflectance_no_arc)
                     
                     # 生成1D动画数据并合并到静态数据中
                     animation_data = model.generate_1d_animation_data(I_avg, V, K, t_exp_start_1d, t_exp_end_1d, time_steps_1d, C, angle_a, exposure_threshold, contrast_ctr, wavelength, arc_transmission_factor)
@@ -601,6 +722,9 @@ def calculate_data():
     
     try:
         data = request.get_json()
+        error_response = resolve_intensity_profile_reference(data)
+        if error_response is not None:
+            return error_response
         print('收到前端参数:', data)  # 调试用
         
         # === 🔍 调试自定义光强数据 ===
@@ -1074,7 +1198,7 @@ def calculate_data():
                     if arc_params is not None:
                         reflectance_with_arc = arc_params.get('reflectance_with_arc', 0.0)
                         reflectance_no_arc = arc_params.get('reflectance_no_arc', 0.0)
-                        arc_transmission_factor = (1 - reflectance_with_arc) / (1 - reflectance_no_arc) if reflectance_no_arc > 0 else 1.0
+                        arc_transmission_factor = transmission_factor(reflectance_with_arc, reflectance_no_arc)
                     
                     # 生成动画数据
                     print(f"[Dill-1D-Animation] 生成动画数据 ({t_start}s - {t_end}s, {time_steps}帧)")
@@ -1272,6 +1396,25 @@ def calculate_data():
             I_avg, V_car, t_exp_car = float(data['I_avg']), float(data['V']), float(data['t_exp'])
             acid_gen_eff, diff_len, react_rate, amp, contr = float(data['acid_gen_efficiency']), float(data['diffusion_length']), float(data['reaction_rate']), float(data['amplification']), float(data['contrast'])
             
+            # 后烘(PEB)反应-扩散模式（1D/2D）：物理单位参数，未提供的项取默认值
+            enable_peb = data.get('enable_peb', False)
+            peb_params = None
+            if enable_peb:
+                try:
+                    peb_params = resolve_peb_parameters({key: data.get(key) for key in DEFAULT_PEB_PARAMS})
+                except ValueError as e:
+                    add_error_log('car', f"后烘参数校验失败: {e}", dimension=sine_type)
+                    return jsonify(format_response(False, message=str(e))), 400
+                if sine_type == '3d':
+                    add_log_entry('warning', 'car', "PEB模式仅支持1D/2D，3D计算使用高斯扩散模型", dimension='3d')
+                else:
+                    print(f"[CAR-PEB] 后烘参数: T={peb_params['bake_temperature']}°C, t={peb_params['bake_time']}s, "
+                          f"D_A={peb_params['acid_diffusivity']}nm²/s, k_amp={peb_params['amplification_rate']}1/s, "
+                          f"Q0={peb_params['quencher_concentration']}")
+                    add_log_entry('info', 'car', f"🔥 PEB模式: T={peb_params['bake_temperature']}°C, t={peb_params['bake_time']}s, "
+                                  f"D_A={peb_params['acid_diffusivity']}nm²/s, k_amp={peb_params['amplification_rate']}1/s, "
+                                  f"Q0={peb_params['quencher_concentration']}", dimension='2d' if sine_type == 'multi' else '1d')
+            
             if sine_type == 'multi':
                 Kx, Ky, phi_expr = float(data.get('Kx',0)), float(data.get('Ky',0)), data.get('phi_expr','0')
                 y_min = float(data.get('y_min', 0))
@@ -1297,13 +1440,24 @@ def calculate_data():
                 if y_points <= 1:
                     add_error_log('car', "Y轴点数配置错误", dimension='2d')
                     return jsonify(format_response(False, message_zh="Y轴点数必须大于1才能进行二维计算", message_en="Number of Y-axis points must be greater than 1 for 2D calculation")), 400
+                if enable_peb:
+                    # PEB求解器在 1000 × y_points 网格上积分，计算前检查计算量
+                    try:
+                        peb_plan = plan_time_steps(peb_params, 1000 * y_points)
+                    except ValueError as e:
+                        add_error_log('car', f"后烘计算量超出上限: {e}", dimension='2d')
+                        return jsonify(format_response(False, message=str(e))), 400
+                    if peb_plan['limited_by'] is not None:
+                        add_log_entry('warning', 'car', f"⚠️ 后烘步长由 {peb_plan['requested_time_step']:.4g}s 放大为 "
+                                      f"{peb_plan['time_step']:.4g}s（{peb_plan['steps']}步）以限制计算量", dimension='2d')
                 
                 y_range = np.linspace(y_min, y_max, y_points).tolist()
                 
                 calc_start = time.time()
                 # 🔧 添加自定义光强数据支持
                 custom_intensity_data = data.get('custom_intensity_data')
-                plot_data = model.generate_data(I_avg, V_car, None, t_exp_car, acid_gen_eff, diff_len, react_rate, amp, contr, sine_type=sine_type, Kx=Kx, Ky=Ky, phi_expr=phi_expr, y_range=y_range, custom_intensity_data=custom_intensity_data)
+                plot_data = model.generate_data(I_avg, V_car, None, t_exp_car, acid_gen_eff, diff_len, react_rate, amp, contr, sine_type=sine_type, Kx=Kx, Ky=Ky, phi_expr=phi_expr, y_range=y_range, custom_intensity_data=custom_intensity_data,
+                                             enable_peb=enable_peb, peb_params=peb_params)
                 calc_time = time.time() - calc_start
                 
                 if plot_data and 'z_acid_concentration' in plot_data:
@@ -1421,7 +1575,8 @@ def calculate_data():
                 calc_start = time.time()
                 # 🔧 添加自定义光强数据支持
                 custom_intensity_data = data.get('custom_intensity_data')
-                plot_data = model.generate_data(I_avg, V_car, K_car, t_exp_car, acid_gen_eff, diff_len, react_rate, amp, contr, sine_type=sine_type, custom_intensity_data=custom_intensity_data)
+                plot_data = model.generate_data(I_avg, V_car, K_car, t_exp_car, acid_gen_eff, diff_len, react_rate, amp, contr, sine_type=sine_type, custom_intensity_data=custom_intensity_data,
+                                             enable_peb=enable_peb, peb_params=peb_params)
                 calc_time = time.time() - calc_start
                 
                 if plot_data and 'acid_concentration' in plot_data:
@@ -1525,8 +1680,7 @@ def calculate_data():
                 add_log_entry('warning', 'enhanced_dill', f"⚠️ Enhanced Dill 2D兼容性数据不完整", dimension='2d')
         
         # 保存最近的计算结果，供验证页面使用
-        global latest_calculation_result
-        latest_calculation_result.update({
+        state_store.set(LATEST_CALCULATION_KEY, {
             'timestamp': datetime.datetime.now().isoformat(),
             'parameters': data,  # 保存输入参数
             'results': plot_data,  # 保存计算结果
@@ -1646,8 +1800,7 @@ def compare_data():
             if model_type == 'enhanced_dill' or any(k in params for k in ['z_h', 'I0', 'M0']):
                 # Enhanced Dill模型
                 if enhanced_model is None:
-                    from ..models import EnhancedDillModel
-                    enhanced_model = EnhancedDillModel()
+                    enhanced_model = get_model_by_name('enhanced_dill')
                 
                 # 获取Enhanced Dill参数
                 z_h = float(params.get('z_h', 10))  # 胶厚度
@@ -1673,7 +1826,21 @@ def compare_data():
                 successful_calcs = 0
                 fallback_calcs = 0
                 
-                for i, pos in enumerate(x):
+                # 表面光强不随时间变化：先用代理仿真器一次批量求出所有位置，超出信任区域时逐点求解PDE
+                import time
+                surrogate_start = time.time()
+                surface_intensity = I0 * (1 + V * np.cos(K * np.asarray(x))) if V > 0 else np.full(len(x), I0)
+                surrogate_result = enhanced_model.surrogate_depth_profiles(z_h, T, t_B, surface_intensity, M0, t_exp)
+                if surrogate_result is not None:
+                    _, _, M_batch, exposure_batch, surrogate_error = surrogate_result
+                    exposure_dose_data = exposure_batch[:, 0].tolist()
+                    thickness_data = M_batch[:, 0].tolist()
+                    successful_calcs = len(x)
+                    total_compute_time = time.time() - surrogate_start
+                    print(f"[Enhanced Dill] ⚡ 代理仿真器批量计算完成: {len(x)}个位置, 耗时{total_compute_time*1000:.1f}ms, 最大误差估计={surrogate_error.max():.2e}")
+                    add_log_entry('info', 'enhanced_dill', f"⚡ 代理仿真器批量计算完成: {len(x)}个位置, 耗时{total_compute_time*1000:.1f}ms")
+                
+                for i, pos in enumerate(x if surrogate_result is None else []):
                     try:
                         # 使用自适应PDE求解器，自动优化计算效率
                         z, I_final, M_final, exposure_dose_profile, compute_time = enhanced_model.adaptive_solve_enhanced_dill_pde(
@@ -1810,8 +1977,7 @@ def compare_data():
             elif model_type == 'car' or any(k in params for k in ['acid_gen_efficiency', 'diffusion_length', 'reaction_rate']):
                 # CAR模型
                 if car_model is None:
-                    from backend.models import CARModel
-                    car_model = CARModel()
+                    car_model = get_model_by_name('car')
                 
                 I_avg = float(params.get('I_avg', 10))
                 V = float(params.get('V', 0.8))
@@ -1910,8 +2076,7 @@ def compare_data():
             else:
                 # Dill模型
                 if dill_model is None:
-                    from backend.models import DillModel
-                    dill_model = DillModel()
+                    dill_model = get_model_by_name('dill')
                 
                 I_avg = float(params.get('I_avg', 10))
                 V = float(params.get('V', 0.8))
@@ -2035,9 +2200,9 @@ def compare_data():
 
 def generate_comparison_plots_with_enhanced(parameter_sets):
     x = np.linspace(0, 10, 1000)
-    fig1 = plt.figure(figsize=(12, 7))
     colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
-    legend_labels = []
+    exposure_series = []
+    exposure_labels = []
     
     # 初始化所有需要的模型实例
     dill_model = None
@@ -2048,8 +2213,7 @@ def generate_comparison_plots_with_enhanced(parameter_sets):
     for i, params in enumerate(parameter_sets):
         if any(k in params for k in ['acid_gen_efficiency', 'diffusion_length', 'reaction_rate']):
             if car_model is None:
-                from backend.models import CARModel
-                car_model = CARModel()
+                car_model = get_model_by_name('car')
             I_avg = float(params['I_avg'])
             V = float(params['V'])
             K = float(params.get('K', 2.0))
@@ -2064,8 +2228,7 @@ def generate_comparison_plots_with_enhanced(parameter_sets):
             label = f"Set {i+1}: CAR模型 (K={K}, t_exp={t_exp}, acid_eff={acid_gen_efficiency})"
         elif any(k in params for k in ['z_h', 'I0', 'M0']):
             if enhanced_model is None:
-                from ..models import EnhancedDillModel
-                enhanced_model = EnhancedDillModel()
+                enhanced_model = get_model_by_name('enhanced_dill')
             z_h = float(params['z_h'])
             T = float(params['T'])
             t_B = float(params['t_B'])
@@ -2094,39 +2257,25 @@ def generate_comparison_plots_with_enhanced(parameter_sets):
         else:
             # Dill模型 - 修正：添加模型初始化
             if dill_model is None:
-                from backend.models import DillModel
-                dill_model = DillModel()
+                dill_model = get_model_by_name('dill')
                 
             I_avg = float(params['I_avg'])
             V = float(params['V'])
             K = float(params['K'])
             t_exp = float(params['t_exp'])
-            intensity = dill_model.calculate_intensity_distribution(x, I_avg, V, K)
+            intensity = get_shared_dill_model().calculate_intensity_distribution(x, I_avg, V, K)
             exposure_dose = intensity * t_exp
             label = f"Set {i+1}: 薄胶模型 (I_avg={I_avg}, V={V}, K={K}, t_exp={t_exp})"
-        color = colors[i % len(colors)]
-        plt.plot(x, exposure_dose, color=color, linewidth=2)
-        legend_labels.append(label)
-    plt.title('Exposure Dose Distribution Comparison', fontsize=16)
-    plt.xlabel('Position (μm)', fontsize=14)
-    plt.ylabel('Exposure Dose (mJ/cm²)', fontsize=14)
-    plt.grid(True, alpha=0.3)
-    plt.legend(legend_labels, loc='best', fontsize=10)
-    plt.tight_layout()
-    buffer1 = BytesIO()
-    fig1.savefig(buffer1, format='png', dpi=100)
-    buffer1.seek(0)
-    exposure_comparison_plot = base64.b64encode(buffer1.getvalue()).decode()
-    plt.close(fig1)
+        exposure_series.append({'x': x, 'y': exposure_dose, 'color': colors[i % len(colors)], 'linewidth': 2})
+        exposure_labels.append(label)
     
     # 第二个图：厚度分布比较
-    fig2 = plt.figure(figsize=(12, 7))
-    legend_labels = []
+    thickness_series = []
+    thickness_labels = []
     for i, params in enumerate(parameter_sets):
         if any(k in params for k in ['acid_gen_efficiency', 'diffusion_length', 'reaction_rate']):
             if car_model is None:
-                from backend.models import CARModel
-                car_model = CARModel()
+                car_model = get_model_by_name('car')
             I_avg = float(params['I_avg'])
             V = float(params['V'])
             K = float(params.get('K', 2.0))
@@ -2141,8 +2290,7 @@ def generate_comparison_plots_with_enhanced(parameter_sets):
             label = f"Set {i+1}: CAR模型 (K={K}, diffusion={diffusion_length}, contrast={contrast})"
         elif any(k in params for k in ['z_h', 'I0', 'M0']):
             if enhanced_model is None:
-                from ..models import EnhancedDillModel
-                enhanced_model = EnhancedDillModel()
+                enhanced_model = get_model_by_name('enhanced_dill')
             z_h = float(params['z_h'])
             T = float(params['T'])
             t_B = float(params['t_B'])
@@ -2171,44 +2319,143 @@ def generate_comparison_plots_with_enhanced(parameter_sets):
         else:
             # Dill模型 - 修正：添加模型初始化
             if dill_model is None:
-                from backend.models import DillModel
-                dill_model = DillModel()
+                dill_model = get_model_by_name('dill')
                 
             I_avg = float(params['I_avg'])
             V = float(params['V'])
             K = float(params['K'])
             t_exp = float(params['t_exp'])
             C = float(params['C'])
-            intensity = dill_model.calculate_intensity_distribution(x, I_avg, V, K)
+            intensity = get_shared_dill_model().calculate_intensity_distribution(x, I_avg, V, K)
             exposure_dose = intensity * t_exp
             thickness = np.exp(-C * exposure_dose)
             label = f"Set {i+1}: 薄胶模型 (I_avg={I_avg}, V={V}, K={K}, C={C})"
-        color = colors[i % len(colors)]
-        plt.plot(x, thickness, color=color, linewidth=2)
-        legend_labels.append(label)
-    plt.title('Photoresist Thickness Distribution Comparison', fontsize=16)
-    plt.xlabel('Position (μm)', fontsize=14)
-    plt.ylabel('Relative Thickness', fontsize=14)
-    plt.grid(True, alpha=0.3)
-    plt.legend(legend_labels, loc='best', fontsize=10)
-    plt.tight_layout()
-    buffer2 = BytesIO()
-    fig2.savefig(buffer2, format='png', dpi=100)
-    buffer2.seek(0)
-    thickness_comparison_plot = base64.b64encode(buffer2.getvalue()).decode()
-    plt.close(fig2)
-    return {'exposure_comparison_plot': exposure_comparison_plot, 'thickness_comparison_plot': thickness_comparison_plot, 'colors': colors}
+        thickness_series.append({'x': x, 'y': thickness, 'color': colors[i % len(colors)], 'linewidth': 2})
+        thickness_labels.append(label)
+    
+    # 两张对比图一起提交渲染（模板按参数组数复用）
+    legend = {'loc': 'best', 'fontsize': 10}
+    plots = get_figure_renderer().render_many({
+        'exposure_comparison_plot': line_plot(exposure_series, 'Exposure Dose Distribution Comparison',
+                                              'Position (μm)', 'Exposure Dose (mJ/cm²)', figsize=(12, 7),
+                                              legend=legend, labels=exposure_labels),
+        'thickness_comparison_plot': line_plot(thickness_series, 'Photoresist Thickness Distribution Comparison',
+                                               'Position (μm)', 'Relative Thickness', figsize=(12, 7),
+                                               legend=legend, labels=thickness_labels)
+    })
+    plots['colors'] = colors
+    return plots
+
+# ARC扫描网格点数上限（波长 × 厚度 × 角度）
+ARC_SWEEP_MAX_POINTS = 2_000_000
+
+def parse_sweep_range(data, prefix, default_min, default_max, default_step):
+    """
+    读取 <prefix>_min / <prefix>_max / <prefix>_step 并计算点数（不分配数组）
+
+    返回:
+        (起点, 终点, 步长, 点数)；步长非正、范围无效或参数非数值时抛出 ValueError
+    """
+    start = float(data.get(f'{prefix}_min', default_min))
+    stop = float(data.get(f'{prefix}_max', default_max))
+    step = float(data.get(f'{prefix}_step', default_step))
+    if not all(np.isfinite([start, stop, step])):
+        raise ValueError(f"{prefix} 范围与步长必须为有限数值")
+    if step <= 0:
+        raise ValueError(f"{prefix}_step 必须大于0")
+    if stop < start:
+        raise ValueError(f"{prefix}_max 不能小于 {prefix}_min")
+    # 与 np.arange(start, stop + 1e-9, step) 的长度一致
+    count = np.ceil((stop + 1e-9 - start) / step)
+    if not np.isfinite(count):
+        raise ValueError(f"{prefix} 扫描点数过多，请缩小范围或增大步长")
+    return start, stop, step, int(count)
+
+@api_bp.route('/arc_reflectance_map', methods=['POST'])
+def arc_reflectance_map_endpoint():
+    """
+    ARC厚度扫描：一次返回 波长 × ARC厚度 × 入射角 的完整反射率图及每个波长的最优ARC厚度
+
+    请求参数（均可选）:
+        substrate_material, arc_material, n_resist
+        wavelengths: 波长列表(nm)；或 wavelength_min / wavelength_max / wavelength_step
+        thickness_min / thickness_max / thickness_step: ARC厚度范围(nm)
+        angles: 入射角列表(度)
+    """
+    try:
+        data = request.get_json() or {}
+        substrate_material = data.get('substrate_material', 'silicon')
+        arc_material = data.get('arc_material', 'sion')
+        n_resist = float(data.get('n_resist', 1.7))
+
+        # 先由范围与步长算出点数并检查上限，再分配网格数组
+        wavelength_range = None
+        if data.get('wavelengths') is not None:
+            wavelengths = [float(w) for w in data['wavelengths']]
+            n_wavelengths = len(wavelengths)
+            if not wavelengths or min(wavelengths) <= 0 or not np.all(np.isfinite(wavelengths)):
+                return jsonify(format_response(False, message="wavelengths 必须是非空的正数列表")), 400
+        else:
+            wavelength_range = parse_sweep_range(data, 'wavelength', 190, 450, 5)
+            n_wavelengths = wavelength_range[3]
+            if wavelength_range[0] <= 0:
+                return jsonify(format_response(False, message="wavelength_min 必须大于0")), 400
+        thickness_range = parse_sweep_range(data, 'thickness', 0, 200, 1)
+        angles = [float(a) for a in data.get('angles', [0, 10, 20, 30])]
+
+        if n_wavelengths * thickness_range[3] * len(angles) > ARC_SWEEP_MAX_POINTS:
+            return jsonify(format_response(False, message="扫描网格过大，请减小波长/厚度/角度范围或增大步长")), 400
+
+        if wavelength_range is not None:
+            wavelengths = np.arange(wavelength_range[0], wavelength_range[1] + 1e-9, wavelength_range[2])
+        thicknesses = np.arange(thickness_range[0], thickness_range[1] + 1e-9, thickness_range[2])
+
+        model = get_model_by_name('dill')
+        start = time.time()
+        result = model.calculate_arc_reflectance_map(substrate_material, arc_material, wavelengths,
+                                                     thicknesses, angles, n_resist)
+        compute_ms = (time.time() - start) * 1000
+
+        return jsonify(format_response(True, data={
+            'substrate_material': substrate_material,
+            'arc_material': arc_material,
+            'n_resist': n_resist,
+            'wavelengths': result['wavelengths'],
+            'thicknesses': result['thicknesses'],
+            'angles': result['angles'],
+            'reflectance': result['reflectance'],
+            'reflectance_no_arc': result['reflectance_no_arc'],
+            'optimal_thickness': result['optimal_thickness'],
+            'min_reflectance': result['min_reflectance'],
+            'compute_ms': round(compute_ms, 2)
+        }))
+    except (TypeError, ValueError) as e:
+        return jsonify(format_response(False, message=str(e))), 400
+    except Exception as e:
+        error_msg = f"ARC反射率扫描失败: {str(e)}"
+        print(f"Error: {error_msg}")
+        return jsonify(format_response(False, message=error_msg)), 500
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """
-    API健康检查端点
+    API健康检查端点（附带模型单例、共享缓存命中率及启动耗时统计）
     """
-    return jsonify({"status": "healthy"}), 200 
+    return jsonify({"status": "healthy", "model_registry": registry_stats(),
+                    "intensity_profiles": get_intensity_profile_registry().stats(),
+                    "intensity_files": get_intensity_file_parser().stats(),
+                    "figure_renderer": get_figure_renderer().stats(),
+                    "startup": current_app.config.get('STARTUP_TIMING'),
+                    "loaded_heavy_modules": loaded_heavy_modules()}), 200 
 
 @api_bp.route('/logs', methods=['GET'])
 def get_logs():
-    """获取系统化计算日志"""
+    """
+    获取系统化计算日志
+
+    支持 since=<seq> 游标参数：只返回序列号大于 since 的新日志，
+    返回数据中的 latest_seq 可作为下一次轮询的 since。
+    """
     try:
         # 获取查询参数
         model_type = request.args.get('model_type')  # 过滤特定模型
@@ -2216,69 +2463,39 @@ def get_logs():
         category = request.args.get('category', '')  # 子分类：1d, 2d, 3d 或 dill, enhanced_dill, car
         log_type = request.args.get('type', '')  # 日志类型：info, progress, success, warning, error
         limit = request.args.get('limit', 100)  # 默认返回最近100条
+        since = request.args.get('since', 0)  # 增量游标：只返回seq大于since的日志
         
         try:
             limit = int(limit)
         except:
             limit = 100
-            
-        # 过滤日志
-        filtered_logs = calculation_logs
-        
-        # 按模型类型过滤
-        if model_type:
-            filtered_logs = [log for log in filtered_logs if log.get('model') == model_type]
-        
-        # 按页面类型过滤
-        if page == 'compare':
-            # 比较页面显示所有模型的日志
-            pass
-        else:
-            # 单一计算页面，根据category过滤
-            if category and category in ['1d', '2d', '3d']:
-                # 根据消息内容推断维度
-                dimension_keywords = {
-                    '1d': ['1d', '一维', '1D'],
-                    '2d': ['2d', '二维', '2D'],
-                    '3d': ['3d', '三维', '3D']
-                }
-                if category in dimension_keywords:
-                    keywords = dimension_keywords[category]
-                    filtered_logs = [
-                        log for log in filtered_logs 
-                        if any(keyword in log.get('message', '').lower() for keyword in [k.lower() for k in keywords])
-                    ]
-        
-        # 按日志类型过滤
-        if log_type:
-            filtered_logs = [log for log in filtered_logs if log.get('type') == log_type]
-        
-        # 为每个日志添加ID和增强信息
-        enhanced_logs = []
-        for i, log in enumerate(filtered_logs):
-            enhanced_log = {
-                'id': f"{log.get('timestamp', '')}-{i}",
-                'timestamp': log.get('timestamp'),
-                'type': log.get('type', 'info'),
-                'message': log.get('message', ''),
-                'model': log.get('model', 'unknown'),
-                'details': '',
-                'category': detect_log_category(log, page),
-                'subcategory': detect_log_subcategory(log, page),
-                'dimension': detect_log_dimension(log)
-            }
-            enhanced_logs.append(enhanced_log)
+        try:
+            since = max(int(since), 0)
+        except:
+            since = 0
+        
+        # 单一计算页面根据category按维度过滤；比较页面显示所有模型的日志
+        dimension = category if page != 'compare' and category in ['1d', '2d', '3d'] else None
+        
+        # 通过预建索引过滤（新→旧）
+        # latest_seq 取本次扫描的最大序列号，避免跳过查询之后写入的日志
+        filtered_logs, latest_seq = calculation_logs.scan(
+            model=model_type or None,
+            log_type=log_type or None,
+            dimension=dimension,
+            since=since
+        )
         
-        # 返回最近的N条日志（倒序）
-        recent_logs = enhanced_logs[-limit:] if limit > 0 else enhanced_logs
-        recent_logs.reverse()  # 最新的在前面
+        # 返回最近的N条日志（最新的在前面）
+        recent_logs = filtered_logs[:limit] if limit > 0 else filtered_logs
+        recent_logs = [LogStore.to_api_entry(log, page) for log in recent_logs]
         
         # 统计信息
         stats = {
             'total_logs': len(calculation_logs),
             'filtered_logs': len(filtered_logs),
-            'error_count': len([log for log in filtered_logs if log.get('type') == 'error']),
-            'warning_count': len([log for log in filtered_logs if log.get('type') == 'warning']),
+            'error_count': sum(1 for log in filtered_logs if log.get('type') == 'error'),
+            'warning_count': sum(1 for log in filtered_logs if log.get('type') == 'warning'),
             'progress': '等待计算...'
         }
         
@@ -2286,7 +2503,9 @@ def get_logs():
             'logs': recent_logs,
             'stats': stats,
             'total_count': len(calculation_logs),
-            'filtered_count': len(filtered_logs)
+            'filtered_count': len(filtered_logs),
+            'latest_seq': latest_seq,
+            'since': since
         }))
         
     except Exception as e:
@@ -2294,44 +2513,72 @@ def get_logs():
         print(f"Error: {error_msg}")
         return jsonify(format_response(False, message=error_msg)), 500
 
-def detect_log_category(log, page):
-    """检测日志分类"""
-    if page == 'compare':
-        return 'compare'
-    return 'single'
+# 日志推送连接参数
+LOG_STREAM_HEARTBEAT_SECONDS = 15  # 心跳间隔，防止代理断开空闲连接
+LOG_STREAM_MAX_SECONDS = 300  # 单个连接的最长持续时间，之后由EventSource自动重连
+
+def _format_sse_event(event, data, event_id=None):
+    """格式化一条Server-Sent Events消息"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, cls=NumpyEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+@api_bp.route('/logs/stream', methods=['GET'])
+def stream_logs():
+    """
+    以Server-Sent Events方式推送新日志和进度
 
-def detect_log_subcategory(log, page):
-    """检测日志子分类"""
-    message = log.get('message', '').lower()
-    model = log.get('model', '').lower()
+    查询参数与 /api/logs 一致（model_type、page、category、type），
+    另支持 since=<seq> 或 Last-Event-ID 头作为起始游标（默认只推送连接之后的新日志）。
+    每条日志以 event: log（进度日志为 event: progress）推送，id 为日志序列号。
+    """
+    model_type = request.args.get('model_type') or None
+    page = request.args.get('page', 'index')
+    category = request.args.get('category', '')
+    log_type = request.args.get('type') or None
+    dimension = category if page != 'compare' and category in ['1d', '2d', '3d'] else None
     
-    if page == 'compare':
-        if 'dill' in model and 'enhanced' not in model:
-            return 'dill'
-        elif 'enhanced' in model or '厚胶' in message:
-            return 'enhanced_dill'
-        elif 'car' in model:
-            return 'car'
-    else:
-        if any(keyword in message for keyword in ['1d', '一维']):
-            return '1d'
-        elif any(keyword in message for keyword in ['2d', '二维']):
-            return '2d'
-        elif any(keyword in message for keyword in ['3d', '三维']):
-            return '3d'
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        cursor = max(int(cursor), 0)
+    except (TypeError, ValueError):
+        cursor = calculation_logs.latest_seq
     
-    return 'unknown'
-
-def detect_log_dimension(log):
-    """检测日志维度"""
-    message = log.get('message', '').lower()
-    if '1d' in message or '一维' in message:
-        return '1d'
-    elif '2d' in message or '二维' in message:
-        return '2d'
-    elif '3d' in message or '三维' in message:
-        return '3d'
-    return 'unknown'
+    try:
+        max_seconds = min(float(request.args.get('timeout', LOG_STREAM_MAX_SECONDS)), LOG_STREAM_MAX_SECONDS)
+    except (TypeError, ValueError):
+        max_seconds = LOG_STREAM_MAX_SECONDS
+    
+    def generate(cursor):
+        deadline = time.time() + max_seconds
+        # 告知客户端重连间隔及当前游标
+        yield "retry: 1000\n" + _format_sse_event('ready', {'latest_seq': calculation_logs.latest_seq}, cursor)
+        while True:
+            entries, scanned_seq = calculation_logs.scan(model=model_type, log_type=log_type, dimension=dimension, since=cursor)
+            for entry in reversed(entries):
+                event = 'progress' if entry.get('type') == 'progress' else 'log'
+                yield _format_sse_event(event, LogStore.to_api_entry(entry, page), entry['seq'])
+            # 推进到本次扫描覆盖的最大序列号（被过滤掉的日志也不再重复扫描）；
+            # 不能事后再读 latest_seq，否则查询之后写入的日志会被跳过
+            cursor = max(cursor, scanned_seq)
+            
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            if not calculation_logs.wait_for_new(cursor, timeout=min(LOG_STREAM_HEARTBEAT_SECONDS, remaining)):
+                yield ": keep-alive\n\n"
+    
+    return Response(
+        stream_with_context(generate(cursor)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # 禁止反向代理缓冲
+        }
+    )
 
 @api_bp.route('/logs/clear', methods=['POST'])
 def clear_calculation_logs():
@@ -2354,8 +2601,8 @@ import os
 import pathlib
 
 # 示例文件根目录路径 - 支持多种部署环境
-def get_example_files_dir():
-    """获取示例文件目录路径，支持多种部署环境"""
+def probe_example_files_dir():
+    """依次探测候选位置，返回示例文件目录路径"""
     current_file = os.path.abspath(__file__)
     
     # 尝试多种可能的路径
@@ -2412,13 +2659,40 @@ def get_example_files_dir():
     
     return os.path.abspath(possible_paths[0])
 
-EXAMPLE_FILES_DIR = get_example_files_dir()
+# 已探测到的示例文件目录及其索引（首次使用时创建）
+_example_files_dir = None
+_example_catalog = None
+_example_catalog_lock = threading.Lock()
+
+def get_example_files_dir():
+    """获取示例文件目录路径（探测结果缓存，目录不存在时重新探测）"""
+    global _example_files_dir
+    if _example_files_dir is None or not os.path.isdir(_example_files_dir):
+        _example_files_dir = probe_example_files_dir()
+    return _example_files_dir
+
+def get_example_catalog():
+    """获取示例文件目录索引"""
+    global _example_catalog
+    example_dir = get_example_files_dir()
+    if _example_catalog is None or _example_catalog.directory != example_dir:
+        with _example_catalog_lock:
+            if _example_catalog is None or _example_catalog.directory != example_dir:
+                _example_catalog = ExampleFileCatalog(example_dir, describe=get_file_description)
+    return _example_catalog
+
+def conditional_response(response, etag, last_modified=None):
+    """设置 ETag / Last-Modified，客户端缓存仍有效时转为 304"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @api_bp.route('/example-files', methods=['GET'])
 def get_example_files():
-    """获取示例文件列表"""
+    """获取示例文件列表（元数据来自目录索引，支持 ETag 条件请求）"""
     try:
-        # 重新获取目录路径以确保最新
         example_dir = get_example_files_dir()
         
         if not os.path.exists(example_dir):
@@ -2433,47 +2707,17 @@ def get_example_files():
             add_log_entry('error', 'system', error_msg)
             return jsonify(format_response(False, message="指定路径不是目录")), 400
         
-        files = []
-        print(f"Scanning directory: {example_dir}")
-        
+        catalog = get_example_catalog()
         try:
-            file_list = os.listdir(example_dir)
-            print(f"Found {len(file_list)} items in directory")
+            files = [entry.describe() for entry in catalog.entries()]
         except PermissionError:
             error_msg = f"没有权限访问目录: {example_dir}"
             print(f"Error: {error_msg}")
             add_log_entry('error', 'system', error_msg)
             return jsonify(format_response(False, message="没有权限访问示例文件目录")), 403
         
-        for filename in file_list:
-            if filename.startswith('.') or filename.lower() == 'readme.md':
-                continue
-                
-            file_path = os.path.join(example_dir, filename)
-            if os.path.isfile(file_path):
-                try:
-                    file_stat = os.stat(file_path)
-                    file_ext = pathlib.Path(filename).suffix.lstrip('.')
-                    
-                    file_info = {
-                        'name': filename,
-                        'extension': file_ext,
-                        'size': file_stat.st_size,
-                        'modified': file_stat.st_mtime,
-                        'description': get_file_description(filename, file_ext)
-                    }
-                    files.append(file_info)
-                except (OSError, IOError) as e:
-                    print(f"Error reading file {filename}: {e}")
-                    continue
-        
-        # 按文件名排序
-        files.sort(key=lambda x: x['name'])
-        
-        print(f"Successfully found {len(files)} example files")
-        add_log_entry('info', 'system', f'加载了 {len(files)} 个示例文件')
-        
-        return jsonify(format_response(True, data=files))
+        response = jsonify(format_response(True, data=files))
+        return conditional_response(response, catalog.listing_etag())
         
     except Exception as e:
         error_msg = f"获取示例文件列表失败: {str(e)}"
@@ -2482,50 +2726,61 @@ def get_example_files():
 
 @api_bp.route('/example-files/<filename>', methods=['GET'])
 def get_example_file_content(filename):
-    """获取示例文件内容"""
+    """获取示例文件内容（支持 ETag / Last-Modified 条件请求）"""
     try:
         # 安全检查：防止目录遍历攻击
         if '..' in filename or '/' in filename or '\\' in filename:
             return jsonify(format_response(False, message="无效的文件名")), 400
         
-        example_dir = get_example_files_dir()
-        file_path = os.path.join(example_dir, filename)
-        
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
+        entry = get_example_catalog().entry(filename)
+        if entry is None:
             return jsonify(format_response(False, message="文件不存在")), 404
         
-        # 读取文件内容
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            # 如果UTF-8解码失败，尝试其他编码
-            try:
-                with open(file_path, 'r', encoding='gbk') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    content = f.read()
-        
-        file_stat = os.stat(file_path)
-        file_ext = pathlib.Path(filename).suffix.lstrip('.')
-        
-        file_data = {
-            'name': filename,
-            'content': content,
-            'size': file_stat.st_size,
-            'format': file_ext.upper() if file_ext else '未知',
-            'modified': file_stat.st_mtime,
-            'description': get_file_description(filename, file_ext)
-        }
+        # 客户端缓存仍有效时不读取文件
+        if request.if_none_match.contains_weak(entry.etag):
+            return conditional_response(Response(status=304), entry.etag, entry.mtime)
         
-        return jsonify(format_response(True, data=file_data))
+        file_data = dict(entry.describe(), content=get_example_catalog().read_text(entry))
+        response = jsonify(format_response(True, data=file_data))
+        return conditional_response(response, entry.etag, entry.mtime)
         
     except Exception as e:
         error_msg = f"读取文件内容失败: {str(e)}"
         print(f"Error: {error_msg}")
         return jsonify(format_response(False, message=error_msg)), 500
 
+@api_bp.route('/example-files/<filename>/raw', methods=['GET'])
+def get_example_file_raw(filename):
+    """示例文件原始内容（支持条件请求与 Range 分段读取，适合大文件）"""
+    if '..' in filename or '/' in filename or '\\' in filename:
+        return jsonify(format_response(False, message="无效的文件名")), 400
+    entry = get_example_catalog().entry(filename)
+    if entry is None:
+        return jsonify(format_response(False, message="文件不存在")), 404
+    mimetype = 'application/json' if entry.data_format == 'json' else 'text/plain'
+    response = send_file(entry.path, mimetype=mimetype, conditional=True, etag=entry.etag,
+                         last_modified=entry.mtime, max_age=0)
+    response.cache_control.no_cache = True
+    return response
+
+@api_bp.route('/example-files/<filename>/parsed', methods=['GET'])
+def get_example_file_parsed(filename):
+    """服务端解析示例文件（大文件内存映射读取），返回文件信息与降采样预览；register=1 时同时登记"""
+    try:
+        if '..' in filename or '/' in filename or '\\' in filename:
+            return jsonify(format_response(False, message="无效的文件名")), 400
+        file_path = os.path.join(get_example_files_dir(), filename)
+        if not os.path.isfile(file_path):
+            return jsonify(format_response(False, message="文件不存在")), 404
+        parsed, cached = get_intensity_file_parser().parse_path(file_path)
+        return parsed_intensity_file_response(parsed, cached, request.args)
+    except IntensityFileError as e:
+        return jsonify(format_response(False, message=f"文件解析失败: {str(e)}")), 400
+    except Exception as e:
+        error_msg = f"解析示例文件失败: {str(e)}"
+        print(f"Error: {error_msg}")
+        return jsonify(format_response(False, message=error_msg)), 500
+
 @api_bp.route('/example-files/<filename>', methods=['PUT'])
 def update_example_file_content(filename):
     """更新示例文件内容"""
@@ -2560,6 +2815,7 @@ def update_example_file_content(filename):
             f.write(content)
         
         # 添加日志
+        get_example_catalog().invalidate(filename)
         add_log_entry('info', 'system', f'示例文件已更新: {filename}')
         
         return jsonify(format_response(True, message="文件更新成功"))
@@ -2611,6 +2867,7 @@ def delete_example_file(filename):
             # 验证文件是否确实被删除
             if not os.path.exists(file_path):
                 # 添加日志
+                get_example_catalog().invalidate(filename)
                 add_log_entry('info', 'system', f'示例文件已删除: {filename}')
                 return jsonify(format_response(True, message="文件删除成功"))
             else:
@@ -2655,6 +2912,7 @@ def delete_example_file_by_post(filename):
             # 验证文件是否确实被删除
             if not os.path.exists(file_path):
                 # 添加日志
+                get_example_catalog().invalidate(filename)
                 add_log_entry('info', 'system', f'示例文件已删除: {filename}')
                 return jsonify(format_response(True, message="文件删除成功"))
             else:
@@ -2720,6 +2978,7 @@ def create_example_file():
         }
         
         # 添加日志
+        get_example_catalog().invalidate(filename)
         add_log_entry('info', 'system', f'新的示例文件已创建: {filename}')
         
         return jsonify(format_response(True, message="文件创建成功", data=file_data))
@@ -2833,6 +3092,7 @@ def upload_example_files():
                 })
                 
                 # 添加日志
+                get_example_catalog().invalidate(filename)
                 add_log_entry('info', 'system', f'文件上传成功: {filename}')
                 
             except Exception as e:
@@ -2893,6 +3153,7 @@ def file_action():
                 
                 # 验证文件是否确实被删除
                 if not os.path.exists(file_path):
+                    get_example_catalog().invalidate(filename)
                     add_log_entry('info', 'system', f'示例文件已删除: {filename}')
                     
                     # 检查是否是通过浏览器直接访问的（非AJAX请求）
@@ -2951,7 +3212,7 @@ def file_action():
 def get_latest_calculation():
     """获取最近的计算结果，供验证页面使用"""
     try:
-        global latest_calculation_result
+        latest_calculation_result = get_latest_calculation_result()
         
         if latest_calculation_result['timestamp'] is None:
             # 返回200状态码，而不是404，因为这是正常的"暂无数据"状态
@@ -2975,16 +3236,74 @@ def get_latest_calculation():
         return jsonify(format_response(False, message=error_msg)), 500
 
 
+# 验证记录存储（SQLite，首次使用时自动导入已有的 validation_data.xlsx）
+_validation_store = None
+_validation_store_lock = threading.Lock()
+
+def get_validation_store():
+    """获取验证记录存储（按需创建一次）"""
+    global _validation_store
+    if _validation_store is None:
+        with _validation_store_lock:
+            if _validation_store is None:
+                _validation_store = ValidationStore(
+                    os.path.join(os.getcwd(), 'validation_data.sqlite3'),
+                    excel_path=os.path.join(os.getcwd(), 'validation_data.xlsx')
+                )
+    return _validation_store
+
+# 机器学习模型注册表（模型文件只加载一次，文件变化或重新训练后自动重载）
+_ml_model_registry = None
+_ml_model_registry_lock = threading.Lock()
+
+def get_ml_model_registry():
+    """获取进程内机器学习模型注册表"""
+    global _ml_model_registry
+    if _ml_model_registry is None:
+        with _ml_model_registry_lock:
+            if _ml_model_registry is None:
+                _ml_model_registry = MLModelRegistry(os.getcwd(), validation_store=get_validation_store())
+    return _ml_model_registry
+
+_online_model_updater = None
+_online_model_updater_lock = threading.Lock()
+
+def _retrain_ml_model(model_type):
+    """漂移触发的后台完整重训练，沿用模型上次训练时的参数"""
+    entry = get_ml_model_registry().get(model_type)
+    params = entry.model_info.get('training_params', {}) if entry is not None else {}
+    _, error_msg, _ = run_model_training(
+        model_type,
+        epochs=params.get('epochs', 100),
+        test_size=params.get('test_size', 0.2),
+        enable_cross_validation=params.get('enable_cross_validation', True)
+    )
+    if error_msg:
+        raise RuntimeError(error_msg)
+
+def get_online_model_updater():
+    """获取验证记录在线更新器（DILL_ML_AUTO_RETRAIN=0 时不自动后台重训练）"""
+    global _online_model_updater
+    if _online_model_updater is None:
+        with _online_model_updater_lock:
+            if _online_model_updater is None:
+                auto_retrain = os.environ.get('DILL_ML_AUTO_RETRAIN', '1') != '0'
+                _online_model_updater = OnlineModelUpdater(
+                    get_ml_model_registry(), retrain=_retrain_ml_model if auto_retrain else None
+                )
+    return _online_model_updater
+
+def warm_up_ml_models():
+    """后台预热：导入scikit-learn并加载已有模型及特征统计"""
+    try:
+        get_ml_model_registry().warm_up()
+    except Exception as e:
+        print(f"⚠️ 机器学习模型预热失败: {e}")
+
 @api_bp.route('/save_validation_data', methods=['POST'])
 def save_validation_data():
-    """保存验证数据到Excel文件"""
+    """保存验证数据到验证记录存储"""
     try:
-        # 检查Excel支持
-        try:
-            import openpyxl
-        except ImportError:
-            return jsonify(format_response(False, message="Excel支持库(openpyxl)未安装，无法保存数据。请运行: pip install openpyxl")), 500
-            
         data = request.get_json()
         if not data:
             return jsonify(format_response(False, message="无效的请求数据")), 400
@@ -2996,13 +3315,6 @@ def save_validation_data():
         if not annotations:
             return jsonify(format_response(False, message="缺少标注数据")), 400
         
-        # 导入Excel处理库
-        import pandas as pd
-        import os
-        
-        # 定义Excel文件路径
-        excel_file = os.path.join(os.getcwd(), 'validation_data.xlsx')
-        
         # 准备数据行列表
         rows_data = []
         for annotation in annotations:
@@ -3110,34 +3422,20 @@ def save_validation_data():
             }
             rows_data.append(row_data)
         
-        # 读取或创建Excel文件
-        if os.path.exists(excel_file):
-            try:
-                df = pd.read_excel(excel_file)
-                new_df = pd.DataFrame(rows_data)
-                df = pd.concat([df, new_df], ignore_index=True)
-            except Exception as e:
-                print(f"读取现有Excel文件失败: {e}")
-                df = pd.DataFrame(rows_data)
-        else:
-            df = pd.DataFrame(rows_data)
+        # 追加写入（仅INSERT，不再重写整个文件）
+        total_records = get_validation_store().append(rows_data)
         
-        # 保存到Excel文件
+        # 在线更新已训练的模型；失败不影响保存结果
         try:
-            df.to_excel(excel_file, index=False)
-            print(f"Excel文件保存成功: {excel_file}")
-            print(f"文件路径: {os.path.abspath(excel_file)}")
+            online_update = get_online_model_updater().observe(rows_data)
         except Exception as e:
-            print(f"保存Excel文件失败: {e}")
-            raise
-        
-        # 获取总记录数
-        total_records = len(df) if 'df' in locals() else 0
+            print(f"⚠️ 模型在线更新失败: {e}")
+            online_update = {}
         
         add_log_entry('success', 'validation', f'保存验证数据成功，共{len(annotations)}个标注点')
         return jsonify(format_response(True, 
                                        message=f"验证数据保存成功",
-                                       data={'total_records': total_records}))
+                                       data={'total_records': total_records, 'online_update': online_update}))
         
     except Exception as e:
         error_msg = f"保存验证数据失败: {str(e)}"
@@ -3146,286 +3444,362 @@ def save_validation_data():
         return jsonify(format_response(False, message=error_msg)), 500
 
 
-@api_bp.route('/train_model', methods=['POST'])
-def train_model():
-    """训练参数预测模型 - 支持训练参数配置"""
-    try:
-        # 获取请求数据
-        data = request.get_json() or {}
-        
-        # 提取训练参数，设置默认值
-        epochs = data.get('epochs', 100)
-        test_size = data.get('test_size', 0.2)
-        model_type = data.get('model_type', 'random_forest')
-        enable_cross_validation = data.get('enable_cross_validation', True)
-        
-        print(f"🔧 收到训练参数: epochs={epochs}, test_size={test_size}, model_type={model_type}, cross_validation={enable_cross_validation}")
-        
-        # 检查Excel支持
-        try:
-            import openpyxl
-        except ImportError:
-            return jsonify(format_response(False, message="Excel支持库(openpyxl)未安装，无法读取训练数据。请运行: pip install openpyxl")), 500
-            
-        import pandas as pd
-        import os
-        import numpy as np
-        from sklearn.ensemble import RandomForestRegressor
-        from sklearn.linear_model import LinearRegression
-        from sklearn.svm import SVR
-        from sklearn.multioutput import MultiOutputRegressor
-        from sklearn.model_selection import train_test_split, cross_val_score
-        from sklearn.metrics import mean_squared_error, r2_score
-        import joblib
-        
-        # 检查数据文件是否存在
-        excel_file = os.path.join(os.getcwd(), 'validation_data.xlsx')
-        if not os.path.exists(excel_file):
-            return jsonify(format_response(False, message="没有找到验证数据文件")), 404
-        
-        # 读取数据
-        df = pd.read_excel(excel_file)
-        
-        if len(df) < 5:
-            return jsonify(format_response(False, message=f"数据量不足，至少需要5条数据，当前仅有{len(df)}条")), 400
-        
-        # 修复训练逻辑：从工艺参数预测厚度，而不是反向预测
-        # 这样更符合物理逻辑和实际需求
-        
-        # 检查数据中主要使用的模型类型
-        model_types = df['model_type'].value_counts()
-        primary_model = model_types.index[0] if not model_types.empty else 'dill'
-        
-        print(f"🔍 检测到主要模型类型: {primary_model}")
-        
-        # 根据模型类型选择相应的特征列（工艺参数）
-        if 'car' in primary_model.lower():
-            # CAR模型参数作为特征
-            feature_columns = ['I_avg', 'V', 'K', 't_exp', 'acid_gen_efficiency', 
-                             'diffusion_length', 'reaction_rate', 'amplification', 'contrast', 
-                             'annotation_x', 'annotation_y']
-        else:
-            # Dill模型参数作为特征（默认）
-            feature_columns = ['I_avg', 'V', 'K', 't_exp', 'annotation_x', 'annotation_y']
-            
-        # 添加基底材料和抗反射薄膜参数作为潜在特征
-        additional_features = [
-            # 基底材料参数
-            'substrate_refractive_index', 'substrate_extinction_coefficient', 
-            'substrate_thickness', 'substrate_thermal_conductivity',
-            
-            # 抗反射薄膜参数
-            'arc_refractive_index', 'arc_extinction_coefficient', 'arc_thickness', 
-            'arc_reflectance', 'arc_anti_reflective_efficiency',
-            
-            # 高级光学参数
-            'wavelength', 'numerical_aperture', 'coherence_factor',
-            
-            # 曝光高级参数
-            'exposure_threshold', 'dose_uniformity', 'focus_offset',
-            
-            # 机器学习参数
-            'learning_rate', 'batch_size', 'validation_split', 'regularization_factor',
-            
-            # 经验学习参数
-            'historical_data_weight', 'expert_knowledge_factor', 'confidence_threshold'
-        ]
-        
-        # 将附加特征添加到特征列表中
-        feature_columns.extend(additional_features)
-            
-        # 目标变量：厚度预测
-        target_columns = ['actual_value']  # 预测实际厚度值
+def prepare_training_data(df):
+    """
+    从验证记录构建训练特征矩阵
+    
+    返回:
+        (prepared, None)，数据不满足训练条件时返回 (None, 错误信息)
+    """
+    import pandas as pd
+    
+    # 修复训练逻辑：从工艺参数预测厚度，而不是反向预测
+    # 这样更符合物理逻辑和实际需求
+    
+    # 检查数据中主要使用的模型类型
+    model_types = df['model_type'].value_counts()
+    primary_model = model_types.index[0] if not model_types.empty else 'dill'
+    
+    print(f"🔍 检测到主要模型类型: {primary_model}")
+    
+    # 根据模型类型选择相应的特征列（工艺参数）
+    if 'car' in primary_model.lower():
+        # CAR模型参数作为特征
+        feature_columns = ['I_avg', 'V', 'K', 't_exp', 'acid_gen_efficiency', 
+                         'diffusion_length', 'reaction_rate', 'amplification', 'contrast', 
+                         'annotation_x', 'annotation_y']
+    else:
+        # Dill模型参数作为特征（默认）
+        feature_columns = ['I_avg', 'V', 'K', 't_exp', 'annotation_x', 'annotation_y']
         
-        print(f"🎯 使用的目标列: {target_columns}")
+    # 添加基底材料和抗反射薄膜参数作为潜在特征
+    additional_features = [
+        # 基底材料参数
+        'substrate_refractive_index', 'substrate_extinction_coefficient', 
+        'substrate_thickness', 'substrate_thermal_conductivity',
         
-        # 检查必需列是否存在，并过滤掉不存在的列
-        available_feature_cols = [col for col in feature_columns if col in df.columns]
-        missing_feature_cols = [col for col in feature_columns if col not in df.columns]
+        # 抗反射薄膜参数
+        'arc_refractive_index', 'arc_extinction_coefficient', 'arc_thickness', 
+        'arc_reflectance', 'arc_anti_reflective_efficiency',
         
-        if missing_feature_cols:
-            print(f"⚠️  警告：缺少特征列 {missing_feature_cols}，将使用可用列进行训练")
-            
-        if len(available_feature_cols) < 2:
-            return jsonify(format_response(False, message=f"可用特征列不足，需要至少2个特征列，当前仅有: {available_feature_cols}")), 400
-            
-        # 更新特征列为实际可用的列
-        feature_columns = available_feature_cols
+        # 高级光学参数
+        'wavelength', 'numerical_aperture', 'coherence_factor',
         
-        missing_target_cols = [col for col in target_columns if col not in df.columns]
-        if missing_target_cols:
-            return jsonify(format_response(False, message=f"缺少必需的目标列: {missing_target_cols}")), 400
+        # 曝光高级参数
+        'exposure_threshold', 'dose_uniformity', 'focus_offset',
         
-        # 过滤有效数据（只检查非空的必需列）
-        valid_rows = df.dropna(subset=feature_columns + target_columns)
+        # 机器学习参数
+        'learning_rate', 'batch_size', 'validation_split', 'regularization_factor',
         
-        print(f"📊 原始数据量: {len(df)}, 有效数据量: {len(valid_rows)}")
+        # 经验学习参数
+        'historical_data_weight', 'expert_knowledge_factor', 'confidence_threshold'
+    ]
+    
+    # 将附加特征添加到特征列表中
+    feature_columns.extend(additional_features)
         
-        if len(valid_rows) < 3:
-            return jsonify(format_response(False, message=f"有效数据不足，无法训练模型。原始数据: {len(df)}条，有效数据: {len(valid_rows)}条，至少需要3条有效数据")), 400
+    # 目标变量：厚度预测
+    target_columns = ['actual_value']  # 预测实际厚度值
+    
+    print(f"🎯 使用的目标列: {target_columns}")
+    
+    # 检查必需列是否存在，并过滤掉不存在的列
+    available_feature_cols = [col for col in feature_columns if col in df.columns]
+    missing_feature_cols = [col for col in feature_columns if col not in df.columns]
+    
+    if missing_feature_cols:
+        print(f"⚠️  警告：缺少特征列 {missing_feature_cols}，将使用可用列进行训练")
         
-        # 检查特征和目标变量的变化性
-        print("📊 检查特征变量变化性:")
-        feature_variation_check = {}
-        for col in feature_columns:
-            std_val = valid_rows[col].std()
-            feature_variation_check[col] = std_val
-            print(f"   特征 {col}: 标准差 = {std_val:.6f}")
+    if len(available_feature_cols) < 2:
+        return None, f"可用特征列不足，需要至少2个特征列，当前仅有: {available_feature_cols}"
         
-        # 过滤掉没有变化的特征变量
-        varying_features = [col for col in feature_columns if feature_variation_check[col] > 1e-6]
-        constant_features = [col for col in feature_columns if feature_variation_check[col] <= 1e-6]
+    # 更新特征列为实际可用的列
+    feature_columns = available_feature_cols
+    
+    missing_target_cols = [col for col in target_columns if col not in df.columns]
+    if missing_target_cols:
+        return None, f"缺少必需的目标列: {missing_target_cols}"
+    
+    # 过滤有效数据（只检查非空的必需列）
+    valid_rows = df.dropna(subset=feature_columns + target_columns)
+    
+    print(f"📊 原始数据量: {len(df)}, 有效数据量: {len(valid_rows)}")
+    
+    if len(valid_rows) < 3:
+        return None, f"有效数据不足，无法训练模型。原始数据: {len(df)}条，有效数据: {len(valid_rows)}条，至少需要3条有效数据"
+    
+    # 检查特征和目标变量的变化性
+    print("📊 检查特征变量变化性:")
+    feature_variation_check = {}
+    for col in feature_columns:
+        std_val = valid_rows[col].std()
+        feature_variation_check[col] = std_val
+        print(f"   特征 {col}: 标准差 = {std_val:.6f}")
+    
+    # 过滤掉没有变化的特征变量
+    varying_features = [col for col in feature_columns if feature_variation_check[col] > 1e-6]
+    constant_features = [col for col in feature_columns if feature_variation_check[col] <= 1e-6]
+    
+    if constant_features:
+        print(f"⚠️  发现常数特征变量: {constant_features}，将从训练中排除")
         
-        if constant_features:
-            print(f"⚠️  发现常数特征变量: {constant_features}，将从训练中排除")
+    if len(varying_features) < 2:
+        return None, "有效特征变量不足，需要至少2个变化的特征进行训练。请添加更多不同参数的验证数据。"
+    
+    # 检查目标变量的变化性
+    target_variation_check = {}
+    for col in target_columns:
+        std_val = valid_rows[col].std()
+        target_variation_check[col] = std_val
+        print(f"📊 目标变量 {col}: 标准差 = {std_val:.6f}")
+    
+    # 过滤掉没有变化的目标变量
+    varying_targets = [col for col in target_columns if target_variation_check[col] > 1e-6]
+    
+    if len(varying_targets) == 0:
+        return None, "目标变量没有变化，无法进行机器学习训练。请确保实际测量值有足够的差异性。"
+    
+    print(f"🎯 使用有变化的特征列: {varying_features}")
+    print(f"🎯 使用有变化的目标列: {varying_targets}")
+    
+    # 更新特征列为有变化的列
+    actual_feature_columns = varying_features
+    
+    X = valid_rows[actual_feature_columns].values
+    y = valid_rows[varying_targets].values
+    
+    # 更新列信息为实际使用的列
+    actual_target_columns = varying_targets
+    
+    # 检查数据质量和特征相关性
+    print("🔍 数据质量检查:")
+    print(f"   特征矩阵形状: {X.shape}")
+    print(f"   目标矩阵形状: {y.shape}")
+    
+    # 简单的相关性检查
+    correlations = []
+    max_corr = 0.0
+    try:
+        combined_data = pd.DataFrame(X, columns=actual_feature_columns)
+        combined_data['target'] = y.flatten() if y.shape[1] == 1 else y.mean(axis=1)
+        
+        # 计算特征与目标的相关性
+        for i, feature_col in enumerate(actual_feature_columns):
+            corr = combined_data[feature_col].corr(combined_data['target'])
+            correlations.append(abs(corr))
+            print(f"   {feature_col} 与目标相关性: {corr:.4f}")
+        
+        max_corr = max(correlations) if correlations else 0
+        if max_corr < 0.1:
+            print(f"   ⚠️  警告：所有特征与目标的相关性都很低（最高: {max_corr:.4f}），模型效果可能不佳")
             
-        if len(varying_features) < 2:
-            return jsonify(format_response(False, message="有效特征变量不足，需要至少2个变化的特征进行训练。请添加更多不同参数的验证数据。")), 400
+    except Exception as e:
+        print(f"   相关性检查失败: {e}")
+    
+    return {
+        'feature_columns': feature_columns,
+        'actual_feature_columns': actual_feature_columns,
+        'actual_target_columns': actual_target_columns,
+        'target_columns': target_columns,
+        'constant_features': constant_features,
+        'X': X,
+        'y': y,
+        'n_rows': len(valid_rows),
+        'correlations': correlations,
+        'max_corr': max_corr
+    }, None
+
+
+def run_model_training(model_type='random_forest', epochs=100, test_size=0.2, enable_cross_validation=True):
+    """
+    训练参数预测模型并保存到 validation_model_<model_type>.pkl
+    
+    供 /api/train_model 以及验证数据漂移触发的后台重训练共用；同一模型类型的训练串行执行。
+    
+    返回:
+        (result_data, None, None)，失败时返回 (None, 错误信息, HTTP状态码)
+    """
+    with get_ml_model_registry().training_lock(model_type):
+        return _run_model_training(model_type, epochs, test_size, enable_cross_validation)
+
+def _run_model_training(model_type, epochs, test_size, enable_cross_validation):
+    import os
+    import numpy as np
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+    from sklearn.svm import SVR
+    from sklearn.multioutput import MultiOutputRegressor
+    from sklearn.model_selection import train_test_split, cross_val_score
+    from sklearn.metrics import mean_squared_error, r2_score
+    
+    # 检查是否有验证数据
+    validation_store = get_validation_store()
+    if validation_store.count() == 0:
+        return None, "没有找到验证数据", 404
+    
+    if validation_store.count() < 5:
+        return None, f"数据量不足，至少需要5条数据，当前仅有{validation_store.count()}条", 400
+    
+    # 特征矩阵按验证记录修订号缓存，数据未变化时重复训练无需重新读取和整理数据
+    prepared, cache_hit = get_ml_model_registry().training_data(prepare_training_data)
+    prepared, error_msg = prepared
+    if error_msg:
+        return None, error_msg, 400
+    if cache_hit:
+        print("♻️ 验证数据未变化，复用缓存的训练特征矩阵")
+    
+    feature_columns = prepared['feature_columns']
+    actual_feature_columns = prepared['actual_feature_columns']
+    actual_target_columns = varying_targets = prepared['actual_target_columns']
+    target_columns = prepared['target_columns']
+    constant_features = prepared['constant_features']
+    X, y = prepared['X'], prepared['y']
+    n_rows = prepared['n_rows']
+    correlations, max_corr = prepared['correlations'], prepared['max_corr']
+    
+    # 分割训练和测试集
+    if n_rows >= 10:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    elif n_rows >= 5:
+        # 小数据集：至少保留1个样本作为测试集
+        test_samples = max(1, int(n_rows * test_size))
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_samples, random_state=42)
+        print(f"⚠️  小数据集检测，强制保留{test_samples}个测试样本以避免数据泄露")
+    else:
+        # 数据过少，仅使用交叉验证
+        X_train, y_train = X, y
+        X_test, y_test = X, y
+        print(f"⚠️  数据量过少({n_rows}个)，将主要依赖交叉验证进行评估")
+    
+    # 根据模型类型创建模型
+    print(f"📊 创建{model_type}模型...")
+    if model_type == 'random_forest':
+        # 随机森林：n_estimators可以作为epochs的替代
+        # 使用warm_start逐步增加树的数量，学习曲线与最终模型共用同一片森林；
+        # oob_score 使用袋外样本评估，n_jobs=-1 多核并行建树
+        n_estimators = min(max(epochs, 10), 300)  # 限制在合理范围内
+        model = RandomForestRegressor(
+            n_estimators=n_estimators, 
+            random_state=42, 
+            max_depth=min(10, max(3, n_rows // 2)) if n_rows >= 5 else 3,  # 根据数据量调整深度
+            min_samples_split=max(2, n_rows // 10) if n_rows >= 10 else 2,
+            warm_start=True,
+            oob_score=True,
+            n_jobs=-1
+        )
+    elif model_type == 'linear_regression':
+        model = LinearRegression()
+    elif model_type == 'svm':
+        # SVM不支持多输出回归，需要使用MultiOutputRegressor包装
+        if len(varying_targets) > 1:
+            model = MultiOutputRegressor(SVR(kernel='rbf', C=1.0, gamma='scale'))
+        else:
+            model = SVR(kernel='rbf', C=1.0, gamma='scale')
+    else:
+        # 默认使用随机森林
+        model = RandomForestRegressor(n_estimators=50, random_state=42, max_depth=5)
+    
+    print(f"📈 开始训练模型，训练集大小: {X_train.shape}, 测试集大小: {X_test.shape}")
+    
+    # 记录训练过程曲线数据
+    training_curves = {'epochs': [], 'train_loss': [], 'val_loss': [], 'train_r2': [], 'val_r2': []}
+    
+    if model_type == 'random_forest':
+        # 对于随机森林，记录不同树数量下的性能：每一步只新增树，不重新训练已有的树
+        import math
+        import warnings
         
-        # 检查目标变量的变化性
-        target_variation_check = {}
-        for col in target_columns:
-            std_val = valid_rows[col].std()
-            target_variation_check[col] = std_val
-            print(f"📊 目标变量 {col}: 标准差 = {std_val:.6f}")
+        def safe_float_temp(value, default=0.0):
+            if value is None or math.isnan(value) or math.isinf(value):
+                return default
+            return float(value)
         
-        # 过滤掉没有变化的目标变量
-        varying_targets = [col for col in target_columns if target_variation_check[col] > 1e-6]
+        n_estimators_total = model.get_params()['n_estimators']
+        step_size = max(1, n_estimators_total // 20)  # 最多记录20个点
+        y_train_flat = y_train.ravel() if y_train.shape[1] == 1 else y_train
+        training_curves['oob_loss'] = []
+        training_curves['oob_r2'] = []
+        
+        steps = list(range(step_size, n_estimators_total + 1, step_size))
+        if steps[-1] != n_estimators_total:
+            steps.append(n_estimators_total)
+        
+        for n_trees in steps:
+            model.set_params(n_estimators=n_trees)
+            with warnings.catch_warnings():
+                # 树数量较少时部分样本没有袋外预测，sklearn会给出警告
+                warnings.simplefilter('ignore', UserWarning)
+                model.fit(X_train, y_train_flat)
+            
+            # 计算训练和验证性能
+            train_pred = model.predict(X_train)
+            val_pred = model.predict(X_test)
+            
+            train_mse = mean_squared_error(y_train, train_pred)
+            val_mse = mean_squared_error(y_test, val_pred)
+            train_r2 = r2_score(y_train, train_pred)
+            val_r2 = r2_score(y_test, val_pred)
+            
+            # 袋外评估（忽略尚无袋外预测的样本）
+            oob_pred = np.asarray(model.oob_prediction_).reshape(len(y_train), -1)
+            oob_mask = ~np.isnan(oob_pred).any(axis=1)
+            if oob_mask.sum() >= 2:
+                oob_mse = mean_squared_error(y_train[oob_mask], oob_pred[oob_mask])
+                oob_r2 = r2_score(y_train[oob_mask], oob_pred[oob_mask])
+            else:
+                oob_mse, oob_r2 = float('nan'), float('nan')
+            
+            training_curves['epochs'].append(n_trees)
+            training_curves['train_loss'].append(safe_float_temp(train_mse))
+            training_curves['val_loss'].append(safe_float_temp(val_mse))
+            training_curves['train_r2'].append(safe_float_temp(train_r2))
+            training_curves['val_r2'].append(safe_float_temp(val_r2))
+            training_curves['oob_loss'].append(safe_float_temp(oob_mse))
+            training_curves['oob_r2'].append(safe_float_temp(oob_r2))
+            
+            if n_trees % (step_size * 5) == 0:
+                print(f"   树数量: {n_trees}, 训练MSE: {train_mse:.6f}, 验证MSE: {val_mse:.6f}, 验证R²: {val_r2:.4f}, 袋外R²: {oob_r2:.4f}")
         
-        if len(varying_targets) == 0:
-            return jsonify(format_response(False, message="目标变量没有变化，无法进行机器学习训练。请确保实际测量值有足够的差异性。")), 400
+        # 训练完成后关闭warm_start，之后的交叉验证克隆模型时从头训练
+        model.set_params(warm_start=False)
         
-        print(f"🎯 使用有变化的特征列: {varying_features}")
-        print(f"🎯 使用有变化的目标列: {varying_targets}")
+    elif model_type == 'linear_regression':
+        # 线性回归没有迭代过程，创建单点数据
+        model.fit(X_train, y_train)
+        train_pred = model.predict(X_train)
+        val_pred = model.predict(X_test)
         
-        # 更新特征列为有变化的列
-        actual_feature_columns = varying_features
+        train_mse = mean_squared_error(y_train, train_pred)
+        val_mse = mean_squared_error(y_test, val_pred)
+        train_r2 = r2_score(y_train, train_pred)
+        val_r2 = r2_score(y_test, val_pred)
         
-        X = valid_rows[actual_feature_columns].values
-        y = valid_rows[varying_targets].values
+        # 安全处理可能的NaN值
+        import math
+        def safe_float_lr(value, default=0.0):
+            if value is None or math.isnan(value) or math.isinf(value):
+                return default
+            return float(value)
         
-        # 更新列信息为实际使用的列
-        actual_target_columns = varying_targets
+        training_curves['epochs'] = [1]
+        training_curves['train_loss'] = [safe_float_lr(train_mse)]
+        training_curves['val_loss'] = [safe_float_lr(val_mse)]
+        training_curves['train_r2'] = [safe_float_lr(train_r2)]
+        training_curves['val_r2'] = [safe_float_lr(val_r2)]
         
-        # 检查数据质量和特征相关性
-        print("🔍 数据质量检查:")
-        print(f"   特征矩阵形状: {X.shape}")
-        print(f"   目标矩阵形状: {y.shape}")
+    else:  # SVM或其他模型
+        # 对于SVM，测试不同的C值
+        C_values = [0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0][:min(10, epochs // 10 + 3)]
         
-        # 简单的相关性检查
-        try:
-            import pandas as pd
-            combined_data = pd.DataFrame(X, columns=actual_feature_columns)
-            combined_data['target'] = y.flatten() if y.shape[1] == 1 else y.mean(axis=1)
-            
-            # 计算特征与目标的相关性
-            correlations = []
-            for i, feature_col in enumerate(actual_feature_columns):
-                corr = combined_data[feature_col].corr(combined_data['target'])
-                correlations.append(abs(corr))
-                print(f"   {feature_col} 与目标相关性: {corr:.4f}")
-            
-            max_corr = max(correlations) if correlations else 0
-            if max_corr < 0.1:
-                print(f"   ⚠️  警告：所有特征与目标的相关性都很低（最高: {max_corr:.4f}），模型效果可能不佳")
-                
-        except Exception as e:
-            print(f"   相关性检查失败: {e}")
-        
-        # 分割训练和测试集
-        if len(valid_rows) >= 10:
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
-        elif len(valid_rows) >= 5:
-            # 小数据集：至少保留1个样本作为测试集
-            test_samples = max(1, int(len(valid_rows) * test_size))
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_samples, random_state=42)
-            print(f"⚠️  小数据集检测，强制保留{test_samples}个测试样本以避免数据泄露")
-        else:
-            # 数据过少，仅使用交叉验证
-            X_train, y_train = X, y
-            X_test, y_test = X, y
-            print(f"⚠️  数据量过少({len(valid_rows)}个)，将主要依赖交叉验证进行评估")
-        
-        # 根据模型类型创建模型
-        print(f"📊 创建{model_type}模型...")
-        if model_type == 'random_forest':
-            # 随机森林：n_estimators可以作为epochs的替代
-            n_estimators = min(max(epochs, 10), 300)  # 限制在合理范围内
-            model = RandomForestRegressor(
-                n_estimators=n_estimators, 
-                random_state=42, 
-                max_depth=min(10, len(valid_rows) // 2),  # 根据数据量调整深度
-                min_samples_split=max(2, len(valid_rows) // 20)
-            )
-        elif model_type == 'linear_regression':
-            model = LinearRegression()
-        elif model_type == 'svm':
-            # SVM不支持多输出回归，需要使用MultiOutputRegressor包装
+        for i, C_val in enumerate(C_values):
             if len(varying_targets) > 1:
-                model = MultiOutputRegressor(SVR(kernel='rbf', C=1.0, gamma='scale'))
+                temp_model = MultiOutputRegressor(SVR(kernel='rbf', C=C_val, gamma='scale'))
             else:
-                model = SVR(kernel='rbf', C=1.0, gamma='scale')
-        else:
-            # 默认使用随机森林
-            model = RandomForestRegressor(n_estimators=50, random_state=42, max_depth=5)
-        
-        print(f"📈 开始训练模型，训练集大小: {X_train.shape}, 测试集大小: {X_test.shape}")
-        
-        # 记录训练过程曲线数据
-        training_curves = {'epochs': [], 'train_loss': [], 'val_loss': [], 'train_r2': [], 'val_r2': []}
-        
-        if model_type == 'random_forest':
-            # 对于随机森林，记录不同树数量下的性能
-            n_estimators_total = min(max(epochs, 10), 300)
-            step_size = max(1, n_estimators_total // 20)  # 最多记录20个点
-            
-            # 为小数据集优化参数
-            max_depth = min(10, max(3, len(valid_rows) // 2)) if len(valid_rows) >= 5 else 3
-            min_samples_split = max(2, len(valid_rows) // 10) if len(valid_rows) >= 10 else 2
+                temp_model = SVR(kernel='rbf', C=C_val, gamma='scale')
+            temp_model.fit(X_train, y_train)
             
-            for n_trees in range(step_size, n_estimators_total + 1, step_size):
-                # 创建临时模型
-                temp_model = RandomForestRegressor(
-                    n_estimators=n_trees,
-                    random_state=42,
-                    max_depth=max_depth,
-                    min_samples_split=min_samples_split
-                )
-                temp_model.fit(X_train, y_train)
-                
-                # 计算训练和验证性能
-                train_pred = temp_model.predict(X_train)
-                val_pred = temp_model.predict(X_test)
-                
-                train_mse = mean_squared_error(y_train, train_pred)
-                val_mse = mean_squared_error(y_test, val_pred)
-                train_r2 = r2_score(y_train, train_pred)
-                val_r2 = r2_score(y_test, val_pred)
-                
-                # 安全处理可能的NaN值
-                import math
-                def safe_float_temp(value, default=0.0):
-                    if value is None or math.isnan(value) or math.isinf(value):
-                        return default
-                    return float(value)
-                
-                training_curves['epochs'].append(n_trees)
-                training_curves['train_loss'].append(safe_float_temp(train_mse))
-                training_curves['val_loss'].append(safe_float_temp(val_mse))
-                training_curves['train_r2'].append(safe_float_temp(train_r2))
-                training_curves['val_r2'].append(safe_float_temp(val_r2))
-                
-                if n_trees % (step_size * 5) == 0:
-                    print(f"   树数量: {n_trees}, 训练MSE: {train_mse:.6f}, 验证MSE: {val_mse:.6f}, 验证R²: {val_r2:.4f}")
-            
-            # 使用最终模型
-            model.fit(X_train, y_train)
-            
-        elif model_type == 'linear_regression':
-            # 线性回归没有迭代过程，创建单点数据
-            model.fit(X_train, y_train)
-            train_pred = model.predict(X_train)
-            val_pred = model.predict(X_test)
+            train_pred = temp_model.predict(X_train)
+            val_pred = temp_model.predict(X_test)
             
             train_mse = mean_squared_error(y_train, train_pred)
             val_mse = mean_squared_error(y_test, val_pred)
@@ -3434,155 +3808,149 @@ def train_model():
             
             # 安全处理可能的NaN值
             import math
-            def safe_float_lr(value, default=0.0):
+            def safe_float_svm(value, default=0.0):
                 if value is None or math.isnan(value) or math.isinf(value):
                     return default
                 return float(value)
             
-            training_curves['epochs'] = [1]
-            training_curves['train_loss'] = [safe_float_lr(train_mse)]
-            training_curves['val_loss'] = [safe_float_lr(val_mse)]
-            training_curves['train_r2'] = [safe_float_lr(train_r2)]
-            training_curves['val_r2'] = [safe_float_lr(val_r2)]
-            
-        else:  # SVM或其他模型
-            # 对于SVM，测试不同的C值
-            C_values = [0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0][:min(10, epochs // 10 + 3)]
-            
-            for i, C_val in enumerate(C_values):
-                if len(varying_targets) > 1:
-                    temp_model = MultiOutputRegressor(SVR(kernel='rbf', C=C_val, gamma='scale'))
-                else:
-                    temp_model = SVR(kernel='rbf', C=C_val, gamma='scale')
-                temp_model.fit(X_train, y_train)
-                
-                train_pred = temp_model.predict(X_train)
-                val_pred = temp_model.predict(X_test)
-                
-                train_mse = mean_squared_error(y_train, train_pred)
-                val_mse = mean_squared_error(y_test, val_pred)
-                train_r2 = r2_score(y_train, train_pred)
-                val_r2 = r2_score(y_test, val_pred)
-                
-                # 安全处理可能的NaN值
-                import math
-                def safe_float_svm(value, default=0.0):
-                    if value is None or math.isnan(value) or math.isinf(value):
-                        return default
-                    return float(value)
-                
-                training_curves['epochs'].append(i + 1)
-                training_curves['train_loss'].append(safe_float_svm(train_mse))
-                training_curves['val_loss'].append(safe_float_svm(val_mse))
-                training_curves['train_r2'].append(safe_float_svm(train_r2))
-                training_curves['val_r2'].append(safe_float_svm(val_r2))
-            
-            # 使用最佳C值重新训练
-            model.fit(X_train, y_train)
-        
-        # 最终评估
-        y_pred = model.predict(X_test)
-        mse = mean_squared_error(y_test, y_pred)
-        r2 = r2_score(y_test, y_pred)
-        
-        # 处理可能的NaN值
-        import math
-        def safe_float(value, default=0.0):
-            """安全转换浮点数，处理NaN和无限值"""
-            if value is None or math.isnan(value) or math.isinf(value):
-                return default
-            return float(value)
-        
-        mse = safe_float(mse, 0.0)
-        r2 = safe_float(r2, 0.0)
-        
-        print(f"📊 训练曲线记录完成，共{len(training_curves['epochs'])}个数据点")
-        
-        # 交叉验证（如果启用）
-        cv_scores = None
-        cv_mean = None
-        cv_std = None
-        if enable_cross_validation and len(valid_rows) >= 5:
-            print("🔄 执行交叉验证...")
-            cv_scores = cross_val_score(model, X, y, cv=min(5, len(valid_rows) // 2), scoring='r2')
-            cv_mean = safe_float(cv_scores.mean(), 0.0)
-            cv_std = safe_float(cv_scores.std(), 0.0)
-            print(f"   交叉验证 R² 分数: {cv_mean:.4f} (+/- {cv_std * 2:.4f})")
-        
-        print(f"📊 模型评估结果:")
-        print(f"   MSE: {mse:.6f}")
-        print(f"   R² 分数: {r2:.4f}")
-        if cv_mean is not None:
-            print(f"   交叉验证 R²: {cv_mean:.4f}")
-        
-        # 如果R²为负数或过低，给出警告
-        if r2 < 0:
-            print("⚠️  警告: R²分数为负数，模型可能表现不佳")
-        elif r2 < 0.3:
-            print("⚠️  警告: R²分数较低，建议增加更多训练数据")
-        
-        # 根据模型类型保存到不同的文件
-        model_file_name = f'validation_model_{model_type}.pkl'
-        model_file = os.path.join(os.getcwd(), model_file_name)
-        model_info = {
-            'model': model,
-            'target_columns': actual_target_columns,  # 实际训练的目标列
-            'feature_columns': actual_feature_columns,  # 实际训练的特征列
-            'original_feature_columns': feature_columns,  # 原始特征列
-            'original_target_columns': target_columns,  # 原始目标列
-            'constant_features': constant_features if 'constant_features' in locals() else [],
-            'training_params': {
-                'epochs': epochs,
-                'test_size': test_size,
-                'model_type': model_type,
-                'enable_cross_validation': enable_cross_validation,
-                'training_logic': 'params_to_thickness'  # 标记新的训练逻辑
-            },
-            'data_stats': {
-                'training_samples': len(X_train),
-                'test_samples': len(X_test),
-                'feature_correlations': correlations if 'correlations' in locals() else [],
-                'max_correlation': max_corr if 'max_corr' in locals() else 0.0
-            }
-        }
-        joblib.dump(model_info, model_file)
-        
-        # 计算准确率（这里用R²分数作为准确率指标）
-        accuracy = max(0, r2)  # R²可能为负数，这里限制最小值为0
-        
-        # 使用交叉验证结果作为更可靠的准确率（如果有的话）
-        final_accuracy = cv_mean if cv_mean is not None and cv_mean > 0 else accuracy
-        
-        add_log_entry('success', 'validation', f'模型训练完成，类型: {model_type}, 准确率: {final_accuracy:.3f}')
-        
-        # 构建返回数据
-        result_data = {
-            'accuracy': final_accuracy,
+            training_curves['epochs'].append(i + 1)
+            training_curves['train_loss'].append(safe_float_svm(train_mse))
+            training_curves['val_loss'].append(safe_float_svm(val_mse))
+            training_curves['train_r2'].append(safe_float_svm(train_r2))
+            training_curves['val_r2'].append(safe_float_svm(val_r2))
+        
+        # 使用最佳C值重新训练
+        model.fit(X_train, y_train)
+    
+    # 最终评估
+    y_pred = model.predict(X_test)
+    mse = mean_squared_error(y_test, y_pred)
+    r2 = r2_score(y_test, y_pred)
+    
+    # 处理可能的NaN值
+    import math
+    def safe_float(value, default=0.0):
+        """安全转换浮点数，处理NaN和无限值"""
+        if value is None or math.isnan(value) or math.isinf(value):
+            return default
+        return float(value)
+    
+    mse = safe_float(mse, 0.0)
+    r2 = safe_float(r2, 0.0)
+    
+    print(f"📊 训练曲线记录完成，共{len(training_curves['epochs'])}个数据点")
+    
+    # 交叉验证（如果启用）
+    cv_scores = None
+    cv_mean = None
+    cv_std = None
+    if enable_cross_validation and n_rows >= 5:
+        print("🔄 执行交叉验证...")
+        cv_y = y.ravel() if y.shape[1] == 1 else y
+        cv_scores = cross_val_score(model, X, cv_y, cv=min(5, n_rows // 2), scoring='r2', n_jobs=-1)
+        cv_mean = safe_float(cv_scores.mean(), 0.0)
+        cv_std = safe_float(cv_scores.std(), 0.0)
+        print(f"   交叉验证 R² 分数: {cv_mean:.4f} (+/- {cv_std * 2:.4f})")
+    
+    print(f"📊 模型评估结果:")
+    print(f"   MSE: {mse:.6f}")
+    print(f"   R² 分数: {r2:.4f}")
+    if cv_mean is not None:
+        print(f"   交叉验证 R²: {cv_mean:.4f}")
+    
+    # 如果R²为负数或过低，给出警告
+    if r2 < 0:
+        print("⚠️  警告: R²分数为负数，模型可能表现不佳")
+    elif r2 < 0.3:
+        print("⚠️  警告: R²分数较低，建议增加更多训练数据")
+    
+    # 根据模型类型保存到不同的文件（validation_model_<model_type>.pkl）
+    model_info = {
+        'model': model,
+        'target_columns': actual_target_columns,  # 实际训练的目标列
+        'feature_columns': actual_feature_columns,  # 实际训练的特征列
+        'original_feature_columns': feature_columns,  # 原始特征列
+        'original_target_columns': target_columns,  # 原始目标列
+        'constant_features': constant_features,
+        'training_params': {
+            'epochs': epochs,
+            'test_size': test_size,
+            'model_type': model_type,
+            'enable_cross_validation': enable_cross_validation,
+            'training_logic': 'params_to_thickness'  # 标记新的训练逻辑
+        },
+        'metrics': {
             'mse': mse,
-            'r2_score': r2,
+            'r2': r2
+        },
+        'data_stats': {
             'training_samples': len(X_train),
             'test_samples': len(X_test),
-            'model_type': model_type,
-            'training_params': {
-                'epochs': epochs,
-                'test_size': test_size,
-                'model_type': model_type,
-                'enable_cross_validation': enable_cross_validation
-            },
-            'training_curves': training_curves  # 添加训练曲线数据
+            'feature_correlations': correlations,
+            'max_correlation': max_corr
         }
+    }
+    # 原子写入（临时文件 + os.replace）并让注册表立即加载新模型，后续预测无需再读取文件
+    get_ml_model_registry().save(model_type, model_info)
+    
+    # 计算准确率（这里用R²分数作为准确率指标）
+    accuracy = max(0, r2)  # R²可能为负数，这里限制最小值为0
+    
+    # 使用交叉验证结果作为更可靠的准确率（如果有的话）
+    final_accuracy = cv_mean if cv_mean is not None and cv_mean > 0 else accuracy
+    
+    add_log_entry('success', 'validation', f'模型训练完成，类型: {model_type}, 准确率: {final_accuracy:.3f}')
+    
+    # 构建返回数据
+    result_data = {
+        'accuracy': final_accuracy,
+        'mse': mse,
+        'r2_score': r2,
+        'training_samples': len(X_train),
+        'test_samples': len(X_test),
+        'model_type': model_type,
+        'training_params': {
+            'epochs': epochs,
+            'test_size': test_size,
+            'model_type': model_type,
+            'enable_cross_validation': enable_cross_validation
+        },
+        'training_curves': training_curves  # 添加训练曲线数据
+    }
+    
+    # 添加交叉验证结果（如果有）
+    if cv_mean is not None:
+        # 清理cv_scores中的NaN值
+        clean_cv_scores = [safe_float(score, 0.0) for score in cv_scores] if cv_scores is not None else []
+        result_data.update({
+            'cross_validation': {
+                'cv_mean': cv_mean,
+                'cv_std': cv_std,
+                'cv_scores': clean_cv_scores
+            }
+        })
+    
+    return result_data, None, None
+
+
+@api_bp.route('/train_model', methods=['POST'])
+def train_model():
+    """训练参数预测模型 - 支持训练参数配置"""
+    try:
+        # 获取请求数据
+        data = request.get_json() or {}
         
-        # 添加交叉验证结果（如果有）
-        if cv_mean is not None:
-            # 清理cv_scores中的NaN值
-            clean_cv_scores = [safe_float(score, 0.0) for score in cv_scores] if cv_scores is not None else []
-            result_data.update({
-                'cross_validation': {
-                    'cv_mean': cv_mean,
-                    'cv_std': cv_std,
-                    'cv_scores': clean_cv_scores
-                }
-            })
+        # 提取训练参数，设置默认值
+        epochs = data.get('epochs', 100)
+        test_size = data.get('test_size', 0.2)
+        model_type = data.get('model_type', 'random_forest')
+        enable_cross_validation = data.get('enable_cross_validation', True)
+        
+        print(f"🔧 收到训练参数: epochs={epochs}, test_size={test_size}, model_type={model_type}, cross_validation={enable_cross_validation}")
+        
+        result_data, error_msg, status = run_model_training(model_type, epochs, test_size, enable_cross_validation)
+        if error_msg:
+            return jsonify(format_response(False, message=error_msg)), status
         
         return jsonify(format_response(True, 
                                        message="模型训练完成",
@@ -3596,7 +3964,12 @@ def train_model():
 
 
 def build_complete_feature_vector(base_params, x, y, training_df=None):
-    """构建与训练时一致的完整特征向量"""
+    """
+    构建与训练时一致的完整特征向量
+    
+    training_df 可以是训练数据DataFrame，也可以是预先计算好的 {列名: 均值} 字典
+    （例如模型注册表缓存的特征均值），后者避免在优化迭代中反复求均值。
+    """
     
     # 获取基础参数
     I_avg = base_params[0] if len(base_params) > 0 else 0.5
@@ -3606,35 +3979,38 @@ def build_complete_feature_vector(base_params, x, y, training_df=None):
     
     # 如果有训练数据，使用训练数据的统计信息来填充其他特征
     # 否则使用合理的默认值
-    if training_df is not None and not training_df.empty:
+    feature_means = training_df
+    if feature_means is not None and not isinstance(feature_means, dict):
+        feature_means = {col: feature_means[col].mean() for col in feature_means.columns} if not feature_means.empty else None
+    if feature_means:
         # 从训练数据中获取典型值
-        substrate_ri = training_df['substrate_refractive_index'].mean() if 'substrate_refractive_index' in training_df.columns else 3.42
-        substrate_k = training_df['substrate_extinction_coefficient'].mean() if 'substrate_extinction_coefficient' in training_df.columns else 0.02  
-        substrate_thickness = training_df['substrate_thickness'].mean() if 'substrate_thickness' in training_df.columns else 525.0
-        substrate_thermal = training_df['substrate_thermal_conductivity'].mean() if 'substrate_thermal_conductivity' in training_df.columns else 150.0
-        
-        arc_ri = training_df['arc_refractive_index'].mean() if 'arc_refractive_index' in training_df.columns else 1.85
-        arc_k = training_df['arc_extinction_coefficient'].mean() if 'arc_extinction_coefficient' in training_df.columns else 0.001
-        arc_thickness = training_df['arc_thickness'].mean() if 'arc_thickness' in training_df.columns else 75.0
-        arc_reflectance = training_df['arc_reflectance'].mean() if 'arc_reflectance' in training_df.columns else 2.1
-        arc_efficiency = training_df['arc_anti_reflective_efficiency'].mean() if 'arc_anti_reflective_efficiency' in training_df.columns else 97.9
-        
-        wavelength = training_df['wavelength'].mean() if 'wavelength' in training_df.columns else 193.0
-        numerical_aperture = training_df['numerical_aperture'].mean() if 'numerical_aperture' in training_df.columns else 1.35
-        coherence_factor = training_df['coherence_factor'].mean() if 'coherence_factor' in training_df.columns else 0.7
-        
-        exposure_threshold = training_df['exposure_threshold'].mean() if 'exposure_threshold' in training_df.columns else 0.5
-        dose_uniformity = training_df['dose_uniformity'].mean() if 'dose_uniformity' in training_df.columns else 95.0
-        focus_offset = training_df['focus_offset'].mean() if 'focus_offset' in training_df.columns else 0.0
-        
-        learning_rate = training_df['learning_rate'].mean() if 'learning_rate' in training_df.columns else 0.01
-        batch_size = training_df['batch_size'].mean() if 'batch_size' in training_df.columns else 32
-        validation_split = training_df['validation_split'].mean() if 'validation_split' in training_df.columns else 0.2
-        regularization_factor = training_df['regularization_factor'].mean() if 'regularization_factor' in training_df.columns else 0.001
-        
-        historical_data_weight = training_df['historical_data_weight'].mean() if 'historical_data_weight' in training_df.columns else 0.8
-        expert_knowledge_factor = training_df['expert_knowledge_factor'].mean() if 'expert_knowledge_factor' in training_df.columns else 0.3
-        confidence_threshold = training_df['confidence_threshold'].mean() if 'confidence_threshold' in training_df.columns else 0.7
+        substrate_ri = feature_means.get('substrate_refractive_index', 3.42)
+        substrate_k = feature_means.get('substrate_extinction_coefficient', 0.02)  
+        substrate_thickness = feature_means.get('substrate_thickness', 525.0)
+        substrate_thermal = feature_means.get('substrate_thermal_conductivity', 150.0)
+        
+        arc_ri = feature_means.get('arc_refractive_index', 1.85)
+        arc_k = feature_means.get('arc_extinction_coefficient', 0.001)
+        arc_thickness = feature_means.get('arc_thickness', 75.0)
+        arc_reflectance = feature_means.get('arc_reflectance', 2.1)
+        arc_efficiency = feature_means.get('arc_anti_reflective_efficiency', 97.9)
+        
+        wavelength = feature_means.get('wavelength', 193.0)
+        numerical_aperture = feature_means.get('numerical_aperture', 1.35)
+        coherence_factor = feature_means.get('coherence_factor', 0.7)
+        
+        exposure_threshold = feature_means.get('exposure_threshold', 0.5)
+        dose_uniformity = feature_means.get('dose_uniformity', 95.0)
+        focus_offset = feature_means.get('focus_offset', 0.0)
+        
+        learning_rate = feature_means.get('learning_rate', 0.01)
+        batch_size = feature_means.get('batch_size', 32)
+        validation_split = feature_means.get('validation_split', 0.2)
+        regularization_factor = feature_means.get('regularization_factor', 0.001)
+        
+        historical_data_weight = feature_means.get('historical_data_weight', 0.8)
+        expert_knowledge_factor = feature_means.get('expert_knowledge_factor', 0.3)
+        confidence_threshold = feature_means.get('confidence_threshold', 0.7)
     else:
         # 使用默认值
         substrate_ri = 3.42
@@ -3707,102 +4083,74 @@ def predict_parameters():
         # 获取选择的模型类型，默认使用线性回归
         model_type = data.get('model_type', 'linear_regression')
         
+        # 坐标、目标厚度与反向搜索规模参数（候选数、起点数、返回解个数）
+        try:
+            x, y, target_thickness = float(x), float(y), float(target_thickness)
+        except (TypeError, ValueError):
+            return jsonify(format_response(False, message="x、y、target_thickness 必须为数值")), 400
+        try:
+            n_candidates = min(max(int(data.get('n_candidates', 2048)), 1), 20000)
+            n_starts = min(max(int(data.get('n_starts', 8)), 1), 64)
+            top_k = min(max(int(data.get('top_k', 5)), 1), 20)
+        except (TypeError, ValueError):
+            return jsonify(format_response(False, message="n_candidates、n_starts、top_k 必须为整数")), 400
+        
         print(f"🎯 收到参数预测请求: 位置({x}, {y}), 目标厚度: {target_thickness}, 模型类型: {model_type}")
         
-        import os
-        import joblib
         import numpy as np
         
-        # 根据模型类型检查对应的模型文件
-        model_file_name = f'validation_model_{model_type}.pkl'
-        model_file = os.path.join(os.getcwd(), model_file_name)
-        if not os.path.exists(model_file):
+        # 从注册表获取已加载的模型（不存在时返回None）
+        registry = get_ml_model_registry()
+        model_entry = registry.get(model_type)
+        if model_entry is None:
             return jsonify(format_response(False, message=f"选择的{model_type}模型不存在，请先训练该模型")), 404
         
-        # 加载模型信息
-        model_info = joblib.load(model_file)
-        
-        # 兼容旧版本模型文件
-        if isinstance(model_info, dict) and 'model' in model_info:
-            model = model_info['model']
-            target_columns = model_info.get('target_columns', ['I_avg', 'V', 'K', 't_exp'])
-            original_target_columns = model_info.get('original_target_columns', target_columns)
-            constant_targets = model_info.get('constant_targets', [])
-            constant_values = model_info.get('constant_values', {})
-            feature_columns = model_info.get('feature_columns', ['annotation_x', 'annotation_y', 'actual_value'])
-        else:
-            # 旧版本模型文件，直接是模型对象
-            model = model_info
-            target_columns = ['I_avg', 'V', 'K', 't_exp']  # 默认Dill参数
-            original_target_columns = target_columns
-            constant_targets = []
-            constant_values = {}
-            feature_columns = ['annotation_x', 'annotation_y', 'actual_value']
+        model_info = model_entry.model_info
+        # 有在线更新时使用修正后的模型（线性模型增量系数 / 最近邻残差修正）
+        model = get_online_model_updater().model_for(model_entry)
+        target_columns = model_entry.target_columns
+        original_target_columns = model_info.get('original_target_columns', target_columns)
+        constant_targets = model_info.get('constant_targets', [])
+        constant_values = model_info.get('constant_values', {})
+        feature_columns = model_entry.feature_columns
         
         print(f"🔍 加载的模型信息:")
         print(f"   目标列: {target_columns}")
         print(f"   特征列: {feature_columns}")
         
         # 检查模型的训练逻辑
-        training_logic = model_info.get('training_params', {}).get('training_logic', 'unknown')
+        training_logic = model_entry.training_logic
         print(f"   训练逻辑: {training_logic}")
+        search_result = None
         
         if training_logic == 'params_to_thickness':
             # 新的训练逻辑：从工艺参数预测厚度
             # 预测时需要反向求解：给定厚度和坐标，找到合适的工艺参数
             print("🔄 使用反向预测逻辑...")
             
-            # 由于这是一个反向问题，我们使用优化方法找到最佳参数
-            from scipy.optimize import minimize
-            import pandas as pd
+            # 由于这是一个反向问题，使用批量多起点搜索找到最佳参数：
+            # 拉丁超立方候选 + 并行坐标搜索，每轮只调用一次 model.predict
             
-            # 加载训练数据以获取参数范围
-            excel_file = os.path.join(os.getcwd(), 'validation_data.xlsx')
-            if os.path.exists(excel_file):
-                df = pd.read_excel(excel_file)
+            # 参数范围与特征均值由注册表按验证数据修订号缓存，无需读取训练数据
+            if get_validation_store().count() > 0:
+                feature_means = registry.feature_means()
                 
                 # 获取工艺参数的合理范围
-                param_ranges = {}
-                for param in ['I_avg', 'V', 'K', 't_exp']:
-                    if param in df.columns:
-                        param_ranges[param] = (df[param].min(), df[param].max())
-                    else:
-                        # 默认范围
-                        if param == 'I_avg':
-                            param_ranges[param] = (0.1, 10.0)
-                        elif param == 'V':
-                            param_ranges[param] = (1.0, 50.0)
-                        elif param == 'K':
-                            param_ranges[param] = (0.01, 1.0)
-                        elif param == 't_exp':
-                            param_ranges[param] = (0.1, 10.0)
+                param_ranges = registry.param_ranges()
                 
                 print(f"   参数范围: {param_ranges}")
                 
-                # 定义目标函数：最小化预测厚度与目标厚度的差异
-                def objective(params):
-                    # 构造完整的特征向量，与训练时一致
-                    features = build_complete_feature_vector(params, x, y, df)
-                    predicted_thickness = model.predict(features)[0]
-                    return (predicted_thickness - target_thickness) ** 2
-                
-                # 初始猜测（使用参数范围的中点）
-                initial_guess = [(param_ranges[param][0] + param_ranges[param][1]) / 2 
-                               for param in ['I_avg', 'V', 'K', 't_exp']]
-                
-                # 设置边界
-                bounds = [param_ranges[param] for param in ['I_avg', 'V', 'K', 't_exp']]
-                
-                # 优化求解
-                result = minimize(objective, initial_guess, bounds=bounds, method='L-BFGS-B')
+                searcher = InverseDesignSearch(
+                    model, feature_columns, param_ranges, feature_means,
+                    n_candidates=n_candidates,
+                    n_starts=n_starts
+                )
+                search_result = searcher.search(x, y, target_thickness, top_k=top_k)
                 
-                if result.success:
-                    predictions = result.x
-                    print(f"📊 优化预测结果: {predictions}")
-                else:
-                    # 如果优化失败，使用初始猜测
-                    predictions = np.array(initial_guess)
-                    print(f"⚠️ 优化失败，使用初始猜测: {predictions}")
+                best = search_result['solutions'][0]
+                predictions = np.array([best['parameters'][param] for param in ['I_avg', 'V', 'K', 't_exp']])
+                print(f"📊 批量搜索预测结果: {predictions}, 预测厚度: {best['predicted_thickness']:.4f} "
+                      f"(评估 {search_result['n_evaluations']} 个候选, {search_result['n_predict_calls']} 次predict)")
             else:
                 # 如果无法加载数据，使用默认值
                 predictions = np.array([1.0, 10.0, 0.1, 1.0])  # 默认工艺参数
@@ -3851,8 +4199,9 @@ def predict_parameters():
         # 构建基础预测参数（机器学习模型预测的参数）
         ml_predicted_params = {}
         
-        # 添加预测的参数
-        for i, param_name in enumerate(target_columns):
+        # 添加预测的参数（反向预测时，预测结果对应的是工艺参数而非模型目标列）
+        predicted_param_names = ['I_avg', 'V', 'K', 't_exp'] if training_logic == 'params_to_thickness' else target_columns
+        for i, param_name in enumerate(predicted_param_names):
             if i < len(predictions):
                 ml_predicted_params[param_name] = safe_float_predict(float(predictions[i]), 0.0)
         
@@ -3930,7 +4279,9 @@ def predict_parameters():
                                            'predicted_parameters': complete_params,
                                            'ml_predictions': ml_predicted_params,
                                            'target_position': {'x': x, 'y': y},
-                                           'target_thickness': target_thickness
+                                           'target_thickness': target_thickness,
+                                           'solutions': search_result['solutions'] if search_result else [],
+                                           'search': {k: v for k, v in search_result.items() if k != 'solutions'} if search_result else None
                                        }))
         
     except Exception as e:
@@ -3940,28 +4291,32 @@ def predict_parameters():
         return jsonify(format_response(False, message=error_msg)), 500
 
 
+@api_bp.route('/ml_models', methods=['GET'])
+def get_ml_models():
+    """获取已加载的机器学习模型版本信息（reload=true 时强制重新加载）"""
+    try:
+        registry = get_ml_model_registry()
+        if request.args.get('reload', 'false').lower() in ('1', 'true', 'yes'):
+            for model_type in ML_MODEL_TYPES:
+                if registry.exists(model_type):
+                    registry.reload(model_type)
+        return jsonify(format_response(True, data={
+            'models': registry.versions(),
+            'online_updates': get_online_model_updater().status()
+        }))
+    except Exception as e:
+        error_msg = f"获取模型信息失败: {str(e)}"
+        print(f"Error: {error_msg}")
+        return jsonify(format_response(False, message=error_msg)), 500
+
+
 @api_bp.route('/validation_stats', methods=['GET'])
 def get_validation_stats():
     """获取验证数据统计信息"""
     try:
-        # 检查Excel支持（如果文件存在的话）
-        try:
-            import openpyxl
-        except ImportError:
-            # 对于统计信息，如果Excel库不存在，返回基本信息即可
-            return jsonify(format_response(True, data={
-                'data_file_exists': False,
-                'model_file_exists': False,
-                'total_records': 0,
-                'unique_sessions': 0,
-                'excel_support': False,
-                'message': 'Excel支持库(openpyxl)未安装'
-            }))
-            
-        import pandas as pd
         import os
         
-        excel_file = os.path.join(os.getcwd(), 'validation_data.xlsx')
+        validation_store = get_validation_store()
         
         # 检查三种不同模型文件的存在状态
         model_types = ['linear_regression', 'random_forest', 'svm']
@@ -3971,19 +4326,15 @@ def get_validation_stats():
             model_file = os.path.join(os.getcwd(), f'validation_model_{model_type}.pkl')
             model_files_status[model_type] = os.path.exists(model_file)
         
+        total_records = validation_store.count()
         stats = {
-            'data_file_exists': os.path.exists(excel_file),
+            'data_file_exists': total_records > 0,
             'model_files_status': model_files_status,
             'available_models': [k for k, v in model_files_status.items() if v],
-            'total_records': 0,
-            'unique_sessions': 0
+            'total_records': total_records,
+            'unique_sessions': validation_store.unique_sessions() if total_records > 0 else 0
         }
         
-        if stats['data_file_exists']:
-            df = pd.read_excel(excel_file)
-            stats['total_records'] = len(df)
-            stats['unique_sessions'] = df['timestamp'].nunique() if 'timestamp' in df.columns else 0
-        
         return jsonify(format_response(True, data=stats))
         
     except Exception as e:
@@ -3995,17 +4346,8 @@ def get_validation_stats():
 
 @api_bp.route('/get_validation_records', methods=['GET'])
 def get_validation_records():
-    """获取Excel文件中的验证记录"""
+    """分页获取验证记录（搜索、排序、分页与统计均在SQL中完成）"""
     try:
-        # 检查Excel支持
-        try:
-            import openpyxl
-        except ImportError:
-            return jsonify(format_response(False, message="Excel支持库(openpyxl)未安装，请运行: pip install openpyxl")), 500
-            
-        import pandas as pd
-        import os
-        
         # 获取请求参数
         page = request.args.get('page', 1, type=int)
         page_size = request.args.get('page_size', 50, type=int)
@@ -4013,17 +4355,11 @@ def get_validation_records():
         sort_by = request.args.get('sort_by', 'timestamp', type=str)
         sort_order = request.args.get('sort_order', 'desc', type=str)
         
-        # 检查Excel文件是否存在
-        excel_file = os.path.join(os.getcwd(), 'validation_data.xlsx')
-        if not os.path.exists(excel_file):
-            return jsonify(format_response(False, message="验证数据文件不存在，请先进行一些验证操作")), 404
-        
-        # 读取Excel数据
-        df = pd.read_excel(excel_file)
-        
-        if df.empty:
+        validation_store = get_validation_store()
+        if validation_store.count() == 0:
             return jsonify(format_response(True, data={
                 'records': [],
+                'record_ids': [],
                 'total_count': 0,
                 'page': page,
                 'page_size': page_size,
@@ -4036,98 +4372,27 @@ def get_validation_records():
                 }
             }))
         
-        # 数据清洗和格式化
-        df = df.fillna('')  # 填充空值
-        
-        # 如果有搜索条件，进行过滤
-        if search_term:
-            search_cols = ['model_type', 'x_coord', 'simulated_value', 'actual_value']
-            search_condition = False
-            for col in search_cols:
-                if col in df.columns:
-                    search_condition |= df[col].astype(str).str.contains(search_term, case=False, na=False)
-            df = df[search_condition]
-        
-        # 计算统计信息
-        total_count = len(df)
-        
-        # 排序
-        if sort_by in df.columns:
-            ascending = (sort_order == 'asc')
-            df = df.sort_values(by=sort_by, ascending=ascending)
-        
-        # 分页
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        paginated_df = df.iloc[start_idx:end_idx]
-        
-        # 转换为字典列表
-        records = []
-        for index, row in paginated_df.iterrows():
-            record = {}
-            for col in df.columns:
-                value = row[col]
-                # 处理NaN和特殊数值
-                if pd.isna(value):
-                    record[col] = ''
-                elif isinstance(value, (int, float)):
-                    if pd.isna(value):
-                        record[col] = ''
-                    else:
-                        record[col] = float(value) if value != int(value) else int(value)
-                else:
-                    record[col] = str(value)
-            records.append(record)
+        result = validation_store.query_page(
+            page=page,
+            page_size=page_size,
+            search_term=search_term,
+            sort_by=sort_by,
+            sort_order=sort_order
+        )
+        total_count = result['total_count']
         
         # 计算总页数
         total_pages = (total_count + page_size - 1) // page_size
         
-        # 计算统计信息
-        statistics = {}
-        if total_count > 0:
-            # 基本统计
-            statistics['total_records'] = total_count
-            
-            # 准确性统计
-            if 'simulated_value' in df.columns and 'actual_value' in df.columns:
-                sim_vals = pd.to_numeric(df['simulated_value'], errors='coerce').dropna()
-                act_vals = pd.to_numeric(df['actual_value'], errors='coerce').dropna()
-                if len(sim_vals) > 0 and len(act_vals) > 0:
-                    # 计算平均相对误差
-                    relative_errors = abs((sim_vals - act_vals) / act_vals) * 100
-                    avg_accuracy = max(0, 100 - relative_errors.mean())
-                    statistics['avg_accuracy'] = round(avg_accuracy, 2)
-                    statistics['avg_error'] = round(relative_errors.mean(), 2)
-                    statistics['max_error'] = round(relative_errors.max(), 2)
-                    statistics['min_error'] = round(relative_errors.min(), 2)
-                else:
-                    statistics['avg_accuracy'] = 0
-                    statistics['avg_error'] = 0
-                    statistics['max_error'] = 0
-                    statistics['min_error'] = 0
-            
-            # 模型类型统计
-            if 'model_type' in df.columns:
-                model_counts = df['model_type'].value_counts().to_dict()
-                statistics['model_types'] = [{'type': k, 'count': v} for k, v in model_counts.items()]
-            
-            # 日期范围统计
-            if 'timestamp' in df.columns:
-                timestamps = pd.to_datetime(df['timestamp'], errors='coerce').dropna()
-                if len(timestamps) > 0:
-                    statistics['date_range'] = {
-                        'earliest': timestamps.min().strftime('%Y-%m-%d %H:%M:%S'),
-                        'latest': timestamps.max().strftime('%Y-%m-%d %H:%M:%S')
-                    }
-        
         result_data = {
-            'records': records,
+            'records': result['records'],
+            'record_ids': result['record_ids'],  # 与records一一对应，用于删除记录
             'total_count': total_count,
             'page': page,
             'page_size': page_size,
             'total_pages': total_pages,
-            'statistics': statistics,
-            'columns': list(df.columns)
+            'statistics': validation_store.statistics(search_term),
+            'columns': result['columns']
         }
         
         add_log_entry('info', 'validation', f"成功获取验证记录，共{total_count}条记录，第{page}页")
@@ -4143,42 +4408,32 @@ def get_validation_records():
 
 @api_bp.route('/delete_validation_record', methods=['POST'])
 def delete_validation_record():
-    """删除指定的验证记录"""
+    """
+    删除指定的验证记录
+    
+    优先使用 record_id（记录主键）；兼容旧参数 record_index（按保存顺序的位置，从0开始）。
+    """
     try:
-        # 检查Excel支持
-        try:
-            import openpyxl
-        except ImportError:
-            return jsonify(format_response(False, message="Excel支持库(openpyxl)未安装，无法删除记录。请运行: pip install openpyxl")), 500
-            
-        import pandas as pd
-        import os
-        
         data = request.get_json()
-        if not data or 'record_index' not in data:
+        if not data or ('record_id' not in data and 'record_index' not in data):
             return jsonify(format_response(False, message="缺少记录索引参数")), 400
         
-        record_index = data['record_index']
-        
-        # 检查Excel文件是否存在
-        excel_file = os.path.join(os.getcwd(), 'validation_data.xlsx')
-        if not os.path.exists(excel_file):
-            return jsonify(format_response(False, message="验证数据文件不存在")), 404
-        
-        # 读取Excel数据
-        df = pd.read_excel(excel_file)
-        
-        if df.empty or record_index < 0 or record_index >= len(df):
+        validation_store = get_validation_store()
+        try:
+            if data.get('record_id') is not None:
+                record_id = int(data['record_id'])
+                record_label = f"ID为{record_id}的"
+            else:
+                record_id = validation_store.id_at_position(int(data['record_index']))
+                record_label = f"第{data['record_index']}条"
+        except (TypeError, ValueError):
             return jsonify(format_response(False, message="无效的记录索引")), 400
         
-        # 删除指定行
-        df = df.drop(df.index[record_index])
-        
-        # 保存更新后的数据
-        df.to_excel(excel_file, index=False)
+        if record_id is None or not validation_store.delete_by_id(record_id):
+            return jsonify(format_response(False, message="无效的记录索引")), 400
         
-        add_log_entry('info', 'validation', f"成功删除第{record_index}条验证记录")
-        return jsonify(format_response(True, message=f"成功删除记录，剩余{len(df)}条记录"))
+        add_log_entry('info', 'validation', f"成功删除{record_label}验证记录")
+        return jsonify(format_response(True, message=f"成功删除记录，剩余{validation_store.count()}条记录"))
         
     except Exception as e:
         error_msg = f"删除验证记录失败: {str(e)}"
@@ -4187,6 +4442,73 @@ def delete_validation_record():
         return jsonify(format_response(False, message=error_msg)), 500
 
 
+@api_bp.route('/validation_data/export', methods=['GET'])
+def export_validation_data():
+    """将全部验证记录导出为xlsx文件下载"""
+    try:
+        try:
+            import openpyxl
+        except ImportError:
+            return jsonify(format_response(False, message="Excel支持库(openpyxl)未安装，无法导出数据。请运行: pip install openpyxl")), 500
+        
+        buffer = BytesIO()
+        count = get_validation_store().export_xlsx(buffer)
+        buffer.seek(0)
+        add_log_entry('info', 'validation', f"导出验证记录{count}条")
+        return send_file(
+            buffer,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            as_attachment=True,
+            download_name='validation_data.xlsx'
+        )
+    except Exception as e:
+        error_msg = f"导出验证数据失败: {str(e)}"
+        print(f"Error: {error_msg}")
+        add_log_entry('error', 'validation', error_msg)
+        return jsonify(format_response(False, message=error_msg)), 500
+
+
+@api_bp.route('/validation_data/import', methods=['POST'])
+def import_validation_data():
+    """
+    从xlsx导入验证记录
+    
+    支持multipart上传字段 file；未上传文件时导入工作目录下的 validation_data.xlsx。
+    参数 replace=true 时先清空已有记录。
+    """
+    try:
+        try:
+            import openpyxl
+        except ImportError:
+            return jsonify(format_response(False, message="Excel支持库(openpyxl)未安装，无法导入数据。请运行: pip install openpyxl")), 500
+        
+        replace = str(request.values.get('replace', 'false')).lower() in ('1', 'true', 'yes')
+        upload = request.files.get('file')
+        if upload is not None and upload.filename:
+            source = upload.stream
+        else:
+            source = os.path.join(os.getcwd(), 'validation_data.xlsx')
+            if not os.path.exists(source):
+                return jsonify(format_response(False, message="验证数据文件不存在")), 404
+        
+        validation_store = get_validation_store()
+        imported = validation_store.import_xlsx(source, replace=replace)
+        total_records = validation_store.count()
+        
+        add_log_entry('success', 'validation', f"导入验证记录{imported}条，当前共{total_records}条")
+        return jsonify(format_response(True, message="验证数据导入成功",
+                                       data={'imported_records': imported, 'total_records': total_records}))
+    except ValueError as e:
+        error_msg = f"导入验证数据失败: {str(e)}"
+        add_log_entry('error', 'validation', error_msg)
+        return jsonify(format_response(False, message=error_msg)), 400
+    except Exception as e:
+        error_msg = f"导入验证数据失败: {str(e)}"
+        print(f"Error: {error_msg}")
+        add_log_entry('error', 'validation', error_msg)
+        return jsonify(format_response(False, message=error_msg)), 500
+
+
 @api_bp.route('/smart_optimize_exposure', methods=['POST'])
 def smart_optimize_exposure():
     """基于验证数据的智能优化曝光时间算法"""
@@ -4259,8 +4581,8 @@ def smart_optimize_exposure():
 
 def get_latest_parameters():
     """获取最新的计算参数"""
-    global latest_calculation_result
     try:
+        latest_calculation_result = get_latest_calculation_result()
         if latest_calculation_result and latest_calculation_result.get('parameters'):
             return latest_calculation_result.get('parameters')
         return None
@@ -4429,42 +4751,34 @@ def calculate_exposure_times_simple(target_x, target_y, target_thickness, curren
 def get_validation_data_for_optimization():
     """获取验证数据供优化选择使用"""
     try:
-        import pandas as pd
-        import os
-        
-        # 检查Excel文件是否存在
-        excel_file = os.path.join(os.getcwd(), 'validation_data.xlsx')
-        if not os.path.exists(excel_file):
-            return jsonify(format_response(False, message="验证数据文件不存在")), 404
+        validation_store = get_validation_store()
+        rows = validation_store.fetch(['annotation_x', 'annotation_y', 'simulated_value', 'actual_value', 'annotation_timestamp'])
         
-        # 读取验证数据
-        df = pd.read_excel(excel_file)
-        
-        if df.empty:
+        if not rows:
             return jsonify(format_response(False, message="验证数据为空")), 404
         
-        # 格式化数据供前端使用
+        # 格式化数据供前端使用（index 为记录ID，优化请求中原样传回）
         validation_records = []
-        for index, row in df.iterrows():
+        for record_id, row in rows:
             try:
-                simulated_val = float(row.get('simulated_value', 0))
-                actual_val = float(row.get('actual_value', 0))
+                simulated_val = float(row.get('simulated_value') or 0)
+                actual_val = float(row.get('actual_value') or 0)
                 deviation = actual_val - simulated_val
                 
                 record = {
-                    'index': index,
-                    'position_x': float(row.get('annotation_x', 0)),
-                    'position_y': float(row.get('annotation_y', 0)),
+                    'index': record_id,
+                    'position_x': float(row.get('annotation_x') or 0),
+                    'position_y': float(row.get('annotation_y') or 0),
                     'simulated_value': round(simulated_val, 4),
                     'actual_value': round(actual_val, 4),
                     'deviation': round(deviation, 4),
                     'deviation_percentage': round((deviation / simulated_val * 100) if simulated_val != 0 else 0, 1),
-                    'timestamp': str(row.get('annotation_timestamp', '')),
+                    'timestamp': str(row.get('annotation_timestamp') or ''),
                     'analysis': get_deviation_analysis(deviation)
                 }
                 validation_records.append(record)
             except (ValueError, TypeError) as e:
-                print(f"跳过无效记录 {index}: {e}")
+                print(f"跳过无效记录 {record_id}: {e}")
                 continue
         
         print(f"📊 返回{len(validation_records)}条验证记录供选择")
@@ -4504,28 +4818,27 @@ def calculate_experience_based_exposure_times(target_x, target_y, target_thickne
         return calculate_optimal_exposure_times(target_x, target_y, target_thickness, current_params)
     
     try:
-        # 读取验证数据
-        excel_file = os.path.join(os.getcwd(), 'validation_data.xlsx')
-        df = pd.read_excel(excel_file)
+        # 按记录ID读取选中的验证记录
+        rows = get_validation_store().fetch(
+            ['annotation_x', 'annotation_y', 'simulated_value', 'actual_value'], ids=selected_indices
+        )
         
         # 获取选中的记录
         selected_records = []
-        for idx in selected_indices:
-            if 0 <= idx < len(df):
-                row = df.iloc[idx]
-                try:
-                    simulated_val = float(row.get('simulated_value', 0))
-                    actual_val = float(row.get('actual_value', 0))
-                    if simulated_val > 0:  # 确保有效数据
-                        selected_records.append({
-                            'simulated': simulated_val,
-                            'actual': actual_val,
-                            'deviation': actual_val - simulated_val,
-                            'position_x': float(row.get('annotation_x', 0)),
-                            'position_y': float(row.get('annotation_y', 0))
-                        })
-                except (ValueError, TypeError):
-                    continue
+        for record_id, row in rows:
+            try:
+                simulated_val = float(row.get('simulated_value') or 0)
+                actual_val = float(row.get('actual_value') or 0)
+                if simulated_val > 0:  # 确保有效数据
+                    selected_records.append({
+                        'simulated': simulated_val,
+                        'actual': actual_val,
+                        'deviation': actual_val - simulated_val,
+                        'position_x': float(row.get('annotation_x') or 0),
+                        'position_y': float(row.get('annotation_y') or 0)
+                    })
+            except (ValueError, TypeError):
+                continue
         
         if not selected_records:
             print("⚠️ 选择的记录无效，使用传统优化算法")
@@ -4712,6 +5025,162 @@ def generate_experience_summary(selected_records, weighted_deviation):
     }
 
 
+# 照片句柄缓存（按内容哈希登记的已解码图像，进程内共享）
+_photo_image_store = None
+_photo_image_store_lock = threading.Lock()
+
+# 单次请求最多提取的剖面条数
+MAX_PHOTO_PROFILES = 64
+
+def get_photo_image_store():
+    """获取进程内共享的照片句柄缓存"""
+    global _photo_image_store
+    if _photo_image_store is None:
+        with _photo_image_store_lock:
+            if _photo_image_store is None:
+                max_mb = float(os.environ.get('DILL_PHOTO_CACHE_MB', 256))
+                _photo_image_store = PhotoImageStore(max_bytes=int(max_mb * 1024 * 1024))
+    return _photo_image_store
+
+def resolve_photo_image(data):
+    """
+    根据请求中的 image_id 或 image_data 获取照片句柄
+
+    返回:
+        (PhotoImage, None) 或 (None, 错误响应)
+    """
+    store = get_photo_image_store()
+    image_id = data.get('image_id')
+    if image_id and not data.get('image_data'):
+        photo = store.get(image_id)
+        if photo is None:
+            add_error_log('system', f'照片句柄不存在或已过期: {image_id}')
+            return None, (jsonify(format_response(False, data={'image_id': image_id, 'expired': True},
+                                                  message="照片句柄不存在或已过期，请重新上传图像")), 404)
+        add_progress_log('system', f'使用已缓存的照片句柄: {image_id} ({photo.width}x{photo.height})')
+        return photo, None
+
+    try:
+        photo, cached = store.put(decode_image_data(data['image_data']))
+    except Exception as e:
+        add_error_log('system', f'图像解码失败: {str(e)}')
+        return None, (jsonify(format_response(False, message=f"图像解码失败: {str(e)}")), 400)
+    add_progress_log('system', f'{"命中已缓存图像" if cached else "成功解码图像"}: {photo.width}x{photo.height} pixels')
+    return photo, None
+
+@api_bp.route('/photo-images', methods=['POST'])
+def upload_photo_image():
+    """
+    上传照片并返回句柄（JSON 的 image_data 或 multipart 的 image 文件）
+
+    之后的 /api/process-photo 请求只需传 image_id，不必重复上传和解码。
+    """
+    try:
+        store = get_photo_image_store()
+        if 'image' in request.files:
+            photo, cached = store.put(request.files['image'].read())
+        else:
+            data = request.get_json(silent=True) or {}
+            if not data.get('image_data'):
+                return jsonify(format_response(False, message="缺少图像数据")), 400
+            photo, cached = store.put(decode_image_data(data['image_data']))
+        return jsonify(format_response(True, data=dict(photo.describe(), cached=cached)))
+    except Exception as e:
+        add_error_log('system', f'照片上传失败: {str(e)}')
+        return jsonify(format_response(False, message=f"照片上传失败: {str(e)}")), 400
+
+@api_bp.route('/photo-images/<image_id>', methods=['GET'])
+def get_photo_image_info(image_id):
+    """照片句柄信息（尺寸、预览金字塔各级尺寸）"""
+    photo = get_photo_image_store().get(image_id)
+    if photo is None:
+        return jsonify(format_response(False, message="照片句柄不存在或已过期")), 404
+    return jsonify(format_response(True, data=photo.describe()))
+
+@api_bp.route('/photo-images/<image_id>/preview', methods=['GET'])
+def get_photo_image_preview(image_id):
+    """
+    灰度预览图（PNG）
+
+    参数:
+        level: 金字塔级别，0为原尺寸，每级边长减半；超出时取最小一级
+    """
+    from PIL import Image
+    photo = get_photo_image_store().get(image_id)
+    if photo is None:
+        return jsonify(format_response(False, message="照片句柄不存在或已过期")), 404
+    pyramid = photo.pyramid()
+    try:
+        level = min(max(int(request.args.get('level', len(pyramid) - 1)), 0), len(pyramid) - 1)
+    except (TypeError, ValueError):
+        return jsonify(format_response(False, message="level 必须为整数")), 400
+    buffer = BytesIO()
+    Image.fromarray(np.ascontiguousarray(pyramid[level])).save(buffer, format='PNG')
+    response = Response(buffer.getvalue(), mimetype='image/png')
+    # 句柄由内容哈希决定，内容不会变化
+    response.headers['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+def extract_profile_series(grayscale_array, profile_specs, scale_factor, smoothing_method='none', order=1):
+    """
+    按请求中的剖面参数一次提取多条剖面，并转换为前端使用的 x/intensity 序列
+
+    x 为以剖面中点为0的物理坐标（沿剖面距离 × scale_factor）
+    """
+    if not isinstance(profile_specs, list) or len(profile_specs) > MAX_PHOTO_PROFILES:
+        raise ValueError(f"profiles 必须是不超过 {MAX_PHOTO_PROFILES} 项的列表")
+    series = []
+    for profile in extract_profiles(grayscale_array, profile_specs, order=order):
+        intensity = profile['intensity'].tolist()
+        if smoothing_method != 'none':
+            intensity = apply_smoothing(intensity, smoothing_method)
+        series.append({
+            'x': ((profile['distance'] - profile['length'] / 2.0) * scale_factor).tolist(),
+            'intensity': intensity,
+            'intensity_std': profile['intensity_std'].tolist(),
+            'start': profile['start'],
+            'end': profile['end'],
+            'length_px': profile['length'],
+            'band_width': profile['band_width'],
+            'num_points': profile['num_points']
+        })
+    return series
+
+@api_bp.route('/photo-images/<image_id>/profiles', methods=['POST'])
+def photo_image_profiles(image_id):
+    """
+    在已上传的照片上提取多条剖面（任意角度、亚像素插值、条带平均）
+
+    请求体:
+        profiles: [{angle, center, length, start, end, band_width, num_points}, ...]
+        grayscale_method: 灰度方法，默认 weighted
+        scale_factor: 1像素对应的物理长度，默认1
+        smoothing_method: none / gaussian / moving-average
+        order: 插值阶数（1 双线性，3 三次样条），默认1
+    """
+    try:
+        photo = get_photo_image_store().get(image_id)
+        if photo is None:
+            return jsonify(format_response(False, message="图像句柄不存在或已过期，请重新上传")), 404
+        data = request.get_json() or {}
+        profile_specs = data.get('profiles')
+        if not profile_specs:
+            return jsonify(format_response(False, message="缺少剖面参数 profiles")), 400
+        order = int(data.get('order', 1))
+        if order not in (0, 1, 3):
+            return jsonify(format_response(False, message="order 只支持 0、1、3")), 400
+
+        grayscale_array = photo.grayscale(data.get('grayscale_method', 'weighted'))
+        profiles = extract_profile_series(grayscale_array, profile_specs, float(data.get('scale_factor', 1.0)),
+                                          data.get('smoothing_method', 'none'), order=order)
+        return jsonify(format_response(True, data={'image_id': photo.image_id, 'profiles': profiles}))
+    except ValueError as e:
+        return jsonify(format_response(False, message=str(e))), 400
+    except Exception as e:
+        add_error_log('system', f'剖面提取失败: {str(e)}')
+        traceback.print_exc()
+        return jsonify(format_response(False, message=f"剖面提取失败: {str(e)}")), 500
+
 @api_bp.route('/process-photo', methods=['POST'])
 def process_photo():
     """
@@ -4729,12 +5198,11 @@ def process_photo():
         # 获取请求数据
         data = request.get_json()
         
-        if not data or 'image_data' not in data:
+        if not data or ('image_data' not in data and 'image_id' not in data):
             add_error_log('system', '缺少图像数据')
             return jsonify(format_response(False, message="缺少图像数据")), 400
         
         # 获取处理参数
-        image_data = data['image_data']
         grayscale_method = data.get('grayscale_method', 'weighted')
         vector_direction = data.get('vector_direction', 'horizontal')
         coordinate_unit = data.get('coordinate_unit', 'mm')
@@ -4743,6 +5211,9 @@ def process_photo():
         crop_mode = data.get('crop_mode', 'none')
         max_intensity_value = float(data.get('max_intensity_value', 1.0))
         crop_params = data.get('crop_params', None)
+        band_width = int(data.get('band_width', 1))
+        line_angle = float(data.get('line_angle', 0.0))
+        profile_specs = data.get('profiles') or []
         
         # 获取光强值类型设置（新增）
         intensity_value_type = data.get('intensity_value_type', 'max')
@@ -4753,67 +5224,44 @@ def process_photo():
         
         add_progress_log('system', f'处理参数: 灰度方法={grayscale_method}, 方向={vector_direction}')
         
-        # 解码base64图像数据
-        try:
-            # 移除data:image前缀
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
-            
-            # 解码base64
-            image_bytes = base64.b64decode(image_data)
-            
-            # 打开图像
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            add_progress_log('system', f'成功解码图像: {image.size[0]}x{image.size[1]} pixels')
-            
-        except Exception as e:
-            add_error_log('system', f'图像解码失败: {str(e)}')
-            return jsonify(format_response(False, message=f"图像解码失败: {str(e)}")), 400
+        # 获取图像句柄：优先使用已上传的 image_id，否则解码 image_data 并登记（同一内容只解码一次）
+        photo, error_response = resolve_photo_image(data)
+        if error_response is not None:
+            return error_response
         
-        # 转换为RGB模式（如果不是的话）
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-            add_progress_log('system', f'图像模式转换为RGB')
+        # 彩色转灰度转换（每个句柄每种方法只计算一次）
+        grayscale_array = photo.grayscale(grayscale_method)
+        add_progress_log('system', f'灰度转换完成，方法: {grayscale_method}')
         
-        # 图像裁剪处理
+        # 图像裁剪处理（在灰度数组上切片，与先裁剪RGB再转灰度结果相同）
+        height, width = grayscale_array.shape
         if crop_mode == 'center':
-            width, height = image.size
             crop_size = min(width, height) // 2
             left = (width - crop_size) // 2
             top = (height - crop_size) // 2
-            right = left + crop_size
-            bottom = top + crop_size
-            image = image.crop((left, top, right, bottom))
+            grayscale_array = grayscale_array[top:top + crop_size, left:left + crop_size]
             add_progress_log('system', f'中心裁剪完成: {crop_size}x{crop_size}')
         elif crop_mode == 'manual' and crop_params:
             # 手动裁剪处理
             crop_x = int(crop_params.get('x', 0))
             crop_y = int(crop_params.get('y', 0))
-            crop_width = int(crop_params.get('width', image.size[0]))
-            crop_height = int(crop_params.get('height', image.size[1]))
+            crop_width = int(crop_params.get('width', width))
+            crop_height = int(crop_params.get('height', height))
             
             # 确保裁剪区域在图像范围内
-            crop_x = max(0, min(crop_x, image.size[0]))
-            crop_y = max(0, min(crop_y, image.size[1]))
-            crop_width = min(crop_width, image.size[0] - crop_x)
-            crop_height = min(crop_height, image.size[1] - crop_y)
+            crop_x = max(0, min(crop_x, width))
+            crop_y = max(0, min(crop_y, height))
+            crop_width = min(crop_width, width - crop_x)
+            crop_height = min(crop_height, height - crop_y)
             
             # 执行裁剪
             right = crop_x + crop_width
             bottom = crop_y + crop_height
-            image = image.crop((crop_x, crop_y, right, bottom))
+            grayscale_array = grayscale_array[crop_y:bottom, crop_x:right]
             add_progress_log('system', f'手动裁剪完成: 区域({crop_x}, {crop_y}, {right}, {bottom}), 尺寸{crop_width}x{crop_height}')
         
-        # 转换为numpy数组
-        image_array = np.array(image)
-        height, width, channels = image_array.shape
-        
-        add_progress_log('system', f'图像数组形状: {image_array.shape}')
-        
-        # 彩色转灰度转换
-        grayscale_array = convert_to_grayscale_numpy(image_array, grayscale_method)
-        add_progress_log('system', f'灰度转换完成，方法: {grayscale_method}')
+        height, width = grayscale_array.shape
+        add_progress_log('system', f'灰度数组形状: {grayscale_array.shape}')
         
         # 检查图像大小，对于2D处理给出警告
         if vector_direction == '2d' and (width * height > 1000000):  # 超过100万像素
@@ -4825,7 +5273,9 @@ def process_photo():
             grayscale_array, 
             vector_direction, 
             coordinate_unit, 
-            scale_factor
+            scale_factor,
+            band_width=band_width,
+            line_angle=line_angle
         )
         
         # 记录提取完成日志 - 支持1D和2D数据
@@ -4872,6 +5322,7 @@ def process_photo():
         if vector_data.get('is2D'):
             response_data = {
                 'success': True,
+                'image_id': photo.image_id,
                 'vector_data': vector_data,  # 直接返回完整的2D数据结构
                 'metadata': {
                     'original_size': f"{width}x{height}",
@@ -4896,6 +5347,7 @@ def process_photo():
         else:
             response_data = {
                 'success': True,
+                'image_id': photo.image_id,
                 'vector_data': {
                     'x': vector_data['x'],
                     'intensity': vector_data['intensity']
@@ -4924,6 +5376,11 @@ def process_photo():
             }
         }
         
+        # 额外的任意角度/条带平均剖面（一次采样完成）
+        if profile_specs:
+            response_data['profiles'] = extract_profile_series(grayscale_array, profile_specs, scale_factor, smoothing_method)
+            add_progress_log('system', f'剖面提取完成: {len(profile_specs)} 条')
+        
         # 记录处理完成日志 - 支持1D和2D数据
         if vector_data.get('is2D'):
             total_points = vector_data['width'] * vector_data['height']
@@ -4937,6 +5394,11 @@ def process_photo():
         add_error_log('system', f'缺少必要的图像处理库: {str(e)}')
         return jsonify(format_response(False, message=f"服务器配置错误：缺少图像处理库 {str(e)}")), 500
         
+    except ValueError as e:
+        # 参数无效（剖面参数超限、数值格式错误等）
+        add_error_log('system', f'照片处理参数无效: {str(e)}')
+        return jsonify(format_response(False, message=f"照片处理失败: {str(e)}")), 400
+        
     except Exception as e:
         add_error_log('system', f'照片处理过程中发生错误: {str(e)}')
         traceback.print_exc()
@@ -5017,80 +5479,29 @@ def calculate_intensity_marker_info(vector_data, intensity_value_type,
         }
 
 
-def convert_to_grayscale_numpy(image_array, method='weighted'):
-    """
-    使用numpy进行彩色转灰度转换
-    """
-    # 调试输出：检查输入图像数组的统计信息
-    print(f"🔍 [DEBUG] 灰度转换输入统计:")
-    print(f"   - 输入数组形状: {image_array.shape}")
-    print(f"   - 输入数组数据类型: {image_array.dtype}")
-    
-    # 安全地获取RGB通道统计信息
-    try:
-        print(f"   - R通道统计: 最小值={image_array[:,:,0].min()}, 最大值={image_array[:,:,0].max()}, 平均值={image_array[:,:,0].mean():.1f}")
-        print(f"   - G通道统计: 最小值={image_array[:,:,1].min()}, 最大值={image_array[:,:,1].max()}, 平均值={image_array[:,:,1].mean():.1f}")
-        print(f"   - B通道统计: 最小值={image_array[:,:,2].min()}, 最大值={image_array[:,:,2].max()}, 平均值={image_array[:,:,2].mean():.1f}")
-    except Exception as e:
-        print(f"   - RGB通道统计获取失败: {e}")
-    
-    if method == 'weighted':
-        # 加权平均法（推荐）
-        grayscale = 0.299 * image_array[:, :, 0] + 0.587 * image_array[:, :, 1] + 0.114 * image_array[:, :, 2]
-    elif method == 'average':
-        # 平均值法
-        grayscale = np.mean(image_array, axis=2)
-    elif method == 'luminance':
-        # 亮度法
-        grayscale = 0.21 * image_array[:, :, 0] + 0.72 * image_array[:, :, 1] + 0.07 * image_array[:, :, 2]
-    elif method == 'max':
-        # 最大值法
-        grayscale = np.max(image_array, axis=2)
-    else:
-        # 默认使用加权平均法
-        grayscale = 0.299 * image_array[:, :, 0] + 0.587 * image_array[:, :, 1] + 0.114 * image_array[:, :, 2]
-    
-    result = grayscale.astype(np.uint8)
-    
-    # 调试输出：检查灰度转换结果
-    print(f"🔍 [DEBUG] 灰度转换输出统计:")
-    print(f"   - 转换方法: {method}")
-    print(f"   - 输出数组形状: {result.shape}")
-    print(f"   - 输出数组数据类型: {result.dtype}")
-    print(f"   - 灰度值统计: 最小值={result.min()}, 最大值={result.max()}, 平均值={result.mean():.1f}")
-    print(f"   - 非零像素数量: {np.count_nonzero(result)} / {result.size}")
-    
-    if result.max() == 0:
-        print(f"⚠️ [WARNING] 灰度转换结果全为0！这可能意味着输入图像是全黑的")
-    
-    return result
-
-
-def extract_vector_from_grayscale(grayscale_array, direction, coordinate_unit, scale_factor):
+def extract_vector_from_grayscale(grayscale_array, direction, coordinate_unit, scale_factor, band_width=1, line_angle=0.0):
     """
     从灰度图像中提取向量数据
+
+    1D方向统一由 extract_profiles 一次采样：band_width>1 时沿法向做条带平均，
+    direction='angle' 时沿经过图像中心、方向角为 line_angle（度）的直线提取
     """
     height, width = grayscale_array.shape
     
-    if direction == 'horizontal':
-        # 水平方向：沿中间行提取
-        middle_row = height // 2
-        intensity_values = grayscale_array[middle_row, :] / 255.0  # 归一化到0-1
-        data_length = width
-        
-    elif direction == 'vertical':
+    if direction == 'vertical':
         # 垂直方向：沿中间列提取
         middle_col = width // 2
-        intensity_values = grayscale_array[:, middle_col] / 255.0
-        data_length = height
+        specs = [{'start': [middle_col, 0], 'end': [middle_col, height - 1], 'num_points': height}]
         
     elif direction == 'center-line':
-        # 中心线提取：对角线平均
+        # 中心线提取：两条对角线平均
         min_size = min(width, height)
-        diagonal1 = np.array([grayscale_array[i, i] for i in range(min_size)])
-        diagonal2 = np.array([grayscale_array[i, min_size-1-i] for i in range(min_size)])
-        intensity_values = (diagonal1 + diagonal2) / (2 * 255.0)  # 归一化
-        data_length = min_size
+        specs = [{'start': [0, 0], 'end': [min_size - 1, min_size - 1], 'num_points': min_size},
+                 {'start': [min_size - 1, 0], 'end': [0, min_size - 1], 'num_points': min_size}]
+        
+    elif direction == 'angle':
+        # 任意角度：经过图像中心的直线，按1像素间距亚像素插值采样
+        specs = [{'angle': line_angle}]
         
     elif direction == '2d':
         # 2D识别：返回整个2D强度矩阵
@@ -5127,13 +5538,17 @@ def extract_vector_from_grayscale(grayscale_array, direction, coordinate_unit, s
         }
         
     else:
-        # 默认水平方向
+        # 水平方向（默认）：沿中间行提取
         middle_row = height // 2
-        intensity_values = grayscale_array[middle_row, :] / 255.0
-        data_length = width
+        specs = [{'start': [0, middle_row], 'end': [width - 1, middle_row], 'num_points': width}]
+    
+    for spec in specs:
+        spec['band_width'] = band_width
+    profiles = extract_profiles(grayscale_array, specs)
+    intensity_values = np.mean([profile['intensity'] for profile in profiles], axis=0)
     
     # 生成坐标
-    coordinates = generate_coordinates(data_length, coordinate_unit, scale_factor)
+    coordinates = generate_coordinates(len(intensity_values), coordinate_unit, scale_factor)
     
     return {
         'x': coordinates.tolist(),
@@ -5157,8 +5572,7 @@ def generate_coordinates(length, unit, scale_factor):
     final_scale = scale_factor
     
     # 生成对称的坐标（以0为中心）
-    center = (length - 1) / 2
-    coordinates = np.array([(i - center) * final_scale for i in range(length)])
+    coordinates = symmetric_coordinates(length, final_scale)
     
     # 添加坐标合理性检查和验证
     coord_range = coordinates.max() - coordinates.min()
@@ -5274,14 +5688,24 @@ def apply_smoothing(data, method):
     
     return smoothed.tolist()
 
-# PID控制相关API端点
-pid_model = PIDModel()
+# PID控制相关API端点（模型在首次使用时创建）
+_pid_model = None
+_pid_model_lock = threading.Lock()
+
+def get_pid_model():
+    """获取进程内共享的PID模型"""
+    global _pid_model
+    if _pid_model is None:
+        with _pid_model_lock:
+            if _pid_model is None:
+                _pid_model = PIDModel()
+    return _pid_model
 
 @api_bp.route('/pid/read-parameters', methods=['GET'])
 def read_pid_parameters():
     """读取PID参数"""
     try:
-        parameters = pid_model.read_pid_parameters()
+        parameters = get_pid_model().read_pid_parameters()
         add_log_entry('success', 'pid', f'成功读取PID参数: P={parameters["p"]:.3f}, I={parameters["i"]:.3f}, D={parameters["d"]:.3f}')
         
         return jsonify({
@@ -5312,11 +5736,11 @@ def apply_pid_parameter():
             }), 400
         
         # 读取当前参数
-        current_params = pid_model.read_pid_parameters()
+        current_params = get_pid_model().read_pid_parameters()
         current_params[parameter] = value
         
         # 写入更新后的参数
-        success = pid_model.write_pid_parameters(current_params)
+        success = get_pid_model().write_pid_parameters(current_params)
         
         if success:
             add_log_entry('success', 'pid', f'成功应用{parameter.upper()}参数: {value}')
@@ -5370,7 +5794,7 @@ def apply_all_pid_parameters():
                 }), 400
         
         # 写入参数
-        success = pid_model.write_pid_parameters(clean_params)
+        success = get_pid_model().write_pid_parameters(clean_params)
         
         if success:
             add_log_entry('success', 'pid', f'成功应用所有PID参数: P={clean_params["p"]:.3f}, I={clean_params["i"]:.3f}, D={clean_params["d"]:.3f}')
@@ -5393,7 +5817,7 @@ def apply_all_pid_parameters():
 def get_pid_system_data():
     """获取系统实时数据"""
     try:
-        system_data = pid_model.get_latest_data()
+        system_data = get_pid_model().get_latest_data()
         
         return jsonify({
             'success': True,
@@ -5415,7 +5839,7 @@ def get_pid_system_data():
 def get_pid_image():
     """获取LabVIEW系统图像"""
     try:
-        image_data = pid_model.get_latest_image()
+        image_data = get_pid_model().get_latest_image()
         
         add_log_entry('info', 'pid', f'成功获取系统图像: {image_data["filename"]}')
         
@@ -5438,7 +5862,7 @@ def get_pid_image():
 def get_pid_status():
     """获取PID系统状态"""
     try:
-        status = pid_model.check_connection_status()
+        status = get_pid_model().check_connection_status()
         
         return jsonify({
             'success': True,
@@ -5460,7 +5884,7 @@ def save_pid_parameters():
         parameters = data.get('parameters', {})
         name = data.get('name')
         
-        success = pid_model.save_parameters_backup(parameters, name)
+        success = get_pid_model().save_parameters_backup(parameters, name)
         
         if success:
             add_log_entry('success', 'pid', f'成功保存PID参数配置')
@@ -5483,7 +5907,7 @@ def save_pid_parameters():
 def get_pid_parameter_history():
     """获取PID参数变更历史"""
     try:
-        history = pid_model.get_parameter_history()
+        history = get_pid_model().get_parameter_history()
         
         return jsonify({
             'success': True,
@@ -1,3 +1,25 @@
 from .helpers import validate_input, validate_enhanced_input, validate_car_input, format_response, NumpyEncoder
+from .log_store import LogStore, SQLiteLogStore
+from .state_store import InProcessStateStore, SQLiteStateStore, create_state_store
+from .validation_store import ValidationStore
+from .ml_registry import MLModelRegistry, ML_MODEL_TYPES
+from .inverse_design import InverseDesignSearch
+from .online_learning import OnlineModelUpdater
+from .thin_film import multilayer_reflectance, arc_reflectance_map, transmission_factor
+from .photo_store import PhotoImageStore
+from .profile_extraction import extract_profiles
+from .intensity_profiles import IntensityProfile, IntensityProfileRegistry
+from .intensity_file_parser import IntensityFileParser, IntensityFileError
+from .example_catalog import ExampleFileCatalog
+from .static_assets import StaticAssetManager
+from .compression import ResponseCompressor
+from .figure_renderer import FigureRenderer
+
+__all__ = ['validate_input', 'validate_enhanced_input', 'validate_car_input', 'format_response', 'NumpyEncoder',
+           'LogStore', 'SQLiteLogStore', 'InProcessStateStore', 'SQLiteStateStore', 'create_state_store',
+           'ValidationStore', 'MLModelRegistry', 'ML_MODEL_TYPES', 'InverseDesignSearch', 'OnlineModelUpdater',
+           'multilayer_reflectance', 'arc_reflectance_map', 'transmission_factor', 'PhotoImageStore',
+           'extract_profiles', 'IntensityProfile', 'IntensityProfileRegistry', 'IntensityFileParser',
+           'IntensityFileError', 'ExampleFileCatalog', 'StaticAssetManager',
+           'ResponseCompressor', 'FigureRenderer']
 
-__all__ = ['validate_input', 'validate_enhanced_input', 'validate_car_input', 'format_response', 'NumpyEncoder'] 
\ No newline at end of file
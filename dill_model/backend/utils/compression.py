@@ -0,0 +1,162 @@
+"""
+API 响应压缩
+
+/api/calculate_data、/api/compare_data 等接口返回的 JSON 中包含大量文本形式的浮点数，
+动辄数MB且原先未压缩发送。这里在 after_request 中统一处理：
+- 按 Accept-Encoding 协商：zstd（安装了 zstandard 时）> br（安装了 brotli 时）> gzip
+- 小于 min_size 字节的响应不压缩；超过 fast_threshold 的大响应使用快速压缩级别，
+  数值文本的压缩率对级别不敏感，快速级别可显著减少CPU时间
+- 生成器响应（如 SSE 日志流）逐块压缩并同步刷新，客户端仍能及时收到每个事件
+- 已编码的响应（预压缩静态资源）、send_file 直传、Range 请求及非文本类型不处理
+"""
+
+import gzip
+import os
+import zlib
+
+from flask import request
+
+try:
+    import zstandard
+except ImportError:  # zstandard 为可选依赖
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+# 默认阈值（字节）
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_FAST_THRESHOLD = 1024 * 1024
+# 压缩级别：(普通, 大响应)
+GZIP_LEVELS = (6, 1)
+ZSTD_LEVELS = (6, 1)
+BROTLI_LEVELS = (5, 1)
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/javascript', 'application/xml', 'image/svg+xml'}
+
+
+def available_encodings():
+    """按优先级排列的可用编码"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+def compress_bytes(data, encoding, fast=False):
+    """一次性压缩"""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVELS[fast]).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_LEVELS[fast])
+    return gzip.compress(data, compresslevel=GZIP_LEVELS[fast], mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """逐块压缩，每块之后同步刷新（使用快速级别）"""
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVELS[1]).compressobj()
+        compress = compressor.compress
+        flush_block = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        finish = compressor.flush
+    elif encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_LEVELS[1])
+        compress, flush_block, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVELS[1], zlib.DEFLATED, 31)
+        compress = compressor.compress
+        flush_block = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+
+    for chunk in chunks:
+        if chunk:
+            data = compress(chunk) + flush_block()
+            if data:
+                yield data
+    yield finish()
+
+
+class ResponseCompressor:
+    """
+    Flask 响应压缩中间件
+
+    参数:
+        app: Flask 应用（可稍后调用 init_app）
+        min_size: 小于该字节数的响应不压缩（环境变量 DILL_COMPRESS_MIN_SIZE）
+        fast_threshold: 超过该字节数时使用快速压缩级别
+    """
+
+    def __init__(self, app=None, min_size=None, fast_threshold=DEFAULT_FAST_THRESHOLD):
+        if min_size is None:
+            min_size = int(os.environ.get('DILL_COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE))
+        self.min_size = min_size
+        self.fast_threshold = fast_threshold
+        self.encodings = available_encodings()
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+        app.extensions['response_compressor'] = self
+
+    @staticmethod
+    def _compressible(response):
+        mimetype = response.mimetype or ''
+        return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES or mimetype.endswith('+json')
+
+    def _negotiate(self):
+        accept = request.accept_encodings
+        for encoding in self.encodings:
+            if accept[encoding] > 0:
+                return encoding
+        return None
+
+    def after_request(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers or response.direct_passthrough
+                or request.method == 'HEAD' or not self._compressible(response)):
+            return response
+        encoding = self._negotiate()
+        if encoding is None:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if response.is_streamed:
+            response.response = compress_stream(response.iter_encoded(), encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            compressed = compress_bytes(data, encoding, fast=len(data) >= self.fast_threshold)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+            self.compressed += 1
+            self.bytes_in += len(data)
+            self.bytes_out += len(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        # 压缩后的表示与原内容字节不同，强 ETag 改为弱 ETag（条件请求按弱比较仍可命中 304）
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def stats(self):
+        return {
+            'encodings': self.encodings,
+            'min_size': self.min_size,
+            'fast_threshold': self.fast_threshold,
+            'compressed_responses': self.compressed,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out
+        }
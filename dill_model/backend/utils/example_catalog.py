@@ -0,0 +1,242 @@
+"""
+示例文件目录索引
+
+示例文件列表原先每次请求都重新扫描并逐个读取目录，读取文件内容时也每次整文件重读。这里改为：
+- 按文件 (大小, mtime_ns) 缓存元数据：格式、数据点数、前几行预览；文件未变化时不重新读取
+- 目录 mtime 未变化且距上次扫描不足 RESCAN_INTERVAL 秒时直接返回缓存列表；
+  新增/删除/重命名会改变目录 mtime，原地改写的文件在下次扫描时按 mtime 失效；
+  写操作接口可调用 invalidate() 立即失效
+- 每个文件有基于 (大小, mtime_ns) 的 ETag，用于条件请求（304）与 Range 读取
+- 小文件的解码文本按 ETag 缓存（有界LRU）
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .intensity_file_parser import (IntensityFileError, detect_format, locate_numeric_block, _json_arrays,
+                                    TEXT_FORMATS)
+
+# 目录 mtime 未变化时的最短重新扫描间隔（秒）
+RESCAN_INTERVAL = 2.0
+# 超过该大小的文件不在建索引时统计数据点数
+INSPECT_LIMIT = 16 * 1024 * 1024
+# 预览行数及读取的文件头字节数
+PREVIEW_LINES = 5
+PREVIEW_BYTES = 2048
+# 文本内容缓存上限
+DEFAULT_MAX_CONTENT_BYTES = 32 * 1024 * 1024
+# 单个文件可缓存的最大字节数
+MAX_CACHED_FILE_BYTES = 4 * 1024 * 1024
+# 尝试的文本编码
+TEXT_ENCODINGS = ('utf-8', 'gbk', 'latin-1')
+
+
+def decode_text(raw):
+    """依次尝试 UTF-8、GBK、Latin-1 解码"""
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode('latin-1', errors='replace')
+
+
+def count_data_points(path, filename):
+    """数据点数（文本表格取最长连续数值行数，JSON 取数组长度）；无法识别时返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        file_format = detect_format(filename, raw[:64])
+        if file_format == 'json':
+            x, _ = _json_arrays(json.loads(raw.decode('utf-8-sig')))
+            return int(len(x))
+        return locate_numeric_block(np.frombuffer(raw, dtype=np.uint8))[2]
+    except (IntensityFileError, ValueError, TypeError, IndexError, OSError):
+        return None
+
+
+class ExampleFileEntry:
+    """单个示例文件的缓存元数据"""
+
+    def __init__(self, name, path, stat, description=''):
+        self.name = name
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.mtime_ns = stat.st_mtime_ns
+        self.extension = os.path.splitext(name)[1].lstrip('.')
+        self.description = description
+        self.etag = f'{self.size:x}-{self.mtime_ns:x}'
+
+        extension = os.path.splitext(name)[1].lower()
+        self.data_format = 'json' if extension == '.json' else TEXT_FORMATS.get(extension)
+        self.num_points = None
+        self.preview = ''
+        if self.data_format is not None:
+            with open(path, 'rb') as f:
+                head = f.read(PREVIEW_BYTES)
+            self.preview = '\n'.join(decode_text(head).splitlines()[:PREVIEW_LINES])
+            if self.size <= INSPECT_LIMIT:
+                self.num_points = count_data_points(path, name)
+
+    def matches(self, stat):
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'extension': self.extension,
+            'size': self.size,
+            'modified': self.mtime,
+            'description': self.description,
+            'format': self.extension.upper() if self.extension else '未知',
+            'data_format': self.data_format,
+            'num_points': self.num_points,
+            'preview': self.preview,
+            'etag': self.etag
+        }
+
+
+class ExampleFileCatalog:
+    """
+    示例文件目录索引
+
+    参数:
+        directory: 示例文件目录
+        describe: (文件名, 扩展名) -> 描述文字
+        max_content_bytes: 文本内容缓存的总字节数上限
+    """
+
+    def __init__(self, directory, describe=None, max_content_bytes=DEFAULT_MAX_CONTENT_BYTES):
+        self.directory = directory
+        self._describe = describe or (lambda name, extension: '')
+        self.max_content_bytes = max_content_bytes
+        self._entries = {}
+        self._dir_mtime_ns = None
+        self._scanned_at = 0.0
+        self._contents = OrderedDict()
+        self._content_bytes = 0
+        self._lock = threading.RLock()
+        self.scans = 0
+        self.inspections = 0
+        self.content_hits = 0
+        self.content_reads = 0
+
+    @staticmethod
+    def _visible(name):
+        return not name.startswith('.') and name.lower() != 'readme.md'
+
+    def _build_entry(self, name, path, stat):
+        self.inspections += 1
+        return ExampleFileEntry(name, path, stat, self._describe(name, os.path.splitext(name)[1].lstrip('.')))
+
+    def _scan(self):
+        """重新扫描目录（未变化的文件复用已有元数据）"""
+        entries = {}
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if not self._visible(item.name):
+                    continue
+                try:
+                    if not item.is_file():
+                        continue
+                    stat = item.stat()
+                    entry = self._entries.get(item.name)
+                    if entry is None or not entry.matches(stat):
+                        entry = self._build_entry(item.name, item.path, stat)
+                    entries[item.name] = entry
+                except OSError as e:
+                    print(f"Error reading file {item.name}: {e}")
+        self._entries = entries
+        self.scans += 1
+
+    def entries(self):
+        """按文件名排序的元数据列表"""
+        with self._lock:
+            dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+            now = time.monotonic()
+            if dir_mtime_ns != self._dir_mtime_ns or now - self._scanned_at >= RESCAN_INTERVAL:
+                self._scan()
+                self._dir_mtime_ns = dir_mtime_ns
+                self._scanned_at = now
+            return [self._entries[name] for name in sorted(self._entries)]
+
+    def listing_etag(self):
+        """整个列表的 ETag（任一文件变化即改变）"""
+        digest = hashlib.sha1('\n'.join(f'{e.name}:{e.etag}' for e in self.entries()).encode('utf-8'))
+        return 'list-' + digest.hexdigest()[:16]
+
+    def entry(self, name):
+        """单个文件的元数据（按当前 stat 校验，文件不存在时返回 None）"""
+        if not self._visible(name):
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or not entry.matches(stat):
+                entry = self._build_entry(name, path, stat)
+                self._entries[name] = entry
+            return entry
+
+    def read_text(self, entry):
+        """文件文本内容（小文件按 ETag 缓存）"""
+        key = (entry.name, entry.etag)
+        with self._lock:
+            cached = self._contents.get(key)
+            if cached is not None:
+                self._contents.move_to_end(key)
+                self.content_hits += 1
+                return cached[0]
+
+        with open(entry.path, 'rb') as f:
+            raw = f.read()
+        content = decode_text(raw)
+        with self._lock:
+            self.content_reads += 1
+            if len(raw) <= MAX_CACHED_FILE_BYTES:
+                # 同名文件的旧版本内容直接移除
+                for old_key in [k for k in self._contents if k[0] == entry.name]:
+                    self._content_bytes -= self._contents.pop(old_key)[1]
+                self._contents[key] = (content, len(raw))
+                self._content_bytes += len(raw)
+                while self._content_bytes > self.max_content_bytes and len(self._contents) > 1:
+                    self._content_bytes -= self._contents.popitem(last=False)[1][1]
+        return content
+
+    def invalidate(self, name=None):
+        """写操作后失效索引（name 为空时失效整个目录）"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                self._contents.clear()
+                self._content_bytes = 0
+            else:
+                self._entries.pop(name, None)
+                for key in [k for k in self._contents if k[0] == name]:
+                    self._content_bytes -= self._contents.pop(key)[1]
+            self._dir_mtime_ns = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'files': len(self._entries),
+                'scans': self.scans,
+                'inspections': self.inspections,
+                'content_entries': len(self._contents),
+                'content_bytes': self._content_bytes,
+                'content_hits': self.content_hits,
+                'content_reads': self.content_reads
+            }
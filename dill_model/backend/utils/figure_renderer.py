@@ -0,0 +1,449 @@
+"""
+服务端PNG图像渲染
+
+CARModel.generate_plots、厚胶模型绘图及 /api/compare 的对比图原先每张图都通过 pyplot 新建figure、
+tight_layout、savefig 到 BytesIO 再 base64 编码，一次请求常常要画4张图。这里改为：
+- 每种图（按 标题/坐标轴/线型/色图 等静态配置区分）保留一个预先构建的 figure/axes 模板，
+  绘图时只更新曲线、图像或曲面的数据
+- 不经过 pyplot，直接用 Agg 画布输出PNG；只有坐标刻度标签宽度变化时才重新 tight_layout
+- PNG（base64）按 模板配置 + 数据 的 SHA-256 缓存（有界LRU），相同结果不重复绘制
+- 设置 DILL_PLOT_WORKER=1 时在独立子进程中绘图，绘图期间不占用主进程的GIL，
+  其他请求的数值计算不受影响；子进程以 spawn 方式启动（入口脚本需有 __main__ 保护），
+  异常退出时自动回退到进程内绘图
+
+用法:
+    renderer = get_figure_renderer()
+    plots = renderer.render_many({
+        'thickness_plot': line_plot([{'x': x, 'y': thickness, 'fmt': 'm-', 'linewidth': 2}],
+                                    'Thickness', 'Position (μm)', 'Normalized Thickness'),
+    })
+"""
+
+import abc
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import numpy as np
+
+from .lazy_imports import configure_matplotlib
+
+# 输出分辨率（与原 savefig(dpi=100) 一致）
+DPI = 100
+# PNG 缓存上限（base64 字节数）
+DEFAULT_MAX_CACHE_BYTES = 64 * 1024 * 1024
+# 保留的模板数上限
+MAX_TEMPLATES = 32
+
+
+def line_plot(series, title, xlabel, ylabel, figsize=(10, 6), legend=None, labels=None,
+              title_fontsize=16, label_fontsize=14, grid_alpha=0.3):
+    """
+    折线图描述
+
+    参数:
+        series: 曲线列表，每项为 {'x', 'y', 'fmt', 'color', 'linewidth', 'label'}
+        legend: 图例参数（如 {'loc': 'best', 'fontsize': 10}），为 None 时不显示图例
+        labels: 图例文字（为 None 时使用各曲线的 label）
+    """
+    styles = [{k: s.get(k) for k in ('fmt', 'color', 'linewidth', 'label')} for s in series]
+    return {
+        'kind': 'line',
+        'layout': {
+            'figsize': list(figsize), 'title': title, 'xlabel': xlabel, 'ylabel': ylabel,
+            'title_fontsize': title_fontsize, 'label_fontsize': label_fontsize, 'grid_alpha': grid_alpha,
+            'series': styles, 'legend': legend
+        },
+        'data': {
+            'series': [(np.asarray(s['x'], dtype=float), np.asarray(s['y'], dtype=float)) for s in series],
+            'labels': list(labels) if labels is not None else None
+        }
+    }
+
+
+def image_plot(array, extent, title, xlabel, ylabel, cmap='viridis', colorbar_label=None, figsize=(8, 6)):
+    """热图描述（origin='lower'，aspect='auto'）"""
+    return {
+        'kind': 'image',
+        'layout': {
+            'figsize': list(figsize), 'title': title, 'xlabel': xlabel, 'ylabel': ylabel,
+            'cmap': cmap, 'colorbar_label': colorbar_label
+        },
+        'data': {
+            'array': np.asarray(array, dtype=float),
+            'extent': [float(v) for v in extent]
+        }
+    }
+
+
+def surface_plot(surfaces, title, xlabel, ylabel, zlabel, cmap='viridis', figsize=(10, 8), colorbar=None,
+                 surface_options=None, title_fontsize=16, label_fontsize=14):
+    """
+    3D曲面图描述
+
+    参数:
+        surfaces: 曲面列表，每项为 (X, Y, Z)
+        colorbar: 色条参数（如 {'shrink': 0.5, 'aspect': 5}），为 None 时不显示色条
+        surface_options: 传给 plot_surface 的其他参数（如 alpha、rstride）
+    """
+    return {
+        'kind': 'surface',
+        'layout': {
+            'figsize': list(figsize), 'title': title, 'xlabel': xlabel, 'ylabel': ylabel, 'zlabel': zlabel,
+            'title_fontsize': title_fontsize, 'label_fontsize': label_fontsize, 'cmap': cmap,
+            'colorbar': colorbar, 'surface_options': surface_options or {'edgecolor': 'none'}
+        },
+        'data': {
+            'surfaces': [tuple(np.asarray(a, dtype=float) for a in surface) for surface in surfaces]
+        }
+    }
+
+
+def _update_hash(hasher, value):
+    """将描述中的数据递归写入摘要"""
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        hasher.update(f'nd{array.dtype.str}{array.shape}'.encode('utf-8'))
+        hasher.update(array.tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            hasher.update(f'k{key}'.encode('utf-8'))
+            _update_hash(hasher, value[key])
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f'l{len(value)}'.encode('utf-8'))
+        for item in value:
+            _update_hash(hasher, item)
+    else:
+        hasher.update(repr(value).encode('utf-8'))
+
+
+def spec_digest(spec):
+    """图像描述的内容摘要（缓存键）"""
+    hasher = hashlib.sha256()
+    hasher.update(spec['kind'].encode('utf-8'))
+    hasher.update(json.dumps(spec['layout'], sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    _update_hash(hasher, spec['data'])
+    return hasher.hexdigest()
+
+
+class FigureTemplate(abc.ABC):
+    """
+    可复用的 figure 模板
+
+    子类在 build() 中创建坐标轴与空的绘图元素，在 update() 中只替换数据；
+    两者为抽象方法，缺少实现的子类在实例化时即报错，而不是渲染到一半才失败。
+    """
+
+    def __init__(self, layout):
+        configure_matplotlib()
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self.layout = layout
+        self.figure = Figure(figsize=tuple(layout['figsize']), dpi=DPI)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.lock = threading.Lock()
+        self.renders = 0
+        self.relayouts = 0
+        self._layout_signature = None
+        self.build()
+
+    @abc.abstractmethod
+    def build(self):
+        """创建坐标轴与空的绘图元素"""
+
+    @abc.abstractmethod
+    def update(self, data):
+        """用新数据替换绘图元素的内容"""
+
+    def _tick_signature(self):
+        """2D坐标轴（含色条）刻度标签的最大长度，标签宽度变化时需要重新布局"""
+        signature = []
+        for ax in self.figure.axes:
+            if ax.name == '3d':
+                continue
+            for axis in (ax.xaxis, ax.yaxis):
+                ticks = axis.get_major_locator()()
+                labels = axis.get_major_formatter().format_ticks(ticks)
+                signature.append(max((len(label) for label in labels), default=0))
+        return tuple(signature)
+
+    def render(self, data):
+        """更新数据并输出 base64 编码的PNG"""
+        with self.lock:
+            self.update(data)
+            signature = self._tick_signature()
+            if signature != self._layout_signature:
+                self.figure.tight_layout()
+                self._layout_signature = signature
+                self.relayouts += 1
+            buffer = BytesIO()
+            self.canvas.print_png(buffer)
+            self.renders += 1
+            return base64.b64encode(buffer.getvalue()).decode()
+
+
+class LineTemplate(FigureTemplate):
+    """折线图模板"""
+
+    def build(self):
+        layout = self.layout
+        self.ax = self.figure.add_subplot(111)
+        self.lines = []
+        for style in layout['series']:
+            options = {k: style[k] for k in ('color', 'linewidth', 'label') if style.get(k) is not None}
+            line, = self.ax.plot([], [], style.get('fmt') or '-', **options)
+            self.lines.append(line)
+        self.ax.set_title(layout['title'], fontsize=layout['title_fontsize'])
+        self.ax.set_xlabel(layout['xlabel'], fontsize=layout['label_fontsize'])
+        self.ax.set_ylabel(layout['ylabel'], fontsize=layout['label_fontsize'])
+        self.ax.grid(True, alpha=layout['grid_alpha'])
+
+    def update(self, data):
+        for line, (x, y) in zip(self.lines, data['series']):
+            line.set_data(x, y)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        legend = self.layout['legend']
+        if legend is not None:
+            if data['labels'] is not None:
+                self.ax.legend(self.lines, data['labels'], **legend)
+            else:
+                self.ax.legend(**legend)
+
+
+class ImageTemplate(FigureTemplate):
+    """热图模板"""
+
+    def build(self):
+        layout = self.layout
+        self.ax = self.figure.add_subplot(111)
+        self.image = self.ax.imshow(np.zeros((2, 2)), aspect='auto', origin='lower', cmap=layout['cmap'])
+        self.colorbar = self.figure.colorbar(self.image, ax=self.ax, label=layout['colorbar_label'])
+        self.ax.set_xlabel(layout['xlabel'])
+        self.ax.set_ylabel(layout['ylabel'])
+        self.ax.set_title(layout['title'])
+
+    def update(self, data):
+        array = data['array']
+        self.image.set_data(array)
+        self.image.set_extent(data['extent'])
+        self.ax.set_xlim(data['extent'][0], data['extent'][1])
+        self.ax.set_ylim(data['extent'][2], data['extent'][3])
+        finite = array[np.isfinite(array)]
+        if finite.size:
+            self.image.set_clim(finite.min(), finite.max())
+
+
+class SurfaceTemplate(FigureTemplate):
+    """3D曲面图模板（坐标轴与色条复用，每次替换曲面）"""
+
+    def build(self):
+        layout = self.layout
+        self.ax = self.figure.add_subplot(111, projection='3d')
+        self.ax.set_title(layout['title'], fontsize=layout['title_fontsize'])
+        self.ax.set_xlabel(layout['xlabel'], fontsize=layout['label_fontsize'])
+        self.ax.set_ylabel(layout['ylabel'], fontsize=layout['label_fontsize'])
+        self.ax.set_zlabel(layout['zlabel'], fontsize=layout['label_fontsize'])
+        self.surfaces = []
+        self.colorbar = None
+
+    def update(self, data):
+        for surface in self.surfaces:
+            surface.remove()
+        self.surfaces = [
+            self.ax.plot_surface(X, Y, Z, cmap=self.layout['cmap'], **self.layout['surface_options'])
+            for X, Y, Z in data['surfaces']
+        ]
+        if self.layout['colorbar'] is not None and self.surfaces:
+            if self.colorbar is None:
+                self.colorbar = self.figure.colorbar(self.surfaces[0], ax=self.ax, **self.layout['colorbar'])
+            else:
+                self.colorbar.update_normal(self.surfaces[0])
+
+
+TEMPLATE_TYPES = {
+    'line': LineTemplate,
+    'image': ImageTemplate,
+    'surface': SurfaceTemplate
+}
+
+
+_worker_renderer = None
+
+
+def _render_in_worker(spec):
+    """绘图子进程入口"""
+    global _worker_renderer
+    if _worker_renderer is None:
+        _worker_renderer = FigureRenderer(worker=False, max_cache_bytes=0)
+    return _worker_renderer.render_local(spec)
+
+
+class FigureRenderer:
+    """
+    基于模板的PNG渲染器
+
+    参数:
+        max_cache_bytes: PNG 缓存上限（base64 字节数，0 表示不缓存）
+        worker: 是否在独立子进程中绘图（默认读取环境变量 DILL_PLOT_WORKER）
+    """
+
+    def __init__(self, max_cache_bytes=DEFAULT_MAX_CACHE_BYTES, worker=None):
+        if worker is None:
+            worker = os.environ.get('DILL_PLOT_WORKER', '0') == '1'
+        self.max_cache_bytes = max_cache_bytes
+        self.worker = worker
+        self._templates = OrderedDict()
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._executor = None
+        self._lock = threading.Lock()
+        self.template_builds = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.worker_renders = 0
+
+    def _template(self, spec):
+        key = (spec['kind'], json.dumps(spec['layout'], sort_keys=True, ensure_ascii=False))
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                return template
+        template = TEMPLATE_TYPES[spec['kind']](spec['layout'])
+        with self._lock:
+            existing = self._templates.get(key)
+            if existing is not None:
+                return existing
+            self._templates[key] = template
+            self.template_builds += 1
+            while len(self._templates) > MAX_TEMPLATES:
+                self._templates.popitem(last=False)
+        return template
+
+    def render_local(self, spec):
+        """在当前进程中绘图（不经过缓存）"""
+        return self._template(spec).render(spec['data'])
+
+    def _cached(self, key):
+        with self._lock:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+            return image
+
+    def _store(self, key, image):
+        if len(image) > self.max_cache_bytes:
+            return image
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = image
+                self._cache_bytes += len(image)
+                while self._cache_bytes > self.max_cache_bytes:
+                    self._cache_bytes -= len(self._cache.popitem(last=False)[1])
+        return image
+
+    def _get_executor(self):
+        if not self.worker:
+            return None
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    import multiprocessing
+                    # 主进程中有多个线程，使用 spawn 避免 fork 后的锁状态问题
+                    self._executor = ProcessPoolExecutor(max_workers=1,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                    print("🖼️ 绘图子进程已启动")
+        return self._executor
+
+    def _disable_worker(self):
+        print("⚠️ 绘图子进程异常退出，改为在当前进程中绘图")
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self.worker = False
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def submit(self, spec):
+        """提交绘图，返回结果为 base64 PNG 的 Future（缓存命中时立即完成）"""
+        key = spec_digest(spec)
+        image = self._cached(key)
+        if image is not None:
+            future = Future()
+            future.set_result(image)
+            return future
+
+        executor = self._get_executor()
+        if executor is not None:
+            try:
+                future = executor.submit(_render_in_worker, spec)
+            except BrokenProcessPool:
+                self._disable_worker()
+            else:
+                self.worker_renders += 1
+                future.add_done_callback(
+                    lambda f: self._store(key, f.result()) if not f.cancelled() and f.exception() is None else None)
+                return future
+
+        future = Future()
+        try:
+            future.set_result(self._store(key, self.render_local(spec)))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def render_many(self, specs):
+        """批量绘图：{名称: 图像描述} -> {名称: base64 PNG}"""
+        futures = {name: self.submit(spec) for name, spec in specs.items()}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except BrokenProcessPool:
+                if self.worker:
+                    self._disable_worker()
+                results[name] = self.submit(specs[name]).result()
+        return results
+
+    def render(self, spec):
+        """绘制单张图，返回 base64 PNG"""
+        return self.render_many({'plot': spec})['plot']
+
+    def stats(self):
+        with self._lock:
+            return {
+                'worker': self.worker,
+                'templates': len(self._templates),
+                'template_builds': self.template_builds,
+                'renders': sum(t.renders for t in self._templates.values()),
+                'relayouts': sum(t.relayouts for t in self._templates.values()),
+                'worker_renders': self.worker_renders,
+                'cache_entries': len(self._cache),
+                'cache_bytes': self._cache_bytes,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses
+            }
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_figure_renderer():
+    """获取进程内共享的图像渲染器"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = FigureRenderer()
+    return _renderer
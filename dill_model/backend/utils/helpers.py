@@ -1,6 +1,8 @@
 import json
 import numpy as np
 
+from .thin_film import multilayer_reflectance
+
 def validate_input(data):
     """
     验证输入参数（Dill模型）
@@ -275,7 +277,7 @@ def format_response(success, data=None, message=""):
 
 def calculate_reflectance(substrate_material, arc_material, wavelength):
     """
-    计算ARC（抗反射涂层）参数的简化实现
+    计算ARC（抗反射涂层）参数（空气/ARC/基底叠层，传输矩阵法）
     
     Args:
         substrate_material: 基底材料
@@ -298,23 +300,24 @@ def calculate_reflectance(substrate_material, arc_material, wavelength):
     substrate_props = material_properties.get(substrate_material, {'n': 3.88, 'k': 0.02})
     arc_props = material_properties.get(arc_material, {'n': 1.46, 'k': 0.0})
     
-    # 简化的反射率计算
     n_substrate = substrate_props['n']
     n_arc = arc_props['n']
     n_air = 1.0
+    N_substrate = n_substrate + 1j * substrate_props['k']
+    N_arc = n_arc + 1j * arc_props['k']
     
     # 无ARC时的反射率
-    r_no_arc = ((n_substrate - n_air) / (n_substrate + n_air)) ** 2
+    r_no_arc = float(multilayer_reflectance(n_air, [], N_substrate, wavelength))
     
-    # 理想ARC厚度计算 (λ/4)
-    d_arc_ideal = wavelength / (4 * n_arc)
+    # 扫描ARC厚度（覆盖半个波长以上），取反射率最小的厚度
+    thicknesses = np.arange(0.0, wavelength / (2 * n_arc) * 1.5, 0.5)
+    sweep = multilayer_reflectance(n_air, [(N_arc, thicknesses)], N_substrate, wavelength)
+    d_arc_ideal = float(thicknesses[sweep.argmin()])
+    r_with_arc = float(sweep.min())
     
     # 理想ARC折射率
     n_arc_ideal = np.sqrt(n_substrate * n_air)
     
-    # 有ARC时的简化反射率计算
-    r_with_arc = ((n_arc - n_air) / (n_arc + n_air)) ** 2 * 0.1  # 简化模型
-    
     return {
         'materials': {
             'substrate': {
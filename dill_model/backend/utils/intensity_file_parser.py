@@ -0,0 +1,392 @@
+"""
+光强分布文件的服务端解析
+
+浏览器端逐行解析大型仿真导出文件（数十万行以上）会明显卡顿。这里在服务端完成：
+- 按扩展名与内容识别格式：JSON，或带文件头的文本表格（.txt .csv .dat .tab .asc .pli .ldf .msk .int .pro .sim 等）
+- 文本文件在字节数组上向量化定位数值行，取最长的连续数值行作为数据块，自动跳过文件头、
+  BEGIN/END 标记、尾部统计信息及 RECT 等非数值行
+- 纯数值数据块用 np.fromstring 一次解析；含文字列（如 CSV 的备注列）时用正则一次提取前两列
+- 大文件使用内存映射读取，避免整体复制
+- 解析结果按文件内容哈希缓存（按字节数/数量有界LRU），同一文件重复解析、登记或预览直接命中
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# 支持的文本格式（扩展名 -> 格式名）
+TEXT_FORMATS = {
+    '.txt': 'text', '.dat': 'text', '.asc': 'ascii', '.tab': 'tab', '.tsv': 'tab', '.csv': 'csv',
+    '.pli': 'prolith', '.ldf': 'ldf', '.msk': 'mask', '.int': 'intensity', '.pro': 'process',
+    '.sim': 'simulation', '.lis': 'text', '.log': 'text', '.out': 'text'
+}
+SUPPORTED_EXTENSIONS = tuple(sorted(set(TEXT_FORMATS) | {'.json'}))
+
+# 超过该大小的文件使用内存映射读取
+MMAP_THRESHOLD = 8 * 1024 * 1024
+# 单个文件大小上限
+MAX_FILE_BYTES = 512 * 1024 * 1024
+# 默认预览点数
+DEFAULT_PREVIEW_POINTS = 2000
+# 解析结果缓存条目数与总字节数上限
+DEFAULT_CACHE_ENTRIES = 16
+DEFAULT_CACHE_BYTES = 128 * 1024 * 1024
+
+# 字节分类查找表
+_IS_NUMERIC_START = np.zeros(256, dtype=bool)
+_IS_NUMERIC_START[np.frombuffer(b'+-.0123456789', dtype=np.uint8)] = True
+_IS_BLANK = np.zeros(256, dtype=bool)
+_IS_BLANK[np.frombuffer(b' \t\r', dtype=np.uint8)] = True
+# 行首最多跳过的空白字符数
+MAX_LEADING_BLANKS = 32
+# 纯数值数据块允许出现的字节
+_NUMERIC_BYTES = b'+-.0123456789eE \t\r\n,;'
+_SEPARATORS = bytes.maketrans(b',;\t\r', b'    ')
+_FIRST_TWO_COLUMNS = re.compile(
+    rb'^[ \t]*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)[ \t]*[,;\t ][ \t]*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)',
+    re.MULTILINE
+)
+# 文件头中的坐标单位标记，如 Position (mm)、X_Position(um)、X(µm)、X坐标(微米)
+_UNIT_PATTERN = re.compile(
+    r'(?:position|x[_ ]?position|x坐标|位置|\bx)\s*[\(（\[]\s*(mm|um|μm|µm|microns?|nm|毫米|微米|纳米)\s*[\)）\]]',
+    re.IGNORECASE
+)
+_UNIT_NAMES = {'mm': 'mm', '毫米': 'mm', 'um': 'μm', 'μm': 'μm', 'µm': 'μm', 'micron': 'μm', 'microns': 'μm',
+               '微米': 'μm', 'nm': 'nm', '纳米': 'nm'}
+
+# JSON 中可能的字段名
+_JSON_X_FIELDS = ('x', 'X', 'position', 'pos', 'distance', 'xaxis', 'x_axis', 'x_values')
+_JSON_INTENSITY_FIELDS = ('intensity', 'int', 'y', 'values', 'data', 'amplitude', 'value', 'yaxis', 'y_axis', 'y_values')
+
+
+class IntensityFileError(ValueError):
+    """文件格式无法识别或不含有效数据"""
+
+
+def detect_format(filename, head=b''):
+    """按扩展名（缺省时按内容开头）判断格式"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.json' or (not extension and head.lstrip()[:1] in (b'{', b'[')):
+        return 'json'
+    if extension in TEXT_FORMATS:
+        return TEXT_FORMATS[extension]
+    if not extension:
+        return 'text'
+    raise IntensityFileError(f"不支持的文件格式: {extension}，支持: {', '.join(SUPPORTED_EXTENSIONS)}")
+
+
+def _line_bounds(buf):
+    """每一行的 [起点, 终点) 字节位置"""
+    newlines = np.flatnonzero(buf == ord('\n'))
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [buf.size]))
+    keep = starts < ends
+    return starts[keep], ends[keep]
+
+
+def locate_numeric_block(buf):
+    """
+    向量化定位数据块：取首个非空白字符为数字/符号/小数点的最长连续行
+
+    返回:
+        (块起始字节, 块结束字节, 块内行数)
+    """
+    starts, ends = _line_bounds(buf)
+    if starts.size == 0:
+        raise IntensityFileError("文件为空")
+
+    # 每行首个非空白字符（逐列跳过行首空白，各行并行处理）
+    first = starts.copy()
+    pending = np.flatnonzero(_IS_BLANK[buf[first]])
+    for _ in range(MAX_LEADING_BLANKS):
+        if pending.size == 0:
+            break
+        first[pending] += 1
+        pending = pending[first[pending] < ends[pending]]
+        pending = pending[_IS_BLANK[buf[first[pending]]]]
+    has_content = first < ends
+    numeric = has_content & _IS_NUMERIC_START[buf[np.minimum(first, buf.size - 1)]]
+
+    # 连续数值行的区间（空行视为数据块中断）
+    padded = np.concatenate(([False], numeric, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    if run_starts.size == 0:
+        raise IntensityFileError("未找到数值数据行")
+    longest = int(np.argmax(run_ends - run_starts))
+    first_line, last_line = run_starts[longest], run_ends[longest] - 1
+    return int(starts[first_line]), int(ends[last_line]), int(last_line - first_line + 1)
+
+
+def parse_numeric_block(block, num_lines):
+    """
+    解析数据块的前两列
+
+    纯数值时按空白/逗号/分号/制表符分隔一次解析；含文字列或缺失字段时用正则逐行提取前两列
+    """
+    if not block.translate(None, _NUMERIC_BYTES):
+        first_line = block.split(b'\n', 1)[0].translate(_SEPARATORS).split()
+        columns = len(first_line)
+        values = np.fromstring(block.translate(_SEPARATORS), dtype=float, sep=' ')
+        if columns >= 2 and values.size == columns * num_lines:
+            table = values.reshape(num_lines, columns)
+            return table[:, 0].copy(), table[:, 1].copy(), columns
+
+    pairs = _FIRST_TWO_COLUMNS.findall(block)
+    if not pairs:
+        raise IntensityFileError("数据块中未找到两列数值")
+    table = np.array(pairs, dtype=float)
+    return table[:, 0], table[:, 1], 2
+
+
+def detect_x_unit(header_text):
+    """从文件头（列说明）中识别坐标单位，无法识别时返回 None"""
+    match = _UNIT_PATTERN.search(header_text)
+    if match is None:
+        return None
+    return _UNIT_NAMES.get(match.group(1).lower(), _UNIT_NAMES.get(match.group(1)))
+
+
+def _json_arrays(data):
+    """从多种 JSON 结构中取出 x / intensity 数组"""
+    if isinstance(data, list):
+        if data and isinstance(data[0], dict):
+            keys = list(data[0])
+            x_key = next((k for k in keys if k.lower() in ('x', 'position', 'pos', 'distance')), None)
+            y_key = next((k for k in keys if k != x_key and k.lower() in ('intensity', 'int', 'value', 'y', 'power', 'signal')), None)
+            if x_key is None or y_key is None:
+                raise IntensityFileError("JSON数组元素缺少坐标或光强字段")
+            rows = [(item.get(x_key), item.get(y_key)) for item in data if isinstance(item, dict)]
+            table = np.array([row for row in rows if row[0] is not None and row[1] is not None], dtype=float)
+            return table[:, 0], table[:, 1]
+        table = np.asarray(data, dtype=float)
+        if table.ndim == 2 and table.shape[1] >= 2:
+            return table[:, 0], table[:, 1]
+        raise IntensityFileError("无法识别的JSON数组结构")
+
+    if isinstance(data, dict):
+        x = next((data[k] for k in _JSON_X_FIELDS if isinstance(data.get(k), list)), None)
+        y = next((data[k] for k in _JSON_INTENSITY_FIELDS if isinstance(data.get(k), list)), None)
+        if x is not None and y is not None:
+            return np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        # 嵌套结构，如 {"metadata": {...}, "data": {"x": [...], "intensity": [...]}}
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                try:
+                    return _json_arrays(value)
+                except (IntensityFileError, ValueError, TypeError, IndexError):
+                    continue
+    raise IntensityFileError("JSON中未找到 x / intensity 数据")
+
+
+class ParsedIntensityFile:
+    """解析结果（数组只读）"""
+
+    def __init__(self, file_hash, filename, file_format, x, intensity, x_unit=None, columns=2, header=''):
+        x.setflags(write=False)
+        intensity.setflags(write=False)
+        self.file_hash = file_hash
+        self.filename = filename
+        self.format = file_format
+        self.x = x
+        self.intensity = intensity
+        self.x_unit = x_unit
+        self.columns = columns
+        self.header = header
+
+    @property
+    def nbytes(self):
+        return self.x.nbytes + self.intensity.nbytes
+
+    def preview(self, max_points=DEFAULT_PREVIEW_POINTS):
+        """
+        降采样预览：每个分段保留最小值与最大值，保证峰谷不丢失
+
+        点数不超过 max_points 时返回全部数据
+        """
+        n = self.x.size
+        max_points = max(int(max_points), 4)
+        if n <= max_points:
+            return self.x, self.intensity
+        buckets = max_points // 2
+        edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+        lo = np.minimum.reduceat(self.intensity, edges[:-1])
+        hi = np.maximum.reduceat(self.intensity, edges[:-1])
+        # 分段内最小/最大值（首次出现）的位置
+        segment = np.repeat(np.arange(buckets), np.diff(edges))
+        lo_index = _first_true_per_segment(self.intensity == lo[segment], edges)
+        hi_index = _first_true_per_segment(self.intensity == hi[segment], edges)
+        index = np.unique(np.concatenate((lo_index, hi_index, [0, n - 1])))
+        return self.x[index], self.intensity[index]
+
+    def describe(self):
+        return {
+            'file_hash': self.file_hash,
+            'filename': self.filename,
+            'format': self.format,
+            'num_points': int(self.x.size),
+            'columns': self.columns,
+            'x_unit': self.x_unit,
+            'x_range': [float(self.x.min()), float(self.x.max())],
+            'intensity_range': [float(self.intensity.min()), float(self.intensity.max())],
+            'intensity_mean': float(self.intensity.mean())
+        }
+
+
+def _first_true_per_segment(mask, edges):
+    """每个分段 [edges[i], edges[i+1]) 内第一个 True 的全局位置（每段至少有一个 True）"""
+    positions = np.flatnonzero(mask)
+    return positions[np.searchsorted(positions, edges[:-1])]
+
+
+class IntensityFileParser:
+    """
+    光强文件解析器（按内容哈希缓存解析结果，按字节数/数量有界LRU淘汰）
+
+    参数:
+        max_entries: 缓存的解析结果数量上限
+        max_bytes: 缓存的解析数组总字节数上限
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_entries = max(int(max_entries), 1)
+        self.max_bytes = max_bytes
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, file_hash):
+        with self._lock:
+            result = self._results.get(file_hash)
+            if result is not None:
+                self._results.move_to_end(file_hash)
+            return result
+
+    def parse_bytes(self, content, filename=''):
+        """解析内存中的文件内容"""
+        return self._parse(memoryview(content), filename)
+
+    def parse_path(self, path):
+        """解析磁盘文件（大文件内存映射读取）"""
+        size = os.path.getsize(path)
+        if size > MAX_FILE_BYTES:
+            raise IntensityFileError(f"文件过大: {size} 字节")
+        if size == 0:
+            raise IntensityFileError("文件为空")
+        with open(path, 'rb') as f:
+            return self._parse_file(f, size, os.path.basename(path))
+
+    def parse_stream(self, stream, filename=''):
+        """
+        解析上传的文件流
+
+        较大的上传由 Werkzeug 暂存在临时文件中，此时直接内存映射该文件，不再整体读入内存
+        """
+        try:
+            fileno = stream.fileno()
+            size = os.fstat(fileno).st_size
+        except (AttributeError, OSError, ValueError):
+            stream.seek(0)
+            return self.parse_bytes(stream.read(), filename)
+        if size > MAX_FILE_BYTES:
+            raise IntensityFileError(f"文件过大: {size} 字节")
+        if size == 0:
+            raise IntensityFileError("文件为空")
+        stream.seek(0)
+        return self._parse_file(stream, size, filename)
+
+    def _parse_file(self, f, size, filename):
+        """解析已打开的文件对象（大文件内存映射读取）"""
+        if size < MMAP_THRESHOLD:
+            return self._parse(memoryview(f.read()), filename)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                return self._parse(view, filename)
+            finally:
+                view.release()
+
+    def _parse(self, view, filename):
+        if view.nbytes > MAX_FILE_BYTES:
+            raise IntensityFileError(f"文件过大: {view.nbytes} 字节")
+        file_hash = hashlib.sha256(view).hexdigest()[:32]
+        with self._lock:
+            cached = self._results.get(file_hash)
+            if cached is not None:
+                self._results.move_to_end(file_hash)
+                self.hits += 1
+                return cached, True
+
+        buf = np.frombuffer(view, dtype=np.uint8)
+        file_format = detect_format(filename, bytes(buf[:64]))
+        if file_format == 'json':
+            try:
+                x, intensity = _json_arrays(json.loads(bytes(buf).decode('utf-8-sig')))
+            except json.JSONDecodeError as e:
+                raise IntensityFileError(f"JSON格式错误: {e}")
+            columns, header = 2, ''
+            x_unit = None
+        else:
+            start, end, num_lines = locate_numeric_block(buf)
+            x, intensity, columns = parse_numeric_block(bytes(buf[start:end]), num_lines)
+            header = bytes(buf[:start][-4096:]).decode('utf-8', errors='replace')
+            x_unit = detect_x_unit(header)
+
+        valid = np.isfinite(x) & np.isfinite(intensity)
+        if not np.all(valid):
+            x, intensity = x[valid], intensity[valid]
+        if x.size < 2:
+            raise IntensityFileError("有效数据点少于2个")
+
+        result = ParsedIntensityFile(file_hash, filename, file_format, np.ascontiguousarray(x, dtype=float),
+                                     np.ascontiguousarray(intensity, dtype=float), x_unit, columns, header)
+        with self._lock:
+            self.misses += 1
+            self._results[file_hash] = result
+            self._evict()
+        return result, False
+
+    def _evict(self):
+        """淘汰最久未使用的解析结果（至少保留最新的一个）"""
+        while len(self._results) > 1 and (len(self._results) > self.max_entries or self.total_bytes() > self.max_bytes):
+            self._results.popitem(last=False)
+            self.evictions += 1
+
+    def total_bytes(self):
+        return sum(result.nbytes for result in self._results.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._results),
+                'max_entries': self.max_entries,
+                'total_bytes': self.total_bytes(),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+_parser = None
+_parser_lock = threading.Lock()
+
+
+def get_intensity_file_parser():
+    """获取进程内共享的光强文件解析器（缓存总占用上限（MB）由 DILL_INTENSITY_FILE_CACHE_MB 设置）"""
+    global _parser
+    if _parser is None:
+        with _parser_lock:
+            if _parser is None:
+                max_mb = float(os.environ.get('DILL_INTENSITY_FILE_CACHE_MB', DEFAULT_CACHE_BYTES / (1024 * 1024)))
+                _parser = IntensityFileParser(max_bytes=int(max_mb * 1024 * 1024))
+    return _parser
@@ -0,0 +1,375 @@
+"""
+自定义光强分布登记表
+
+custom_intensity_data（x / intensity 数组，常有数千个点）原先随每次 /api/calculate、
+/api/calculate_data 和动画请求重复上传、重复 JSON 解析并重新转换为数组。这里改为"上传一次"：
+- POST /api/intensity-profiles 校验数据、规范单位标记、按 x 排序后保存为只读 float 数组，返回 ID
+- 计算请求只需传 ID（及范围外光强处理方式等请求级选项），服务端直接复用内存中的数组
+- ID 由数据内容哈希决定，相同数据重复登记直接命中；按字节数/数量有界LRU淘汰
+
+各模型路径（Dill 1D / 多维 / 2D曝光图案、CAR）共用同一个 IntensityProfile：
+- 单位换算只在登记时确定一次（统一换算为毫米，再按目标网格取 mm 或 μm）
+- 重采样结果按目标网格（起点/终点/点数）与范围外处理方式缓存
+- 单点/批量查询用 searchsorted 定位区间后线性插值
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# 登记表上限
+DEFAULT_MAX_PROFILES = 64
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+MAX_PROFILE_POINTS = 1000000
+
+# 坐标单位别名 -> 规范名称
+UNIT_ALIASES = {
+    'mm': 'mm',
+    'μm': 'μm', 'µm': 'μm', 'um': 'μm', 'micron': 'μm',
+    'nm': 'nm',
+    'pixels': 'pixels', 'pixel': 'pixels', 'px': 'pixels',
+    'custom': 'custom'
+}
+
+# 规范单位 -> 毫米的换算比例（未声明 unit_scale 时使用）
+UNIT_SCALE_TO_MM = {'mm': 1.0, 'μm': 1e-3, 'nm': 1e-6}
+
+# 每个分布缓存的重采样结果数量
+RESAMPLE_CACHE_SIZE = 16
+
+# 范围外光强处理方式：zero（置0）、boundary/edge（取边界值）、custom（取自定义值）
+EDGE_MODES = ('boundary', 'edge')
+
+# 计算请求中属于请求级选项（不属于数据本身）的字段
+REQUEST_OPTION_KEYS = ('outside_range_mode', 'custom_intensity_value')
+
+
+def grid_unit_for(grid, threshold=10.0):
+    """目标网格的坐标单位：范围不小于 threshold 视为微米网格，否则为毫米网格"""
+    grid = np.asarray(grid, dtype=float)
+    return 'μm' if grid.size and float(grid.max() - grid.min()) >= threshold else 'mm'
+
+
+def normalize_unit(unit):
+    """单位标记规范化（未知单位原样保留）"""
+    if unit is None:
+        return 'mm'
+    unit = str(unit).strip()
+    return UNIT_ALIASES.get(unit, UNIT_ALIASES.get(unit.lower(), unit))
+
+
+class IntensityProfile:
+    """
+    已登记的光强分布（x 升序，只读）
+
+    参数:
+        x, intensity: 坐标与光强（任意可转换为一维 float 数组的序列）
+        original_unit: 坐标单位
+        unit_scale: 原始单位 -> 毫米的比例
+    """
+
+    def __init__(self, x, intensity, original_unit='mm', unit_scale=None, name=None):
+        x = np.asarray(x, dtype=float).ravel()
+        intensity = np.asarray(intensity, dtype=float).ravel()
+        if x.shape != intensity.shape:
+            raise ValueError(f"x 与 intensity 长度不一致: {x.size} != {intensity.size}")
+        if x.size < 2:
+            raise ValueError("光强分布至少需要2个点")
+        if x.size > MAX_PROFILE_POINTS:
+            raise ValueError(f"光强分布点数超过上限 {MAX_PROFILE_POINTS}")
+        if not (np.all(np.isfinite(x)) and np.all(np.isfinite(intensity))):
+            raise ValueError("x 与 intensity 不能包含 NaN 或无穷大")
+
+        original_unit = normalize_unit(original_unit)
+        if unit_scale is None:
+            unit_scale = UNIT_SCALE_TO_MM.get(original_unit, 1.0)
+        unit_scale = float(unit_scale)
+        if not np.isfinite(unit_scale) or unit_scale <= 0:
+            raise ValueError(f"unit_scale 必须为正数: {unit_scale}")
+
+        # 稳定排序，保证重复坐标的先后顺序不变
+        if np.any(np.diff(x) < 0):
+            order = np.argsort(x, kind='stable')
+            x, intensity = x[order], intensity[order]
+        x.setflags(write=False)
+        intensity.setflags(write=False)
+
+        self.x = x
+        self.intensity = intensity
+        self.original_unit = original_unit
+        self.unit_scale = unit_scale
+        self.name = name
+        self.profile_id = self.content_id(x, intensity, original_unit, unit_scale)
+        self.created = time.time()
+        self.uses = 0
+        self.mm_scale, self.corrected_unit = self._resolve_mm_scale(x, original_unit, unit_scale)
+        self._coordinates = {}
+        self._resampled = OrderedDict()
+        self._lock = threading.Lock()
+        self.resample_hits = 0
+        self.resample_misses = 0
+
+    @staticmethod
+    def _resolve_mm_scale(x, original_unit, unit_scale):
+        """
+        原始坐标 -> 毫米的比例
+
+        - pixels：照片像素坐标按微米处理
+        - 声明为 mm 但范围明显不合理（<0.01mm 或 >100mm）时按误标修正为 μm / nm
+        - 其余单位使用 unit_scale（前端给出的 原始单位 -> mm 比例）
+        """
+        if original_unit == 'pixels':
+            return 1e-3, 'μm'
+        if original_unit == 'mm':
+            data_range = float(x[-1] - x[0])
+            if data_range < 1e-5:
+                return UNIT_SCALE_TO_MM['nm'], 'nm'
+            if data_range < 0.01 or data_range > 100:
+                return UNIT_SCALE_TO_MM['μm'], 'μm'
+        return unit_scale, original_unit
+
+    @staticmethod
+    def content_id(x, intensity, original_unit, unit_scale):
+        digest = hashlib.sha256()
+        digest.update(x.tobytes())
+        digest.update(intensity.tobytes())
+        digest.update(f"{original_unit}|{unit_scale!r}".encode('utf-8'))
+        return digest.hexdigest()[:32]
+
+    @property
+    def nbytes(self):
+        # 快照后再求和：其他线程可能正在写入坐标/重采样缓存
+        with self._lock:
+            cached = list(self._coordinates.values()) + list(self._resampled.values())
+        return self.x.nbytes + self.intensity.nbytes + sum(c.nbytes for c in cached)
+
+    def coordinates(self, unit=None):
+        """换算到 unit（'mm' 或 'μm'）的坐标；unit 为 None 时返回原始坐标"""
+        if unit is None:
+            return self.x
+        unit = normalize_unit(unit)
+        coords = self._coordinates.get(unit)
+        if coords is None:
+            factor = self.mm_scale * (1000.0 if unit == 'μm' else 1.0)
+            coords = self.x if factor == 1.0 else self.x * factor
+            coords.setflags(write=False)
+            with self._lock:
+                self._coordinates[unit] = coords
+        return coords
+
+    def values_at(self, points, unit=None, outside_range_mode='boundary', custom_intensity_value=0.0):
+        """
+        批量查询任意坐标处的光强（searchsorted 定位区间后线性插值）
+
+        参数:
+            points: 查询坐标（标量或数组）
+            unit: 查询坐标的单位，None 表示与原始数据相同
+            outside_range_mode: 数据范围外的处理方式（zero / boundary / edge / custom）
+            custom_intensity_value: custom 模式下的范围外光强
+        """
+        xs = self.coordinates(unit)
+        ys = self.intensity
+        q = np.asarray(points, dtype=float)
+        idx = np.clip(np.searchsorted(xs, q, side='right'), 1, xs.size - 1)
+        x0, x1 = xs[idx - 1], xs[idx]
+        y0, y1 = ys[idx - 1], ys[idx]
+        dx = x1 - x0
+        w = np.divide(q - x0, dx, out=np.zeros(np.shape(q)), where=dx > 0)
+        values = y0 + np.clip(w, 0.0, 1.0) * (y1 - y0)
+
+        if outside_range_mode not in EDGE_MODES:
+            fill = float(custom_intensity_value) if outside_range_mode == 'custom' else 0.0
+            values = np.where((q < xs[0]) | (q > xs[-1]), fill, values)
+        return values
+
+    def resample(self, grid, unit='μm', outside_range_mode='zero', custom_intensity_value=0.0):
+        """
+        重采样到目标网格（结果只读，均匀网格按 起点/终点/点数/处理方式 缓存）
+
+        参数:
+            grid: 目标网格坐标（升序）
+            unit: 目标网格单位（'mm' 或 'μm'）
+        """
+        grid = np.asarray(grid, dtype=float)
+        key = None
+        if grid.ndim == 1 and grid.size > 1:
+            step = (grid[-1] - grid[0]) / (grid.size - 1)
+            if np.allclose(np.diff(grid), step, rtol=1e-9, atol=1e-12 * max(abs(grid[0]), abs(grid[-1]), 1.0)):
+                fill = float(custom_intensity_value) if outside_range_mode == 'custom' else 0.0
+                mode = 'boundary' if outside_range_mode in EDGE_MODES else outside_range_mode
+                key = (normalize_unit(unit), float(grid[0]), float(grid[-1]), grid.size, mode, fill)
+                with self._lock:
+                    cached = self._resampled.get(key)
+                    if cached is not None:
+                        self._resampled.move_to_end(key)
+                        self.resample_hits += 1
+                        return cached
+
+        values = self.values_at(grid, unit, outside_range_mode, custom_intensity_value)
+        if key is not None:
+            values.setflags(write=False)
+            with self._lock:
+                self.resample_misses += 1
+                self._resampled[key] = values
+                while len(self._resampled) > RESAMPLE_CACHE_SIZE:
+                    self._resampled.popitem(last=False)
+        return values
+
+    def as_request_data(self, options=None):
+        """
+        转换为模型接受的 custom_intensity_data 字典（数组直接引用，不复制）
+
+        参数:
+            options: 请求级选项（outside_range_mode、custom_intensity_value）
+        """
+        data = {
+            'x': self.x,
+            'intensity': self.intensity,
+            'original_unit': self.original_unit,
+            'unit_scale': self.unit_scale,
+            'outside_range_mode': 'zero',
+            'custom_intensity_value': 0,
+            'profile_id': self.profile_id
+        }
+        for key in REQUEST_OPTION_KEYS:
+            if options and options.get(key) is not None:
+                data[key] = options[key]
+        return data
+
+    def describe(self):
+        return {
+            'profile_id': self.profile_id,
+            'name': self.name,
+            'num_points': int(self.x.size),
+            'x_range': [float(self.x[0]), float(self.x[-1])],
+            'intensity_range': [float(self.intensity.min()), float(self.intensity.max())],
+            'original_unit': self.original_unit,
+            'unit_scale': self.unit_scale,
+            'mm_scale': self.mm_scale,
+            'uses': self.uses,
+            'resample_cache': {'size': len(self._resampled), 'hits': self.resample_hits,
+                               'misses': self.resample_misses}
+        }
+
+
+class IntensityProfileRegistry:
+    """
+    光强分布登记表（按内容哈希登记，按字节数/数量有界LRU淘汰）
+
+    计算请求随附的原始数组也会自动登记（动画各帧、重复计算可复用重采样缓存），
+    因此除数量外还按总字节数（含各分布的坐标换算与重采样缓存）限制占用。
+
+    参数:
+        max_profiles: 最多保存的分布数量
+        max_bytes: 所有分布（含缓存）的总字节数上限
+    """
+
+    def __init__(self, max_profiles=DEFAULT_MAX_PROFILES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_profiles = max(int(max_profiles), 1)
+        self.max_bytes = max_bytes
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def register(self, x, intensity, original_unit='mm', unit_scale=None, name=None):
+        """
+        校验并登记光强分布
+
+        返回:
+            (IntensityProfile, 是否命中已有登记)
+        """
+        profile = IntensityProfile(x, intensity, original_unit, unit_scale, name)
+        with self._lock:
+            existing = self._profiles.get(profile.profile_id)
+            if existing is not None:
+                self._profiles.move_to_end(profile.profile_id)
+                self._evict()
+                return existing, True
+            self._profiles[profile.profile_id] = profile
+            self._evict()
+        return profile, False
+
+    def get(self, profile_id):
+        with self._lock:
+            profile = self._profiles.get(profile_id)
+            if profile is None:
+                self.misses += 1
+                return None
+            self._profiles.move_to_end(profile_id)
+            self.hits += 1
+            profile.uses += 1
+            # 分布上新缓存的重采样结果会增加占用，这里顺带检查上限
+            self._evict()
+            return profile
+
+    def _evict(self):
+        """淘汰最久未使用的分布（至少保留最新的一个）"""
+        while len(self._profiles) > 1 and (len(self._profiles) > self.max_profiles or self.total_bytes() > self.max_bytes):
+            self._profiles.popitem(last=False)
+            self.evictions += 1
+
+    def total_bytes(self):
+        return sum(profile.nbytes for profile in self._profiles.values())
+
+    def remove(self, profile_id):
+        with self._lock:
+            return self._profiles.pop(profile_id, None) is not None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'profiles': len(self._profiles),
+                'max_profiles': self.max_profiles,
+                'total_bytes': self.total_bytes(),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_intensity_profile_registry():
+    """
+    获取进程内共享的光强分布登记表
+
+    数量上限由 DILL_INTENSITY_PROFILE_LIMIT 设置，总占用上限（MB）由 DILL_INTENSITY_PROFILE_CACHE_MB 设置
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                max_mb = float(os.environ.get('DILL_INTENSITY_PROFILE_CACHE_MB', DEFAULT_MAX_BYTES / (1024 * 1024)))
+                _registry = IntensityProfileRegistry(int(os.environ.get('DILL_INTENSITY_PROFILE_LIMIT', DEFAULT_MAX_PROFILES)),
+                                                     max_bytes=int(max_mb * 1024 * 1024))
+    return _registry
+
+
+def profile_from_request_data(custom_intensity_data):
+    """
+    custom_intensity_data 字典 -> 共享的 IntensityProfile
+
+    已登记的分布（按ID解析得到的字典）直接复用；随请求上传的原始数组按内容哈希登记，
+    重复计算同一组数据时复用同一个对象及其重采样缓存。
+    """
+    registry = get_intensity_profile_registry()
+    profile_id = custom_intensity_data.get('profile_id')
+    if profile_id:
+        profile = registry.get(profile_id)
+        if profile is not None and profile.x is custom_intensity_data['x']:
+            return profile
+    profile, _ = registry.register(
+        custom_intensity_data['x'], custom_intensity_data['intensity'],
+        original_unit=custom_intensity_data.get('original_unit', 'mm'),
+        unit_scale=custom_intensity_data.get('unit_scale')
+    )
+    return profile
@@ -0,0 +1,229 @@
+"""
+批量反向设计搜索
+
+给定目标厚度和坐标，搜索使模型预测厚度最接近目标的工艺参数 (I_avg, V, K, t_exp)。
+原实现每次目标函数调用只对一行特征执行 model.predict，并且只从参数范围中点做一次
+L-BFGS-B，这里改为：
+- 拉丁超立方采样数千个候选，一次 predict 完成打分
+- 选取若干最优且互不相近的候选作为起点，所有起点的坐标搜索探测点合并为一次 predict
+  （对随机森林等分段常数模型同样有效，不依赖梯度）
+- 返回按误差排序的多个解，附带预测厚度和不确定度
+"""
+
+import numpy as np
+
+from .ml_registry import PROCESS_PARAMETERS
+
+# 特征列缺失于训练数据时使用的默认值（与 build_complete_feature_vector 一致）
+FEATURE_DEFAULTS = {
+    'substrate_refractive_index': 3.42,
+    'substrate_extinction_coefficient': 0.02,
+    'substrate_thickness': 525.0,
+    'substrate_thermal_conductivity': 150.0,
+    'arc_refractive_index': 1.85,
+    'arc_extinction_coefficient': 0.001,
+    'arc_thickness': 75.0,
+    'arc_reflectance': 2.1,
+    'arc_anti_reflective_efficiency': 97.9,
+    'wavelength': 193.0,
+    'numerical_aperture': 1.35,
+    'coherence_factor': 0.7,
+    'exposure_threshold': 0.5,
+    'dose_uniformity': 95.0,
+    'focus_offset': 0.0,
+    'learning_rate': 0.01,
+    'batch_size': 32,
+    'validation_split': 0.2,
+    'regularization_factor': 0.001,
+    'historical_data_weight': 0.8,
+    'expert_knowledge_factor': 0.3,
+    'confidence_threshold': 0.7
+}
+
+
+def latin_hypercube(n_samples, n_dims, rng):
+    """[0, 1) 上的拉丁超立方采样，每一维的 n_samples 个分层各取一个点"""
+    strata = np.tile(np.arange(n_samples), (n_dims, 1))
+    strata = rng.permuted(strata, axis=1).T
+    return (strata + rng.random((n_samples, n_dims))) / n_samples
+
+
+def build_feature_matrix(params, x, y, feature_columns, feature_means=None, param_names=PROCESS_PARAMETERS):
+    """
+    按模型的特征列顺序批量构建特征矩阵
+
+    参数:
+        params: 形状 (N, len(param_names)) 的工艺参数
+        x, y: 目标坐标（对应 annotation_x / annotation_y）
+        feature_columns: 模型训练时的特征列
+        feature_means: {列名: 均值}，用于填充非工艺参数特征
+
+    返回:
+        形状 (N, len(feature_columns)) 的特征矩阵
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    feature_means = feature_means or {}
+    param_index = {name: i for i, name in enumerate(param_names)}
+    fixed = {'annotation_x': x, 'annotation_y': y}
+
+    X = np.empty((params.shape[0], len(feature_columns)), dtype=float)
+    for j, col in enumerate(feature_columns):
+        if col in param_index:
+            X[:, j] = params[:, param_index[col]]
+        elif col in fixed:
+            X[:, j] = fixed[col]
+        else:
+            X[:, j] = feature_means.get(col, FEATURE_DEFAULTS.get(col, 0.0))
+    return X
+
+
+class InverseDesignSearch:
+    """
+    批量多起点反向设计搜索
+
+    参数:
+        model: 已训练的 scikit-learn 回归模型（params_to_thickness）
+        feature_columns: 模型特征列
+        param_ranges: {参数名: (最小值, 最大值)}
+        feature_means: {列名: 均值}
+        n_candidates: 拉丁超立方候选数量
+        n_starts: 局部搜索起点数量
+        max_iter: 坐标搜索最大迭代次数
+        seed: 随机种子（保证相同请求得到相同结果）
+    """
+
+    def __init__(self, model, feature_columns, param_ranges, feature_means=None,
+                 n_candidates=2048, n_starts=8, max_iter=40, seed=0):
+        self.model = model
+        self.feature_columns = list(feature_columns)
+        self.param_names = PROCESS_PARAMETERS
+        self.lower = np.array([param_ranges[p][0] for p in self.param_names], dtype=float)
+        self.upper = np.array([param_ranges[p][1] for p in self.param_names], dtype=float)
+        self.feature_means = feature_means or {}
+        self.n_candidates = max(int(n_candidates), 1)
+        self.n_starts = max(int(n_starts), 1)
+        self.max_iter = max(int(max_iter), 0)
+        self.rng = np.random.default_rng(seed)
+        self.n_evaluations = 0
+        self.n_predict_calls = 0
+
+    def _to_params(self, unit):
+        return self.lower + unit * (self.upper - self.lower)
+
+    def predict_batch(self, unit, x, y):
+        """对归一化参数 (N, 4) 一次性预测厚度"""
+        X = build_feature_matrix(self._to_params(unit), x, y, self.feature_columns, self.feature_means)
+        self.n_evaluations += X.shape[0]
+        self.n_predict_calls += 1
+        return np.asarray(self.model.predict(X), dtype=float).reshape(X.shape[0], -1)[:, 0]
+
+    def _select_starts(self, unit, loss, min_distance=0.1):
+        """按误差从小到大挑选彼此距离不小于 min_distance 的起点"""
+        order = np.argsort(loss)
+        starts = []
+        for idx in order:
+            if all(np.linalg.norm(unit[idx] - unit[s]) >= min_distance for s in starts):
+                starts.append(idx)
+                if len(starts) >= self.n_starts:
+                    break
+        return np.array(starts, dtype=int)
+
+    def _refine(self, unit, loss, x, y, target):
+        """
+        所有起点并行的坐标（模式）搜索
+
+        每轮为每个起点生成 ±step 沿各参数方向的探测点，合并为一次 predict；
+        有改进的起点移动到最优探测点，无改进的起点步长减半。
+        """
+        n_starts, n_dims = unit.shape
+        step = np.full(n_starts, 0.125)
+        directions = np.vstack([np.eye(n_dims), -np.eye(n_dims)])
+
+        for _ in range(self.max_iter):
+            active = step > 1e-3
+            if not active.any():
+                break
+            probes = np.clip(unit[active, None, :] + step[active, None, None] * directions[None, :, :], 0.0, 1.0)
+            flat = probes.reshape(-1, n_dims)
+            probe_loss = ((self.predict_batch(flat, x, y) - target) ** 2).reshape(probes.shape[:2])
+
+            best = probe_loss.argmin(axis=1)
+            best_loss = probe_loss[np.arange(len(best)), best]
+            active_idx = np.flatnonzero(active)
+            improved = best_loss < loss[active_idx]
+
+            moved = active_idx[improved]
+            unit[moved] = probes[improved, best[improved]]
+            loss[moved] = best_loss[improved]
+            step[active_idx[~improved]] *= 0.5
+        return unit, loss
+
+    def _uncertainty(self, unit, x, y):
+        """
+        预测不确定度
+
+        集成模型（随机森林等）使用各子模型预测的标准差；
+        其他模型使用解附近 ±2% 参数扰动下预测厚度的标准差（局部敏感度）。
+        """
+        X = build_feature_matrix(self._to_params(unit), x, y, self.feature_columns, self.feature_means)
+        estimators = getattr(self.model, 'estimators_', None)
+        if estimators is not None and len(estimators) > 1:
+            per_tree = np.stack([np.asarray(est.predict(X), dtype=float).reshape(X.shape[0], -1)[:, 0]
+                                 for est in estimators])
+            return per_tree.std(axis=0), 'ensemble_std'
+
+        n_dims = unit.shape[1]
+        perturb = 0.02 * np.vstack([np.eye(n_dims), -np.eye(n_dims)])
+        neighbours = np.clip(unit[:, None, :] + perturb[None, :, :], 0.0, 1.0).reshape(-1, n_dims)
+        predicted = self.predict_batch(neighbours, x, y).reshape(unit.shape[0], -1)
+        return predicted.std(axis=1), 'local_sensitivity'
+
+    def search(self, x, y, target_thickness, top_k=5):
+        """
+        执行搜索
+
+        返回:
+            dict: solutions（按误差排序的解列表）及搜索统计信息
+        """
+        target = float(target_thickness)
+        n_dims = len(self.param_names)
+
+        candidates = latin_hypercube(self.n_candidates, n_dims, self.rng)
+        candidates = np.vstack([candidates, np.full((1, n_dims), 0.5)])  # 保留原实现的中点初值
+        candidate_loss = (self.predict_batch(candidates, x, y) - target) ** 2
+
+        starts = self._select_starts(candidates, candidate_loss)
+        unit, loss = self._refine(candidates[starts].copy(), candidate_loss[starts].copy(), x, y, target)
+
+        # 去除收敛到同一位置的重复解
+        order = np.argsort(loss)
+        kept = []
+        for idx in order:
+            if all(np.linalg.norm(unit[idx] - unit[k]) >= 1e-3 for k in kept):
+                kept.append(idx)
+            if len(kept) >= top_k:
+                break
+        unit, loss = unit[kept], loss[kept]
+
+        predicted = self.predict_batch(unit, x, y)
+        uncertainty, uncertainty_method = self._uncertainty(unit, x, y)
+        params = self._to_params(unit)
+
+        solutions = []
+        for i in range(len(kept)):
+            solutions.append({
+                'rank': i + 1,
+                'parameters': {name: float(params[i, j]) for j, name in enumerate(self.param_names)},
+                'predicted_thickness': float(predicted[i]),
+                'absolute_error': float(abs(predicted[i] - target)),
+                'uncertainty': float(uncertainty[i])
+            })
+
+        return {
+            'solutions': solutions,
+            'uncertainty_method': uncertainty_method,
+            'n_candidates': int(candidates.shape[0]),
+            'n_starts': int(len(starts)),
+            'n_evaluations': int(self.n_evaluations),
+            'n_predict_calls': int(self.n_predict_calls)
+        }
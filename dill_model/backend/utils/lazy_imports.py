@@ -0,0 +1,71 @@
+"""
+重量级依赖的延迟导入
+
+matplotlib、pandas、scipy、scikit-learn、PIL 的导入合计约1秒，原先在 backend.app 导入时全部加载，
+冷启动的首个请求（包括 /api/health）都要等待。这里提供首次访问属性时才导入的模块代理：
+
+    from ..utils.lazy_imports import pyplot as plt
+    plt.figure(...)   # 第一次调用时才导入 matplotlib（并设置 Agg 后端）
+"""
+
+import importlib
+import sys
+import threading
+
+# 冷启动时不应加载的重量级模块
+HEAVY_MODULES = ('matplotlib', 'pandas', 'scipy', 'sklearn', 'PIL', 'joblib')
+
+
+class LazyModule:
+    """
+    模块代理：首次访问属性时导入
+
+    参数:
+        name: 模块名
+        setup: 导入前执行的初始化函数（如设置 matplotlib 后端）
+    """
+
+    def __init__(self, name, setup=None):
+        self._name = name
+        self._setup = setup
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    if self._setup is not None:
+                        self._setup()
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<LazyModule {self._name} ({state})>'
+
+
+def configure_matplotlib():
+    """服务端绘图使用非交互式 Agg 后端及全局字体设置"""
+    import matplotlib
+    matplotlib.use('Agg')
+    # 优先使用常见的无衬线字体
+    matplotlib.rcParams['font.sans-serif'] = ['Arial', 'DejaVu Sans', 'Liberation Sans', 'SimHei', 'Microsoft YaHei']
+    matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示为方块的问题
+
+
+pyplot = LazyModule('matplotlib.pyplot', setup=configure_matplotlib)
+pandas = LazyModule('pandas')
+ndimage = LazyModule('scipy.ndimage')
+scipy_fft = LazyModule('scipy.fft')
+pil_image = LazyModule('PIL.Image')
+pil_image_draw = LazyModule('PIL.ImageDraw')
+pil_image_font = LazyModule('PIL.ImageFont')
+
+
+def loaded_heavy_modules():
+    """当前进程已加载的重量级模块"""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
@@ -0,0 +1,343 @@
+"""
+计算日志环形缓冲存储
+
+固定容量的环形缓冲区，为每条日志分配单调递增的序列号(seq)，
+并在写入时预先计算维度/子分类等派生字段，按模型、类型、维度建立索引，
+使 /api/logs 的轮询只需处理新增日志（since=<seq>），而不必每次重扫全部日志。
+写入时通过条件变量唤醒等待新日志的推送连接（/api/logs/stream）。
+"""
+
+import threading
+import time
+from collections import deque
+
+# 维度关键字（与原 /api/logs 的关键字匹配规则保持一致）
+DIMENSION_KEYWORDS = (
+    ('1d', ('1d', '一维')),
+    ('2d', ('2d', '二维')),
+    ('3d', ('3d', '三维')),
+)
+
+
+def _detect_dimensions(message_lower):
+    """返回消息中出现的所有维度关键字对应的维度（按1d/2d/3d顺序）"""
+    return tuple(
+        dim for dim, keywords in DIMENSION_KEYWORDS
+        if any(keyword in message_lower for keyword in keywords)
+    )
+
+
+def _detect_compare_subcategory(message_lower, model_lower):
+    """比较页面的子分类（按模型划分）"""
+    if 'dill' in model_lower and 'enhanced' not in model_lower:
+        return 'dill'
+    elif 'enhanced' in model_lower or '厚胶' in message_lower:
+        return 'enhanced_dill'
+    elif 'car' in model_lower:
+        return 'car'
+    return 'unknown'
+
+
+def annotate_log_entry(entry, seq):
+    """为原始日志附加序列号和预计算的派生字段"""
+    message_lower = (entry.get('message', '') or '').lower()
+    model_lower = (entry.get('model', '') or '').lower()
+    dimensions = _detect_dimensions(message_lower)
+
+    stored = dict(entry)
+    stored['seq'] = seq
+    stored['_dimensions'] = dimensions
+    stored['_dimension'] = dimensions[0] if dimensions else 'unknown'
+    stored['_compare_subcategory'] = _detect_compare_subcategory(message_lower, model_lower)
+    return stored
+
+
+def to_api_entry(entry, page='index'):
+    """转换为 /api/logs 返回的日志格式"""
+    if page == 'compare':
+        category = 'compare'
+        subcategory = entry['_compare_subcategory']
+    else:
+        category = 'single'
+        subcategory = entry['_dimension']
+    return {
+        'id': f"{entry.get('timestamp', '')}-{entry['seq']}",
+        'seq': entry['seq'],
+        'timestamp': entry.get('timestamp'),
+        'type': entry.get('type', 'info'),
+        'message': entry.get('message', ''),
+        'model': entry.get('model', 'unknown'),
+        'details': '',
+        'category': category,
+        'subcategory': subcategory,
+        'dimension': entry['_dimension']
+    }
+
+
+class LogStore:
+    """
+    固定容量的日志环形缓冲区
+
+    - 写入 O(1)：槽位为 seq % capacity，满了直接覆盖最旧条目
+    - 每条日志拥有单调递增的 seq，清空日志后也不会回退
+    - 按 model / type / dimension 维护 seq 索引，淘汰时从索引头部弹出
+    - 写入会唤醒 wait_for_new 上等待的推送连接
+    """
+
+    def __init__(self, capacity=1000):
+        if capacity <= 0:
+            raise ValueError("日志容量必须为正整数")
+        self.capacity = int(capacity)
+        self._slots = [None] * self.capacity
+        self._next_seq = 1
+        self._first_seq = 1
+        self._by_model = {}
+        self._by_type = {}
+        self._by_dimension = {}
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return self._next_seq - self._first_seq
+
+    @property
+    def latest_seq(self):
+        """最新一条日志的序列号（尚无日志时为已分配的最后一个序列号，可能为0）"""
+        return self._next_seq - 1
+
+    def append(self, entry):
+        """
+        追加一条日志（entry 为 add_log_entry 构造的原始字典）
+
+        返回:
+            带有 seq 和预计算字段的存储条目
+        """
+        with self._cond:
+            stored = self._append_locked(entry)
+            self._cond.notify_all()
+        return stored
+
+    def _append_locked(self, entry):
+        seq = self._next_seq
+        if len(self) >= self.capacity:
+            self._evict_oldest()
+
+        stored = annotate_log_entry(entry, seq)
+        self._slots[seq % self.capacity] = stored
+        self._next_seq = seq + 1
+
+        self._by_model.setdefault(entry.get('model'), deque()).append(seq)
+        self._by_type.setdefault(entry.get('type'), deque()).append(seq)
+        for dim in stored['_dimensions']:
+            self._by_dimension.setdefault(dim, deque()).append(seq)
+        return stored
+
+    def _evict_oldest(self):
+        """淘汰最旧条目；由于淘汰按seq顺序进行，它必然位于各索引队列的头部"""
+        seq = self._first_seq
+        slot = seq % self.capacity
+        old = self._slots[slot]
+        self._slots[slot] = None
+        self._first_seq = seq + 1
+        if old is None:
+            return
+        for index, key in ((self._by_model, old.get('model')), (self._by_type, old.get('type'))):
+            self._pop_index(index, key, seq)
+        for dim in old['_dimensions']:
+            self._pop_index(self._by_dimension, dim, seq)
+
+    @staticmethod
+    def _pop_index(index, key, seq):
+        bucket = index.get(key)
+        if bucket and bucket[0] == seq:
+            bucket.popleft()
+            if not bucket:
+                del index[key]
+
+    def clear(self):
+        """清空日志（序列号继续递增，保证游标不会失效）"""
+        with self._cond:
+            self._slots = [None] * self.capacity
+            self._first_seq = self._next_seq
+            self._by_model.clear()
+            self._by_type.clear()
+            self._by_dimension.clear()
+
+    def wait_for_new(self, since, timeout=None):
+        """
+        阻塞等待序列号大于 since 的新日志
+
+        返回:
+            在超时前有新日志返回True，否则返回False
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._next_seq - 1 > since, timeout=timeout)
+
+    def get(self, seq):
+        """按序列号取日志，已淘汰或不存在时返回None"""
+        if seq < self._first_seq or seq >= self._next_seq:
+            return None
+        return self._slots[seq % self.capacity]
+
+    def _candidate_seqs(self, model=None, log_type=None, dimension=None):
+        """选择最小的索引队列作为候选集合（新→旧）"""
+        buckets = []
+        if model:
+            buckets.append(self._by_model.get(model, ()))
+        if log_type:
+            buckets.append(self._by_type.get(log_type, ()))
+        if dimension:
+            buckets.append(self._by_dimension.get(dimension, ()))
+        if buckets:
+            return reversed(min(buckets, key=len))
+        return range(self._next_seq - 1, self._first_seq - 1, -1)
+
+    def query(self, model=None, log_type=None, dimension=None, since=None):
+        """
+        按条件查询日志
+
+        参数:
+            model: 模型过滤（精确匹配）
+            log_type: 日志类型过滤（精确匹配）
+            dimension: 维度过滤（'1d'/'2d'/'3d'，按消息关键字）
+            since: 只返回 seq 大于该值的日志
+
+        返回:
+            满足条件的存储条目列表（新→旧）
+        """
+        return self.scan(model, log_type, dimension, since)[0]
+
+    def scan(self, model=None, log_type=None, dimension=None, since=None):
+        """
+        与 query 相同，另外返回本次扫描覆盖到的最大序列号（与查询在同一把锁内取得）
+
+        游标应推进到该值而不是事后再读 latest_seq，否则查询之后写入的日志会被跳过。
+
+        返回:
+            (满足条件的存储条目列表（新→旧）, 已扫描的最大seq)
+        """
+        since = since or 0
+        results = []
+        with self._cond:
+            high_water = self._next_seq - 1
+            for seq in self._candidate_seqs(model, log_type, dimension):
+                if seq <= since:
+                    break
+                entry = self._slots[seq % self.capacity]
+                if entry is None:
+                    continue
+                if model and entry.get('model') != model:
+                    continue
+                if log_type and entry.get('type') != log_type:
+                    continue
+                if dimension and dimension not in entry['_dimensions']:
+                    continue
+                results.append(entry)
+        return results, max(high_water, since)
+
+    to_api_entry = staticmethod(to_api_entry)
+
+
+class SQLiteLogStore:
+    """
+    基于本地SQLite文件的日志存储（多进程共享）
+
+    接口与 LogStore 一致，供多个gunicorn worker共享同一份日志；
+    seq 使用 AUTOINCREMENT 主键，清空后不会回退，超出容量的旧日志在写入时删除。
+    """
+
+    POLL_INTERVAL = 0.25  # 跨进程等待新日志时的轮询间隔（秒）
+
+    def __init__(self, connect, capacity=1000):
+        self.capacity = int(capacity)
+        self._connect = connect
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS logs ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, type TEXT, model TEXT, "
+                "message TEXT, dimension TEXT, details TEXT, "
+                "dimensions TEXT, primary_dimension TEXT, compare_subcategory TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_model ON logs(model, seq)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_type ON logs(type, seq)")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+
+    @property
+    def latest_seq(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'logs'").fetchone()
+        return row[0] if row else 0
+
+    def append(self, entry):
+        stored = annotate_log_entry(entry, None)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO logs (timestamp, type, model, message, dimension, details, "
+                "dimensions, primary_dimension, compare_subcategory) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (stored.get('timestamp'), stored.get('type'), stored.get('model'), stored.get('message'),
+                 stored.get('dimension'), stored.get('details'), ',' + ','.join(stored['_dimensions']) + ',',
+                 stored['_dimension'], stored['_compare_subcategory'])
+            )
+            stored['seq'] = cursor.lastrowid
+            conn.execute("DELETE FROM logs WHERE seq <= ?", (stored['seq'] - self.capacity,))
+        return stored
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM logs")
+
+    def wait_for_new(self, since, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        while self.latest_seq <= since:
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(self.POLL_INTERVAL)
+        return True
+
+    def query(self, model=None, log_type=None, dimension=None, since=None):
+        return self.scan(model, log_type, dimension, since)[0]
+
+    def scan(self, model=None, log_type=None, dimension=None, since=None):
+        """
+        返回 (日志列表, 已扫描的最大seq)
+
+        先读取已分配的最大seq再只查询不超过它的日志：写入是串行提交的，
+        之后提交的日志seq必然更大，会在下一次扫描中返回。
+        """
+        since = since or 0
+        with self._connect() as conn:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'logs'").fetchone()
+            high_water = row[0] if row else 0
+            if high_water <= since:
+                return [], since
+            rows = self._select(conn, model, log_type, dimension, since, high_water)
+        return [
+            {
+                'seq': row[0], 'timestamp': row[1], 'type': row[2], 'model': row[3],
+                'message': row[4], 'dimension': row[5], 'details': row[6],
+                '_dimensions': tuple(d for d in row[7].split(',') if d),
+                '_dimension': row[8], '_compare_subcategory': row[9]
+            }
+            for row in rows
+        ], high_water
+
+    @staticmethod
+    def _select(conn, model, log_type, dimension, since, high_water):
+        sql = ("SELECT seq, timestamp, type, model, message, dimension, details, "
+               "dimensions, primary_dimension, compare_subcategory FROM logs WHERE seq > ? AND seq <= ?")
+        params = [since, high_water]
+        if model:
+            sql += " AND model = ?"
+            params.append(model)
+        if log_type:
+            sql += " AND type = ?"
+            params.append(log_type)
+        if dimension:
+            sql += " AND dimensions LIKE ?"
+            params.append(f"%,{dimension},%")
+        sql += " ORDER BY seq DESC"
+        return conn.execute(sql, params).fetchall()
+
+    to_api_entry = staticmethod(to_api_entry)
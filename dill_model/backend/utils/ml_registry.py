@@ -0,0 +1,238 @@
+"""
+机器学习模型注册表
+
+在进程内缓存 validation_model_*.pkl 模型文件，避免每次预测都执行 joblib.load：
+- 首次使用（或启动预热）时加载一次，之后直接复用内存中的模型
+- 每次获取时检查文件 mtime，文件被替换后自动重新加载
+- train_model 完成后通过 save 原子写入（临时文件 + os.replace）并立即加载，
+  并发预测不会读到写了一半的文件；同一模型类型的训练由 training_lock 串行化
+- 预先计算特征范围/均值等元数据、缓存训练特征矩阵，并提供版本信息
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+# 支持的模型类型（对应 validation_model_<type>.pkl）
+ML_MODEL_TYPES = ('linear_regression', 'random_forest', 'svm')
+
+# 反向预测时优化的工艺参数
+PROCESS_PARAMETERS = ('I_avg', 'V', 'K', 't_exp')
+
+# 训练数据中没有对应列时使用的默认参数范围
+DEFAULT_PARAM_RANGES = {
+    'I_avg': (0.1, 10.0),
+    'V': (1.0, 50.0),
+    'K': (0.01, 1.0),
+    't_exp': (0.1, 10.0)
+}
+
+
+class ModelEntry:
+    """一个已加载的模型及其元数据"""
+
+    def __init__(self, model_type, path, model_info, mtime, version):
+        self.model_type = model_type
+        self.path = path
+        self.mtime = mtime
+        self.version = version
+        self.loaded_at = time.time()
+
+        # 兼容旧版本模型文件（直接是模型对象）
+        if isinstance(model_info, dict) and 'model' in model_info:
+            self.model_info = model_info
+            self.model = model_info['model']
+        else:
+            self.model_info = {}
+            self.model = model_info
+        self.target_columns = self.model_info.get('target_columns', list(PROCESS_PARAMETERS))
+        self.feature_columns = self.model_info.get('feature_columns', ['annotation_x', 'annotation_y', 'actual_value'])
+        self.training_logic = self.model_info.get('training_params', {}).get('training_logic', 'unknown')
+
+    def describe(self):
+        """版本信息（可JSON序列化）"""
+        return {
+            'model_type': self.model_type,
+            'version': self.version,
+            'file': os.path.basename(self.path),
+            'file_mtime': self.mtime,
+            'loaded_at': self.loaded_at,
+            'estimator': type(self.model).__name__,
+            'training_logic': self.training_logic,
+            'feature_count': len(self.feature_columns),
+            'target_columns': list(self.target_columns)
+        }
+
+
+class MLModelRegistry:
+    """
+    进程内机器学习模型注册表
+
+    参数:
+        base_dir: 模型文件所在目录
+        validation_store: 验证记录存储，用于计算特征范围/均值
+    """
+
+    def __init__(self, base_dir, validation_store=None):
+        self.base_dir = base_dir
+        self.validation_store = validation_store
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._versions = {}
+        self._feature_stats = None
+        self._feature_stats_revision = None
+        self._training_data = None
+        self._training_locks = {}
+
+    def model_path(self, model_type):
+        return os.path.join(self.base_dir, f'validation_model_{model_type}.pkl')
+
+    def exists(self, model_type):
+        return os.path.exists(self.model_path(model_type))
+
+    def get(self, model_type):
+        """
+        获取模型（文件变化时自动重新加载）
+
+        返回:
+            ModelEntry，模型文件不存在时返回None
+        """
+        path = self.model_path(model_type)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            with self._lock:
+                self._entries.pop(model_type, None)
+            return None
+
+        entry = self._entries.get(model_type)
+        if entry is not None and entry.mtime == mtime:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(model_type)
+            if entry is None or entry.mtime != mtime:
+                entry = self._load(model_type, path, mtime)
+        return entry
+
+    def _load(self, model_type, path, mtime):
+        import joblib
+        model_info = joblib.load(path)
+        version = self._versions.get(model_type, 0) + 1
+        self._versions[model_type] = version
+        entry = ModelEntry(model_type, path, model_info, mtime, version)
+        self._entries[model_type] = entry
+        print(f"📦 已加载机器学习模型 {model_type} (版本 {version})")
+        return entry
+
+    def reload(self, model_type):
+        """强制重新加载（例如 train_model 写入新文件之后）"""
+        with self._lock:
+            self._entries.pop(model_type, None)
+        return self.get(model_type)
+
+    def training_lock(self, model_type):
+        """同一模型类型的训练锁（手动训练与漂移触发的后台重训练互斥）"""
+        with self._lock:
+            lock = self._training_locks.get(model_type)
+            if lock is None:
+                lock = self._training_locks[model_type] = threading.Lock()
+            return lock
+
+    def save(self, model_type, model_info):
+        """
+        原子地写入模型文件并立即加载
+
+        先写入同目录的临时文件再 os.replace，读取方（包括按 mtime 重新加载的 get）
+        只会看到旧文件或完整的新文件。
+        """
+        import joblib
+        path = self.model_path(model_type)
+        fd, temp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp',
+                                         dir=os.path.dirname(path) or '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                joblib.dump(model_info, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return self.reload(model_type)
+
+    def warm_up(self, model_types=ML_MODEL_TYPES):
+        """预加载所有已存在的模型及特征统计，失败不影响服务"""
+        for model_type in model_types:
+            try:
+                self.get(model_type)
+            except Exception as e:
+                print(f"⚠️ 预加载模型 {model_type} 失败: {e}")
+        try:
+            self.feature_stats()
+        except Exception as e:
+            print(f"⚠️ 预计算特征统计失败: {e}")
+
+    def feature_stats(self):
+        """
+        训练数据各数值列的 (min, max, mean)
+
+        结果按验证记录存储的修订号缓存，记录变化后重新计算。
+        """
+        if self.validation_store is None:
+            return {}
+        revision = self.validation_store.revision()
+        if self._feature_stats is not None and self._feature_stats_revision == revision:
+            return self._feature_stats
+        with self._lock:
+            if self._feature_stats is None or self._feature_stats_revision != revision:
+                self._feature_stats = self.validation_store.column_stats(self.validation_store.columns)
+                self._feature_stats_revision = revision
+            return self._feature_stats
+
+    def training_data(self, prepare):
+        """
+        训练特征矩阵（按验证记录存储的修订号缓存）
+
+        参数:
+            prepare: prepare(df) -> 准备好的训练数据，df 为全部验证记录
+
+        返回:
+            (prepare 的返回值, 是否命中缓存)
+        """
+        revision = self.validation_store.revision()
+        cached = self._training_data
+        if cached is not None and cached[0] == revision:
+            return cached[1], True
+        with self._lock:
+            cached = self._training_data
+            if cached is not None and cached[0] == revision:
+                return cached[1], True
+            prepared = prepare(self.validation_store.to_dataframe())
+            self._training_data = (revision, prepared)
+            return prepared, False
+
+    def param_ranges(self):
+        """工艺参数的取值范围（训练数据的最小/最大值，缺失时使用默认范围）"""
+        stats = self.feature_stats()
+        return {
+            param: (stats[param][0], stats[param][1]) if param in stats else DEFAULT_PARAM_RANGES[param]
+            for param in PROCESS_PARAMETERS
+        }
+
+    def feature_means(self):
+        """训练数据各数值列的均值"""
+        return {col: stat[2] for col, stat in self.feature_stats().items()}
+
+    def versions(self):
+        """所有模型的版本信息"""
+        info = {}
+        for model_type in ML_MODEL_TYPES:
+            entry = self._entries.get(model_type)
+            if entry is not None:
+                info[model_type] = dict(entry.describe(), loaded=True)
+            else:
+                info[model_type] = {'model_type': model_type, 'loaded': False, 'file_exists': self.exists(model_type)}
+        return info
@@ -0,0 +1,274 @@
+"""
+验证记录在线更新
+
+save_validation_data 追加新的测量记录后，无需等待完整的 train_model 即可让模型吸收新数据：
+- 新记录按模型特征列转换后追加到特征缓存
+- 线性模型：对系数做归一化LMS（SGD式）增量更新，毫秒级完成
+- 其他模型（随机森林、SVM）：维护最近邻残差修正表，预测时加上邻近新记录的残差
+- 监控新记录的残差（漂移指标），超过阈值时在后台线程执行一次完整重训练
+
+在线状态与模型版本绑定：模型文件被重新训练/重新加载后，旧版本的在线状态自动作废。
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .inverse_design import FEATURE_DEFAULTS
+from .ml_registry import ML_MODEL_TYPES
+
+# 默认漂移检测参数
+DRIFT_WINDOW = 20           # 滚动残差窗口大小
+DRIFT_MIN_SAMPLES = 5       # 参考窗口及判断漂移所需的最少新记录数
+DRIFT_RMSE_RATIO = 1.5      # 滚动RMSE超过基准RMSE的倍数时判定为漂移
+RETRAIN_NEW_FRACTION = 0.5  # 新记录数超过训练样本数的该比例时也触发重训练
+
+
+def _to_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value
+
+
+class CorrectedModel:
+    """
+    在线修正后的模型
+
+    predict 返回基础模型预测加上最近邻残差修正；其他属性（如随机森林的 estimators_）委托给基础模型。
+    """
+
+    def __init__(self, state):
+        self._state = state
+
+    def predict(self, X):
+        return self._state.predict(X)
+
+    def __getattr__(self, name):
+        return getattr(self._state.model, name)
+
+
+class OnlineModelState:
+    """
+    单个模型版本的在线更新状态
+
+    参数:
+        entry: 注册表中的 ModelEntry
+        feature_stats: {列名: (最小值, 最大值, 均值)}，用于特征归一化和缺失值填充
+        k_neighbors: 残差修正使用的近邻数量
+        radius: 归一化空间中残差修正的影响半径
+    """
+
+    def __init__(self, entry, feature_stats, k_neighbors=3, radius=0.25):
+        self.model_type = entry.model_type
+        self.version = entry.version
+        self.feature_columns = list(entry.feature_columns)
+        # 缺失特征的填充值：训练数据均值，没有时使用默认值
+        self.fill = np.array([feature_stats[col][2] if col in feature_stats else FEATURE_DEFAULTS.get(col, 0.0)
+                              for col in self.feature_columns], dtype=float)
+        self.center = np.array([feature_stats.get(col, (0.0, 1.0, 0.0))[2] for col in self.feature_columns], dtype=float)
+        scale = np.array([feature_stats.get(col, (0.0, 1.0, 0.0))[1] - feature_stats.get(col, (0.0, 1.0, 0.0))[0]
+                          for col in self.feature_columns], dtype=float)
+        self.scale = np.where(scale > 1e-12, scale, 1.0)
+        self.k_neighbors = k_neighbors
+        self.radius = radius
+
+        self.model = entry.model
+        self.method = 'knn_residual'
+        if hasattr(entry.model, 'coef_') and hasattr(entry.model, 'intercept_'):
+            # 线性模型：复制一份再增量更新，注册表中的原始模型保持不变
+            import copy
+            self.model = copy.deepcopy(entry.model)
+            self.method = 'lms'
+
+        data_stats = entry.model_info.get('data_stats', {})
+        self.training_samples = int(data_stats.get('training_samples', 0) or 0)
+        metrics = entry.model_info.get('metrics', {})
+        mse = metrics.get('mse')
+        self.baseline_rmse = float(np.sqrt(mse)) if mse else None
+
+        self.features = np.empty((0, len(self.feature_columns)))
+        self.residuals = np.empty(0)
+        self.recent_errors = deque(maxlen=DRIFT_WINDOW)
+        self.n_updates = 0
+        self.last_update = None
+
+    def _normalize(self, X):
+        return (X - self.center) / self.scale
+
+    def _base_predict(self, X):
+        return np.asarray(self.model.predict(X), dtype=float).reshape(X.shape[0], -1)[:, 0]
+
+    def correction(self, X):
+        """最近邻残差修正（逆距离加权，影响半径之外衰减为0）"""
+        if self.method != 'knn_residual' or len(self.residuals) == 0:
+            return np.zeros(X.shape[0])
+        Z = self._normalize(X)
+        Zt = self._normalize(self.features)
+        dist = np.sqrt(((Z[:, None, :] - Zt[None, :, :]) ** 2).mean(axis=2))
+        k = min(self.k_neighbors, len(self.residuals))
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        nearest_dist = np.take_along_axis(dist, nearest, axis=1)
+        weights = np.clip(1.0 - nearest_dist / self.radius, 0.0, None) / (nearest_dist + 1e-6)
+        total = weights.sum(axis=1)
+        corrected = (weights * self.residuals[nearest]).sum(axis=1)
+        return np.divide(corrected, total, out=np.zeros_like(corrected), where=total > 0)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float)
+        return self._base_predict(X) + self.correction(X)
+
+    def _lms_update(self, x, error, step=0.5):
+        """归一化LMS：在归一化特征空间中更新一步，再换算回原始特征空间的系数"""
+        z = self._normalize(x)
+        a = np.append(z, 1.0)
+        delta = step * error * a / (a @ a)
+        dw = delta[:-1] / self.scale
+        coef = np.asarray(self.model.coef_, dtype=float)
+        intercept = np.asarray(self.model.intercept_, dtype=float)
+        self.model.coef_ = coef + dw.reshape(coef.shape)
+        self.model.intercept_ = intercept + (delta[-1] - dw @ self.center)
+
+    def observe(self, X, actual):
+        """吸收一批新记录，返回这批记录在更新前的预测误差"""
+        errors = actual - self.predict(X)
+        for i in range(X.shape[0]):
+            if self.method == 'lms':
+                self._lms_update(X[i], actual[i] - self._base_predict(X[i:i + 1])[0])
+        if self.method == 'knn_residual':
+            self.features = np.vstack([self.features, X])
+            self.residuals = np.append(self.residuals, actual - self._base_predict(X))
+        self.recent_errors.extend(errors.tolist())
+        self.n_updates += X.shape[0]
+        self.last_update = time.time()
+
+        if self.baseline_rmse is None and self.n_updates >= DRIFT_MIN_SAMPLES:
+            # 旧模型文件没有保存训练误差时，以最早的一批新记录作为参考窗口
+            self.baseline_rmse = float(np.sqrt(np.mean(np.square(list(self.recent_errors)[:DRIFT_MIN_SAMPLES]))))
+        return errors
+
+    def drift(self):
+        """漂移指标"""
+        rolling_rmse = float(np.sqrt(np.mean(np.square(self.recent_errors)))) if self.recent_errors else None
+        ratio = None
+        if rolling_rmse is not None and self.baseline_rmse:
+            ratio = rolling_rmse / self.baseline_rmse
+        return {
+            'rolling_rmse': rolling_rmse,
+            'baseline_rmse': self.baseline_rmse,
+            'rmse_ratio': ratio,
+            'new_records': self.n_updates,
+            'training_samples': self.training_samples
+        }
+
+    def needs_retrain(self):
+        drift = self.drift()
+        if len(self.recent_errors) >= DRIFT_MIN_SAMPLES and drift['rmse_ratio'] is not None \
+                and drift['rmse_ratio'] > DRIFT_RMSE_RATIO:
+            return 'rmse_drift'
+        if self.training_samples and self.n_updates >= max(DRIFT_MIN_SAMPLES, RETRAIN_NEW_FRACTION * self.training_samples):
+            return 'new_data_fraction'
+        return None
+
+    def describe(self):
+        return dict(self.drift(), model_type=self.model_type, version=self.version,
+                    method=self.method, last_update=self.last_update)
+
+
+class OnlineModelUpdater:
+    """
+    管理所有模型的在线更新状态
+
+    参数:
+        registry: MLModelRegistry
+        retrain: retrain(model_type) 执行完整重训练的回调；为None时不自动重训练
+    """
+
+    def __init__(self, registry, retrain=None):
+        self.registry = registry
+        self.retrain = retrain
+        self._lock = threading.RLock()
+        self._states = {}
+        self._retraining = set()
+
+    def _state_for(self, entry):
+        state = self._states.get(entry.model_type)
+        if state is None or state.version != entry.version:
+            state = OnlineModelState(entry, self.registry.feature_stats())
+            self._states[entry.model_type] = state
+        return state
+
+    def model_for(self, entry):
+        """预测时使用的模型：有在线更新时返回修正后的模型，否则返回原模型"""
+        with self._lock:
+            state = self._states.get(entry.model_type)
+            if state is None or state.version != entry.version or state.n_updates == 0:
+                return entry.model
+            return CorrectedModel(state)
+
+    def observe(self, rows):
+        """
+        吸收 save_validation_data 新追加的记录
+
+        参数:
+            rows: 记录字典列表（与验证记录列一致）
+
+        返回:
+            {model_type: 在线更新摘要}
+        """
+        summary = {}
+        for model_type in ML_MODEL_TYPES:
+            entry = self.registry.get(model_type)
+            if entry is None or entry.training_logic != 'params_to_thickness':
+                continue
+            actual = np.array([_to_float(row.get('actual_value')) for row in rows])
+            start = time.time()
+            with self._lock:
+                state = self._state_for(entry)
+                X = np.array([[_to_float(row.get(col)) for col in state.feature_columns] for row in rows])
+                X = np.where(np.isnan(X), state.fill, X)
+                valid = ~np.isnan(actual)
+                if not valid.any():
+                    continue
+                errors = state.observe(X[valid], actual[valid])
+                reason = state.needs_retrain()
+                info = state.describe()
+            info.update({
+                'batch_mae': float(np.mean(np.abs(errors))),
+                'update_ms': round((time.time() - start) * 1000, 2),
+                'retrain_triggered': bool(reason) and self._schedule_retrain(model_type, reason)
+            })
+            summary[model_type] = info
+        return summary
+
+    def _schedule_retrain(self, model_type, reason):
+        """后台线程执行完整重训练；同一模型同时只运行一次"""
+        if self.retrain is None:
+            return False
+        with self._lock:
+            if model_type in self._retraining:
+                return False
+            self._retraining.add(model_type)
+
+        def run():
+            try:
+                print(f"🔁 检测到验证数据漂移({reason})，后台重新训练 {model_type} 模型")
+                self.retrain(model_type)
+            except Exception as e:
+                print(f"⚠️ 后台重新训练 {model_type} 失败: {e}")
+            finally:
+                with self._lock:
+                    self._retraining.discard(model_type)
+
+        threading.Thread(target=run, name=f'ml-retrain-{model_type}', daemon=True).start()
+        return True
+
+    def status(self):
+        with self._lock:
+            return {
+                model_type: dict(state.describe(), retraining=model_type in self._retraining)
+                for model_type, state in self._states.items()
+            }
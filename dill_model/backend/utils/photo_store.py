@@ -0,0 +1,196 @@
+"""
+照片解码缓存
+
+/api/process-photo 原先每次请求都上传整张 base64 图像并重新解码；调整方向、平滑或坐标参数时
+同一张照片会被反复上传和解码。这里改为"上传一次"：
+- 图像按内容哈希（SHA-256）登记为句柄，相同内容重复上传直接命中
+- 每个句柄只解码一次，保存 RGB 数组；各灰度方法的灰度图按需计算后缓存在句柄上
+- 为前端预览生成降采样金字塔（每级 2×2 块平均）
+- 按总字节数和句柄数量有界，超出时淘汰最久未使用的句柄
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# 缓存上限
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_IMAGES = 16
+
+# 预览金字塔：降采样到最长边不超过该值为止
+PREVIEW_MIN_SIZE = 128
+
+
+def decode_image_data(image_data):
+    """base64 字符串（可带 data:image 前缀）-> 原始字节"""
+    import base64
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+    return base64.b64decode(image_data)
+
+
+def grayscale_from_rgb(rgb, method='weighted'):
+    """彩色转灰度（weighted / average / luminance / max），返回 uint8 数组"""
+    if method == 'average':
+        grayscale = rgb.mean(axis=2)
+    elif method == 'luminance':
+        grayscale = 0.21 * rgb[:, :, 0] + 0.72 * rgb[:, :, 1] + 0.07 * rgb[:, :, 2]
+    elif method == 'max':
+        grayscale = rgb.max(axis=2)
+    else:
+        # 加权平均法（默认）
+        grayscale = 0.299 * rgb[:, :, 0] + 0.587 * rgb[:, :, 1] + 0.114 * rgb[:, :, 2]
+    return grayscale.astype(np.uint8)
+
+
+def downsample2(array):
+    """2×2 块平均降采样（奇数边长时丢弃最后一行/列）"""
+    h, w = array.shape[0] // 2 * 2, array.shape[1] // 2 * 2
+    blocks = array[:h, :w].astype(np.float32).reshape(h // 2, 2, w // 2, 2, *array.shape[2:])
+    return blocks.mean(axis=(1, 3)).astype(array.dtype)
+
+
+class PhotoImage:
+    """已解码的照片句柄"""
+
+    def __init__(self, image_id, rgb):
+        self.image_id = image_id
+        self.rgb = rgb
+        self.rgb.setflags(write=False)
+        self.height, self.width = rgb.shape[:2]
+        self.created = time.time()
+        self.uses = 0
+        self._grayscale = {}
+        self._pyramid = None
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        # 对缓存取快照后再求和：其他线程可能正在写入新的灰度图。
+        # 不加 self._lock，因为灰度转换期间会一直持有该锁，而登记表在自身锁内调用本属性
+        grayscale = list(self._grayscale.values())
+        return self.rgb.nbytes + sum(g.nbytes for g in grayscale) + \
+            sum(level.nbytes for level in (self._pyramid or [])[1:])
+
+    def grayscale(self, method='weighted'):
+        """灰度图（每种方法只计算一次，只读）"""
+        cached = self._grayscale.get(method)
+        if cached is None:
+            with self._lock:
+                cached = self._grayscale.get(method)
+                if cached is None:
+                    cached = grayscale_from_rgb(self.rgb, method)
+                    cached.setflags(write=False)
+                    self._grayscale[method] = cached
+        return cached
+
+    def pyramid(self):
+        """加权灰度图的降采样金字塔：[原尺寸, 1/2, 1/4, ...]，直到最长边不超过 PREVIEW_MIN_SIZE"""
+        if self._pyramid is None:
+            levels = [self.grayscale('weighted')]
+            while max(levels[-1].shape) > PREVIEW_MIN_SIZE and min(levels[-1].shape) >= 2:
+                level = downsample2(levels[-1])
+                level.setflags(write=False)
+                levels.append(level)
+            self._pyramid = levels
+        return self._pyramid
+
+    def describe(self):
+        return {
+            'image_id': self.image_id,
+            'width': self.width,
+            'height': self.height,
+            'preview_levels': [[int(level.shape[1]), int(level.shape[0])] for level in self.pyramid()],
+            'cached_grayscale_methods': sorted(list(self._grayscale)),
+            'uses': self.uses
+        }
+
+
+class PhotoImageStore:
+    """
+    照片句柄缓存（按内容哈希登记，按字节数/数量有界LRU淘汰）
+
+    参数:
+        max_bytes: 缓存的解码数组总字节数上限
+        max_images: 句柄数量上限
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_images=DEFAULT_MAX_IMAGES):
+        self.max_bytes = max_bytes
+        self.max_images = max_images
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.decodes = 0
+        self.evictions = 0
+
+    def put(self, image_bytes):
+        """
+        登记图像（已存在时不重新解码）
+
+        返回:
+            (PhotoImage, 是否命中已有句柄)
+        """
+        image_id = hashlib.sha256(image_bytes).hexdigest()[:32]
+        with self._lock:
+            image = self._images.get(image_id)
+            if image is not None:
+                self._images.move_to_end(image_id)
+                self.hits += 1
+                return image, True
+
+        from PIL import Image
+        import io
+        with Image.open(io.BytesIO(image_bytes)) as pil_image:
+            if pil_image.mode != 'RGB':
+                pil_image = pil_image.convert('RGB')
+            rgb = np.asarray(pil_image, dtype=np.uint8).copy()
+        image = PhotoImage(image_id, rgb)
+
+        with self._lock:
+            self.decodes += 1
+            existing = self._images.get(image_id)
+            if existing is not None:
+                return existing, True
+            self._images[image_id] = image
+            self._evict()
+        return image, False
+
+    def get(self, image_id):
+        with self._lock:
+            image = self._images.get(image_id)
+            if image is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(image_id)
+            self.hits += 1
+            image.uses += 1
+            # 句柄上新缓存的灰度图/金字塔会增加占用，这里顺带检查上限
+            self._evict()
+            return image
+
+    def _evict(self):
+        """淘汰最久未使用的句柄（至少保留最新的一个）"""
+        while len(self._images) > 1 and (len(self._images) > self.max_images or self.total_bytes() > self.max_bytes):
+            self._images.popitem(last=False)
+            self.evictions += 1
+
+    def total_bytes(self):
+        return sum(image.nbytes for image in self._images.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'images': len(self._images),
+                'total_bytes': self.total_bytes(),
+                'max_bytes': self.max_bytes,
+                'max_images': self.max_images,
+                'hits': self.hits,
+                'misses': self.misses,
+                'decodes': self.decodes,
+                'evictions': self.evictions
+            }
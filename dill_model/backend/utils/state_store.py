@@ -0,0 +1,96 @@
+"""
+共享状态存储
+
+将原先 routes/api.py 中的全局变量（计算日志、最近计算结果）放到统一的存储抽象之后：
+- InProcessStateStore: 进程内存储，使用锁保护，适用于单进程多线程服务器
+- SQLiteStateStore: 本地SQLite文件存储，适用于多个gunicorn worker共享状态
+
+通过环境变量选择后端：
+    DILL_STATE_BACKEND=memory|sqlite  （默认 memory）
+    DILL_STATE_DB=<sqlite文件路径>      （默认系统临时目录下的 dill_model_state.sqlite3）
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .helpers import NumpyEncoder
+from .log_store import LogStore, SQLiteLogStore
+
+
+class InProcessStateStore:
+    """进程内共享状态（锁保护）"""
+
+    backend = 'memory'
+
+    def __init__(self, log_capacity=1000):
+        self._lock = threading.RLock()
+        self._values = {}
+        self.logs = LogStore(capacity=log_capacity)
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._values.get(key, default)
+
+    def set(self, key, value):
+        """整体替换键值，读取方总能看到完整的一次写入"""
+        with self._lock:
+            self._values[key] = value
+
+
+class SQLiteStateStore:
+    """
+    本地SQLite文件共享状态（多进程）
+
+    值以JSON形式保存（NumPy数组会被转换为列表），
+    每个线程使用独立连接，数据库启用WAL模式以支持并发读写。
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, path, log_capacity=1000):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT, updated_at REAL)"
+            )
+        self.logs = SQLiteLogStore(self._connect, capacity=log_capacity)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value):
+        payload = json.dumps(value, cls=NumpyEncoder, ensure_ascii=False)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, payload, time.time())
+            )
+
+
+def create_state_store(backend=None, path=None, log_capacity=1000):
+    """根据参数或环境变量创建共享状态存储"""
+    backend = (backend or os.environ.get('DILL_STATE_BACKEND', 'memory')).lower()
+    if backend == 'sqlite':
+        path = path or os.environ.get('DILL_STATE_DB') or os.path.join(
+            tempfile.gettempdir(), 'dill_model_state.sqlite3'
+        )
+        return SQLiteStateStore(path, log_capacity=log_capacity)
+    if backend != 'memory':
+        raise ValueError(f"未知的状态存储后端: {backend}")
+    return InProcessStateStore(log_capacity=log_capacity)
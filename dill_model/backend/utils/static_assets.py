@@ -0,0 +1,230 @@
+"""
+前端静态资源服务
+
+frontend/ 下的 main.js（约1MB）、index.html、CSS 等原先由 send_from_directory 以默认响应头发送，
+每次打开页面都重新传输未压缩的内容。这里改为：
+- 文本类资源（js/css/html/svg/json）首次请求时预压缩（gzip，安装了 brotli 时同时生成 br），
+  按文件 (大小, mtime_ns) 缓存，文件修改后自动重建；可在启动时后台预热
+- 资源按内容 SHA-256 生成指纹文件名（js/main.js -> js/main.<摘要>.js），
+  HTML 页面中对本地资源的 src/href 引用改写为指纹路径
+- 指纹路径以 Cache-Control: public, max-age=一年, immutable 发送；普通路径与 HTML 以 no-cache + ETag 发送，
+  浏览器每次校验，未变化时返回 304
+- 开发模式（DILL_STATIC_CACHE=0 或 Flask debug）不改写 HTML，直接发送原文件；
+  请求到过期指纹时发送当前文件并禁止长期缓存
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response, request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+# 需要预压缩的扩展名
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.html', '.htm', '.svg', '.json', '.txt', '.map', '.xml'}
+# 小于该大小的文件不压缩
+MIN_COMPRESS_BYTES = 1024
+# 指纹资源的缓存时间（秒）
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# 指纹摘要长度
+DIGEST_LENGTH = 10
+
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.[A-Za-z0-9]+)$' % DIGEST_LENGTH)
+# HTML 中的本地资源引用：src="js/main.js?v=1.0"、href="css/style.css"
+_ASSET_REFERENCE = re.compile(
+    r'''(?P<prefix>\b(?:src|href)\s*=\s*)(?P<quote>["'])(?P<path>(?!https?:|//|data:|#|mailto:|javascript:)[^"'?#]+)(?P<query>\?[^"'#]*)?(?P=quote)''',
+    re.IGNORECASE
+)
+
+
+def fingerprint_path(path, digest):
+    """js/main.js -> js/main.<digest>.js"""
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.{digest}{extension}'
+
+
+class StaticAsset:
+    """单个静态资源：内容摘要、指纹路径与预压缩版本"""
+
+    def __init__(self, path, full_path, stat):
+        self.path = path
+        self.full_path = full_path
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.mtime_ns = stat.st_mtime_ns
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.encodings = {}
+
+        hasher = hashlib.sha256()
+        compressible = os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+        with open(full_path, 'rb') as f:
+            if compressible:
+                data = f.read()
+                hasher.update(data)
+            else:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    hasher.update(chunk)
+        self.digest = hasher.hexdigest()
+        self.etag = self.digest[:32]
+        self.fingerprinted = fingerprint_path(path, self.digest[:DIGEST_LENGTH])
+
+        if compressible and self.size >= MIN_COMPRESS_BYTES:
+            self._add_encoding('gzip', gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self._add_encoding('br', brotli.compress(data, quality=11))
+
+    def _add_encoding(self, name, payload):
+        # 压缩后没有变小则不保留
+        if len(payload) < self.size:
+            self.encodings[name] = payload
+
+    def matches(self, stat):
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+    def describe(self):
+        return {
+            'path': self.path,
+            'fingerprinted': self.fingerprinted,
+            'size': self.size,
+            'encodings': {name: len(payload) for name, payload in self.encodings.items()}
+        }
+
+
+class StaticAssetManager:
+    """
+    静态资源缓存与发送
+
+    参数:
+        root: 静态文件根目录
+        fingerprint: 是否改写 HTML 中的资源引用为指纹路径（开发模式下关闭）
+    """
+
+    def __init__(self, root, fingerprint=True):
+        self.root = os.path.abspath(root)
+        self.fingerprint = fingerprint
+        self._assets = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def _resolve(self, path):
+        """相对路径 -> 绝对路径（拒绝越出根目录的路径）"""
+        full_path = os.path.abspath(os.path.join(self.root, path))
+        if os.path.commonpath([full_path, self.root]) != self.root:
+            return None
+        return full_path
+
+    def asset(self, path):
+        """获取资源（文件修改后重建），不存在时返回 None"""
+        path = path.replace('\\', '/').lstrip('/')
+        full_path = self._resolve(path)
+        if full_path is None:
+            return None
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return None
+        if not os.path.isfile(full_path):
+            return None
+        asset = self._assets.get(path)
+        if asset is None or not asset.matches(stat):
+            asset = StaticAsset(path, full_path, stat)
+            with self._lock:
+                self._assets[path] = asset
+                self.builds += 1
+        return asset
+
+    def warm(self):
+        """预先计算全部资源的摘要和压缩版本"""
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.startswith('.'):
+                    self.asset(os.path.relpath(os.path.join(directory, filename), self.root))
+
+    def rewrite_html(self, html, page_path):
+        """将 HTML 中的本地资源引用改写为指纹路径"""
+        base = os.path.dirname(page_path)
+
+        def replace(match):
+            reference = match.group('path')
+            asset = self.asset(os.path.normpath(os.path.join(base, reference)).replace('\\', '/'))
+            if asset is None or asset.mimetype == 'text/html':
+                return match.group(0)
+            fingerprinted = fingerprint_path(reference, asset.digest[:DIGEST_LENGTH])
+            return f"{match.group('prefix')}{match.group('quote')}{fingerprinted}{match.group('quote')}"
+
+        return _ASSET_REFERENCE.sub(replace, html)
+
+    def _lookup(self, path):
+        """请求路径 -> (资源, 是否为当前指纹路径)"""
+        asset = self.asset(path)
+        if asset is not None:
+            return asset, False
+        match = _FINGERPRINTED.match(path)
+        if match is None:
+            return None, False
+        asset = self.asset(match.group('stem') + match.group('ext'))
+        if asset is None:
+            return None, False
+        return asset, match.group('digest') == asset.digest[:DIGEST_LENGTH]
+
+    def serve(self, path):
+        """发送静态资源（找不到时返回 None，由调用方处理 404）"""
+        asset, immutable = self._lookup(path)
+        if asset is None:
+            return None
+
+        if asset.mimetype == 'text/html' and self.fingerprint:
+            with open(asset.full_path, 'r', encoding='utf-8') as f:
+                html = self.rewrite_html(f.read(), asset.path)
+            response = Response(html, mimetype='text/html')
+            response.set_etag(hashlib.sha256(html.encode('utf-8')).hexdigest()[:32])
+        else:
+            encoding = self._negotiate(asset)
+            if encoding is None:
+                response = send_file(asset.full_path, mimetype=asset.mimetype, conditional=True,
+                                     etag=asset.etag, last_modified=asset.mtime, max_age=0)
+            else:
+                response = Response(asset.encodings[encoding], mimetype=asset.mimetype)
+                response.headers['Content-Encoding'] = encoding
+                response.set_etag(f'{asset.etag}-{encoding}')
+                response.last_modified = asset.mtime
+            if asset.encodings:
+                response.vary.add('Accept-Encoding')
+
+        if immutable and self.fingerprint:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        else:
+            response.cache_control.max_age = None
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    @staticmethod
+    def _negotiate(asset):
+        """按 Accept-Encoding 选择预压缩版本（br 优先）"""
+        if not asset.encodings or request.range is not None:
+            return None
+        for encoding in ('br', 'gzip'):
+            if encoding in asset.encodings and request.accept_encodings[encoding] > 0:
+                return encoding
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'root': self.root,
+                'fingerprint': self.fingerprint,
+                'assets': len(self._assets),
+                'builds': self.builds,
+                'compressed_bytes': sum(len(p) for a in self._assets.values() for p in a.encodings.values()),
+                'brotli': brotli is not None
+            }
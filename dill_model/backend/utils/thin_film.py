@@ -0,0 +1,109 @@
+"""
+薄膜传输矩阵反射率计算
+
+光刻胶 / ARC / 基底 叠层的底部反射率，按 波长 × ARC厚度 × 入射角 一次向量化计算：
+- 多层膜使用传输矩阵的递推形式（Airy 递推），对吸收层（复折射率 N = n + ik）同样适用
+- s、p 偏振分别计算，默认取非偏振平均
+- 所有输入按 NumPy 广播规则组合，波长在第0轴、厚度在第1轴、角度在第2轴
+"""
+
+import numpy as np
+
+# 默认扫描网格
+DEFAULT_WAVELENGTHS = np.linspace(190.0, 450.0, 53)   # nm
+DEFAULT_THICKNESSES = np.linspace(0.0, 200.0, 201)    # nm
+DEFAULT_ANGLES = np.array([0.0, 10.0, 20.0, 30.0])    # 度（光刻胶中的入射角）
+
+
+def _normal_component(N, n_sin):
+    """q = N·cosθ = sqrt(N² - (N0 sinθ0)²)，取衰减分支（Im q ≥ 0）"""
+    q = np.sqrt(N * N - n_sin * n_sin + 0j)
+    return np.where(q.imag < 0, -q, q)
+
+
+def _fresnel(N_i, q_i, N_j, q_j, polarization):
+    if polarization == 's':
+        return (q_i - q_j) / (q_i + q_j)
+    return (N_j * N_j * q_i - N_i * N_i * q_j) / (N_j * N_j * q_i + N_i * N_i * q_j)
+
+
+def multilayer_reflectance(n_incident, layers, n_substrate, wavelengths, angles=0.0, polarization='unpolarized'):
+    """
+    多层膜反射率
+
+    参数:
+        n_incident: 入射介质（光刻胶）折射率
+        layers: [(N, d), ...] 从入射侧到基底侧的膜层复折射率与厚度(nm)
+        n_substrate: 基底复折射率
+        wavelengths: 波长(nm)
+        angles: 入射介质中的入射角(度)
+        polarization: 's'、'p' 或 'unpolarized'
+
+    以上参数均可为数组，按广播规则组合；返回广播后形状的反射率。
+    """
+    if polarization == 'unpolarized':
+        return 0.5 * (multilayer_reflectance(n_incident, layers, n_substrate, wavelengths, angles, 's') +
+                      multilayer_reflectance(n_incident, layers, n_substrate, wavelengths, angles, 'p'))
+
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    n_incident = np.asarray(n_incident, dtype=complex)
+    n_sin = n_incident * np.sin(np.deg2rad(np.asarray(angles, dtype=float)))
+
+    media = [n_incident] + [np.asarray(N, dtype=complex) for N, _ in layers] + [np.asarray(n_substrate, dtype=complex)]
+    q = [_normal_component(N, n_sin) for N in media]
+
+    # 从基底侧向入射侧递推：r_j = (ρ_j + r_{j+1}·e^{2iδ}) / (1 + ρ_j·r_{j+1}·e^{2iδ})
+    r = _fresnel(media[-2], q[-2], media[-1], q[-1], polarization)
+    for j in range(len(layers) - 1, -1, -1):
+        d = np.asarray(layers[j][1], dtype=float)
+        phase = np.exp(2j * (2.0 * np.pi / wavelengths) * q[j + 1] * d)
+        rho = _fresnel(media[j], q[j], media[j + 1], q[j + 1], polarization)
+        r = (rho + r * phase) / (1.0 + rho * r * phase)
+    return np.abs(r) ** 2
+
+
+def arc_reflectance_map(n_resist, arc_index, substrate_index, wavelengths=DEFAULT_WAVELENGTHS,
+                        thicknesses=DEFAULT_THICKNESSES, angles=DEFAULT_ANGLES):
+    """
+    光刻胶/ARC/基底叠层的完整反射率图
+
+    参数:
+        n_resist: 光刻胶折射率
+        arc_index, substrate_index: 形状与 wavelengths 相同的复折射率
+        wavelengths, thicknesses, angles: 扫描网格
+
+    返回:
+        dict:
+            reflectance: 形状 (波长, 厚度, 角度)
+            reflectance_no_arc: 形状 (波长, 角度)
+            optimal_thickness / min_reflectance: 每个波长下角度平均反射率最小的ARC厚度及对应反射率
+    """
+    wavelengths = np.atleast_1d(np.asarray(wavelengths, dtype=float))
+    thicknesses = np.atleast_1d(np.asarray(thicknesses, dtype=float))
+    angles = np.atleast_1d(np.asarray(angles, dtype=float))
+    arc_index = np.broadcast_to(np.asarray(arc_index, dtype=complex), wavelengths.shape)
+    substrate_index = np.broadcast_to(np.asarray(substrate_index, dtype=complex), wavelengths.shape)
+
+    wl = wavelengths[:, None, None]
+    reflectance = multilayer_reflectance(
+        n_resist, [(arc_index[:, None, None], thicknesses[None, :, None])], substrate_index[:, None, None],
+        wl, angles[None, None, :]
+    )
+    reflectance_no_arc = multilayer_reflectance(n_resist, [], substrate_index[:, None], wavelengths[:, None], angles[None, :])
+
+    mean_reflectance = reflectance.mean(axis=2)
+    best = mean_reflectance.argmin(axis=1)
+    return {
+        'wavelengths': wavelengths,
+        'thicknesses': thicknesses,
+        'angles': angles,
+        'reflectance': reflectance,
+        'reflectance_no_arc': reflectance_no_arc,
+        'optimal_thickness': thicknesses[best],
+        'min_reflectance': mean_reflectance[np.arange(len(wavelengths)), best]
+    }
+
+
+def transmission_factor(reflectance_with_arc, reflectance_no_arc):
+    """ARC透射率修正因子：(1 - 有ARC反射率) / (1 - 无ARC反射率)"""
+    return (1 - reflectance_with_arc) / (1 - reflectance_no_arc) if reflectance_no_arc > 0 else 1.0
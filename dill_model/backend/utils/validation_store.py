@@ -0,0 +1,438 @@
+"""
+验证数据记录存储
+
+用带索引的SQLite数据库保存验证记录，替代每次请求都完整读写 validation_data.xlsx 的方式：
+- 追加记录只执行INSERT，不再重写整个文件
+- 搜索/排序/分页与统计在SQL中完成，接口开销与页大小而非文件大小相关
+- 提供显式的xlsx导入/导出；首次使用时若数据库为空会自动导入已有的Excel文件
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+
+# 验证记录列（与原 validation_data.xlsx 的列顺序一致）
+VALIDATION_COLUMNS = (
+    # 基础信息
+    'timestamp', 'model_type', 'sine_type', 'is_ideal_exposure_model',
+    # 基底材料参数
+    'substrate_material', 'substrate_refractive_index', 'substrate_extinction_coefficient',
+    'substrate_thickness', 'substrate_thermal_conductivity', 'substrate_optical_density',
+    'substrate_bandgap', 'substrate_surface_roughness',
+    # 抗反射薄膜参数
+    'arc_material', 'arc_refractive_index', 'arc_extinction_coefficient', 'arc_thickness',
+    'arc_deposition_method', 'arc_uniformity', 'arc_reflectance', 'arc_anti_reflective_efficiency',
+    'arc_thermal_stability',
+    # 光学参数
+    'I_avg', 'V', 'K', 'wavelength', 'angle_a', 'numerical_aperture', 'polarization', 'coherence_factor',
+    # 曝光参数
+    't_exp', 'C', 'exposure_threshold', 'exposure_calculation_method', 'dose_uniformity',
+    'focus_offset', 'aberration_correction',
+    # 高级计算参数
+    'enable_exposure_time_window', 'time_mode', 'segment_count', 'segment_duration',
+    'segment_intensities', 'total_exposure_dose', 'simulation_resolution', 'boundary_conditions',
+    'mesh_density', 'convergence_criteria',
+    # 机器学习参数
+    'ml_model_type', 'training_algorithm', 'learning_rate', 'epochs', 'batch_size',
+    'validation_split', 'feature_scaling', 'regularization_factor', 'early_stopping',
+    'cross_validation_folds',
+    # 经验学习参数
+    'historical_data_weight', 'expert_knowledge_factor', 'pattern_recognition_threshold',
+    'adaptive_learning_rate', 'experience_decay_factor', 'confidence_threshold',
+    'uncertainty_estimation', 'knowledge_base_size', 'learning_curve_analysis',
+    # 化学放大参数
+    'acid_gen_efficiency', 'diffusion_length', 'reaction_rate', 'amplification', 'contrast',
+    # 三维空间频率参数
+    'Kx', 'Ky', 'Kz', 'phi_expr',
+    # 标注数据
+    'annotation_x', 'annotation_y', 'simulated_value', 'actual_value', 'annotation_timestamp'
+)
+
+# 建立索引的列（排序、过滤、统计常用列）
+INDEXED_COLUMNS = ('timestamp', 'model_type', 'annotation_x', 'simulated_value', 'actual_value')
+
+# 记录搜索匹配的列（与原Excel实现一致，不存在的列会被忽略）
+SEARCH_COLUMNS = ('model_type', 'x_coord', 'simulated_value', 'actual_value')
+
+TABLE = 'validation_records'
+
+
+def _quote(column):
+    """为列名加引号（列名已经过白名单校验）"""
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _to_sql_value(value):
+    """将请求/Excel中的值转换为可写入SQLite的值；空字符串与NaN视为缺失"""
+    if value is None:
+        return None
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        value = value.item()  # NumPy标量
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, str) and value == '':
+        return None
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _format_record_value(value):
+    """按原Excel接口的规则格式化返回值：缺失为''，整数值返回int，其他数值返回float"""
+    if value is None:
+        return ''
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+            return ''
+        return float(value) if value != int(value) else int(value)
+    return str(value)
+
+
+class ValidationStore:
+    """
+    SQLite验证记录存储
+
+    每条记录有自增主键 id（只增不减），记录的"位置"即按 id 排序后的序号。
+    所有列使用 NUMERIC 亲和性，数值型字符串会自动存为数值。
+    """
+
+    def __init__(self, db_path, excel_path=None):
+        self.db_path = db_path
+        self.excel_path = excel_path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._columns = None
+        self._init_schema()
+        self._import_legacy_excel()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        column_defs = ', '.join(f"{_quote(col)} NUMERIC" for col in VALIDATION_COLUMNS)
+        with self._connect() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} (id INTEGER PRIMARY KEY AUTOINCREMENT, {column_defs})")
+            conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+            for col in INDEXED_COLUMNS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_{col} ON {TABLE}({_quote(col)})")
+        self._columns = None
+
+    def _import_legacy_excel(self):
+        """数据库为空且从未导入过时，自动导入已有的Excel数据（只执行一次）"""
+        if not self.excel_path or not os.path.exists(self.excel_path):
+            return
+        with self._connect() as conn:
+            imported = conn.execute("SELECT value FROM store_meta WHERE key = 'legacy_excel_imported'").fetchone()
+        if imported or self.count() > 0:
+            return
+        try:
+            count = self.import_xlsx(self.excel_path)
+            print(f"📥 已从 {self.excel_path} 导入{count}条验证记录到SQLite")
+        except Exception as e:
+            print(f"⚠️ 导入旧版Excel验证数据失败: {e}")
+            return
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('legacy_excel_imported', ?)",
+                         (self.excel_path,))
+
+    @property
+    def columns(self):
+        """数据列（不含id），按建表顺序"""
+        if self._columns is None:
+            with self._connect() as conn:
+                info = conn.execute(f"PRAGMA table_info({TABLE})").fetchall()
+            self._columns = [row[1] for row in info if row[1] != 'id']
+        return list(self._columns)
+
+    def _ensure_columns(self, columns):
+        """为导入数据中出现的新列扩展表结构"""
+        missing = [col for col in columns if col not in self.columns and col != 'id']
+        if not missing:
+            return
+        with self._schema_lock:
+            with self._connect() as conn:
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})").fetchall()}
+                for col in missing:
+                    if col not in existing:
+                        conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_quote(col)} NUMERIC")
+            self._columns = None
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _prepare_rows(rows):
+        """
+        校验并转换全部记录（写入前完成，失败时不触碰数据库）
+
+        返回:
+            (列名列表, 每条记录的值列表)
+        """
+        keys = []
+        for row in rows:
+            for key in row:
+                if not isinstance(key, str) or not key.strip():
+                    raise ValueError(f"无效的列名: {key!r}")
+                if key != 'id' and key not in keys:
+                    keys.append(key)
+        values = [[_to_sql_value(row.get(k)) for k in keys] for row in rows]
+        return keys, values
+
+    def _insert_sql(self, keys):
+        placeholders = ', '.join('?' for _ in keys)
+        return f"INSERT INTO {TABLE} ({', '.join(_quote(k) for k in keys)}) VALUES ({placeholders})"
+
+    def append(self, rows):
+        """
+        追加记录（仅INSERT）
+
+        参数:
+            rows: 字典列表，键为列名
+
+        返回:
+            追加后的总记录数
+        """
+        if not rows:
+            return self.count()
+        keys, values = self._prepare_rows(rows)
+        self._ensure_columns(keys)
+        with self._connect() as conn:
+            conn.executemany(self._insert_sql(keys), values)
+        return self.count()
+
+    def delete_by_id(self, record_id):
+        """按记录id删除，返回是否删除成功"""
+        with self._connect() as conn:
+            cursor = conn.execute(f"DELETE FROM {TABLE} WHERE id = ?", (int(record_id),))
+        return cursor.rowcount > 0
+
+    def id_at_position(self, position):
+        """按id顺序返回第position条（从0开始）记录的id，不存在时返回None"""
+        if position is None or position < 0:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT id FROM {TABLE} ORDER BY id LIMIT 1 OFFSET ?", (int(position),)).fetchone()
+        return row[0] if row else None
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+
+    def revision(self):
+        """数据修订标识（记录数, 最大id），记录增删后会变化，用于缓存失效"""
+        with self._connect() as conn:
+            return tuple(conn.execute(f"SELECT COUNT(*), MAX(id) FROM {TABLE}").fetchone())
+
+    def unique_sessions(self):
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(DISTINCT timestamp) FROM {TABLE}").fetchone()[0]
+
+    def _search_clause(self, search_term):
+        if not search_term:
+            return '', []
+        columns = [col for col in SEARCH_COLUMNS if col in self.columns]
+        if not columns:
+            return ' WHERE 0', []
+        clause = ' OR '.join(f"CAST({_quote(col)} AS TEXT) LIKE ? ESCAPE '\\'" for col in columns)
+        escaped = search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f" WHERE ({clause})", [f"%{escaped}%"] * len(columns)
+
+    def query_page(self, page=1, page_size=50, search_term='', sort_by='timestamp', sort_order='desc'):
+        """
+        分页查询记录
+
+        返回:
+            dict: records、record_ids、total_count、columns
+        """
+        page = max(int(page), 1)
+        page_size = max(int(page_size), 1)
+        columns = self.columns
+        where, params = self._search_clause(search_term)
+
+        order = 'id'
+        if sort_by in columns:
+            direction = 'ASC' if sort_order == 'asc' else 'DESC'
+            order = f"{_quote(sort_by)} IS NULL, {_quote(sort_by)} {direction}, id"
+
+        select_cols = ', '.join(['id'] + [_quote(col) for col in columns])
+        with self._connect() as conn:
+            total_count = conn.execute(f"SELECT COUNT(*) FROM {TABLE}{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {select_cols} FROM {TABLE}{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size]
+            ).fetchall()
+
+        records = [
+            {col: _format_record_value(value) for col, value in zip(columns, row[1:])}
+            for row in rows
+        ]
+        return {
+            'records': records,
+            'record_ids': [row[0] for row in rows],
+            'total_count': total_count,
+            'columns': columns
+        }
+
+    def statistics(self, search_term=''):
+        """在SQL中计算记录统计（准确性、模型类型分布、日期范围）"""
+        where, params = self._search_clause(search_term)
+        and_where = f"{where} AND" if where else " WHERE"
+        statistics = {}
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM {TABLE}{where}", params).fetchone()[0]
+            if total == 0:
+                return statistics
+            statistics['total_records'] = total
+
+            error_row = conn.execute(
+                f"SELECT AVG(e), MAX(e), MIN(e) FROM ("
+                f"SELECT ABS((simulated_value - actual_value) * 1.0 / actual_value) * 100 AS e FROM {TABLE}{and_where} "
+                f"typeof(simulated_value) IN ('integer', 'real') AND typeof(actual_value) IN ('integer', 'real') "
+                f"AND actual_value != 0)",
+                params
+            ).fetchone()
+            if error_row[0] is not None:
+                statistics['avg_accuracy'] = round(max(0, 100 - error_row[0]), 2)
+                statistics['avg_error'] = round(error_row[0], 2)
+                statistics['max_error'] = round(error_row[1], 2)
+                statistics['min_error'] = round(error_row[2], 2)
+            else:
+                statistics.update({'avg_accuracy': 0, 'avg_error': 0, 'max_error': 0, 'min_error': 0})
+
+            model_rows = conn.execute(
+                f"SELECT COALESCE(model_type, ''), COUNT(*) AS n FROM {TABLE}{where} "
+                f"GROUP BY COALESCE(model_type, '') ORDER BY n DESC",
+                params
+            ).fetchall()
+            statistics['model_types'] = [{'type': str(k), 'count': v} for k, v in model_rows]
+
+            timestamps = conn.execute(
+                f"SELECT DISTINCT timestamp FROM {TABLE}{and_where} timestamp IS NOT NULL", params
+            ).fetchall()
+        if timestamps:
+            # 与原Excel实现一致：按日期解析（无法解析的忽略），格式化为 %Y-%m-%d %H:%M:%S
+            # 逐个解析，导入数据中不同格式的时间戳互不影响
+            import pandas as pd
+            parsed = [pd.to_datetime(str(row[0]), errors='coerce') for row in timestamps]
+            parsed = [value.tz_localize(None) if value.tzinfo else value for value in parsed if not pd.isna(value)]
+            if parsed:
+                statistics['date_range'] = {
+                    'earliest': min(parsed).strftime('%Y-%m-%d %H:%M:%S'),
+                    'latest': max(parsed).strftime('%Y-%m-%d %H:%M:%S')
+                }
+        return statistics
+
+    def fetch(self, columns, ids=None):
+        """
+        读取指定列（按id顺序）
+
+        参数:
+            columns: 列名列表（不存在的列返回None）
+            ids: 可选的记录id列表
+
+        返回:
+            [(id, {col: value}), ...]
+        """
+        existing = [col for col in columns if col in self.columns]
+        select_cols = ', '.join(['id'] + [_quote(col) for col in existing])
+        sql = f"SELECT {select_cols} FROM {TABLE}"
+        params = []
+        if ids is not None:
+            ids = [int(i) for i in ids]
+            if not ids:
+                return []
+            sql += f" WHERE id IN ({', '.join('?' for _ in ids)})"
+            params = ids
+        sql += " ORDER BY id"
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        result = []
+        for row in rows:
+            values = dict.fromkeys(columns)
+            values.update(zip(existing, row[1:]))
+            result.append((row[0], values))
+        return result
+
+    def column_stats(self, columns):
+        """返回数值列的 (min, max, mean)，非数值或不存在的列不包含在结果中"""
+        stats = {}
+        existing = [col for col in columns if col in self.columns]
+        with self._connect() as conn:
+            for col in existing:
+                q = _quote(col)
+                row = conn.execute(
+                    f"SELECT MIN({q}), MAX({q}), AVG({q}) FROM {TABLE} WHERE typeof({q}) IN ('integer', 'real')"
+                ).fetchone()
+                if row[0] is not None:
+                    stats[col] = (row[0], row[1], row[2])
+        return stats
+
+    def to_dataframe(self, columns=None):
+        """读取为pandas DataFrame（缺失值为NaN，与原Excel读取结果一致）"""
+        import pandas as pd
+        columns = self.columns if columns is None else [col for col in columns if col in self.columns]
+        select_cols = ', '.join(_quote(col) for col in columns)
+        df = pd.read_sql_query(f"SELECT {select_cols} FROM {TABLE} ORDER BY id", self._connect())
+        # 纯数值列转换为数值类型，保持与Excel读取一致的dtype
+        for col in df.columns:
+            if df[col].dtype == object:
+                converted = pd.to_numeric(df[col], errors='coerce')
+                if converted.notna().sum() == df[col].notna().sum():
+                    df[col] = converted
+        return df
+
+    # ------------------------------------------------------------------
+    # Excel导入/导出
+    # ------------------------------------------------------------------
+
+    def import_xlsx(self, source, replace=False):
+        """
+        从xlsx导入记录
+
+        参数:
+            source: 文件路径或文件对象
+            replace: 为True时用导入的记录替换已有记录
+
+        先解析并校验全部行，再在同一个事务中清空（replace时）并插入；
+        任一步失败都会回滚，已有记录保持不变。
+
+        返回:
+            导入的记录数
+        """
+        import pandas as pd
+        try:
+            df = pd.read_excel(source)
+        except Exception as e:
+            raise ValueError(f"无法解析Excel文件: {e}") from e
+        rows = df.to_dict(orient='records')
+        keys, values = self._prepare_rows(rows)
+        if not rows and not replace:
+            return 0
+        self._ensure_columns(keys)
+        with self._connect() as conn:
+            if replace:
+                conn.execute(f"DELETE FROM {TABLE}")
+            if rows:
+                conn.executemany(self._insert_sql(keys), values)
+        return len(rows)
+
+    def export_xlsx(self, target):
+        """导出全部记录到xlsx（路径或文件对象），返回导出的记录数"""
+        df = self.to_dataframe()
+        df.to_excel(target, index=False)
+        return len(df)
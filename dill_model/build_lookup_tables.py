@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+增强Dill模型查找表离线构建脚本
+
+在部署前运行一次，将无量纲深度分布查找表写入 .npy 文件包。
+服务进程启动时以只读内存映射方式加载，多个 worker 共享同一份数据，无需各自重新求解。
+
+使用方法:
+    python build_lookup_tables.py [选项]
+
+选项:
+    --output DIR        输出目录 (默认: lookup_tables/enhanced_dill，也可用环境变量 DILL_LOOKUP_TABLE_DIR 指定)
+    --alpha-nodes N     α = A·M0·z_h 方向节点数 (默认: 33)
+    --beta-nodes N      β = B·z_h 方向节点数 (默认: 5)
+    --delta-nodes N     δ = C·I·t_exp 方向节点数 (默认: 65)
+    --z-points N        深度方向点数 (默认: 129)
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+
+def parse_arguments():
+    """解析命令行参数"""
+    from backend.models.enhanced_dill_surrogate import DEFAULT_TABLE_DIR
+
+    parser = argparse.ArgumentParser(description="增强Dill模型查找表离线构建脚本")
+    parser.add_argument('--output', '-o', default=DEFAULT_TABLE_DIR, help='输出目录')
+    parser.add_argument('--alpha-nodes', type=int, default=33, help='α方向节点数（奇数）')
+    parser.add_argument('--beta-nodes', type=int, default=5, help='β方向节点数（奇数）')
+    parser.add_argument('--delta-nodes', type=int, default=65, help='δ方向节点数（奇数）')
+    parser.add_argument('--z-points', type=int, default=129, help='深度方向点数')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    for name in ('alpha_nodes', 'beta_nodes', 'delta_nodes'):
+        if getattr(args, name) < 3 or getattr(args, name) % 2 == 0:
+            print(f"❌ {name} 必须是不小于3的奇数（误差估计需要抽取半分辨率网格）")
+            return 1
+
+    from backend.models.enhanced_dill_model import EnhancedDillModel
+    from backend.models.enhanced_dill_surrogate import build_lookup_tables
+
+    print(f"🔧 构建增强Dill查找表: α×β×δ×z = {args.alpha_nodes}×{args.beta_nodes}×{args.delta_nodes}×{args.z_points}")
+    start = time.time()
+    surrogate = build_lookup_tables(
+        EnhancedDillModel.fit_abc, args.output,
+        alpha_nodes=args.alpha_nodes, beta_nodes=args.beta_nodes,
+        delta_nodes=args.delta_nodes, num_z_points=args.z_points
+    )
+    size_mb = os.path.getsize(surrogate.source) / 1024 / 1024
+    print(f"✅ 查找表已写入 {args.output} ({size_mb:.1f} MB, 耗时 {time.time() - start:.1f}s)")
+    print(f"   - 随机抽样验证最大误差: {surrogate.validation_error:.2e}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+后烘(PEB)求解器数值检查脚本
+
+检查 backend/models/peb_solver.py 的数值正确性与稳定性：
+1. 酸碱中和闭式解与细步长ODE积分一致，且在参数范围上限、零/负舍入光酸输入下无 NaN/Inf
+2. 纯扩散的余弦分量按 exp(-D k² t) 精确衰减
+3. 完整反应-扩散系统随步长减小二阶收敛
+4. CARModel PEB模式在 neutralization_rate / quencher_concentration 取允许范围上限时（碱过量）返回有效结果
+5. 时间步规划：步数 × 网格点数 不超过计算量上限，步长被放大时给出原因
+任何检查失败时以非零状态退出，可在CI中运行。
+
+使用方法:
+    python check_peb_solver.py
+"""
+
+import os
+import sys
+import logging
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+import numpy as np
+
+
+def check_neutralize(peb):
+    """闭式解与参考解比较，以及极端参数下的有限性"""
+    acid = np.array([0.5, 0.1, 0.2, 0.0])
+    quencher = np.array([0.2, 0.4, 0.2, 0.3])
+    closed_acid, closed_quencher = peb.neutralize(acid, quencher, 10.0, 0.7)
+    ref_acid, ref_quencher = acid.copy(), quencher.copy()
+    steps = 100000
+    h = 0.7 / steps
+    for _ in range(steps):
+        # 二阶Runge-Kutta（中点法）
+        mid_rate = 10.0 * (ref_acid - 5.0 * h * ref_acid * ref_quencher) * (ref_quencher - 5.0 * h * ref_acid * ref_quencher)
+        ref_acid = ref_acid - h * mid_rate
+        ref_quencher = ref_quencher - h * mid_rate
+    error = max(np.abs(closed_acid - ref_acid).max(), np.abs(closed_quencher - ref_quencher).max())
+    failures = []
+    if error > 1e-8:
+        failures.append(f"中和闭式解与参考解偏差 {error:.2e}")
+
+    high = peb.PEB_PARAM_RANGES['neutralization_rate'][1]
+    for acid, quencher in (([0.0, -1e-18, 1e-18, 0.5], [0.1] * 4),
+                           ([0.0, 1e-300, 0.3, 10.0, 10.0], [10.0, 10.0, 10.0, 10.0, 1e-12])):
+        for dt in (1e-6, 1.0, 600.0):
+            new_acid, new_quencher = peb.neutralize(np.maximum(acid, 0.0), np.array(quencher, dtype=float), high, dt)
+            if not (np.isfinite(new_acid).all() and np.isfinite(new_quencher).all()):
+                failures.append(f"中和结果含 NaN/Inf: acid={acid}, quencher={quencher}, dt={dt}")
+            elif (new_acid < 0).any() or (new_quencher < 0).any():
+                failures.append(f"中和结果出现负浓度: acid={acid}, quencher={quencher}, dt={dt}")
+    return failures
+
+
+def check_diffusion(peb):
+    solver = peb.PEBSolver()
+    size, spacing = 400, 5.0
+    x = (np.arange(size) + 0.5) * spacing
+    k = 3 * np.pi / (size * spacing)
+    params = peb.resolve_peb_parameters({'acid_diffusivity': 50, 'amplification_rate': 0, 'quencher_concentration': 0,
+                                         'acid_loss_rate': 0, 'neutralization_rate': 0})
+    result = solver.solve(0.5 + 0.3 * np.cos(k * x), (spacing,), params)
+    exact = 0.5 + 0.3 * np.exp(-50 * k * k * params['bake_time']) * np.cos(k * x)
+    error = np.abs(result['acid'] - exact).max()
+    return [f"纯扩散与解析解偏差 {error:.2e}"] if error > 1e-12 else []
+
+
+def check_convergence(peb):
+    solver = peb.PEBSolver()
+    size, spacing = 200, 10.0
+    x = (np.arange(size) + 0.5) * spacing
+    initial_acid = 0.4 + 0.35 * np.cos(2 * np.pi * x / 800.0)
+    base = {'acid_diffusivity': 40, 'quencher_diffusivity': 10, 'bake_time': 30, 'quencher_concentration': 0.15,
+            'neutralization_rate': 2.0, 'acid_loss_rate': 0.01, 'amplification_rate': 0.1}
+    reference = solver.solve(initial_acid, (spacing,), peb.resolve_peb_parameters(dict(base, max_time_step=0.01)))
+    errors = []
+    for step in (1.0, 0.5):
+        result = solver.solve(initial_acid, (spacing,), peb.resolve_peb_parameters(dict(base, max_time_step=step)))
+        errors.append(np.abs(result['protection'] - reference['protection']).max())
+    order = np.log2(errors[0] / errors[1])
+    return [f"收敛阶 {order:.2f} 低于预期（误差 {errors}）"] if order < 1.6 else []
+
+
+def check_time_step_plan(peb):
+    """计算量上限与步数上限覆盖 max_time_step 时应报告实际步长及原因"""
+    long_bake = peb.resolve_peb_parameters({'bake_time': 3600, 'max_time_step': 0.01})
+    cases = [
+        (peb.resolve_peb_parameters(), 1000, None),
+        (long_bake, 1000, 'max_steps'),
+        (long_bake, 1000 * 1000, 'work_budget'),
+    ]
+    failures = []
+    for params, grid_points, expected in cases:
+        plan = peb.plan_time_steps(params, grid_points)
+        if plan['limited_by'] != expected:
+            failures.append(f"{grid_points}个点: 限制原因 {plan['limited_by']}，预期 {expected}")
+        if plan['steps'] * grid_points > peb.MAX_PEB_WORK:
+            failures.append(f"{grid_points}个点: {plan['steps']}步超出计算量上限")
+        if abs(plan['steps'] * plan['time_step'] - params['bake_time']) > 1e-9 * params['bake_time']:
+            failures.append(f"{grid_points}个点: 步数 × 步长 ≠ 后烘时间")
+    try:
+        peb.plan_time_steps(long_bake, peb.MAX_PEB_WORK)
+        failures.append("网格过大时未拒绝")
+    except ValueError:
+        pass
+    return failures
+
+
+def check_car_peb_mode():
+    """碱过量（淬灭剂比光酸多）时CAR模型PEB模式应返回有效结果"""
+    from backend.models.car_model import CARModel
+    from backend.models.peb_solver import PEB_PARAM_RANGES
+    model = CARModel()
+    rate_max = PEB_PARAM_RANGES['neutralization_rate'][1]
+    quencher_max = PEB_PARAM_RANGES['quencher_concentration'][1]
+    cases = [
+        (0.5, 0.8, {'neutralization_rate': 1e3, 'quencher_concentration': 1.0}),
+        (0.5, 1.0, {'neutralization_rate': rate_max}),
+        (10, 1.0, {'neutralization_rate': rate_max, 'quencher_concentration': quencher_max}),
+        (10, 1.0, {'neutralization_rate': rate_max, 'quencher_concentration': quencher_max,
+                   'acid_diffusivity': 1e5, 'quencher_diffusivity': 1e5, 'max_time_step': 600, 'bake_time': 3600}),
+    ]
+    failures = []
+    for I_avg, V, params in cases:
+        try:
+            data = model.generate_data(I_avg, V, 2.0, 100, 1, 3, 0.3, 10, 3, enable_peb=True, peb_params=params)
+        except Exception as e:
+            failures.append(f"PEB模式计算失败 I_avg={I_avg}, V={V}, {params}: {e}")
+            continue
+        for key in ('diffused_acid', 'quencher', 'deprotection', 'thickness'):
+            values = np.asarray(data[key])
+            if not np.isfinite(values).all() or (values < 0).any():
+                failures.append(f"PEB模式结果 {key} 无效: I_avg={I_avg}, V={V}, {params}")
+    return failures
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    from backend.models import peb_solver as peb
+
+    checks = [('酸碱中和闭式解', lambda: check_neutralize(peb)),
+              ('频域扩散', lambda: check_diffusion(peb)),
+              ('时间步收敛', lambda: check_convergence(peb)),
+              ('时间步规划', lambda: check_time_step_plan(peb)),
+              ('CAR PEB模式参数上限', check_car_peb_mode)]
+    failed = False
+    for name, check in checks:
+        failures = check()
+        if failures:
+            failed = True
+            print(f"❌ {name}")
+            for failure in failures:
+                print(f"   - {failure}")
+        else:
+            print(f"✅ {name}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+冷启动耗时检查脚本
+
+在全新的Python进程中依次测量：导入 backend.app、create_app()、首个 /api/health 请求，
+并检查冷启动期间是否加载了 matplotlib、pandas、scipy、scikit-learn、PIL 等重量级依赖。
+超出时间预算或加载了重量级依赖时以非零状态退出，可在部署前或CI中运行以发现启动回归。
+
+测量使用默认配置（含机器学习模型预热）；子进程在首个请求后再等待 --settle 秒，
+确认预热不会在这段时间内抢占启动路径。
+
+使用方法:
+    python check_startup_time.py [选项]
+
+选项:
+    --budget SECONDS    冷启动总耗时预算 (默认: 1.5)
+    --repeat N          测量次数，取中位数 (默认: 3)
+    --allow-heavy       不检查重量级依赖是否被加载
+    --settle SECONDS    首个请求后继续观察的时间 (默认: 1.0)
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+
+def measure(settle):
+    """子进程中执行：测量各阶段耗时并以JSON输出"""
+    import time
+    import threading
+    started = time.perf_counter()
+    from backend.app import create_app
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+    response = app.test_client().get('/api/health')
+    responded = time.perf_counter()
+    # 启动后短时间内仍不应有后台线程导入重量级依赖
+    time.sleep(settle)
+
+    from backend.utils.lazy_imports import loaded_heavy_modules
+    print(json.dumps({
+        'import_seconds': imported - started,
+        'create_app_seconds': created - imported,
+        'first_request_seconds': responded - created,
+        'total_seconds': responded - started,
+        'status_code': response.status_code,
+        'heavy_modules': loaded_heavy_modules(),
+        'background_threads': sorted(t.name for t in threading.enumerate() if t is not threading.main_thread())
+    }))
+
+
+def run_once(settle):
+    # 使用默认配置（不关闭机器学习模型预热），测得的即实际部署的冷启动
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--settle', str(settle)],
+                            cwd=current_dir, capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else '子进程异常退出')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动耗时检查脚本")
+    parser.add_argument('--budget', type=float, default=1.5, help='冷启动总耗时预算（秒）')
+    parser.add_argument('--repeat', type=int, default=3, help='测量次数')
+    parser.add_argument('--allow-heavy', action='store_true', help='不检查重量级依赖')
+    parser.add_argument('--settle', type=float, default=1.0, help='首个请求后继续观察的时间（秒）')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.settle)
+        return 0
+
+    try:
+        runs = [run_once(args.settle) for _ in range(max(args.repeat, 1))]
+    except Exception as e:
+        print(f"❌ 启动测量失败: {e}")
+        return 1
+
+    runs.sort(key=lambda run: run['total_seconds'])
+    median = runs[len(runs) // 2]
+    print(f"⏱️  冷启动耗时（{len(runs)}次取中位数）:")
+    print(f"   - 导入 backend.app: {median['import_seconds']:.3f}s")
+    print(f"   - create_app():     {median['create_app_seconds']:.3f}s")
+    print(f"   - 首个 /api/health: {median['first_request_seconds']:.3f}s")
+    print(f"   - 合计:             {median['total_seconds']:.3f}s (预算 {args.budget:.3f}s)")
+    print(f"   - 后台线程:         {', '.join(median['background_threads']) or '无'}")
+
+    failed = False
+    if median['status_code'] != 200:
+        print(f"❌ /api/health 返回 {median['status_code']}")
+        failed = True
+    if median['total_seconds'] > args.budget:
+        print("❌ 冷启动耗时超出预算")
+        failed = True
+    if median['heavy_modules'] and not args.allow_heavy:
+        print(f"❌ 冷启动期间加载了重量级依赖: {', '.join(median['heavy_modules'])}")
+        failed = True
+    if not failed:
+        print("✅ 冷启动检查通过")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
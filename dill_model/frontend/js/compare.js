@@ -3686,13 +3686,30 @@ function startLoadingLogsUpdate() {
             updateLoadingTime();
         }, 100);
         
-        // 开始日志获取
-        updateLoadingLogs();
-        
-        // 定期更新日志
-        window.loadingLogsUpdateInterval = setInterval(() => {
+        // 优先通过推送连接接收新日志，不支持时回退为定时轮询
+        if (window.EventSource) {
+            window.loadingLogsEventSource = new EventSource('/api/logs/stream');
+            const handleEntry = (event) => {
+                const log = JSON.parse(event.data);
+                if (loadingLogsContainer) {
+                    const placeholder = loadingLogsContainer.querySelector('.loading-logs-placeholder');
+                    if (placeholder) {
+                        placeholder.remove();
+                    }
+                    prependLoadingLogItem(createLoadingLogItem(getLogType(log.message), log.message, new Date(log.timestamp)));
+                }
+            };
+            window.loadingLogsEventSource.addEventListener('log', handleEntry);
+            window.loadingLogsEventSource.addEventListener('progress', handleEntry);
+        } else {
+            // 开始日志获取
             updateLoadingLogs();
-        }, 1000);
+            
+            // 定期更新日志
+            window.loadingLogsUpdateInterval = setInterval(() => {
+                updateLoadingLogs();
+            }, 1000);
+        }
     }
 }
 
@@ -3713,6 +3730,11 @@ function stopLoadingLogsUpdate() {
             clearInterval(window.loadingLogsUpdateInterval);
             window.loadingLogsUpdateInterval = null;
         }
+        
+        if (window.loadingLogsEventSource) {
+            window.loadingLogsEventSource.close();
+            window.loadingLogsEventSource = null;
+        }
     }
 }
 
@@ -2625,6 +2625,76 @@ function getParameterValues() {
     return params;
 }
 
+// 已登记到服务端的自定义光强分布（同一组数据只上传一次）
+let registeredIntensityProfile = null;
+
+/**
+ * 将自定义光强数据登记到服务端，返回光强分布ID
+ * 
+ * @param {Object} data custom_intensity_data
+ * @returns {Promise<string|null>} 登记失败时返回null
+ */
+async function registerIntensityProfile(data) {
+    const cached = registeredIntensityProfile;
+    if (cached && cached.x === data.x && cached.intensity === data.intensity &&
+        cached.length === data.x.length && cached.unit === data.original_unit && cached.scale === data.unit_scale) {
+        return cached.id;
+    }
+    // 服务端解析的大文件：x 仍是解析时的预览数组时，用 file_hash 登记完整数据
+    const serverFile = data.serverFile && data.serverFile.previewX === data.x ? data.serverFile : null;
+    const payload = serverFile
+        ? {file_hash: serverFile.fileHash, original_unit: data.original_unit, unit_scale: data.unit_scale}
+        : {x: data.x, intensity: data.intensity, original_unit: data.original_unit, unit_scale: data.unit_scale};
+    try {
+        const response = await fetch('/api/intensity-profiles', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(payload)
+        });
+        const result = await response.json();
+        if (!result.success) return null;
+        registeredIntensityProfile = {
+            id: result.data.profile_id, x: data.x, intensity: data.intensity,
+            length: data.x.length, unit: data.original_unit, scale: data.unit_scale
+        };
+        return result.data.profile_id;
+    } catch (error) {
+        console.warn('光强分布登记失败，改为随请求发送完整数据:', error);
+        return null;
+    }
+}
+
+/**
+ * 发送计算请求：自定义光强数据以ID代替，服务端ID过期时重新发送完整数据
+ * 
+ * @param {string} url API地址
+ * @param {Object} params 参数对象
+ * @returns {Promise<Response>}
+ */
+async function postCalculationRequest(url, params) {
+    const send = (body) => fetch(url, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(body)
+    });
+    const data = params.custom_intensity_data;
+    if (data && Array.isArray(data.x) && data.x.length > 1) {
+        const profileId = await registerIntensityProfile(data);
+        if (profileId) {
+            const response = await send(Object.assign({}, params, {
+                custom_intensity_data: {
+                    profile_id: profileId,
+                    outside_range_mode: data.outside_range_mode,
+                    custom_intensity_value: data.custom_intensity_value
+                }
+            }));
+            if (response.status !== 404) return response;
+            registeredIntensityProfile = null;
+        }
+    }
+    return send(params);
+}
+
 /**
  * 调用API计算Dill模型
  * 
@@ -2647,13 +2717,7 @@ async function calculateDillModel(params) {
             console.log('   - sine_type:', params.sine_type);
         }
         
-        const response = await fetch('/api/calculate', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(params)
-        });
+        const response = await postCalculationRequest('/api/calculate', params);
         
         const result = await response.json();
         
@@ -2747,13 +2811,7 @@ function preprocessCarModelData(data) {
  */
 async function calculateDillModelData(params) {
     try {
-        const response = await fetch('/api/calculate_data', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(params)
-        });
+        const response = await postCalculationRequest('/api/calculate_data', params);
         
         const result = await response.json();
         
@@ -11782,13 +11840,30 @@ function startLoadingLogsUpdate() {
             updateLoadingTime();
         }, 100);
         
-        // 开始日志获取
-        updateLoadingLogs();
-        
-        // 定期更新日志
-        window.loadingLogsUpdateInterval = setInterval(() => {
+        // 优先通过推送连接接收新日志，不支持时回退为定时轮询
+        if (window.EventSource) {
+            window.loadingLogsEventSource = new EventSource('/api/logs/stream');
+            const handleEntry = (event) => {
+                const log = JSON.parse(event.data);
+                if (loadingLogsContainer) {
+                    const placeholder = loadingLogsContainer.querySelector('.loading-logs-placeholder');
+                    if (placeholder) {
+                        placeholder.remove();
+                    }
+                    prependLoadingLogItem(createLoadingLogItem(getLogType(log.message), log.message, new Date(log.timestamp)));
+                }
+            };
+            window.loadingLogsEventSource.addEventListener('log', handleEntry);
+            window.loadingLogsEventSource.addEventListener('progress', handleEntry);
+        } else {
+            // 开始日志获取
             updateLoadingLogs();
-        }, 1000);
+            
+            // 定期更新日志
+            window.loadingLogsUpdateInterval = setInterval(() => {
+                updateLoadingLogs();
+            }, 1000);
+        }
     }
 }
 
@@ -11809,6 +11884,11 @@ function stopLoadingLogsUpdate() {
             clearInterval(window.loadingLogsUpdateInterval);
             window.loadingLogsUpdateInterval = null;
         }
+        
+        if (window.loadingLogsEventSource) {
+            window.loadingLogsEventSource.close();
+            window.loadingLogsEventSource = null;
+        }
     }
 }
 
@@ -16431,6 +16511,12 @@ function handleFileUpload(file) {
         return;
     }
     
+    // 较大的文本文件交给服务端解析（浏览器只接收降采样预览）
+    if (file.size > SERVER_PARSE_THRESHOLD && SERVER_PARSE_EXTENSIONS.includes(fileExtension)) {
+        parseFileOnServer(file);
+        return;
+    }
+    
     // 检查文件大小（限制为10MB）
     if (file.size > 10 * 1024 * 1024) {
         showNotification('文件过大，请选择小于10MB的文件。', 'error');
@@ -16480,6 +16566,71 @@ function handleFileUpload(file) {
     }
 }
 
+// 超过该大小的文本文件在服务端解析
+const SERVER_PARSE_THRESHOLD = 1024 * 1024;
+// 与服务端 intensity_file_parser.MAX_FILE_BYTES 一致（解析端点的请求体上限按此放宽）
+const SERVER_PARSE_MAX_SIZE = 512 * 1024 * 1024;
+const SERVER_PARSE_EXTENSIONS = [
+    '.txt', '.csv', '.json', '.dat', '.tab', '.tsv', '.asc', '.lis', '.log', '.out',
+    '.pli', '.ldf', '.msk', '.int', '.pro', '.sim'
+];
+
+// 服务端解析大文件：完整数组留在服务端（按 file_hash 缓存），前端只保存降采样预览
+async function parseFileOnServer(file) {
+    if (file.size > SERVER_PARSE_MAX_SIZE) {
+        showNotification('文件过大，请选择小于512MB的文件。', 'error');
+        return;
+    }
+    showNotification(`正在服务端解析文件: ${file.name} (${(file.size / 1024 / 1024).toFixed(1)}MB)...`, 'info');
+    
+    try {
+        const formData = new FormData();
+        formData.append('file', file);
+        const response = await fetch('/api/intensity-files/parse', {method: 'POST', body: formData});
+        const isJson = (response.headers.get('content-type') || '').includes('application/json');
+        const result = isJson ? await response.json() : null;
+        if (response.status === 413) {
+            // 超过服务端请求体上限（与 SERVER_PARSE_MAX_SIZE 一致）
+            showNotification((result && result.message) || `文件过大，请选择小于${SERVER_PARSE_MAX_SIZE / 1024 / 1024}MB的文件。`, 'error');
+            return;
+        }
+        if (!response.ok || !result || !result.success) {
+            throw new Error((result && result.message) || `服务端解析失败 (HTTP ${response.status})`);
+        }
+        
+        const info = result.data;
+        const x = info.preview.x;
+        const intensity = info.preview.intensity;
+        const outsideRangeMode = document.getElementById('outside-range-mode-file').value;
+        
+        customIntensityData = {
+            ...customIntensityData, // 保留已有属性
+            x: x,
+            intensity: intensity,
+            loaded: true,
+            source: 'file',
+            fileName: file.name,
+            outside_range_mode: outsideRangeMode,
+            auto_calculated_I_avg: parseFloat(info.intensity_mean.toFixed(6)),
+            serverFile: {fileHash: info.file_hash, previewX: x, numPoints: info.num_points, xUnit: info.x_unit}
+        };
+        
+        window.isPreviewDataButtonClicked = false;
+        const statusDiv = document.getElementById('intensity-data-status');
+        if (statusDiv) {
+            statusDiv.style.display = 'none';
+        }
+        updateSpecifiedIntensityDisplay();
+        
+        const unitHint = info.x_unit ? `，文件头坐标单位: ${info.x_unit}` : '';
+        showNotification(`成功加载文件: ${file.name}，包含 ${info.num_points} 个数据点（预览 ${x.length} 个点${unitHint}）。请确认坐标单位后点击"预览数据"按钮。`, 'success');
+        addPreviewButton();
+    } catch (error) {
+        console.error('❌ 服务端文件解析错误:', error);
+        showNotification(`文件解析失败: ${error.message}`, 'error');
+    }
+}
+
 // 解析文件内容
 function parseFileContent(content, fileExtension, fileName) {
     console.log(`🔍 解析 ${fileExtension} 文件内容`);
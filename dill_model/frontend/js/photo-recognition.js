@@ -10,6 +10,7 @@ class PhotoRecognition {
         this.previousCoordinateUnit = null;
         this.stream = null;
         this.originalImageData = null;
+        this.uploadedImage = null; // 已上传到后端的图像句柄 { source, imageId }
         this.grayscaleImageData = null;
         this.vectorData = null;
         this.isProcessing = false;
@@ -720,8 +721,10 @@ class PhotoRecognition {
                 }
             });
             
-            // 将图像数据转换为base64
-            const imageDataUrl = this.imageDataToBase64(this.originalImageData);
+            // 同一张图像已上传过时只传句柄，后端无需重新解码；否则上传base64图像
+            const uploadedImageId = (this.uploadedImage && this.uploadedImage.source === this.originalImageData)
+                ? this.uploadedImage.imageId : null;
+            const imageDataUrl = uploadedImageId ? null : this.imageDataToBase64(this.originalImageData);
             
             // 检查裁剪状态
             let actualCropMode = cropMode;
@@ -753,7 +756,7 @@ class PhotoRecognition {
             
             // 准备请求数据
             const requestData = {
-                image_data: imageDataUrl,
+                ...(uploadedImageId ? { image_id: uploadedImageId } : { image_data: imageDataUrl }),
                 grayscale_method: grayscaleMethod,
                 vector_direction: vectorDirection,
                 coordinate_unit: coordinateUnit,
@@ -779,13 +782,22 @@ class PhotoRecognition {
             });
             
             // 发送到后端处理
-            const response = await fetch('/api/process-photo', {
+            const postRequest = (body) => fetch('/api/process-photo', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify(requestData)
+                body: JSON.stringify(body)
             });
+            let response = await postRequest(requestData);
+            
+            if (response.status === 404 && uploadedImageId) {
+                // 后端缓存的图像句柄已过期，重新上传图像
+                console.log('♻️ 图像句柄已过期，重新上传图像');
+                delete requestData.image_id;
+                requestData.image_data = this.imageDataToBase64(this.originalImageData);
+                response = await postRequest(requestData);
+            }
             
             if (!response.ok) {
                 throw new Error(`服务器响应错误: ${response.status}`);
@@ -797,6 +809,10 @@ class PhotoRecognition {
                 throw new Error(result.message || '后端处理失败');
             }
             
+            if (result.image_id) {
+                this.uploadedImage = { source: this.originalImageData, imageId: result.image_id };
+            }
+            
             // 保存向量数据 - 支持1D和2D数据
             this.vectorData = {
                 method: 'photo-recognition',
@@ -52,12 +52,14 @@ class SystematicLogManager {
         // 日志存储
         this.logs = [];
         this.maxLogs = 1000;
+        this.lastSeq = 0; // 增量游标：服务端最后一条已获取日志的序列号
         
         // UI元素
         this.elements = {};
         
         // 定时器
         this.updateInterval = null;
+        this.eventSource = null; // 日志推送连接
         this.timeUpdateInterval = null;
         
         // 状态
@@ -412,6 +414,15 @@ class SystematicLogManager {
      */
     switchTab(tabName) {
         this.activeTab = tabName;
+        this.lastSeq = 0; // 过滤条件变化后重新全量获取一次
+        
+        // 推送连接按新的过滤条件重新建立
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+            this.fetchLogs();
+            this.startLogStream();
+        }
         
         // 更新UI
         document.querySelectorAll('.log-tab').forEach(tab => {
@@ -554,13 +565,60 @@ class SystematicLogManager {
             this.updateTime();
         }, 100);
         
-        // 日志更新
+        // 立即获取一次日志，然后优先通过推送连接接收新日志
+        this.fetchLogs();
+        this.startLogStream();
+    }
+
+    /**
+     * 开始接收新日志：优先使用Server-Sent Events推送，不支持时回退为定时轮询
+     */
+    startLogStream() {
+        if (this.eventSource || this.updateInterval) return;
+        
+        if (!window.EventSource) {
+            this.startLogPolling();
+            return;
+        }
+        
+        const params = new URLSearchParams({
+            page: this.currentPage,
+            category: this.activeTab !== 'all' ? this.activeTab : '',
+            since: this.lastSeq
+        });
+        const eventSource = new EventSource(`/api/logs/stream?${params}`);
+        const handleEntry = (event) => {
+            try {
+                const logItem = JSON.parse(event.data);
+                if (logItem.seq > this.lastSeq) {
+                    this.lastSeq = logItem.seq;
+                }
+                const stats = event.type === 'progress' ? { progress: logItem.message } : undefined;
+                this.processLogData({ logs: [logItem], stats: stats });
+            } catch (error) {
+                console.error('解析推送日志失败:', error);
+            }
+        };
+        eventSource.addEventListener('log', handleEntry);
+        eventSource.addEventListener('progress', handleEntry);
+        eventSource.onerror = () => {
+            // 连接被关闭且不会自动重连时，回退为轮询
+            if (eventSource.readyState === EventSource.CLOSED) {
+                this.eventSource = null;
+                this.startLogPolling();
+            }
+        };
+        this.eventSource = eventSource;
+    }
+
+    /**
+     * 定时轮询日志（推送不可用时的回退方式）
+     */
+    startLogPolling() {
+        if (this.updateInterval) return;
         this.updateInterval = setInterval(() => {
             this.fetchLogs();
         }, 1000);
-        
-        // 立即获取一次日志
-        this.fetchLogs();
     }
 
     /**
@@ -576,6 +634,11 @@ class SystematicLogManager {
             clearInterval(this.updateInterval);
             this.updateInterval = null;
         }
+        
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
     }
 
     /**
@@ -598,7 +661,8 @@ class SystematicLogManager {
             const params = new URLSearchParams({
                 limit: 100,
                 page: this.currentPage,
-                category: this.activeTab !== 'all' ? this.activeTab : ''
+                category: this.activeTab !== 'all' ? this.activeTab : '',
+                since: this.lastSeq
             });
             
             const response = await fetch(`/api/logs?${params}`);
@@ -619,8 +683,18 @@ class SystematicLogManager {
      * 处理日志数据
      */
     processLogData(data) {
+        // 兼容 {success, data: {...}} 响应包装
+        if (data && data.data && Array.isArray(data.data.logs)) {
+            data = data.data;
+        }
         if (!data || !Array.isArray(data.logs)) return;
         
+        if (typeof data.latest_seq === 'number') {
+            this.lastSeq = data.latest_seq;
+        }
+        // 没有新日志时无需重新渲染
+        if (data.logs.length === 0) return;
+        
         // 处理新日志
         data.logs.forEach(logItem => {
             if (!this.logs.find(existing => existing.id === logItem.id)) {
@@ -915,7 +989,7 @@ class SystematicLogManager {
         // }
         
         // 确保正在更新日志（但不显示面板）
-        if (!this.updateInterval) {
+        if (!this.updateInterval && !this.eventSource) {
             // 只启动日志更新，不显示面板
             this.startTime = Date.now();
             
@@ -925,9 +999,7 @@ class SystematicLogManager {
             }, 100);
             
             // 日志更新
-            this.updateInterval = setInterval(() => {
-                this.fetchLogs();
-            }, 1000);
+            this.startLogStream();
         }
         
         console.log('📝 日志已开始后台更新，点击日志按钮查看详情');
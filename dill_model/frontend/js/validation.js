@@ -2340,8 +2340,9 @@ function displayExcelData(data) {
         
         // 操作列
         const actualIndex = (currentPage - 1) * pageSize + index;
+        const recordId = data.record_ids ? data.record_ids[index] : null;
         html += `<td>
-                    <button class="delete-annotation" onclick="deleteRecord(${actualIndex})" title="删除此记录">
+                    <button class="delete-annotation" onclick="deleteRecord(${actualIndex}, ${recordId})" title="删除此记录">
                         <i class="fas fa-trash"></i>
                     </button>
                 </td>`;
@@ -2535,7 +2536,7 @@ function changePage(page) {
 /**
  * 删除记录
  */
-async function deleteRecord(recordIndex) {
+async function deleteRecord(recordIndex, recordId = null) {
     if (!confirm('确定要删除这条记录吗？此操作不可撤销。')) {
         return;
     }
@@ -2548,7 +2549,10 @@ async function deleteRecord(recordIndex) {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ record_index: recordIndex })
+            // 优先按记录ID删除，避免排序/搜索后位置与存储顺序不一致
+            body: JSON.stringify(recordId !== null && recordId !== undefined
+                ? { record_id: recordId }
+                : { record_index: recordIndex })
         });
         
         const result = await response.json();
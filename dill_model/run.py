@@ -14,6 +14,7 @@ Dill模型计算工具启动脚本
     --host HOST     指定服务器主机 (默认: 0.0.0.0)
     --debug         启用调试模式
     --no-browser    不自动打开浏览器
+    --skip-deps-check  跳过依赖检查与自动安装
     --help          显示帮助信息
 
 示例:
@@ -31,6 +32,7 @@ import argparse
 import threading
 import webbrowser
 import subprocess
+import importlib.util
 from datetime import datetime
 import requests
 
@@ -38,6 +40,13 @@ import requests
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
+def is_installed(module_name):
+    """只检查模块是否已安装，不实际导入（避免启动时加载 matplotlib、pandas 等重量级依赖）"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
 def check_and_install_dependencies():
     """检查并自动安装缺失的依赖包"""
     print("🔍 检查系统依赖...")
@@ -61,18 +70,11 @@ def check_and_install_dependencies():
     missing_packages = []
     
     # 检查每个依赖包
+    module_names = {'scikit-learn': 'sklearn', 'pillow': 'PIL'}
     for package_name, package_spec in required_packages.items():
-        try:
-            if package_name == 'flask_cors':
-                import flask_cors
-            elif package_name == 'scikit-learn':
-                import sklearn
-            elif package_name == 'pillow':
-                import PIL
-            else:
-                __import__(package_name)
+        if is_installed(module_names.get(package_name, package_name)):
             print(f"✅ {package_name} 已安装")
-        except ImportError:
+        else:
             print(f"❌ {package_name} 未安装")
             missing_packages.append(package_spec)
     
@@ -148,12 +150,11 @@ def install_requirements_if_needed():
         print("⚠️  未找到requirements.txt文件")
         return False
     
-    try:
-        # 特别检查openpyxl，因为这是Excel功能的关键依赖
-        import openpyxl
+    # 特别检查openpyxl，因为这是Excel功能的关键依赖
+    if is_installed('openpyxl'):
         print("✅ openpyxl (Excel支持) 已安装")
         return True
-    except ImportError:
+    else:
         print("📦 正在安装Excel支持库 openpyxl...")
         try:
             # 针对macOS系统的特殊处理
@@ -343,21 +344,10 @@ def check_dependencies():
         'flask', 'flask_cors', 'numpy', 'matplotlib', 'requests'
     ]
     
-    missing_packages = []
-    for package in required_packages:
-        try:
-            if package == 'flask_cors':
-                # flask_cors包安装后的实际模块名是flask_cors
-                import flask_cors
-            else:
-                __import__(package)
-        except ImportError:
-            missing_packages.append(package)
+    missing_packages = [package for package in required_packages if not is_installed(package)]
     
     # 单独检查Pillow/PIL
-    try:
-        from PIL import Image
-    except ImportError:
+    if not is_installed('PIL'):
         missing_packages.append('pillow')
     
     if missing_packages:
@@ -641,6 +631,13 @@ def parse_arguments():
         help='不自动打开浏览器'
     )
     
+    parser.add_argument(
+        '--skip-deps-check',
+        action='store_true',
+        default=os.environ.get('DILL_SKIP_DEP_CHECK') == '1',
+        help='跳过依赖检查与自动安装，加快启动（也可设置环境变量 DILL_SKIP_DEP_CHECK=1）'
+    )
+    
     parser.add_argument(
         '--verbose-logs', '-v',
         action='store_true',
@@ -661,32 +658,35 @@ def main():
     print("🔍 正在检查和安装必要的依赖包...")
     dependency_check_success = True
     
-    try:
-        # 优先安装Excel支持
-        if not install_requirements_if_needed():
-            print("⚠️  Excel支持库安装可能有问题，但将继续启动...")
-        
-        # 全面检查依赖
-        if not check_and_install_dependencies():
-            print("⚠️  某些依赖包可能缺失，但将尝试继续启动...")
-            dependency_check_success = False
+    if args.skip_deps_check:
+        print("⏭️  已跳过依赖检查")
+    else:
+        try:
+            # 优先安装Excel支持
+            if not install_requirements_if_needed():
+                print("⚠️  Excel支持库安装可能有问题，但将继续启动...")
             
-    except Exception as e:
-        print(f"⚠️  依赖安装过程中出现问题: {str(e)}")
-        print("将尝试继续启动，但某些功能可能不可用...")
-        dependency_check_success = False
-    
-    # 检查依赖（原有的检查逻辑）
-    if not check_dependencies():
-        if not dependency_check_success:
-            print("\n❌ 关键依赖缺失且自动安装失败。")
-            print("请尝试手动运行以下命令安装依赖:")
-            print(f"cd {current_dir}")
-            print("pip install -r requirements.txt")
-            print("或者:")
-            print("pip install openpyxl pandas flask flask-cors numpy matplotlib scikit-learn")
-        sys.exit(1)
-    
+            # 全面检查依赖
+            if not check_and_install_dependencies():
+                print("⚠️  某些依赖包可能缺失，但将尝试继续启动...")
+                dependency_check_success = False
+                
+        except Exception as e:
+            print(f"⚠️  依赖安装过程中出现问题: {str(e)}")
+            print("将尝试继续启动，但某些功能可能不可用...")
+            dependency_check_success = False
+        
+        # 检查依赖（原有的检查逻辑）
+        if not check_dependencies():
+            if not dependency_check_success:
+                print("\n❌ 关键依赖缺失且自动安装失败。")
+                print("请尝试手动运行以下命令安装依赖:")
+                print(f"cd {current_dir}")
+                print("pip install -r requirements.txt")
+                print("或者:")
+                print("pip install openpyxl pandas flask flask-cors numpy matplotlib scikit-learn")
+            sys.exit(1)
+        
     print("✅ 依赖检查完成！")
     
     # 设置环境（确保在创建应用之前设置）
@@ -706,7 +706,7 @@ def main():
     try:
         # 创建Flask应用
         print("🔧 正在创建应用实例...")
-        app = create_app()
+        app = create_app(debug=args.debug)
         
         # 打印服务器信息
         print_server_info(args.host, args.port, args.debug)